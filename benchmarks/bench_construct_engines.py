@@ -0,0 +1,113 @@
+"""Check the SQL segmentation engine against the Python engine on a synthetic benchmark day.
+
+Generates and ingests one synthetic AIS day, then constructs every MMSI's trajectories and
+stops with both engines in this process (no worker pool, no spatial extension needed) and
+compares the results. Prints the time per engine and the MMSI-days whose trajectories or stops
+differ; exits with status 1 if any do.
+
+Usage:
+    python ./benchmarks/bench_construct_engines.py                      # 1k vessels, 24 h
+    python ./benchmarks/bench_construct_engines.py --vessels 200 --hours 6 --threads 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from core.points_to_ls_poly import (  # noqa: E402
+    ProcessResultWithMetrics,
+    process_candidate_segments_with_metrics,
+    process_single_mmsi_with_metrics,
+)
+from db_setup.duckdb.create_duckdb_points import create_duckdb_points  # noqa: E402
+from db_setup.duckdb.create_duckdb_tables import create_duckdb_schema  # noqa: E402
+from duckdb_construct_trajs_stops import get_points_for_days_duckdb  # noqa: E402
+from duckdb_segment_points import segment_points_duckdb  # noqa: E402
+from synthetic_ais import write_synthetic_ais  # noqa: E402
+
+BENCH_SCHEMA = "bench"
+BENCH_DAY = date(2025, 1, 1)
+NO_WATERMARKS = "bench_no_watermarks"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vessels", type=int, default=1_000)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--threads", type=int, default=None, help="DuckDB threads (default: all)"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        write_synthetic_ais(work_dir, args.vessels, BENCH_DAY, 1, args.seed, args.hours)
+        conn = duckdb.connect(os.path.join(work_dir, "engines.duckdb"))
+        conn.execute("SET TimeZone = 'UTC';")
+        if args.threads:
+            conn.execute(f"SET threads = {args.threads};")
+        create_duckdb_schema(conn, BENCH_SCHEMA)
+        create_duckdb_points(
+            conn, BENCH_SCHEMA, ais_data_path=work_dir, interactive=False
+        )
+        conn.execute(
+            f"CREATE TEMP TABLE {NO_WATERMARKS} (mmsi BIGINT, last_ts TIMESTAMP);"
+        )
+
+        start = time.perf_counter()
+        points = get_points_for_days_duckdb(
+            conn, BENCH_SCHEMA, NO_WATERMARKS, [BENCH_DAY]
+        )
+        python_fetch_s = time.perf_counter() - start
+        python_results: dict[tuple[int, date], ProcessResultWithMetrics] = {}
+        for key, key_points in points.items():
+            python_results[key] = process_single_mmsi_with_metrics(key[0], key_points)
+        python_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segments, fallback_points, _ = segment_points_duckdb(
+            conn, BENCH_SCHEMA, NO_WATERMARKS, [BENCH_DAY]
+        )
+        sql_fetch_s = time.perf_counter() - start
+        sql_results: dict[tuple[int, date], ProcessResultWithMetrics] = {}
+        for key, key_segments in segments.items():
+            sql_results[key] = process_candidate_segments_with_metrics(
+                key[0], key_segments
+            )
+        for key, key_points in fallback_points.items():
+            sql_results[key] = process_single_mmsi_with_metrics(key[0], key_points)
+        sql_s = time.perf_counter() - start
+        conn.close()
+
+    num_points = sum(len(key_points) for key_points in points.values())
+    print(
+        f"\n{num_points:,} points of {len(points)} MMSI-days on {BENCH_DAY} "
+        f"({len(segments)} segmented in DuckDB, {len(fallback_points)} fell back to Python)"
+    )
+    print(f"python: {python_s:.2f}s (fetch {python_fetch_s:.2f}s)")
+    print(f"sql:    {sql_s:.2f}s (segment and fetch {sql_fetch_s:.2f}s)")
+
+    diffs = sorted(
+        key
+        for key in python_results.keys() | sql_results.keys()
+        if key not in python_results
+        or key not in sql_results
+        or python_results[key][1:3] != sql_results[key][1:3]
+    )
+    for mmsi, point_day in diffs:
+        print(f"Different trajectories or stops for MMSI {mmsi} on {point_day}")
+    print(f"{len(diffs)} of {len(python_results)} MMSI-days differ.")
+    sys.exit(1 if diffs else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Benchmark region/passage join latency on CellString tables before and after clustering.
+
+Usage:
+    python ./benchmarks/bench_cs_clustering.py                       # synthetic in-memory data
+    python ./benchmarks/bench_cs_clustering.py --trajectories 50000  # larger synthetic data
+    python ./benchmarks/bench_cs_clustering.py --duckdb-path etl.duckdb --cs-schema cs
+        (existing database; its CellString tables are clustered in place)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+import mercantile  # noqa: E402
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from core.cellstring_utils import xy_to_quadkey_int_array  # noqa: E402
+from db_setup.duckdb.cluster_duckdb_cs_tables import (  # noqa: E402
+    cluster_duckdb_cs_tables,
+)
+from db_setup.duckdb.pyarrow_schemas import (  # noqa: E402
+    PASSAGE_CS_SCHEMA,
+    REGION_CS_SCHEMA,
+    TRAJ_CS_SCHEMA,
+)
+
+BBOX_DK = (8.0, 54.5, 13.0, 57.8)  # west, south, east, north (Danish waters)
+ZOOM = 21
+
+REGION_JOIN_QUERY = """
+    SELECT COUNT(DISTINCT t.trajectory_id)
+    FROM {cs_schema}.trajectory_cs t
+    WHERE t.cell_z21 IN (
+        SELECT cell_z21 FROM {cs_schema}.region_cs WHERE region_id = ?
+    );
+"""
+
+PASSAGE_JOIN_QUERY = """
+    SELECT COUNT(DISTINCT t.trajectory_id)
+    FROM {cs_schema}.trajectory_cs t
+    WHERE t.cell_z21 IN (
+        SELECT cell_z21 FROM {cs_schema}.passage_cs WHERE passage_id = ?
+    );
+"""
+
+
+def _create_cs_tables(conn: duckdb.DuckDBPyConnection, cs_schema: str):
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {cs_schema};")
+    conn.execute(f"""
+        CREATE TABLE {cs_schema}.trajectory_cs (
+            trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+            ts_entry TIMESTAMP NOT NULL, ts_exit TIMESTAMP NOT NULL,
+            cell_z21 UINT64 NOT NULL
+        );
+        CREATE TABLE {cs_schema}.stop_cs (
+            stop_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+            ts_start TIMESTAMP NOT NULL, ts_end TIMESTAMP NOT NULL,
+            cell_z21 UINT64 NOT NULL
+        );
+        CREATE TABLE {cs_schema}.region_cs (
+            region_id INTEGER NOT NULL, name TEXT NOT NULL, cell_z21 UINT64 NOT NULL
+        );
+        CREATE TABLE {cs_schema}.passage_cs (
+            passage_id INTEGER NOT NULL, name TEXT NOT NULL, cell_z21 UINT64 NOT NULL
+        );
+    """)
+
+
+def populate_synthetic_cs(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    num_trajectories: int,
+    cells_per_trajectory: int,
+    seed: int = 42,
+) -> tuple[list[int], list[int]]:
+    """Insert random-walk trajectories plus square regions and straight passages.
+
+    Returns (region_ids, passage_ids).
+    """
+    rng = np.random.default_rng(seed)
+    _create_cs_tables(conn, cs_schema)
+
+    west, south, east, north = BBOX_DK
+    top_left = mercantile.tile(west, north, ZOOM)
+    bottom_right = mercantile.tile(east, south, ZOOM)
+
+    # Trajectories are inserted in trajectory_id order (as the transform does)
+    chunk = 5_000
+    for first in range(0, num_trajectories, chunk):
+        n = min(chunk, num_trajectories - first)
+        x0 = rng.integers(top_left.x, bottom_right.x, n)
+        y0 = rng.integers(top_left.y, bottom_right.y, n)
+        steps = rng.integers(0, 4, (n, cells_per_trajectory))
+        dx = np.where(steps == 0, 1, np.where(steps == 1, -1, 0))
+        dy = np.where(steps == 2, 1, np.where(steps == 3, -1, 0))
+        x = (x0[:, None] + np.cumsum(dx, axis=1)).ravel()
+        y = (y0[:, None] + np.cumsum(dy, axis=1)).ravel()
+
+        trajectory_ids = np.repeat(
+            np.arange(first + 1, first + n + 1), cells_per_trajectory
+        )
+        ts_start = rng.integers(1_700_000_000, 1_730_000_000, n)
+        ts_entry = (ts_start[:, None] + np.arange(cells_per_trajectory) * 5).ravel()
+        traj_arrow_table = pa.table(
+            {
+                "trajectory_id": pa.array(trajectory_ids, type=pa.int32()),
+                "mmsi": pa.array(
+                    200_000_000 + trajectory_ids % 50_000, type=pa.int64()
+                ),
+                "ts_entry": pa.array(ts_entry, type=pa.timestamp("s", tz="UTC")),
+                "ts_exit": pa.array(ts_entry + 5, type=pa.timestamp("s", tz="UTC")),
+                "cell_z21": pa.array(
+                    xy_to_quadkey_int_array(x, y, ZOOM), type=pa.uint64()
+                ),
+            },
+            schema=TRAJ_CS_SCHEMA,
+        )
+        conn.execute(
+            f"INSERT INTO {cs_schema}.trajectory_cs SELECT * FROM traj_arrow_table"
+        )
+
+    region_ids = []
+    passage_ids = []
+    for idx, side in enumerate((50, 200, 800), start=1):
+        rx = int(rng.integers(top_left.x, bottom_right.x - side))
+        ry = int(rng.integers(top_left.y, bottom_right.y - side))
+        gx, gy = np.meshgrid(np.arange(rx, rx + side), np.arange(ry, ry + side))
+        cells = xy_to_quadkey_int_array(gx.ravel(), gy.ravel(), ZOOM)
+        arrow_table = pa.table(
+            {
+                "region_id": pa.array([idx] * len(cells), type=pa.int32()),
+                "name": pa.array([f"region_{side}"] * len(cells), type=pa.string()),
+                "cell_z21": pa.array(cells, type=pa.uint64()),
+            },
+            schema=REGION_CS_SCHEMA,
+        )
+        conn.execute(f"INSERT INTO {cs_schema}.region_cs SELECT * FROM arrow_table")
+        region_ids.append(idx)
+
+        length = side * 10
+        px = np.arange(rx, rx + length)
+        py = np.full(length, ry)
+        cells = xy_to_quadkey_int_array(px, py, ZOOM)
+        arrow_table = pa.table(
+            {
+                "passage_id": pa.array([idx] * len(cells), type=pa.int32()),
+                "name": pa.array([f"passage_{length}"] * len(cells), type=pa.string()),
+                "cell_z21": pa.array(cells, type=pa.uint64()),
+            },
+            schema=PASSAGE_CS_SCHEMA,
+        )
+        conn.execute(f"INSERT INTO {cs_schema}.passage_cs SELECT * FROM arrow_table")
+        passage_ids.append(idx)
+
+    return region_ids, passage_ids
+
+
+def _ids(conn: duckdb.DuckDBPyConnection, cs_schema: str, table: str, column: str):
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT DISTINCT {column} FROM {cs_schema}.{table} ORDER BY 1"
+        ).fetchall()
+    ]
+
+
+def time_query(
+    conn: duckdb.DuckDBPyConnection, query: str, param: int, repeats: int
+) -> float:
+    """Median latency in milliseconds (after one warm-up run)."""
+    conn.execute(query, [param]).fetchall()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(query, [param]).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    region_ids: list[int],
+    passage_ids: list[int],
+    repeats: int,
+) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for region_id in region_ids:
+        results[f"region {region_id}"] = time_query(
+            conn, REGION_JOIN_QUERY.format(cs_schema=cs_schema), region_id, repeats
+        )
+    for passage_id in passage_ids:
+        results[f"passage {passage_id}"] = time_query(
+            conn, PASSAGE_JOIN_QUERY.format(cs_schema=cs_schema), passage_id, repeats
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duckdb-path", default=None)
+    parser.add_argument("--cs-schema", default="bench_cs")
+    parser.add_argument("--trajectories", type=int, default=20_000)
+    parser.add_argument("--cells-per-trajectory", type=int, default=300)
+    parser.add_argument("--cluster-zoom", type=int, default=13)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.duckdb_path:
+        conn = duckdb.connect(args.duckdb_path)
+        region_ids = _ids(conn, args.cs_schema, "region_cs", "region_id")
+        passage_ids = _ids(conn, args.cs_schema, "passage_cs", "passage_id")
+    else:
+        conn = duckdb.connect()
+        print(
+            f"Generating {args.trajectories:,} synthetic trajectories x {args.cells_per_trajectory} cells..."
+        )
+        region_ids, passage_ids = populate_synthetic_cs(
+            conn, args.cs_schema, args.trajectories, args.cells_per_trajectory
+        )
+
+    before = measure(conn, args.cs_schema, region_ids, passage_ids, args.repeats)
+    cluster_duckdb_cs_tables(
+        conn, args.cs_schema, cluster_zoom=args.cluster_zoom, full=True
+    )
+    after = measure(conn, args.cs_schema, region_ids, passage_ids, args.repeats)
+
+    print(f"\n{'query':<14}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] > 0 else float("inf")
+        print(f"{name:<14}{before[name]:>14.2f}{after[name]:>14.2f}{speedup:>9.1f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Micro-benchmarks for the core kernels with a throughput regression gate.
+
+Each kernel runs on a fixed, seeded fixture (long trajectory, dense moored clusters, large
+polygon, synthetic vessel days). The best of ``--repeats`` runs is reported as throughput
+(cells/s, points/s, calls/s) and compared with a baseline JSON: the script exits with status 1
+when a kernel's throughput drops by more than ``--threshold`` (default 20%).
+
+Usage:
+    python ./benchmarks/bench_kernels.py --update-baseline        # record the baseline
+    python ./benchmarks/bench_kernels.py                          # compare against it
+    python ./benchmarks/bench_kernels.py --kernels linecover,haversine_distance_m --threshold 0.1
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import numpy as np  # noqa: E402
+from shapely import LineString, box  # noqa: E402
+
+from core.cellstring_utils import (  # noqa: E402
+    linecover,
+    linecover_multizoom,
+    xyz_to_quadkey_int,
+)
+from core.ls_poly_to_cs import convert_polygon_to_cellstrings  # noqa: E402
+from core.points_to_ls_poly import (  # noqa: E402
+    MERGE_DISTANCE_THRESHOLD,
+    MERGE_TIME_THRESHOLD,
+    DuckDBRawPoint,
+    process_single_mmsi,
+)
+from core.stop_geometry import build_stop_polygon  # noqa: E402
+from core.utils import (  # noqa: E402
+    Coord,
+    coords_to_linestringm_as_wkb,
+    haversine_distance_m,
+    merge_candidate_stops,
+)
+from synthetic_ais import generate_day_table  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "kernel_baseline.json"
+)
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_REPEATS = 5
+SEED = 7
+
+
+@dataclass(frozen=True)
+class Kernel:
+    name: str
+    unit: str
+    setup: Callable[[], Any]  # builds the fixture once
+    run: Callable[[Any], int]  # returns the number of units processed
+    copy_fixture: bool = False  # the kernel mutates its input
+
+
+# --- Fixtures ---
+
+
+def _long_trajectory_coords(num_points: int = 5_000) -> list[Coord]:
+    """Random walk at ~12 kn with 10 s reports, starting in the Kattegat."""
+    rng = np.random.default_rng(SEED)
+    heading = np.cumsum(rng.normal(0, 0.05, num_points))
+    step_m = 12 * 0.514444 * 10
+    lat = 56.5 + np.cumsum(step_m * np.cos(heading)) / 111_320
+    lon = 11.0 + np.cumsum(step_m * np.sin(heading)) / (
+        111_320 * np.cos(np.radians(lat))
+    )
+    ts = 1_735_689_600 + np.arange(num_points) * 10
+    return [(float(x), float(y), float(t)) for x, y, t in zip(lon, lat, ts)]
+
+
+def _moored_candidate_stops(
+    num_stops: int = 2_000, points_per_stop: int = 30
+) -> list[list[Coord]]:
+    """Dense candidate stops around a few berths, consecutive in time."""
+    rng = np.random.default_rng(SEED)
+    berths = [(10.2170, 56.1510), (10.2185, 56.1515), (10.2300, 56.1600)]
+    stops: list[list[Coord]] = []
+    ts = 1_735_689_600.0
+    for i in range(num_stops):
+        lon0, lat0 = berths[(i // 50) % len(berths)]
+        jitter = rng.normal(0, 5e-5, (points_per_stop, 2))
+        stop: list[Coord] = []
+        for dx, dy in jitter:
+            stop.append((lon0 + dx, lat0 + dy, ts))
+            ts += 60
+        ts += 600
+        stops.append(stop)
+    return stops
+
+
+def _merged_moored_stop(num_points: int = 20_000) -> list[Coord]:
+    """One long merged stop at a berth (a vessel moored for days)."""
+    return [
+        point
+        for stop in _moored_candidate_stops(num_points // 40, 40)
+        for point in stop
+    ]
+
+
+def _vessel_days(num_vessels: int = 30) -> list[tuple[int, list[DuckDBRawPoint]]]:
+    """One synthetic day of mixed moored/anchored/underway vessels, as construct input."""
+    table = generate_day_table(date(2025, 1, 1), num_vessels, seed=SEED).to_pydict()
+    by_mmsi: dict[int, list[DuckDBRawPoint]] = {}
+    for mmsi, lon, lat, sog, ts, transponder in zip(
+        table["mmsi"],
+        table["lon"],
+        table["lat"],
+        table["sog"],
+        table["timestamp"],
+        table["transponder_type"],
+    ):
+        if lat == 91 or transponder != "class a":
+            continue
+        by_mmsi.setdefault(mmsi, []).append((lon, lat, sog, ts.timestamp()))
+    return sorted(by_mmsi.items())
+
+
+def _tile_xy(num: int = 200_000) -> tuple[list[int], list[int]]:
+    rng = np.random.default_rng(SEED)
+    return (
+        rng.integers(1_090_000, 1_120_000, num).tolist(),
+        rng.integers(630_000, 660_000, num).tolist(),
+    )
+
+
+def _lonlat_pairs(num: int = 100_000) -> list[tuple[float, float, float, float]]:
+    rng = np.random.default_rng(SEED)
+    lon = rng.uniform(8.0, 13.0, (num, 2))
+    lat = rng.uniform(54.5, 57.8, (num, 2))
+    return [(a, b, c, d) for (a, c), (b, d) in zip(lon.tolist(), lat.tolist())]
+
+
+# --- Kernel runs ---
+
+
+def _run_linecover(ls: LineString) -> int:
+    return len(linecover(ls, 21))
+
+
+def _run_linecover_multizoom(ls: LineString) -> int:
+    return sum(len(cells) for cells in linecover_multizoom(ls, (13, 17, 21)))
+
+
+def _run_quadkey(xy: tuple[list[int], list[int]]) -> int:
+    for x, y in zip(*xy):
+        xyz_to_quadkey_int(21, x, y)
+    return len(xy[0])
+
+
+def _run_polygon_cover(polygon) -> int:
+    _, _, cellstring_z21 = convert_polygon_to_cellstrings(polygon)
+    return len(cellstring_z21)
+
+
+def _run_process_single_mmsi(vessels: list[tuple[int, list[DuckDBRawPoint]]]) -> int:
+    for mmsi, points in vessels:
+        process_single_mmsi(mmsi, points)
+    return sum(len(points) for _, points in vessels)
+
+
+def _run_merge_candidate_stops(stops: list[list[Coord]]) -> int:
+    num_points = sum(len(stop) for stop in stops)
+    merge_candidate_stops(stops, MERGE_TIME_THRESHOLD, MERGE_DISTANCE_THRESHOLD)
+    return num_points
+
+
+def _run_stop_polygon(coords: list[Coord]) -> int:
+    build_stop_polygon(coords)
+    return len(coords)
+
+
+def _run_linestringm(coords: list[Coord]) -> int:
+    coords_to_linestringm_as_wkb(coords)
+    return len(coords)
+
+
+def _run_haversine(pairs: list[tuple[float, float, float, float]]) -> int:
+    for lon1, lat1, lon2, lat2 in pairs:
+        haversine_distance_m(lon1, lat1, lon2, lat2)
+    return len(pairs)
+
+
+KERNELS: list[Kernel] = [
+    Kernel(
+        "linecover",
+        "cells/s",
+        lambda: LineString(_long_trajectory_coords()),
+        _run_linecover,
+    ),
+    Kernel(
+        "linecover_multizoom",
+        "cells/s",
+        lambda: LineString(_long_trajectory_coords()),
+        _run_linecover_multizoom,
+    ),
+    Kernel("xyz_to_quadkey_int", "calls/s", _tile_xy, _run_quadkey),
+    Kernel(
+        "convert_polygon_to_cellstrings",
+        "cells/s",
+        lambda: box(10.20, 56.14, 10.23, 56.155),
+        _run_polygon_cover,
+    ),
+    Kernel("process_single_mmsi", "points/s", _vessel_days, _run_process_single_mmsi),
+    Kernel(
+        "merge_candidate_stops",
+        "points/s",
+        _moored_candidate_stops,
+        _run_merge_candidate_stops,
+        copy_fixture=True,
+    ),
+    Kernel("build_stop_polygon", "points/s", _merged_moored_stop, _run_stop_polygon),
+    Kernel(
+        "coords_to_linestringm_as_wkb",
+        "points/s",
+        _long_trajectory_coords,
+        _run_linestringm,
+    ),
+    Kernel("haversine_distance_m", "calls/s", _lonlat_pairs, _run_haversine),
+]
+
+
+def measure(kernel: Kernel, repeats: int) -> dict[str, Any]:
+    """Best-of-``repeats`` throughput after one warm-up run."""
+    fixture = kernel.setup()
+    timings: list[float] = []
+    units = 0
+    for i in range(repeats + 1):
+        args = copy.deepcopy(fixture) if kernel.copy_fixture else fixture
+        start = time.perf_counter()
+        units = kernel.run(args)
+        elapsed = time.perf_counter() - start
+        if i > 0:
+            timings.append(elapsed)
+    best = min(timings)
+    return {
+        "unit": kernel.unit,
+        "units": units,
+        "best_s": round(best, 6),
+        "median_s": round(float(np.median(timings)), 6),
+        "throughput": units / best if best > 0 else float("inf"),
+    }
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Names of kernels whose throughput fell more than ``threshold`` below the baseline."""
+    regressions: list[str] = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old or not old.get("throughput"):
+            continue
+        if result["throughput"] < old["throughput"] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative throughput drop (0.2 = 20%%)",
+    )
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--kernels", default=None, help="Comma-separated subset of kernel names"
+    )
+    args = parser.parse_args()
+
+    selected = (
+        {name.strip() for name in args.kernels.split(",")} if args.kernels else None
+    )
+    unknown = (selected or set()) - {kernel.name for kernel in KERNELS}
+    if unknown:
+        parser.error(f"Unknown kernel(s): {', '.join(sorted(unknown))}")
+
+    baseline: dict[str, dict[str, Any]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["kernels"]
+
+    results: dict[str, dict[str, Any]] = {}
+    print(
+        f"{'kernel':<32}{'throughput':>16}  {'unit':<10}{'best (s)':>10}{'vs baseline':>13}"
+    )
+    for kernel in KERNELS:
+        if selected and kernel.name not in selected:
+            continue
+        result = measure(kernel, args.repeats)
+        results[kernel.name] = result
+        old = baseline.get(kernel.name, {}).get("throughput")
+        change = f"{result['throughput'] / old - 1:+.1%}" if old else "-"
+        print(
+            f"{kernel.name:<32}{result['throughput']:>16,.0f}  {kernel.unit:<10}{result['best_s']:>10.4f}{change:>13}"
+        )
+
+    if args.update_baseline:
+        merged = {**baseline, **results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "kernels": merged,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nBaseline written to '{args.baseline}'.")
+        return
+
+    if not baseline:
+        print(f"\nNo baseline at '{args.baseline}'; run with --update-baseline first.")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(
+            f"\nThroughput regressed by more than {args.threshold:.0%}: {', '.join(regressions)}"
+        )
+        sys.exit(1)
+    print(f"\nNo kernel regressed by more than {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Time the ETL stages on synthetic AIS data at several scales and store the results.
+
+Stages: generate, ingest (create_duckdb_points), construct, transform_trajs, transform_stops and
+region conversion (convert_polygon_to_cellstrings). Each scale runs in a fresh DuckDB file. The
+results are written to benchmarks/results/<utc time>_<git commit>.json; pass a previous file
+with --compare to print the change per stage.
+
+Usage:
+    python ./benchmarks/bench_pipeline.py                                  # 1k and 10k vessels
+    python ./benchmarks/bench_pipeline.py --scales 1000,10000,100000 --hours 6
+    python ./benchmarks/bench_pipeline.py --scales 1000 --compare benchmarks/results/<file>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+from shapely import Polygon, box  # noqa: E402
+
+from core.ls_poly_to_cs import convert_polygon_to_cellstrings  # noqa: E402
+from core.metrics import MetricsRecorder  # noqa: E402
+from db_setup.duckdb.create_duckdb_points import create_duckdb_points  # noqa: E402
+from db_setup.duckdb.create_duckdb_tables import (  # noqa: E402
+    create_duckdb_schema,
+    create_duckdb_tables,
+)
+from duckdb_construct_trajs_stops import construct_trajectories_and_stops  # noqa: E402
+from duckdb_transform_ls_to_cs import (  # noqa: E402
+    transform_ls_trajectories_to_cs,
+    transform_poly_stops_to_cs,
+)
+from synthetic_ais import write_synthetic_ais  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BENCH_SCHEMA = "bench"
+START_DAY = date(2025, 1, 1)
+
+# Regions of increasing size; the z21 cover of the largest already has ~100k cells
+BENCH_REGIONS: dict[str, Polygon] = {
+    "berth": box(10.215, 56.150, 10.220, 56.152),
+    "harbour": box(10.20, 56.14, 10.23, 56.155),
+    "fairway": Polygon(
+        [(10.80, 55.30), (10.83, 55.30), (10.86, 55.35), (10.84, 55.36), (10.79, 55.32)]
+    ),
+}
+
+StageResult = dict[str, Any]
+
+
+def _git_commit() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _count(conn: duckdb.DuckDBPyConnection, table: str) -> int:
+    row = conn.execute(f"SELECT COUNT(*) FROM {BENCH_SCHEMA}.{table}").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _run_stage(
+    results: dict[str, StageResult], name: str, fn: Callable[[], int]
+) -> bool:
+    """Run one stage; ``fn`` returns the number of output rows. Failures are recorded, not raised."""
+    print(f"\n===== {name} =====")
+    start = time.perf_counter()
+    try:
+        rows = fn()
+    except Exception as e:
+        results[name] = {"status": f"failed: {e}"}
+        print(f"{name} failed: {e}")
+        return False
+    seconds = time.perf_counter() - start
+    results[name] = {
+        "status": "ok",
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+    }
+    return True
+
+
+def _convert_regions() -> int:
+    cells = 0
+    for polygon in BENCH_REGIONS.values():
+        _, _, cellstring_z21 = convert_polygon_to_cellstrings(polygon)
+        cells += len(cellstring_z21)
+    return cells
+
+
+def run_scale(
+    num_vessels: int,
+    num_days: int,
+    hours: float,
+    seed: int,
+    workers: int,
+    work_dir: str,
+    days_per_cycle: int = 1,
+) -> dict[str, Any]:
+    results: dict[str, StageResult] = {}
+    ais_dir = os.path.join(work_dir, f"ais_{num_vessels}")
+    db_path = os.path.join(work_dir, f"bench_{num_vessels}.duckdb")
+
+    def generate() -> int:
+        paths = write_synthetic_ais(
+            ais_dir, num_vessels, START_DAY, num_days, seed, hours
+        )
+        return sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+
+    _run_stage(results, "generate", generate)
+
+    conn = duckdb.connect(db_path)
+    conn.execute("SET TimeZone = 'UTC';")
+    create_duckdb_schema(conn, BENCH_SCHEMA)
+    metrics = MetricsRecorder()
+
+    def ingest() -> int:
+        create_duckdb_points(
+            conn, BENCH_SCHEMA, ais_data_path=ais_dir, interactive=False
+        )
+        return _count(conn, "points")
+
+    ingested = _run_stage(results, "ingest", ingest)
+    spatial_ok = False
+    try:
+        conn.execute("INSTALL spatial;")
+        conn.execute("LOAD spatial;")
+        create_duckdb_tables(conn, BENCH_SCHEMA, BENCH_SCHEMA)
+        spatial_ok = True
+    except Exception as e:
+        print(f"Spatial extension unavailable, skipping database stages: {e}")
+        for stage in ("construct", "transform_trajs", "transform_stops"):
+            results[stage] = {"status": "skipped: spatial extension unavailable"}
+
+    if ingested and spatial_ok:
+
+        def construct() -> int:
+            construct_trajectories_and_stops(
+                conn,
+                BENCH_SCHEMA,
+                BENCH_SCHEMA,
+                workers,
+                metrics=metrics,
+                days_per_cycle=days_per_cycle,
+            )
+            return _count(conn, "trajectory_ls") + _count(conn, "stop_poly")
+
+        def transform_trajs() -> int:
+            transform_ls_trajectories_to_cs(
+                conn, BENCH_SCHEMA, BENCH_SCHEMA, workers, metrics=metrics
+            )
+            return _count(conn, "trajectory_cs")
+
+        def transform_stops() -> int:
+            transform_poly_stops_to_cs(
+                conn, BENCH_SCHEMA, BENCH_SCHEMA, workers, metrics=metrics
+            )
+            return _count(conn, "stop_cs")
+
+        _run_stage(results, "construct", construct)
+        _run_stage(results, "transform_trajs", transform_trajs)
+        _run_stage(results, "transform_stops", transform_stops)
+
+    _run_stage(results, "convert_regions", _convert_regions)
+    conn.close()
+
+    phases = metrics.totals("construct", "mmsi")
+    return {
+        "vessels": num_vessels,
+        "stages": results,
+        "construct_phases_s": {
+            key: round(value, 3)
+            for key, value in phases.items()
+            if key.startswith("time_")
+        },
+    }
+
+
+def _print_report(run: dict[str, Any], baseline: dict[str, Any] | None):
+    baseline_by_scale = {
+        scale["vessels"]: scale for scale in (baseline or {}).get("scales", [])
+    }
+    print(
+        f"\n{'vessels':>9}  {'stage':<17}{'seconds':>10}{'rows':>14}{'rows/s':>14}{'change':>10}"
+    )
+    for scale in run["scales"]:
+        previous = baseline_by_scale.get(scale["vessels"], {}).get("stages", {})
+        for stage, result in scale["stages"].items():
+            if result["status"] != "ok":
+                print(f"{scale['vessels']:>9,}  {stage:<17}{result['status']}")
+                continue
+            change = ""
+            old = previous.get(stage, {})
+            if old.get("status") == "ok" and old.get("seconds"):
+                change = f"{(result['seconds'] - old['seconds']) / old['seconds']:+.1%}"
+            rate = result["rows_per_s"] or 0
+            print(
+                f"{scale['vessels']:>9,}  {stage:<17}{result['seconds']:>10.2f}{result['rows']:>14,}{rate:>14,.0f}{change:>10}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales", default="1000,10000", help="Comma-separated vessel counts"
+    )
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument(
+        "--hours", type=float, default=24.0, help="Hours of AIS per day"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument(
+        "--days-per-cycle", type=int, default=1, help="Construct cycle size in days"
+    )
+    parser.add_argument("--work-dir", default=None, help="Keep generated files here")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", default=None, help="Previous results JSON")
+    args = parser.parse_args()
+
+    scales = [int(value) for value in args.scales.split(",") if value.strip()]
+    started_at = datetime.now(timezone.utc)
+    run: dict[str, Any] = {
+        "commit": _git_commit(),
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "cpu_count": os.cpu_count(),
+        "workers": args.workers,
+        "days": args.days,
+        "days_per_cycle": args.days_per_cycle,
+        "hours": args.hours,
+        "seed": args.seed,
+        "scales": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for num_vessels in scales:
+            print(f"\n######## {num_vessels:,} vessels ########")
+            run["scales"].append(
+                run_scale(
+                    num_vessels,
+                    args.days,
+                    args.hours,
+                    args.seed,
+                    args.workers,
+                    work_dir,
+                    args.days_per_cycle,
+                )
+            )
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    out_path = os.path.join(
+        args.results_dir, f"{started_at:%Y%m%dT%H%M%SZ}_{run['commit']}.json"
+    )
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_report(run, baseline)
+    print(f"\nResults written to '{out_path}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Deterministic synthetic AIS generator writing DMA-style ``aisdk-YYYY-MM-DD.pq`` files.
+
+Vessels are moored (berth with GPS jitter, frequent null SOG), anchored (swinging around an
+anchor) or underway (random-walk heading, some with a mid-day stop). Rows get noisy SOG, speed
+outliers, exact duplicates, ``lat = 91`` invalid positions, class B transponders and invalid
+MMSIs, so every filter in the ingest and construct stages is exercised. The same seed, vessel
+count and dates always produce the same files.
+
+Usage:
+    python ./benchmarks/synthetic_ais.py --vessels 1000 --days 2 --out-dir /tmp/ais
+"""
+
+import argparse
+import math
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BBOX_DK = (8.0, 54.5, 13.0, 57.8)  # west, south, east, north (Danish waters)
+METERS_PER_DEG_LAT = 111_320.0
+KNOTS_TO_MS = 0.514444
+
+MOORED_SHARE = 0.3
+ANCHORED_SHARE = 0.2  # the rest is underway
+UNDERWAY_STOP_SHARE = 0.5  # underway vessels that stop for 1-3 hours during the day
+
+MOORED_INTERVAL_S = 180  # class A report interval at berth
+ANCHORED_INTERVAL_S = 60
+UNDERWAY_INTERVAL_S = 10
+
+NULL_SOG_SHARE_MOORED = 0.3
+NULL_SOG_SHARE = 0.02
+OUTLIER_SHARE = 0.001  # rows teleported ~50 km (speed outliers)
+DUPLICATE_SHARE = 0.01
+INVALID_LAT_SHARE = 0.005
+CLASS_B_SHARE = 0.05
+INVALID_MMSI_SHARE = 0.01
+
+VESSEL_CHUNK = 1_000
+
+AIS_SCHEMA = pa.schema(
+    [
+        pa.field("timestamp", pa.timestamp("us")),
+        pa.field("transponder_type", pa.string()),
+        pa.field("mmsi", pa.int64()),
+        pa.field("lat", pa.float64()),
+        pa.field("lon", pa.float64()),
+        pa.field("sog", pa.float64()),
+    ]
+)
+
+
+def _vessel_profiles(num_vessels: int, seed: int) -> dict[str, np.ndarray]:
+    """Per-vessel constants (identity, behaviour, home position) that do not change per day."""
+    rng = np.random.default_rng([seed, 0])
+    west, south, east, north = BBOX_DK
+
+    mmsi = 219_000_000 + np.arange(num_vessels, dtype=np.int64)
+    invalid = rng.random(num_vessels) < INVALID_MMSI_SHARE
+    mmsi[invalid] = 900_000_000 + np.arange(int(invalid.sum()), dtype=np.int64)
+
+    behaviour = rng.random(num_vessels)
+    return {
+        "mmsi": mmsi,
+        "moored": behaviour < MOORED_SHARE,
+        "anchored": (behaviour >= MOORED_SHARE)
+        & (behaviour < MOORED_SHARE + ANCHORED_SHARE),
+        "class_b": rng.random(num_vessels) < CLASS_B_SHARE,
+        "lon": rng.uniform(west, east, num_vessels),
+        "lat": rng.uniform(south, north, num_vessels),
+        "speed_kn": rng.uniform(8.0, 20.0, num_vessels),
+        "stops": rng.random(num_vessels) < UNDERWAY_STOP_SHARE,
+    }
+
+
+def _offsets_m_to_deg(
+    lat: np.ndarray, east_m: np.ndarray, north_m: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    dlat = north_m / METERS_PER_DEG_LAT
+    dlon = east_m / (METERS_PER_DEG_LAT * np.cos(np.radians(lat)))
+    return dlon, dlat
+
+
+def _stationary_tracks(
+    rng: np.random.Generator,
+    lon0: np.ndarray,
+    lat0: np.ndarray,
+    num_steps: int,
+    radius_m: float,
+    max_sog: float,
+    null_sog_share: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Moored/anchored vessels: slow swing around a fixed point plus GPS jitter."""
+    n = len(lon0)
+    phase = rng.uniform(0, 2 * math.pi, (n, 1))
+    angle = phase + np.linspace(0, 4 * math.pi, num_steps)[None, :]
+    east = radius_m * np.cos(angle) + rng.normal(0, 3.0, (n, num_steps))
+    north = radius_m * np.sin(angle) + rng.normal(0, 3.0, (n, num_steps))
+    lat = np.repeat(lat0[:, None], num_steps, axis=1)
+    dlon, dlat = _offsets_m_to_deg(lat, east, north)
+
+    sog = rng.uniform(0.0, max_sog, (n, num_steps))
+    sog[rng.random((n, num_steps)) < null_sog_share] = np.nan
+    return lon0[:, None] + dlon, lat + dlat, sog
+
+
+def _underway_tracks(
+    rng: np.random.Generator,
+    lon0: np.ndarray,
+    lat0: np.ndarray,
+    speed_kn: np.ndarray,
+    stops: np.ndarray,
+    num_steps: int,
+    interval_s: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Underway vessels: random-walk heading at cruise speed, optionally with a 1-3 h stop."""
+    n = len(lon0)
+    heading = np.cumsum(rng.normal(0, 0.02, (n, num_steps)), axis=1) + rng.uniform(
+        0, 2 * math.pi, (n, 1)
+    )
+
+    speed = np.repeat(speed_kn[:, None], num_steps, axis=1) + rng.normal(
+        0, 0.5, (n, num_steps)
+    )
+    stop_start = rng.integers(0, max(num_steps // 2, 1), n)
+    stop_len = rng.integers(3600, 3 * 3600, n) // interval_s
+    steps = np.arange(num_steps)[None, :]
+    stopped = (
+        stops[:, None]
+        & (steps >= stop_start[:, None])
+        & (steps < (stop_start + stop_len)[:, None])
+    )
+    speed = np.where(stopped, rng.uniform(0.0, 0.5, (n, num_steps)), speed)
+    speed = np.clip(speed, 0.0, None)
+
+    distance = speed * KNOTS_TO_MS * interval_s
+    east = np.cumsum(distance * np.sin(heading), axis=1)
+    north = np.cumsum(distance * np.cos(heading), axis=1)
+    lat = lat0[:, None] + north / METERS_PER_DEG_LAT
+    dlon, _ = _offsets_m_to_deg(lat, east, north)
+
+    sog = speed + rng.normal(0, 0.3, (n, num_steps))
+    sog = np.clip(sog, 0.0, None)
+    sog[rng.random((n, num_steps)) < NULL_SOG_SHARE] = np.nan
+    return lon0[:, None] + dlon, lat, sog
+
+
+def _group_rows(
+    rng: np.random.Generator,
+    day_start: int,
+    mmsi: np.ndarray,
+    class_b: np.ndarray,
+    lon: np.ndarray,
+    lat: np.ndarray,
+    sog: np.ndarray,
+    interval_s: int,
+) -> dict[str, np.ndarray]:
+    n, num_steps = lon.shape
+    start_offset = rng.integers(0, interval_s, (n, 1))
+    epoch = day_start + start_offset + np.arange(num_steps)[None, :] * interval_s
+    return {
+        "epoch": epoch.ravel(),
+        "mmsi": np.repeat(mmsi, num_steps),
+        "class_b": np.repeat(class_b, num_steps),
+        "lon": lon.ravel(),
+        "lat": lat.ravel(),
+        "sog": sog.ravel(),
+    }
+
+
+def generate_day_table(
+    day: date,
+    num_vessels: int,
+    seed: int = 42,
+    hours: float = 24.0,
+    first_vessel: int = 0,
+    last_vessel: int | None = None,
+    profiles: dict[str, np.ndarray] | None = None,
+) -> pa.Table:
+    """Synthetic AIS rows of one day for vessels ``first_vessel..last_vessel``.
+
+    Underway vessels end the day where they stopped: their position in ``profiles`` is advanced,
+    so generating consecutive days with the same profiles gives continuous tracks.
+    """
+    profiles = profiles if profiles is not None else _vessel_profiles(num_vessels, seed)
+    last_vessel = num_vessels if last_vessel is None else last_vessel
+    rng = np.random.default_rng([seed, day.toordinal(), first_vessel])
+    day_start = int(
+        datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+    )
+    duration_s = int(hours * 3600)
+    chunk = slice(first_vessel, last_vessel)
+
+    moored = profiles["moored"][chunk]
+    anchored = profiles["anchored"][chunk]
+    underway = ~(moored | anchored)
+
+    groups: list[dict[str, np.ndarray]] = []
+    for mask, interval_s in (
+        (moored, MOORED_INTERVAL_S),
+        (anchored, ANCHORED_INTERVAL_S),
+        (underway, UNDERWAY_INTERVAL_S),
+    ):
+        if not mask.any():
+            continue
+        num_steps = max(duration_s // interval_s, 1)
+        lon0 = profiles["lon"][chunk][mask]
+        lat0 = profiles["lat"][chunk][mask]
+        if mask is moored:
+            lon, lat, sog = _stationary_tracks(
+                rng, lon0, lat0, num_steps, 2.0, 0.3, NULL_SOG_SHARE_MOORED
+            )
+        elif mask is anchored:
+            lon, lat, sog = _stationary_tracks(
+                rng, lon0, lat0, num_steps, 60.0, 0.8, NULL_SOG_SHARE
+            )
+        else:
+            lon, lat, sog = _underway_tracks(
+                rng,
+                lon0,
+                lat0,
+                profiles["speed_kn"][chunk][mask],
+                profiles["stops"][chunk][mask],
+                num_steps,
+                interval_s,
+            )
+            vessel_idx = np.flatnonzero(mask) + first_vessel
+            profiles["lon"][vessel_idx] = lon[:, -1]
+            profiles["lat"][vessel_idx] = lat[:, -1]
+        groups.append(
+            _group_rows(
+                rng,
+                day_start,
+                profiles["mmsi"][chunk][mask],
+                profiles["class_b"][chunk][mask],
+                lon,
+                lat,
+                sog,
+                interval_s,
+            )
+        )
+
+    rows = {key: np.concatenate([g[key] for g in groups]) for key in groups[0]}
+    num_rows = len(rows["epoch"])
+
+    outliers = rng.random(num_rows) < OUTLIER_SHARE
+    rows["lat"][outliers] += rng.choice([-0.5, 0.5], int(outliers.sum()))
+    rows["lat"][rng.random(num_rows) < INVALID_LAT_SHARE] = 91.0
+
+    duplicates = np.flatnonzero(rng.random(num_rows) < DUPLICATE_SHARE)
+    order = np.concatenate([np.arange(num_rows), duplicates])
+    order = order[np.lexsort((rows["epoch"][order], rows["mmsi"][order]))]
+    rows = {key: values[order] for key, values in rows.items()}
+
+    sog = rows["sog"]
+    return pa.table(
+        {
+            "timestamp": pa.array(rows["epoch"] * 1_000_000, type=pa.timestamp("us")),
+            "transponder_type": pa.array(
+                np.where(rows["class_b"], "class b", "class a"), type=pa.string()
+            ),
+            "mmsi": pa.array(rows["mmsi"], type=pa.int64()),
+            "lat": pa.array(np.round(rows["lat"], 6), type=pa.float64()),
+            "lon": pa.array(np.round(rows["lon"], 6), type=pa.float64()),
+            "sog": pa.array(np.round(sog, 1), type=pa.float64(), mask=np.isnan(sog)),
+        },
+        schema=AIS_SCHEMA,
+    )
+
+
+def write_synthetic_ais(
+    out_dir: str,
+    num_vessels: int,
+    start_day: date,
+    num_days: int = 1,
+    seed: int = 42,
+    hours: float = 24.0,
+) -> list[str]:
+    """Write one ``aisdk-YYYY-MM-DD.pq`` per day (row group per vessel chunk); return the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    profiles = _vessel_profiles(num_vessels, seed)
+    paths: list[str] = []
+    for day_offset in range(num_days):
+        day = start_day + timedelta(days=day_offset)
+        path = os.path.join(out_dir, f"aisdk-{day.isoformat()}.pq")
+        with pq.ParquetWriter(path, AIS_SCHEMA) as writer:
+            for first in range(0, num_vessels, VESSEL_CHUNK):
+                writer.write_table(
+                    generate_day_table(
+                        day,
+                        num_vessels,
+                        seed,
+                        hours,
+                        first_vessel=first,
+                        last_vessel=min(first + VESSEL_CHUNK, num_vessels),
+                        profiles=profiles,
+                    )
+                )
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--vessels", type=int, default=1_000)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument(
+        "--start-day", type=date.fromisoformat, default=date(2025, 1, 1)
+    )
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = write_synthetic_ais(
+        args.out_dir, args.vessels, args.start_day, args.days, args.seed, args.hours
+    )
+    rows = sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+    print(
+        f"Wrote {rows:,} rows for {args.vessels:,} vessels to {len(paths)} file(s) in {time.perf_counter() - start:.2f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
+from functools import partial
+
 from shapely import LineString
 
-from core.ls_poly_to_cs import convert_linestring_to_cellids
+from core.cover_store import LINECOVER, get_or_compute_covers
+from core.ls_poly_to_cs import (
+    convert_linestring_to_cellids,
+    convert_linestring_to_cellstrings,
+)
 from db_setup.utils.db_utils import (
     get_cs_schema,
     get_db_backend,
@@ -16,6 +22,7 @@ def convert_passage_linestring_to_cs_postgres(linestring: LineString, name: str)
     """
     from psycopg import sql
 
+    from db_setup.postgresql.cover_store import load_covers, save_covers
     from db_setup.utils.connect import connect_to_postgres_db
 
     conn = connect_to_postgres_db()
@@ -39,14 +46,20 @@ def convert_passage_linestring_to_cs_postgres(linestring: LineString, name: str)
     conn.commit()
     print("Inserted passage linestring into PostGIS table")
 
-    # Convert passage to cellstring and insert into table
+    # Convert passage to cellstring (or reuse its stored cover) and insert into table
     print("Converting passage to cellstrings")
-    cellstring_z13 = convert_linestring_to_cellids(linestring, 13)
-    cellstring_z17 = convert_linestring_to_cellids(linestring, 17)
-    cellstring_z21 = convert_linestring_to_cellids(linestring, 21)
+    covers, from_store = get_or_compute_covers(
+        linestring.wkb,
+        LINECOVER,
+        (13, 17, 21),
+        partial(load_covers, conn, ls_schema),
+        partial(save_covers, conn, ls_schema),
+        lambda: dict(zip((13, 17, 21), convert_linestring_to_cellstrings(linestring))),
+    )
+    cellstring_z13, cellstring_z17, cellstring_z21 = covers[13], covers[17], covers[21]
 
     print(
-        f"Conversion succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
+        f"{'Reused stored cover' if from_store else 'Conversion'} succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
     )
 
     cur.execute(
@@ -73,6 +86,7 @@ def convert_passage_linestring_to_cs_duckdb(linestring: LineString, name: str):
     import duckdb
     import pyarrow as pa
 
+    from db_setup.duckdb.cover_store import load_covers, save_covers
     from db_setup.duckdb.pyarrow_schemas import PASSAGE_CS_SCHEMA
 
     ls_schema = get_ls_schema("duckdb")
@@ -98,8 +112,18 @@ def convert_passage_linestring_to_cs_duckdb(linestring: LineString, name: str):
         print("Inserted passage linestring into DuckDB table")
 
         print("Converting passage to cellstrings")
-        cellstring_z21 = convert_linestring_to_cellids(linestring, 21)
-        print(f"Conversion succeeded with {len(cellstring_z21)} cells (zoom 21).")
+        covers, from_store = get_or_compute_covers(
+            linestring.wkb,
+            LINECOVER,
+            (21,),
+            partial(load_covers, connection, ls_schema),
+            partial(save_covers, connection, ls_schema),
+            lambda: {21: convert_linestring_to_cellids(linestring, 21)},
+        )
+        cellstring_z21 = covers[21]
+        print(
+            f"{'Reused stored cover' if from_store else 'Conversion'} succeeded with {len(cellstring_z21)} cells (zoom 21)."
+        )
 
         if cellstring_z21:
             arrow_table = pa.table(
@@ -1,3 +1,4 @@
+from functools import partial
 from shapely import Polygon, MultiPolygon
 from db_setup.utils.db_utils import (
     get_cs_schema,
@@ -5,6 +6,7 @@ from db_setup.utils.db_utils import (
     get_db_path_or_url,
     get_ls_schema,
 )
+from core.cover_store import POLYGON_COVER, get_or_compute_covers
 from core.ls_poly_to_cs import convert_polygon_to_cellstrings
 
 
@@ -19,6 +21,7 @@ def convert_region_polygon_to_cs_postgresql(
         polygon: A Shapely Polygon or MultiPolygon representing the region
         name: A unique identifier for this region
     """
+    from db_setup.postgresql.cover_store import load_covers, save_covers
     from db_setup.utils.connect import connect_to_postgres_db
     from psycopg import sql
 
@@ -43,13 +46,25 @@ def convert_region_polygon_to_cs_postgresql(
     conn.commit()
     print(f"Inserted region polygon (ID: {region_id}, Name: {name}) into PostGIS table")
 
-    # Convert polygon to cellstring and insert into table
+    # Convert polygon to cellstring (or reuse its stored cover) and insert into table
     print("Converting polygon to cellstrings")
-    cellstring_z13, cellstring_z17, cellstring_z21 = convert_polygon_to_cellstrings(
-        polygon, skip_z21=skip_z21
+    zooms = (13, 17) if skip_z21 else (13, 17, 21)
+    covers, from_store = get_or_compute_covers(
+        polygon.wkb,
+        POLYGON_COVER,
+        zooms,
+        partial(load_covers, conn, ls_schema),
+        partial(save_covers, conn, ls_schema),
+        lambda: dict(
+            zip(
+                (13, 17, 21), convert_polygon_to_cellstrings(polygon, skip_z21=skip_z21)
+            )
+        ),
     )
+    cellstring_z13, cellstring_z17 = covers[13], covers[17]
+    cellstring_z21 = covers.get(21, [])
     print(
-        f"Conversion succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
+        f"{'Reused stored cover' if from_store else 'Conversion'} succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
     )
 
     cur.execute(
@@ -84,6 +99,7 @@ def convert_region_polygon_to_cs_duckdb(
     """
     import duckdb
     import pyarrow as pa
+    from db_setup.duckdb.cover_store import load_covers, save_covers
     from db_setup.duckdb.pyarrow_schemas import REGION_CS_SCHEMA
 
     ls_schema = get_ls_schema("duckdb")
@@ -115,10 +131,18 @@ def convert_region_polygon_to_cs_duckdb(
         )
 
         print("Converting polygon to cellstring(s)")
-        _, _, cellstring_z21 = convert_polygon_to_cellstrings(
-            polygon, skip_z21=skip_z21
+        covers, from_store = get_or_compute_covers(
+            polygon.wkb,
+            POLYGON_COVER,
+            (21,),
+            partial(load_covers, connection, ls_schema),
+            partial(save_covers, connection, ls_schema),
+            lambda: {21: convert_polygon_to_cellstrings(polygon, skip_z21=skip_z21)[2]},
+        )
+        cellstring_z21 = covers[21]
+        print(
+            f"{'Reused stored cover' if from_store else 'Conversion'} succeeded with {len(cellstring_z21)} cells (zoom 21)."
         )
-        print(f"Conversion succeeded with {len(cellstring_z21)} cells (zoom 21).")
 
         if cellstring_z21:
             arrow_table = pa.table(
@@ -1,4 +1,6 @@
+from functools import partial
 from shapely import from_wkb
+from core.cover_store import POLYGON_COVER, get_or_compute_covers
 from core.ls_poly_to_cs import convert_polygon_to_cellstrings
 from db_setup.utils.db_utils import (
     get_cs_schema,
@@ -13,6 +15,7 @@ def convert_region_polygons_to_cs_postgres():
     """
     Convert all region polygons in DB to cellstrings and upload to PostGIS.
     """
+    from db_setup.postgresql.cover_store import load_covers, save_covers
     from db_setup.utils.connect import connect_to_postgres_db
     from psycopg import sql
 
@@ -43,14 +46,24 @@ def convert_region_polygons_to_cs_postgres():
         # from_wkb returns the correct type (Polygon or MultiPolygon)
         polygon = from_wkb(geom_wkb)
 
-        # Convert polygon to cellstring and insert into table
+        # Convert polygon to cellstring (or reuse its stored cover) and insert into table
         print("Converting polygon to cellstrings")
-        cellstring_z13, cellstring_z17, cellstring_z21 = convert_polygon_to_cellstrings(
-            polygon
+        covers, from_store = get_or_compute_covers(
+            polygon.wkb,
+            POLYGON_COVER,
+            (13, 17, 21),
+            partial(load_covers, conn, ls_schema),
+            partial(save_covers, conn, ls_schema),
+            lambda: dict(zip((13, 17, 21), convert_polygon_to_cellstrings(polygon))),
+        )
+        cellstring_z13, cellstring_z17, cellstring_z21 = (
+            covers[13],
+            covers[17],
+            covers[21],
         )
 
         print(
-            f"Conversion of {name} succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
+            f"{'Reused stored cover' if from_store else 'Conversion'} of {name} succeeded with {len(cellstring_z13)} cells (zoom 13), {len(cellstring_z17)} cells (zoom 17), and {len(cellstring_z21)} cells (zoom 21)."
         )
 
         cur.execute(
@@ -74,6 +87,7 @@ def convert_region_polygons_to_cs_duckdb():
     """
     import duckdb
     import pyarrow as pa
+    from db_setup.duckdb.cover_store import load_covers, save_covers
     from db_setup.duckdb.pyarrow_schemas import REGION_CS_SCHEMA
 
     db_path = get_db_path_or_url("duckdb")
@@ -96,11 +110,19 @@ def convert_region_polygons_to_cs_duckdb():
         region_id, name, geom_wkb = row
         polygon = from_wkb(geom_wkb)
 
-        # Convert polygon to cellstring and insert into table
+        # Convert polygon to cellstring (or reuse its stored cover) and insert into table
         print("Converting polygon to cellstrings")
-        _, _, cellstring_z21 = convert_polygon_to_cellstrings(polygon, skip_z21=False)
+        covers, from_store = get_or_compute_covers(
+            polygon.wkb,
+            POLYGON_COVER,
+            (21,),
+            partial(load_covers, conn, ls_schema),
+            partial(save_covers, conn, ls_schema),
+            lambda: {21: convert_polygon_to_cellstrings(polygon, skip_z21=False)[2]},
+        )
+        cellstring_z21 = covers[21]
         print(
-            f"Conversion of {name} succeeded with {len(cellstring_z21)} cells (zoom 21)."
+            f"{'Reused stored cover' if from_store else 'Conversion'} of {name} succeeded with {len(cellstring_z21)} cells (zoom 21)."
         )
 
         if cellstring_z21:
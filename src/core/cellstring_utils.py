@@ -2,6 +2,7 @@ import math
 from enum import Enum
 
 import mercantile
+import numpy as np
 from shapely import LineString, Polygon, MultiPolygon, box
 
 from ukc_core.quadkey_utils import quadkey_to_int, zxy_to_quadkey
@@ -25,6 +26,81 @@ def xyz_to_quadkey_int(zoom: int, x: int, y: int) -> int:
     return quadkey_to_int(zxy_to_quadkey(zoom, x, y))
 
 
+def xy_to_quadkey_int_array(x: np.ndarray, y: np.ndarray, zoom: int) -> np.ndarray:
+    """Vectorized ``xyz_to_quadkey_int``: interleave tile x (even bits) and y (odd bits)."""
+    x = np.asarray(x, dtype=np.uint64)
+    y = np.asarray(y, dtype=np.uint64)
+    cells = np.zeros(np.broadcast(x, y).shape, dtype=np.uint64)
+    one = np.uint64(1)
+    for bit in range(zoom):
+        b = np.uint64(bit)
+        cells |= ((x >> b) & one) << np.uint64(2 * bit)
+        cells |= ((y >> b) & one) << np.uint64(2 * bit + 1)
+    return cells
+
+
+def quadkey_int_to_xy_array(
+    cells: np.ndarray, zoom: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Inverse of ``xy_to_quadkey_int_array``: de-interleave quadkey ints into tile (x, y)."""
+    cells = np.asarray(cells, dtype=np.uint64)
+    x = np.zeros(cells.shape, dtype=np.uint64)
+    y = np.zeros(cells.shape, dtype=np.uint64)
+    one = np.uint64(1)
+    for bit in range(zoom):
+        b = np.uint64(bit)
+        x |= ((cells >> np.uint64(2 * bit)) & one) << b
+        y |= ((cells >> np.uint64(2 * bit + 1)) & one) << b
+    return x, y
+
+
+def quadkey_int_ancestor(cell: int, from_zoom: int, to_zoom: int) -> int:
+    """Return the ancestor of a quadkey int at a coarser zoom (each zoom level is 2 bits)."""
+    if to_zoom > from_zoom:
+        raise ValueError(f"Ancestor zoom {to_zoom} is finer than cell zoom {from_zoom}")
+    return cell >> (2 * (from_zoom - to_zoom))
+
+
+def cellstring_ancestors(
+    cells: list[int], to_zoom: int, from_zoom: int = DEFAULT_ZOOM
+) -> list[int]:
+    """Sorted distinct ancestors of a CellString at a coarser zoom."""
+    if to_zoom > from_zoom:
+        raise ValueError(f"Ancestor zoom {to_zoom} is finer than cell zoom {from_zoom}")
+    if not cells:
+        return []
+    shift = np.uint64(2 * (from_zoom - to_zoom))
+    return np.unique(np.asarray(cells, dtype=np.uint64) >> shift).tolist()
+
+
+def grouped_cellstring_ancestors(
+    ids: np.ndarray, cells: np.ndarray, to_zoom: int, from_zoom: int = DEFAULT_ZOOM
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sorted distinct ancestors per id for a flattened batch of (id, cell) rows.
+
+    Returns (unique_ids, offsets, ancestors): the ancestors of ``unique_ids[i]`` are
+    ``ancestors[offsets[i]:offsets[i + 1]]``, the layout of an Arrow list array.
+    """
+    if to_zoom > from_zoom:
+        raise ValueError(f"Ancestor zoom {to_zoom} is finer than cell zoom {from_zoom}")
+    ids = np.asarray(ids)
+    ancestors = np.asarray(cells, dtype=np.uint64) >> np.uint64(
+        2 * (from_zoom - to_zoom)
+    )
+    if len(ids) == 0:
+        return ids, np.zeros(1, dtype=np.int32), ancestors
+
+    order = np.lexsort((ancestors, ids))
+    ids, ancestors = ids[order], ancestors[order]
+    keep = np.ones(len(ids), dtype=bool)
+    keep[1:] = (ids[1:] != ids[:-1]) | (ancestors[1:] != ancestors[:-1])
+    ids, ancestors = ids[keep], ancestors[keep]
+
+    unique_ids, starts = np.unique(ids, return_index=True)
+    offsets = np.append(starts, len(ids)).astype(np.int32)
+    return unique_ids, offsets, ancestors
+
+
 def _point_to_tile_fraction(lon: float, lat: float, zoom: int) -> tuple[float, float]:
     """Convert lon/lat to fractional tile coordinates at the given zoom level.
 
@@ -135,6 +211,42 @@ def linecover(
     return cells_with_time
 
 
+def linecover_multizoom(
+    ls: LineString,
+    zooms: tuple[int, ...] = (13, 17, DEFAULT_ZOOM),
+) -> list[list[tuple[int, int]]]:
+    """Return the ``linecover`` of a LineString at several zoom levels from one traversal.
+
+    The line is walked once at the finest zoom; the coarser sequences are derived by
+    right-shifting the quadkey ints (2 bits per zoom level) and suppressing consecutive
+    duplicates, so each coarser cell keeps the timestamp of its first fine cell.
+
+    Args:
+        ls:     A Shapely LineString.
+        zooms:  Tile zoom levels, any order.
+
+    Returns:
+        One list of (cell_id, epoch_timestamp) tuples per zoom in ``zooms``, temporally ordered.
+    """
+    finest_zoom = max(zooms)
+    fine_cells = linecover(ls, finest_zoom)
+    covers: list[list[tuple[int, int]]] = []
+    for zoom in zooms:
+        if zoom == finest_zoom:
+            covers.append(fine_cells)
+            continue
+        shift = 2 * (finest_zoom - zoom)
+        cells_with_time: list[tuple[int, int]] = []
+        prev_cell_id: int | None = None
+        for fine_cell_id, ts in fine_cells:
+            cell_id = fine_cell_id >> shift
+            if cell_id != prev_cell_id:
+                cells_with_time.append((cell_id, ts))
+                prev_cell_id = cell_id
+        covers.append(cells_with_time)
+    return covers
+
+
 def classify_tile_containment(
     poly: Polygon | MultiPolygon, tile: mercantile.Tile
 ) -> Classification:
@@ -0,0 +1,153 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import mercantile
+import numpy as np
+import shapely
+from shapely import LineString, MultiPolygon, Polygon
+
+from core.cellstring_utils import (
+    DEFAULT_ZOOM,
+    linecover,
+    quadkey_int_to_xy_array,
+    xy_to_quadkey_int_array,
+)
+
+CachedCover = tuple[
+    bytes, list[int]
+]  # (geom_wkb the cells were computed for, cell_z21)
+CoverCacheSettings = tuple[
+    int, float | None
+]  # (LRU entries per worker, snap grid in degrees or None)
+
+DEFAULT_COVER_CACHE_SIZE = 4096
+NEIGHBOUR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def get_cover_cache_settings() -> CoverCacheSettings | None:
+    """Stop cover cache from ``ETL_STOP_COVER_CACHE_SIZE`` (entries per worker, default 4096,
+    0 = off) and ``ETL_STOP_COVER_SNAP_DEG`` (grid for near-duplicate lookups, unset = exact only).
+    """
+    size_value = os.getenv("ETL_STOP_COVER_CACHE_SIZE", "").strip()
+    snap_value = os.getenv("ETL_STOP_COVER_SNAP_DEG", "").strip()
+    try:
+        size = int(size_value) if size_value else DEFAULT_COVER_CACHE_SIZE
+        snap_deg = float(snap_value) if snap_value else None
+    except ValueError as exc:
+        raise ValueError(
+            "Invalid ETL_STOP_COVER_CACHE_SIZE or ETL_STOP_COVER_SNAP_DEG: use a whole number and a number of degrees."
+        ) from exc
+    if size < 0 or (snap_deg is not None and snap_deg <= 0):
+        raise ValueError(
+            "ETL_STOP_COVER_CACHE_SIZE must be at least 0 and ETL_STOP_COVER_SNAP_DEG greater than 0."
+        )
+    if size == 0:
+        return None
+    return size, snap_deg
+
+
+def cover_cache_keys(
+    geom_wkb: bytes, polygon: Polygon | MultiPolygon, snap_deg: float | None
+) -> list[bytes]:
+    """Cache keys of a stop polygon: the hash of its WKB (exact matches) and, with ``snap_deg``,
+    the hash of its bounds snapped to that grid (near-duplicates, e.g. the same berth).
+    """
+    keys = [b"w" + hashlib.blake2b(geom_wkb, digest_size=16).digest()]
+    if snap_deg is not None and not polygon.is_empty:
+        snapped = np.round(np.asarray(polygon.bounds) / snap_deg).astype(np.int64)
+        keys.append(b"b" + hashlib.blake2b(snapped.tobytes(), digest_size=16).digest())
+    return keys
+
+
+def _boundary_cells(polygon: Polygon | MultiPolygon, zoom: int) -> np.ndarray:
+    """Cells crossed by the polygon's rings and their 8 neighbours: every cell the boundary touches."""
+    cells: set[int] = set()
+    for part in getattr(polygon, "geoms", [polygon]):
+        for ring in [part.exterior, *part.interiors]:
+            cells.update(cell for cell, _ in linecover(LineString(ring.coords), zoom))
+    if not cells:
+        return np.zeros(0, dtype=np.uint64)
+    x, y = quadkey_int_to_xy_array(np.fromiter(cells, dtype=np.uint64), zoom)
+    x, y = x.astype(np.int64), y.astype(np.int64)
+    neighbours = [
+        xy_to_quadkey_int_array(x + dx, y + dy, zoom) for dx, dy in NEIGHBOUR_OFFSETS
+    ]
+    return np.unique(np.concatenate(neighbours))
+
+
+def _min_cell_area(polygon: Polygon | MultiPolygon, zoom: int) -> float:
+    """Area in square degrees of the smallest cell at ``zoom`` within the polygon's latitudes."""
+    minx, miny, maxx, maxy = polygon.bounds
+    latitude = maxy if abs(maxy) >= abs(miny) else miny
+    tile = mercantile.tile(minx, latitude, zoom)
+    bounds = mercantile.bounds(tile)
+    return (bounds.east - bounds.west) * (bounds.north - bounds.south)
+
+
+def reuse_cached_cover(
+    polygon: Polygon | MultiPolygon,
+    cached_polygon: Polygon | MultiPolygon,
+    cached_cells: list[int],
+    zoom: int = DEFAULT_ZOOM,
+) -> list[int] | None:
+    """Return ``cached_cells`` if they are exactly the cover of ``polygon``, else None.
+
+    A cell's membership can only differ between the two covers if the cell touches the
+    boundary of either polygon, or lies entirely in their difference. The second is ruled out
+    when neither difference is as large as a cell; the first is checked by testing the cells
+    around both boundaries against ``polygon``.
+    """
+    min_cell_area = _min_cell_area(polygon, zoom)
+    if (
+        shapely.difference(polygon, cached_polygon).area >= min_cell_area
+        or shapely.difference(cached_polygon, polygon).area >= min_cell_area
+    ):
+        return None
+
+    candidates = np.union1d(
+        _boundary_cells(polygon, zoom), _boundary_cells(cached_polygon, zoom)
+    )
+    x, y = quadkey_int_to_xy_array(candidates, zoom)
+    boxes = []
+    for tile_x, tile_y in zip(x.tolist(), y.tolist()):
+        bounds = mercantile.bounds(tile_x, tile_y, zoom)
+        boxes.append((bounds.west, bounds.south, bounds.east, bounds.north))
+    bounds_array = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    intersects = shapely.intersects(
+        polygon,
+        shapely.box(
+            bounds_array[:, 0],
+            bounds_array[:, 1],
+            bounds_array[:, 2],
+            bounds_array[:, 3],
+        ),
+    )
+    cached = np.isin(candidates, np.asarray(cached_cells, dtype=np.uint64))
+    if not np.array_equal(intersects, cached):
+        return None
+    return cached_cells
+
+
+class CoverCache:
+    """Least-recently-used cache of stop covers in one process, keyed by ``cover_cache_keys``."""
+
+    def __init__(self, max_entries: int = DEFAULT_COVER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, CachedCover] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> CachedCover | None:
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+        return cached
+
+    def put(self, keys: list[bytes], cached: CachedCover):
+        for key in keys:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,81 @@
+import hashlib
+import zlib
+from typing import Callable
+
+import numpy as np
+
+CoverStoreKey = tuple[
+    bytes, int, str
+]  # (geometry hash, zoom, cover algorithm and version)
+Covers = dict[int, list[int]]  # zoom -> cells
+
+# Bump the version when a cover algorithm's output changes, so stored covers are recomputed
+POLYGON_COVER = "polygon_cover/1"
+LINECOVER = "linecover/2"
+# Covers whose cells are in traversal order (a passage CellString), stored and returned as is
+ORDERED_COVERS = frozenset({LINECOVER})
+
+
+def geometry_hash(geom_wkb: bytes) -> bytes:
+    return hashlib.blake2b(geom_wkb, digest_size=16).digest()
+
+
+def cover_store_keys(
+    geom_wkb: bytes, algorithm: str, zooms: tuple[int, ...]
+) -> dict[int, CoverStoreKey]:
+    geom_hash = geometry_hash(geom_wkb)
+    return {zoom: (geom_hash, zoom, algorithm) for zoom in zooms}
+
+
+def encode_cells(cells: list[int], ordered: bool = False) -> bytes:
+    """Cells as zlib-compressed uint64 deltas (small for contiguous covers).
+
+    By default the cells are sorted and deduplicated. With ``ordered`` they keep their order:
+    the signed deltas between consecutive cells are zigzag encoded.
+    """
+    if ordered:
+        deltas = np.diff(np.asarray(cells, dtype=np.int64), prepend=np.int64(0))
+        zigzag = (deltas << 1) ^ (deltas >> 63)
+        return zlib.compress(zigzag.astype("<u8").tobytes())
+    sorted_cells = np.unique(np.asarray(cells, dtype=np.uint64))
+    deltas = np.diff(sorted_cells, prepend=np.uint64(0))
+    return zlib.compress(deltas.astype("<u8").tobytes())
+
+
+def decode_cells(blob: bytes, ordered: bool = False) -> list[int]:
+    deltas = np.frombuffer(zlib.decompress(blob), dtype="<u8")
+    if ordered:
+        signed = (deltas >> np.uint64(1)).astype(np.int64) ^ -(
+            deltas & np.uint64(1)
+        ).astype(np.int64)
+        return np.cumsum(signed, dtype=np.int64).tolist()
+    return np.cumsum(deltas, dtype=np.uint64).tolist()
+
+
+def get_or_compute_covers(
+    geom_wkb: bytes,
+    algorithm: str,
+    zooms: tuple[int, ...],
+    load: Callable[[list[CoverStoreKey]], dict[CoverStoreKey, bytes]],
+    save: Callable[[dict[CoverStoreKey, bytes]], None],
+    compute: Callable[[], Covers],
+) -> tuple[Covers, bool]:
+    """Covers of a geometry at ``zooms`` from the cover store, or computed and saved to it.
+
+    ``load`` and ``save`` read and write the backend's ``cover_store`` table. Covers are returned
+    sorted, except those of ``ORDERED_COVERS``, which keep the order ``compute`` returned them in;
+    returns (covers, whether they came from the store).
+    """
+    ordered = algorithm in ORDERED_COVERS
+    keys = cover_store_keys(geom_wkb, algorithm, zooms)
+    stored = load(list(keys.values()))
+    if all(key in stored for key in keys.values()):
+        return {
+            zoom: decode_cells(stored[key], ordered) for zoom, key in keys.items()
+        }, True
+
+    covers = compute()
+    save({key: encode_cells(covers[zoom], ordered) for zoom, key in keys.items()})
+    if ordered:
+        return {zoom: list(covers[zoom]) for zoom in zooms}, False
+    return {zoom: sorted(dict.fromkeys(covers[zoom])) for zoom in zooms}, False
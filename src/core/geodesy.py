@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+KNOT_AS_MPS = 0.514444  # 1 knot = 0.514444 m/s
+EARTH_RADIUS_M = 6_371_000.0  # Mean Earth radius in meters
+
+# Per-segment motion between consecutive points: (time_diff_s, distance_m, speed_kn), each of length n - 1
+SegmentMotion = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def haversine_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Haversine distance in meters between two (lon, lat) points, for scalar loops."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    sin_dlat = math.sin((phi2 - phi1) / 2)
+    sin_dlon = math.sin(math.radians(lon2 - lon1) / 2)
+    a = sin_dlat * sin_dlat + math.cos(phi1) * math.cos(phi2) * sin_dlon * sin_dlon
+    return EARTH_RADIUS_M * 2 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def haversine_m_array(
+    lon1: ArrayLike, lat1: ArrayLike, lon2: ArrayLike, lat2: ArrayLike
+) -> np.ndarray:
+    """Element-wise haversine distance in meters between (lon1, lat1) and (lon2, lat2) arrays."""
+    phi1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    phi2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    dlon = np.radians(
+        np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64)
+    )
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin(dlon / 2) ** 2
+    )
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def segment_distances_m(lon: ArrayLike, lat: ArrayLike) -> np.ndarray:
+    """Distance in meters between consecutive points of a track (length n - 1)."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    return haversine_m_array(lon[:-1], lat[:-1], lon[1:], lat[1:])
+
+
+def cumulative_distance_m(lon: ArrayLike, lat: ArrayLike) -> np.ndarray:
+    """Distance in meters travelled along a track up to each point (length n, starting at 0)."""
+    distances = segment_distances_m(lon, lat)
+    return np.concatenate(([0.0], np.cumsum(distances)))
+
+
+def segment_motion(lon: ArrayLike, lat: ArrayLike, ts: ArrayLike) -> SegmentMotion:
+    """Time difference (s), distance (m) and average speed (knots) between consecutive points.
+
+    The speed is ``inf`` when the time difference is not positive, as in ``compute_motion``.
+    """
+    ts = np.asarray(ts, dtype=np.float64)
+    time_diff = np.diff(ts)
+    distances = segment_distances_m(lon, lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed_kn = np.where(
+            time_diff > 0, distances / time_diff / KNOT_AS_MPS, math.inf
+        )
+    return time_diff, distances, speed_kn
+
+
+def coords_segment_motion(coords: list[tuple[float, float, float]]) -> SegmentMotion:
+    """``segment_motion`` for a list of (lon, lat, epoch_ts) Coords."""
+    if len(coords) < 2:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty
+    arr = np.asarray(coords, dtype=np.float64)
+    return segment_motion(arr[:, 0], arr[:, 1], arr[:, 2])
@@ -5,11 +5,19 @@ from shapely import LineString, MultiPolygon, Polygon, box, from_wkb
 from core.cellstring_utils import (
     DEFAULT_ZOOM,
     linecover,
+    linecover_multizoom,
     process_z13_tiles,
     process_z17_tiles,
     process_z21_tiles,
     xyz_to_quadkey_int,
 )
+from core.cover_cache import (
+    CachedCover,
+    CoverCache,
+    CoverCacheSettings,
+    cover_cache_keys,
+    reuse_cached_cover,
+)
 
 TrajRow = tuple[
     int, int, int, int, bytes
@@ -23,6 +31,18 @@ ProcessResultTraj = tuple[
 ProcessResultStop = tuple[
     int, int, int, int, list[int]
 ]  # stop_id, mmsi, ts_start, ts_end, cell_z21
+ProcessResultTrajVariants = tuple[
+    int, int, dict[int, list[tuple[int, int]]]
+]  # trajectory_id, mmsi, {zoom: [(cell, ts)]}
+ProcessResultStopVariants = tuple[
+    int, int, int, int, dict[int, list[int]]
+]  # stop_id, mmsi, ts_start, ts_end, {zoom: cells}
+CachedProcessResultStop = tuple[
+    ProcessResultStop, str
+]  # (result, cover cache outcome: "hit", "near", "miss" or "off")
+
+# Stop cover cache of this (worker) process
+_stop_cover_cache: CoverCache | None = None
 
 # --- Conversion Utilities ---
 
@@ -66,6 +86,31 @@ def convert_linestring_to_cellids(
 
 
 
+def convert_linestring_to_cellstrings(
+    ls: LineString,
+) -> tuple[list[int], list[int], list[int]]:
+    """
+    Convert a LineString to CellStrings (cell IDs without timestamps) at z13, z17, and z21.
+
+    The line is walked once at z21; the z13 and z17 cells are derived from the z21 cells.
+
+    Args:
+        ls: A Shapely LineString to convert
+
+    Returns:
+        Tuple of (cellstring_z13, cellstring_z17, cellstring_z21), each deduplicated in traversal order
+    """
+    if ls.is_empty:
+        return ([], [], [])
+
+    cover_z13, cover_z17, cover_z21 = linecover_multizoom(ls, (13, 17, 21))
+    cellstring_z13, cellstring_z17, cellstring_z21 = (
+        list(dict.fromkeys(cell_id for cell_id, _ in cover))
+        for cover in (cover_z13, cover_z17, cover_z21)
+    )
+    return cellstring_z13, cellstring_z17, cellstring_z21
+
+
 def convert_polygon_to_cellstrings(
     poly: Polygon | MultiPolygon, skip_z21: bool = False
 ) -> tuple[list[int], list[int], list[int]]:
@@ -144,3 +189,71 @@ def process_stop_row(row: StopRow) -> ProcessResultStop:
     _, _, cellstring_z21 = convert_polygon_to_cellstrings(polygon)
 
     return stop_id, mmsi, ts_start, ts_end, cellstring_z21
+
+
+def process_trajectory_row_variants(
+    row: TrajRow, zooms: tuple[int, ...]
+) -> ProcessResultTrajVariants:
+    """``process_trajectory_row`` at several zooms from one WKB decode and one linecover walk.
+
+    The walk is always at z21, so a zoom's cells and entry times do not depend on the other zooms.
+    """
+    trajectory_id, mmsi, _, _, geom_wkb = row
+    linestring = cast(LineString, from_wkb(geom_wkb))
+    if linestring.is_empty:
+        return (trajectory_id, mmsi, {zoom: [] for zoom in zooms})
+    covers = linecover_multizoom(linestring, (*zooms, DEFAULT_ZOOM))
+    return (trajectory_id, mmsi, dict(zip(zooms, covers)))
+
+
+def process_stop_row_variants(
+    row: StopRow, zooms: tuple[int, ...]
+) -> ProcessResultStopVariants:
+    """``process_stop_row`` at several of the zooms 13, 17 and 21 from one hierarchical cover."""
+    stop_id, mmsi, ts_start, ts_end, geom_wkb = row
+    polygon = cast(Polygon, from_wkb(geom_wkb))
+
+    cellstrings = convert_polygon_to_cellstrings(
+        polygon, skip_z21=DEFAULT_ZOOM not in zooms
+    )
+    covers = dict(zip((13, 17, DEFAULT_ZOOM), cellstrings))
+    return stop_id, mmsi, ts_start, ts_end, {zoom: covers[zoom] for zoom in zooms}
+
+
+def process_stop_row_cached(
+    row: StopRow,
+    settings: CoverCacheSettings | None,
+    stored: list[CachedCover] | None = None,
+) -> CachedProcessResultStop:
+    """``process_stop_row`` with the worker's stop cover cache: an identical polygon reuses its
+    cover, a near-duplicate (same snapped bounds) reuses it only if ``reuse_cached_cover``
+    proves it identical. ``stored`` are candidates from the shared on-disk cache."""
+    global _stop_cover_cache
+    if settings is None:
+        return process_stop_row(row), "off"
+
+    stop_id, mmsi, ts_start, ts_end, geom_wkb = row
+    max_entries, snap_deg = settings
+    if _stop_cover_cache is None or _stop_cover_cache.max_entries != max_entries:
+        _stop_cover_cache = CoverCache(max_entries)
+    polygon = cast(Polygon, from_wkb(geom_wkb))
+    keys = cover_cache_keys(geom_wkb, polygon, snap_deg)
+
+    candidates = [
+        cached
+        for cached in [_stop_cover_cache.get(key) for key in keys] + (stored or [])
+        if cached is not None
+    ]
+    for cached_wkb, cached_cells in candidates:
+        if cached_wkb == geom_wkb:
+            _stop_cover_cache.put(keys, (geom_wkb, cached_cells))
+            return (stop_id, mmsi, ts_start, ts_end, cached_cells), "hit"
+    for cached_wkb, cached_cells in candidates:
+        cells = reuse_cached_cover(polygon, from_wkb(cached_wkb), cached_cells)
+        if cells is not None:
+            _stop_cover_cache.put(keys, (geom_wkb, cells))
+            return (stop_id, mmsi, ts_start, ts_end, cells), "near"
+
+    _, _, cellstring_z21 = convert_polygon_to_cellstrings(polygon)
+    _stop_cover_cache.put(keys, (geom_wkb, cellstring_z21))
+    return (stop_id, mmsi, ts_start, ts_end, cellstring_z21), "miss"
@@ -0,0 +1,256 @@
+import heapq
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+import pyarrow as pa
+
+MetricRecord = dict[str, Any]
+TimedResult = tuple[Any, float, int]  # (result, duration_s, worker pid)
+
+TOP_N_SLOWEST = 10
+NON_ADDITIVE_DETAILS = {"worker_pid", "mmsi", "max_points_in_stop"}
+
+ETL_METRICS_SCHEMA = pa.schema(
+    [
+        pa.field("run_id", pa.string()),
+        pa.field("recorded_at", pa.timestamp("us", tz="UTC")),
+        pa.field("stage", pa.string()),
+        pa.field("kind", pa.string()),
+        pa.field("unit", pa.string()),
+        pa.field("duration_s", pa.float64()),
+        pa.field("rows", pa.int64()),
+        pa.field("details", pa.string()),
+    ]
+)
+
+
+def call_timed(fn: Callable[..., Any], *args: Any) -> TimedResult:
+    """Run ``fn(*args)`` in a worker and return (result, duration_s, worker pid)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start, os.getpid()
+
+
+def worker_utilisation(busy_s: float, wall_s: float, max_workers: int) -> float:
+    """Share of the pool's capacity (wall time x workers) spent inside tasks."""
+    if wall_s <= 0 or max_workers <= 0:
+        return 0.0
+    return min(busy_s / (wall_s * max_workers), 1.0)
+
+
+class MetricsRecorder:
+    """Collects timing/count records for one ETL run.
+
+    Every record has a stage (construct, transform_trajs, ...), a kind (mmsi, batch, day, ...),
+    an optional unit id, a duration, a row count and free-form numeric/text details. Records are
+    buffered and written by ``flush`` to a JSON-lines file and/or a DuckDB ``etl_metrics``
+    table; running totals and the slowest units are kept in memory for ``summary``.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str | None = None,
+        duckdb_conn: Any = None,
+        duckdb_schema: str | None = None,
+        run_id: str | None = None,
+    ):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.jsonl_path = jsonl_path
+        self.duckdb_conn = duckdb_conn
+        self.duckdb_schema = duckdb_schema
+        self._buffer: list[MetricRecord] = []
+        self._totals: dict[tuple[str, str], dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._slowest: dict[tuple[str, str], list[tuple[float, str, int]]] = (
+            defaultdict(list)
+        )
+        self._slowest_details: dict[
+            tuple[str, str], dict[tuple[float, str, int], dict[str, Any]]
+        ] = defaultdict(dict)
+        self._started = time.perf_counter()
+
+        if duckdb_conn is not None and duckdb_schema is not None:
+            ensure_etl_metrics_table(duckdb_conn, duckdb_schema)
+
+    def record(
+        self,
+        stage: str,
+        kind: str,
+        duration_s: float,
+        rows: int = 0,
+        unit: str | int | None = None,
+        **details: Any,
+    ):
+        record: MetricRecord = {
+            "run_id": self.run_id,
+            "recorded_at": datetime.now(timezone.utc),
+            "stage": stage,
+            "kind": kind,
+            "unit": None if unit is None else str(unit),
+            "duration_s": float(duration_s),
+            "rows": int(rows),
+            "details": details,
+        }
+        self._buffer.append(record)
+
+        totals = self._totals[(stage, kind)]
+        totals["count"] += 1
+        totals["duration_s"] += duration_s
+        totals["rows"] += rows
+        for key, value in details.items():
+            if key in NON_ADDITIVE_DETAILS:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] += value
+
+        if unit is not None:
+            slowest = self._slowest[(stage, kind)]
+            slowest_details = self._slowest_details[(stage, kind)]
+            entry = (float(duration_s), str(unit), int(rows))
+            if len(slowest) < TOP_N_SLOWEST:
+                heapq.heappush(slowest, entry)
+                slowest_details[entry] = details
+            elif entry > slowest[0]:
+                slowest_details.pop(heapq.heapreplace(slowest, entry), None)
+                slowest_details[entry] = details
+
+    @contextmanager
+    def timer(
+        self, stage: str, kind: str, unit: str | int | None = None, **details: Any
+    ) -> Iterator[dict[str, Any]]:
+        """Time a block; set ``rows`` or extra details on the yielded dict inside the block."""
+        fields: dict[str, Any] = dict(details)
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            rows = int(fields.pop("rows", 0))
+            self.record(stage, kind, time.perf_counter() - start, rows, unit, **fields)
+
+    def flush(self):
+        """Write buffered records to the configured sinks and clear the buffer."""
+        if not self._buffer:
+            return
+
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                for record in self._buffer:
+                    f.write(
+                        json.dumps(
+                            {**record, "recorded_at": record["recorded_at"].isoformat()}
+                        )
+                        + "\n"
+                    )
+
+        if self.duckdb_conn is not None and self.duckdb_schema is not None:
+            metrics_arrow_table = pa.table(
+                {
+                    "run_id": [r["run_id"] for r in self._buffer],
+                    "recorded_at": [r["recorded_at"] for r in self._buffer],
+                    "stage": [r["stage"] for r in self._buffer],
+                    "kind": [r["kind"] for r in self._buffer],
+                    "unit": [r["unit"] for r in self._buffer],
+                    "duration_s": [r["duration_s"] for r in self._buffer],
+                    "rows": [r["rows"] for r in self._buffer],
+                    "details": [json.dumps(r["details"]) for r in self._buffer],
+                },
+                schema=ETL_METRICS_SCHEMA,
+            )
+            self.duckdb_conn.execute(
+                f"INSERT INTO {self.duckdb_schema}.etl_metrics SELECT * FROM metrics_arrow_table"
+            )
+
+        self._buffer.clear()
+
+    def totals(self, stage: str, kind: str) -> dict[str, float]:
+        return dict(self._totals.get((stage, kind), {}))
+
+    def slowest(self, stage: str, kind: str) -> list[tuple[float, str, int]]:
+        """(duration_s, unit, rows) of the slowest units, slowest first."""
+        return sorted(self._slowest.get((stage, kind), []), reverse=True)
+
+    def slowest_details(
+        self, stage: str, kind: str
+    ) -> list[tuple[float, str, int, dict[str, Any]]]:
+        """Like ``slowest``, with the details each unit was recorded with."""
+        details = self._slowest_details.get((stage, kind), {})
+        return [
+            (duration, unit, rows, details.get((duration, unit, rows), {}))
+            for duration, unit, rows in self.slowest(stage, kind)
+        ]
+
+    def slowest_keys(self) -> list[tuple[str, str]]:
+        """(stage, kind) pairs that have per-unit records."""
+        return [key for key, entries in self._slowest.items() if entries]
+
+    def summary(self) -> str:
+        """Human-readable report of all recorded stages."""
+        lines = [
+            f"\n--- ETL metrics summary (run {self.run_id}, {time.perf_counter() - self._started:.1f}s) ---"
+        ]
+        for (stage, kind), totals in self._totals.items():
+            count = int(totals["count"])
+            duration = totals["duration_s"]
+            rows = int(totals["rows"])
+            rate = f", {rows / duration:,.0f} rows/s" if duration > 0 and rows else ""
+            lines.append(
+                f"{stage}/{kind}: {count:,} x, {duration:.2f}s total, {rows:,} rows{rate}"
+            )
+
+            phase_keys = sorted(
+                k for k in totals if k.startswith("time_") and k != "time_total"
+            )
+            if phase_keys and duration > 0:
+                phases = ", ".join(
+                    f"{k[len('time_'):]}={totals[k]:.2f}s ({totals[k] / duration:.0%})"
+                    for k in phase_keys
+                )
+                lines.append(f"    phases: {phases}")
+
+            for key in ("fetch_s", "compute_s", "insert_s"):
+                if key in totals:
+                    lines.append(f"    {key[:-2]}: {totals[key]:.2f}s")
+            if (
+                "busy_s" in totals
+                and "capacity_s" in totals
+                and totals["capacity_s"] > 0
+            ):
+                lines.append(
+                    f"    worker utilisation: {totals['busy_s'] / totals['capacity_s']:.0%}"
+                )
+
+            slowest = self.slowest(stage, kind)
+            if slowest and kind not in ("batch", "day", "stage"):
+                top = ", ".join(
+                    f"{unit} ({d:.2f}s, {r:,} rows)" for d, unit, r in slowest[:5]
+                )
+                lines.append(f"    slowest: {top}")
+        return "\n".join(lines)
+
+
+def ensure_etl_metrics_table(conn: Any, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.etl_metrics (
+            run_id      TEXT NOT NULL,
+            recorded_at TIMESTAMPTZ NOT NULL,
+            stage       TEXT NOT NULL,
+            kind        TEXT NOT NULL,
+            unit        TEXT,
+            duration_s  DOUBLE NOT NULL,
+            rows        BIGINT NOT NULL,
+            details     TEXT
+        );
+    """)
+
+
+def get_metrics_jsonl_path() -> str | None:
+    """JSON-lines output file from ``ETL_METRICS_PATH`` (unset: no file)."""
+    path = os.getenv("ETL_METRICS_PATH", "").strip()
+    return path or None
@@ -1,6 +1,11 @@
+import os
+from dataclasses import dataclass
 from typing import cast
 import time
-from shapely import Polygon, from_wkb, from_wkt, Point, MultiPoint, concave_hull
+import numpy as np
+from shapely import Polygon, from_wkb, from_wkt, Point
+from core.geodesy import coords_segment_motion
+from core.stop_geometry import build_stop_polygon
 from core.utils import (
     Coord,
     add_connecting_point_to_segment,
@@ -8,10 +13,9 @@ from core.utils import (
     compute_mbr_area,
     compute_motion,
     extract_start_end_time_s,
-    haversine_distance_m,
     merge_candidate_stops,
+    merge_invalid_stops_with_trajectories,
     coords_to_linestringm_as_wkb,
-    try_merge_invalid_merged_stop_with_trajectories,
 )
 
 # Stops
@@ -23,7 +27,6 @@ MIN_STOP_DURATION = 600  # seconds, Δstopt (original = 1.5 h)   CHANGED TO 10 m
 MERGE_DISTANCE_THRESHOLD = 50  # meters, Δd. (original = 2 km)  CHANGED TO 50 m
 MERGE_TIME_THRESHOLD = 3600  # seconds, Δt (original = 1 h)
 MAX_MBR_AREA = 5_000_000  # 5 km², Maximum area of the Minimum Bounding Rectangle (MBR) for a valid stop polygon
-STOP_POINT_BUFFER_DEG = 1e-5  # ~1 m radius buffer in WGS84 degrees, used when all stop points have same lat,lon (e.g. null-SOG stationary vessel)
 
 # Trajectories
 TRAJ_MAX_SPEED_KN = 50.0  # knots, used to filter out false AIS points (e.g. > 50 knots)
@@ -32,20 +35,67 @@ TRAJ_MAX_GAP_S = (
 )
 MIN_AIS_POINTS_IN_TRAJ = 10  # Minimum AIS messages required to record a trajectory, Remove trajectories with only small number of AIS points
 
+
+@dataclass(frozen=True)
+class ConstructParams:
+    """The construct thresholds above as one object, e.g. to evaluate several sets in a sweep."""
+
+    stop_sog_threshold: float = STOP_SOG_THRESHOLD
+    stop_distance_threshold: float = STOP_DISTANCE_THRESHOLD
+    stop_time_threshold: float = STOP_TIME_THRESHOLD
+    min_stop_points: int = MIN_STOP_POINTS
+    min_stop_duration: float = MIN_STOP_DURATION
+    merge_distance_threshold: float = MERGE_DISTANCE_THRESHOLD
+    merge_time_threshold: float = MERGE_TIME_THRESHOLD
+    max_mbr_area: float = MAX_MBR_AREA
+    traj_max_speed_kn: float = TRAJ_MAX_SPEED_KN
+    traj_max_gap_s: float = TRAJ_MAX_GAP_S
+    min_ais_points_in_traj: int = MIN_AIS_POINTS_IN_TRAJ
+
+    def segmentation_key(self) -> tuple[float, ...]:
+        """The thresholds phase 2 (candidate segmentation) depends on."""
+        return (
+            self.stop_sog_threshold,
+            self.stop_distance_threshold,
+            self.stop_time_threshold,
+            self.traj_max_speed_kn,
+            self.traj_max_gap_s,
+        )
+
+
+DEFAULT_CONSTRUCT_PARAMS = ConstructParams()
+
 AISPointWKB = tuple[bytes, float | None]  # (geom as WKB, sog)
 DuckDBRawPoint = tuple[float, float, float | None, float]  # (lon, lat, sog, epoch_ts)
 InputPoint = AISPointWKB | DuckDBRawPoint
 AISPoint = tuple[Coord, float | None]  # (coord, sog)
+PointMotion = tuple[
+    list[float], list[float], list[float]
+]  # (time diff s, distance m, speed kn) from each point to the next
 Traj = tuple[int, int, int, bytes]  # (mmsi, ts_start, ts_end, geom as WKB)
 Stop = tuple[int, int, int, bytes]  # (mmsi, ts_start, ts_end, geom as WKB)
 ProcessResult = tuple[
     int, list[Traj], list[Stop]
 ]  # (mmsi, trajs_to_insert, stops_to_insert)
 
+MmsiMetrics = dict[
+    str, float | int
+]  # per-MMSI point counts and phase timings (seconds)
+ProcessResultWithMetrics = tuple[
+    int, list[Traj], list[Stop], MmsiMetrics
+]  # (mmsi, trajs_to_insert, stops_to_insert, metrics)
+
+CandidateSegments = tuple[
+    np.ndarray, np.ndarray, np.ndarray, int
+]  # (is_stop per segment, segment start offsets (+ end), (n, 3) lon/lat/epoch_ts, num_points), from the DuckDB SQL engine
+
 AISPointRow = tuple[int, bytes, float | None]  # (mmsi, geom as WKB, sog)
 DictInputPoint = dict[
     int, list[InputPoint]
 ]  # mmsi -> list of InputPoint (AISPointWKB or DuckDBRawPoint)
+SweepSummary = tuple[
+    int, int, int, int, int
+]  # (num_trajs, num_stops, traj seconds, stop seconds, num trajectory points)
 
 
 def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessResult:
@@ -53,15 +103,15 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
     Process the points of a single MMSI - constructs trajectories and stops.
     Returns (mmsi, trajs_to_insert, stops_to_insert).
     """
-    if not input_points:
-        return (mmsi, [], [])
+    mmsi, trajs_to_insert, stops_to_insert, _ = process_single_mmsi_with_metrics(
+        mmsi, input_points
+    )
+    return (mmsi, trajs_to_insert, stops_to_insert)
 
-    start_total = time.perf_counter()
-    start_phase1 = time.perf_counter()
 
+def parse_input_points(input_points: list[InputPoint]) -> list[AISPoint]:
+    """Phase 1: parse input points into (Coord, SOG) tuples."""
     points: list[AISPoint] = []
-
-    # Phase 1: Parse input points into (Coord, SOG) tuples
     for input_point in input_points:
         if len(input_point) == 2:
             # WKB path (PostgreSQL): parse WKB, extract coords immediately
@@ -73,32 +123,47 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
             lon, lat, sog, epoch_ts = input_point
             coord: Coord = (float(lon), float(lat), float(epoch_ts))
             points.append((coord, float(sog) if sog is not None else None))
+    return points
 
-    time_phase1 = time.perf_counter() - start_phase1
 
+def compute_point_motion(points: list[AISPoint]) -> PointMotion:
+    """Motion between consecutive points, computed in one batch."""
+    time_diffs, dist_diffs, speeds_kn = (
+        motion.tolist() for motion in coords_segment_motion([c for c, _ in points])
+    )
+    return time_diffs, dist_diffs, speeds_kn
+
+
+def segment_candidates(
+    points: list[AISPoint],
+    motion: PointMotion,
+    params: ConstructParams = DEFAULT_CONSTRUCT_PARAMS,
+) -> tuple[list[list[Coord]], list[list[Coord]]]:
+    """Phase 2: split the points into candidate trajectories and stops.
+
+    ``motion`` is only used between consecutive points; the loop falls back to compute_motion
+    when the previous point was skipped (duplicate time or outlier).
+    Returns (candidate_trajs, candidate_stops).
+    """
+    time_diffs, dist_diffs, speeds_kn = motion
     prev_coord: Coord | None = None
+    prev_index = -1
     current_traj: list[Coord] = []
     current_stop: list[Coord] = []
     candidate_trajs: list[list[Coord]] = []
     candidate_stops: list[list[Coord]] = []
 
-    # Final trajectories and stops to insert
-    trajs_to_insert: list[Traj] = []
-    stops_to_insert: list[Stop] = []
-
-    start_phase2 = time.perf_counter()
-
-    # Phase 2: Iterate through points to construct candidate trajectories and stops
-    for current_coord, sog in points:
+    for index, (current_coord, sog) in enumerate(points):
 
         # Initialization of first point
         if prev_coord is None:
-            if sog is None or sog < STOP_SOG_THRESHOLD:
+            if sog is None or sog < params.stop_sog_threshold:
                 current_stop.append(current_coord)
             else:
                 current_traj.append(current_coord)
 
             prev_coord = current_coord
+            prev_index = index
             continue
 
         current_time = current_coord[2]
@@ -108,18 +173,23 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
             continue
 
         # Compute differences between previous and current point
-        time_diff, dist_diff, avg_vessel_speed = compute_motion(
-            prev_coord, current_coord
-        )
+        if prev_index == index - 1:
+            time_diff = time_diffs[prev_index]
+            dist_diff = dist_diffs[prev_index]
+            avg_vessel_speed = speeds_kn[prev_index]
+        else:
+            time_diff, dist_diff, avg_vessel_speed = compute_motion(
+                prev_coord, current_coord
+            )
 
         # Use SOG if SOG is not null, otherwise use the computed average speed between points
         current_speed = sog if sog is not None else avg_vessel_speed
 
         # Candidate stop condition
         if (
-            current_speed < STOP_SOG_THRESHOLD
-            and time_diff < STOP_TIME_THRESHOLD
-            and dist_diff < STOP_DISTANCE_THRESHOLD
+            current_speed < params.stop_sog_threshold
+            and time_diff < params.stop_time_threshold
+            and dist_diff < params.stop_distance_threshold
         ):
             add_connecting_point_to_segment(current_stop, prev_coord)
             current_stop.append(current_coord)
@@ -130,8 +200,8 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
         # Trajectory condition
         else:
             add_connecting_point_to_segment(current_traj, prev_coord)
-            if avg_vessel_speed < TRAJ_MAX_SPEED_KN:  # Filter out outliers
-                if time_diff < TRAJ_MAX_GAP_S:
+            if avg_vessel_speed < params.traj_max_speed_kn:  # Filter out outliers
+                if time_diff < params.traj_max_gap_s:
                     current_traj.append(current_coord)
                 else:
                     # Append trajectory (start a new one due to large time gap)
@@ -146,26 +216,155 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
 
         # Update previous point
         prev_coord = current_coord
+        prev_index = index
 
     # Phase 2.1: Final append (remaining traj or stop)
     append_segment_if_nonempty_and_clear_segment(candidate_trajs, current_traj)
     append_segment_if_nonempty_and_clear_segment(candidate_stops, current_stop)
+    return candidate_trajs, candidate_stops
+
+
+def process_single_mmsi_with_metrics(
+    mmsi: int,
+    input_points: list[InputPoint],
+    params: ConstructParams = DEFAULT_CONSTRUCT_PARAMS,
+) -> ProcessResultWithMetrics:
+    """
+    Same as ``process_single_mmsi``, but also returns the MMSI's point counts and phase timings.
+    Returns (mmsi, trajs_to_insert, stops_to_insert, metrics).
+    """
+    if not input_points:
+        return (mmsi, [], [], {"num_points": 0, "time_total": 0.0})
+
+    start_total = time.perf_counter()
+    start_phase1 = time.perf_counter()
+
+    # Phase 1: Parse input points into (Coord, SOG) tuples
+    points = parse_input_points(input_points)
+
+    time_phase1 = time.perf_counter() - start_phase1
+
+    start_phase2 = time.perf_counter()
+
+    # Phase 2: Iterate through points to construct candidate trajectories and stops
+    candidate_trajs, candidate_stops = segment_candidates(
+        points, compute_point_motion(points), params
+    )
 
     time_phase2 = time.perf_counter() - start_phase2
 
+    trajs_to_insert, stops_to_insert, metrics = build_trajs_and_stops(
+        mmsi, candidate_trajs, candidate_stops, params
+    )
+    total_time = time.perf_counter() - start_total
+
+    metrics = {
+        "num_points": len(points),
+        **metrics,
+        "time_phase1": time_phase1,
+        "time_phase2": time_phase2,
+        "time_total": total_time,
+        "worker_pid": os.getpid(),
+    }
+
+    return (mmsi, trajs_to_insert, stops_to_insert, metrics)
+
+
+def sweep_single_mmsi(
+    mmsi: int, input_points: list[InputPoint], params_list: list[ConstructParams]
+) -> tuple[int, list[SweepSummary]]:
+    """
+    Construct the points of a single MMSI with each parameter set and summarise the results.
+    Points are parsed and their motion computed once; sets with the same segmentation
+    thresholds share phase 2. Returns (mmsi, one SweepSummary per parameter set).
+    """
+    points = parse_input_points(input_points)
+    motion = compute_point_motion(points)
+    candidates_by_key: dict[
+        tuple[float, ...], tuple[list[list[Coord]], list[list[Coord]]]
+    ] = {}
+    summaries: list[SweepSummary] = []
+    for params in params_list:
+        key = params.segmentation_key()
+        if key not in candidates_by_key:
+            candidates_by_key[key] = segment_candidates(points, motion, params)
+        candidate_trajs, candidate_stops = candidates_by_key[key]
+
+        # Phases 3-4 extend and relink segments in place: give each set its own copies
+        trajs, stops, _ = build_trajs_and_stops(
+            mmsi,
+            [list(traj) for traj in candidate_trajs],
+            [list(stop) for stop in candidate_stops],
+            params,
+        )
+        summaries.append(
+            (
+                len(trajs),
+                len(stops),
+                sum(ts_end - ts_start for _, ts_start, ts_end, _ in trajs),
+                sum(ts_end - ts_start for _, ts_start, ts_end, _ in stops),
+                sum(len(from_wkb(geom_wkb).coords) for _, _, _, geom_wkb in trajs),
+            )
+        )
+    return mmsi, summaries
+
+
+def process_candidate_segments_with_metrics(
+    mmsi: int, segments: CandidateSegments
+) -> ProcessResultWithMetrics:
+    """
+    Phases 3-5 of ``process_single_mmsi_with_metrics`` for candidate trajectories and stops
+    segmented elsewhere (the DuckDB SQL engine). Returns (mmsi, trajs_to_insert, stops_to_insert, metrics).
+    """
+    is_stop, offsets, coords_array, num_points = segments
+    start_total = time.perf_counter()
+    coords: list[Coord] = list(zip(*coords_array.T.tolist()))
+    candidate_trajs: list[list[Coord]] = []
+    candidate_stops: list[list[Coord]] = []
+    for index, segment_is_stop in enumerate(is_stop.tolist()):
+        segment = coords[offsets[index] : offsets[index + 1]]
+        (candidate_stops if segment_is_stop else candidate_trajs).append(segment)
+
+    trajs_to_insert, stops_to_insert, metrics = build_trajs_and_stops(
+        mmsi, candidate_trajs, candidate_stops
+    )
+    metrics = {
+        "num_points": num_points,
+        **metrics,
+        "time_total": time.perf_counter() - start_total,
+        "sql_segmented": 1,
+        "worker_pid": os.getpid(),
+    }
+    return (mmsi, trajs_to_insert, stops_to_insert, metrics)
+
+
+def build_trajs_and_stops(
+    mmsi: int,
+    candidate_trajs: list[list[Coord]],
+    candidate_stops: list[list[Coord]],
+    params: ConstructParams = DEFAULT_CONSTRUCT_PARAMS,
+) -> tuple[list[Traj], list[Stop], MmsiMetrics]:
+    """
+    Phases 3-5: merge candidate stops, validate them (invalid stops are merged with the
+    trajectories) and validate the trajectories. Returns (trajs_to_insert, stops_to_insert, metrics).
+    """
+    # Final trajectories and stops to insert
+    trajs_to_insert: list[Traj] = []
+    stops_to_insert: list[Stop] = []
+
     start_phase3 = time.perf_counter()
 
     # Phase 3: Merge nearby candidate stops
     merged_stops = merge_candidate_stops(
-        candidate_stops, MERGE_TIME_THRESHOLD, MERGE_DISTANCE_THRESHOLD
+        candidate_stops, params.merge_time_threshold, params.merge_distance_threshold
     )
 
     time_phase3 = time.perf_counter() - start_phase3
 
     start_phase4 = time.perf_counter()
     time_concave_hull = 0.0
-    time_merge_stops_with_trajs = 0.0
     max_points_in_stop = 0
+    invalid_merged_stops: list[list[Coord]] = []
 
     # Phase 4: Final validation of merged stops (fallback to merge invalid stops with trajectories)
     for merged_stop in merged_stops:
@@ -175,42 +374,37 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
         ts_end = int(ts_end)
         stop_duration = ts_end - ts_start
 
-        if len(merged_stop) >= MIN_STOP_POINTS and stop_duration >= MIN_STOP_DURATION:
+        if (
+            len(merged_stop) >= params.min_stop_points
+            and stop_duration >= params.min_stop_duration
+        ):
             start_hull = time.perf_counter()
-            # Convert Coord tuples to Shapely Points only here (for concave hull)
-            geom_points = MultiPoint([(c[0], c[1]) for c in merged_stop])
-
-            # Phase 4.1: Compute concave hull
-            hull = concave_hull(geom_points, ratio=0.2, allow_holes=False)
-            envelope = geom_points.envelope
+            # Phase 4.1: Compute concave hull (deduplicated/thinned points, envelope fallback)
+            stop_geom = build_stop_polygon(merged_stop)
             time_concave_hull += time.perf_counter() - start_hull
 
-            # Use the envelope (MBR) if the hull is not Polygon
-            stop_geom = hull if hull.geom_type == "Polygon" else envelope
-
-            # We use a buffer for null-SOG stationary vessel (all points have same lat,lon).
-            if stop_geom.geom_type == "Point":
-                stop_geom = geom_points.centroid.buffer(STOP_POINT_BUFFER_DEG)
-
             if stop_geom.geom_type == "Polygon":
                 stop_poly = cast(Polygon, stop_geom)
                 mbr_area = compute_mbr_area(stop_poly)
 
-                if mbr_area <= MAX_MBR_AREA:
+                if mbr_area <= params.max_mbr_area:
                     # Fully valid stop
                     stops_to_insert.append((mmsi, ts_start, ts_end, stop_poly.wkb))
                     continue  # Skip fallback
 
-        start_fallback = time.perf_counter()
-        # Phase 4.2: Fallback - Try to merge invalid merged stop with trajectories
-        try_merge_invalid_merged_stop_with_trajectories(
-            trajs=candidate_trajs,
-            invalid_merged_stop=merged_stop,
-            traj_max_speed_kn=TRAJ_MAX_SPEED_KN,
-            traj_max_gap_s=TRAJ_MAX_GAP_S,
-            min_ais_points_in_traj=MIN_AIS_POINTS_IN_TRAJ,
-        )
-        time_merge_stops_with_trajs += time.perf_counter() - start_fallback
+        # Invalid stop: merged with the trajectories in Phase 4.2
+        invalid_merged_stops.append(merged_stop)
+
+    start_fallback = time.perf_counter()
+    # Phase 4.2: Fallback - Try to merge invalid merged stops with trajectories
+    candidate_trajs = merge_invalid_stops_with_trajectories(
+        trajs=candidate_trajs,
+        invalid_merged_stops=invalid_merged_stops,
+        traj_max_speed_kn=params.traj_max_speed_kn,
+        traj_max_gap_s=params.traj_max_gap_s,
+        min_ais_points_in_traj=params.min_ais_points_in_traj,
+    )
+    time_merge_stops_with_trajs = time.perf_counter() - start_fallback
 
     time_phase4 = time.perf_counter() - start_phase4
 
@@ -222,7 +416,7 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
         ts_start, ts_end = extract_start_end_time_s(trajectory)
         ts_start = int(ts_start)
         ts_end = int(ts_end)
-        if len(trajectory) >= MIN_AIS_POINTS_IN_TRAJ and ts_end > ts_start:
+        if len(trajectory) >= params.min_ais_points_in_traj and ts_end > ts_start:
             start_linestringm = time.perf_counter()
             trajs_to_insert.append(
                 (mmsi, ts_start, ts_end, coords_to_linestringm_as_wkb(trajectory))
@@ -231,10 +425,19 @@ def process_single_mmsi(mmsi: int, input_points: list[InputPoint]) -> ProcessRes
 
     time_phase5 = time.perf_counter() - start_phase5
 
-    total_time = time.perf_counter() - start_total
-
-    # print(
-    #     f"[MMSI: {mmsi}] ({len(points)} points, {len(trajs_to_insert)} trajectories, {len(stops_to_insert)} stops) processed in {total_time:.2f}s ([1]={time_phase1:.2f}s, [2]={time_phase2:.2f}s, [3]={time_phase3:.2f}s, [4]={time_phase4:.2f}s, [4.1]={time_concave_hull:.2f}s, [4.2]={time_merge_stops_with_trajs:.2f}s, [5]={time_phase5:.2f}s)"
-    # )
-
-    return (mmsi, trajs_to_insert, stops_to_insert)
+    metrics: MmsiMetrics = {
+        "num_candidate_trajs": len(candidate_trajs),
+        "num_candidate_stops": len(candidate_stops),
+        "num_merged_stops": len(merged_stops),
+        "max_points_in_stop": max_points_in_stop,
+        "num_trajs": len(trajs_to_insert),
+        "num_stops": len(stops_to_insert),
+        "time_phase3": time_phase3,
+        "time_phase4": time_phase4,
+        "time_concave_hull": time_concave_hull,
+        "time_merge_stops_with_trajs": time_merge_stops_with_trajs,
+        "time_phase5": time_phase5,
+        "time_linestringm": time_linestringm,
+    }
+
+    return (trajs_to_insert, stops_to_insert, metrics)
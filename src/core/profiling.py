@@ -0,0 +1,244 @@
+import cProfile
+import io
+import json
+import multiprocessing.util
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from glob import glob
+from typing import Any, Callable, Iterator
+
+from core.metrics import MetricsRecorder
+
+ProfileSettings = tuple[str, str, str]  # (mode, output dir, stage)
+
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_DIR = "etl_profiles"
+SAMPLE_INTERVAL_S = 0.005
+TOP_N_FUNCTIONS = 40
+
+# One profiler per stage in each worker process, dumped when the worker exits
+_worker_profilers: dict[str, Any] = {}
+
+
+class StackSampler:
+    """Sampling profiler for one thread, with the same enable/disable API as ``cProfile.Profile``.
+
+    A daemon thread records the target thread's stack every ``interval_s`` while enabled;
+    ``folded`` returns the counts in the collapsed-stack format read by flamegraph.pl/speedscope.
+    """
+
+    def __init__(
+        self, thread_id: int | None = None, interval_s: float = SAMPLE_INTERVAL_S
+    ):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval_s = interval_s
+        self.counts: Counter[str] = Counter()
+        self._active = threading.Event()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def enable(self):
+        self._active.set()
+
+    def disable(self):
+        self._active.clear()
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.counts.items())
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = _fold_stack(frame)
+                with self._lock:
+                    self.counts[stack] += 1
+            time.sleep(self.interval_s)
+
+
+def _fold_stack(frame: Any) -> str:
+    frames: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def get_profile_mode() -> str | None:
+    """Profiler from ``ETL_PROFILE``: true/cprofile (deterministic), sample, or unset/false (off)."""
+    value = os.getenv("ETL_PROFILE", "").strip().lower()
+    if value in ("", "n", "no", "0", "false"):
+        return None
+    if value in ("y", "yes", "1", "true", "cprofile"):
+        return "cprofile"
+    if value == "sample":
+        return "sample"
+    raise ValueError(
+        f"Invalid value for ETL_PROFILE: '{value}'. Use true/false or one of {', '.join(PROFILE_MODES)}."
+    )
+
+
+def get_profile_dir(run_id: str) -> str | None:
+    """Output directory for one run (``ETL_PROFILE_DIR``/<run id>), or None if profiling is off."""
+    if get_profile_mode() is None:
+        return None
+    base_dir = os.getenv("ETL_PROFILE_DIR", "").strip() or DEFAULT_PROFILE_DIR
+    return os.path.join(base_dir, run_id)
+
+
+def get_profile_settings(stage: str, run_id: str) -> ProfileSettings | None:
+    mode = get_profile_mode()
+    if mode is None:
+        return None
+    return mode, str(get_profile_dir(run_id)), stage
+
+
+def _new_profiler(mode: str) -> Any:
+    return cProfile.Profile() if mode == "cprofile" else StackSampler()
+
+
+def _dump_profiler(profiler: Any, path_without_ext: str):
+    os.makedirs(os.path.dirname(path_without_ext), exist_ok=True)
+    if isinstance(profiler, StackSampler):
+        with open(f"{path_without_ext}.folded", "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+    else:
+        profiler.dump_stats(f"{path_without_ext}.pstats")
+
+
+def _worker_profiler(settings: ProfileSettings) -> Any:
+    mode, out_dir, stage = settings
+    profiler = _worker_profilers.get(stage)
+    if profiler is None:
+        profiler = _new_profiler(mode)
+        _worker_profilers[stage] = profiler
+        path = os.path.join(
+            out_dir, "parts", f"{stage}.worker-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        )
+        # Runs when the pool shuts the worker down (atexit is skipped in pool workers)
+        multiprocessing.util.Finalize(
+            None, _dump_profiler, args=(profiler, path), exitpriority=10
+        )
+    return profiler
+
+
+def run_profiled(settings: ProfileSettings, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run ``fn(*args)`` in a worker under the worker's profiler for the stage."""
+    profiler = _worker_profiler(settings)
+    profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+
+
+def profiled_task(
+    fn: Callable[..., Any], settings: ProfileSettings | None
+) -> Callable[..., Any]:
+    """``fn`` itself when profiling is off, otherwise a picklable wrapper for executor.submit."""
+    if settings is None:
+        return fn
+    return partial(run_profiled, settings, fn)
+
+
+def merge_stage_profiles(out_dir: str, stage: str, mode: str) -> str | None:
+    """Merge the parent and worker profiles of a stage into one file; returns its path."""
+    parts_dir = os.path.join(out_dir, "parts")
+    if mode == "cprofile":
+        paths = sorted(glob(os.path.join(parts_dir, f"{stage}.*.pstats")))
+        if not paths:
+            return None
+        stats = pstats.Stats(*paths)
+        out_path = os.path.join(out_dir, f"{stage}.pstats")
+        stats.dump_stats(out_path)
+
+        report = io.StringIO()
+        stats.stream = report
+        stats.sort_stats("cumulative").print_stats(TOP_N_FUNCTIONS)
+        with open(os.path.join(out_dir, f"{stage}.txt"), "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        return out_path
+
+    paths = sorted(glob(os.path.join(parts_dir, f"{stage}.*.folded")))
+    if not paths:
+        return None
+    counts: Counter[str] = Counter()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    counts[stack] += int(count)
+    out_path = os.path.join(out_dir, f"{stage}.folded")
+    with open(out_path, "w", encoding="utf-8") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+    return out_path
+
+
+@contextmanager
+def profile_stage(settings: ProfileSettings | None) -> Iterator[None]:
+    """Profile the parent process for a stage, then merge it with the stage's worker profiles.
+
+    Workers only write their profiles when their pool shuts down, so wrap the whole stage call.
+    """
+    if settings is None:
+        yield
+        return
+
+    mode, out_dir, stage = settings
+    profiler = _new_profiler(mode)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _dump_profiler(profiler, os.path.join(out_dir, "parts", f"{stage}.main"))
+        out_path = merge_stage_profiles(out_dir, stage, mode)
+        print(f"Profile for stage '{stage}' written to '{out_path}'.")
+
+
+def write_slowest_report(
+    metrics: MetricsRecorder,
+    out_dir: str,
+    num_points_by_unit: dict[tuple[str, str], dict[str, int]] | None = None,
+) -> str:
+    """Write the slowest units per stage (MMSIs, trajectories, stops) as JSON for reproduction.
+
+    ``num_points_by_unit`` adds point counts that are not part of the metrics, keyed by
+    (stage, kind) and unit id.
+    """
+    num_points_by_unit = num_points_by_unit or {}
+    report: dict[str, list[dict[str, Any]]] = {}
+    for stage, kind in metrics.slowest_keys():
+        num_points = num_points_by_unit.get((stage, kind), {})
+        entries = []
+        for duration, unit, rows, details in metrics.slowest_details(stage, kind):
+            entry: dict[str, Any] = {
+                "unit": unit,
+                "duration_s": round(duration, 4),
+                "rows": rows,
+                **details,
+            }
+            if unit in num_points:
+                entry["num_points"] = num_points[unit]
+            entries.append(entry)
+        report[f"{stage}/{kind}"] = entries
+
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, "slowest.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"run_id": metrics.run_id, "slowest": report}, f, indent=2)
+    return out_path
@@ -0,0 +1,165 @@
+import math
+from typing import Any, Hashable
+
+import numpy as np
+
+from core.geodesy import segment_motion
+from core.metrics import NON_ADDITIVE_DETAILS
+from core.points_to_ls_poly import (
+    MERGE_TIME_THRESHOLD,
+    STOP_TIME_THRESHOLD,
+    TRAJ_MAX_GAP_S,
+    TRAJ_MAX_SPEED_KN,
+    DuckDBRawPoint,
+    InputPoint,
+    MmsiMetrics,
+    ProcessResultWithMetrics,
+)
+
+CostModel = tuple[float, float]  # (coefficient, exponent): seconds ~ coef * points**exp
+CostSample = tuple[int, float]  # (num_points, seconds)
+ConstructTask = tuple[
+    Hashable, int, int, list[InputPoint], float
+]  # (task key e.g. mmsi or (mmsi, day), piece, num_pieces, points, predicted seconds)
+
+DEFAULT_COST_MODEL: CostModel = (2e-5, 1.0)
+MIN_COST_SAMPLES = 20  # Fewer samples than this: keep the default model
+MAX_COST_SAMPLES = 50_000  # Most recent samples used for fitting
+MIN_SPLIT_POINTS = 20_000  # Never split MMSI-days with fewer points
+
+# A gap this long ends any candidate trajectory or stop and blocks stop merging across it, so
+# the points on either side can be processed independently with identical results
+SPLIT_MIN_GAP_S = max(TRAJ_MAX_GAP_S, STOP_TIME_THRESHOLD, MERGE_TIME_THRESHOLD)
+
+
+def fit_cost_model(samples: list[CostSample]) -> CostModel:
+    """Fit seconds = coef * num_points**exp on log-log scale from per-MMSI construct metrics."""
+    usable = [(n, s) for n, s in samples[-MAX_COST_SAMPLES:] if n > 0 and s > 0]
+    if len(usable) < MIN_COST_SAMPLES:
+        return DEFAULT_COST_MODEL
+
+    log_points = np.log([n for n, _ in usable])
+    log_seconds = np.log([s for _, s in usable])
+    if np.ptp(log_points) == 0:
+        return DEFAULT_COST_MODEL
+
+    exponent, log_coef = np.polyfit(log_points, log_seconds, 1)
+    # Keep the exponent in a sane range so a noisy fit cannot invert the ordering
+    exponent = float(min(max(exponent, 0.5), 2.0))
+    log_coef = float(np.mean(log_seconds - exponent * log_points))
+    return math.exp(log_coef), exponent
+
+
+def predict_cost(model: CostModel, num_points: int) -> float:
+    coef, exponent = model
+    return coef * num_points**exponent if num_points > 0 else 0.0
+
+
+def find_split_indices(
+    points: list[DuckDBRawPoint], min_gap_s: float = SPLIT_MIN_GAP_S
+) -> list[int]:
+    """Indices where a new piece may start: after a gap of at least ``min_gap_s``.
+
+    The jump across the gap must also be slower than TRAJ_MAX_SPEED_KN, otherwise construction
+    would drop the first point after the gap as an outlier and the pieces would not match.
+    """
+    if len(points) < 2:
+        return []
+    lon, lat, ts = np.array([(p[0], p[1], p[3]) for p in points], dtype=np.float64).T
+    time_diffs, _, speeds_kn = segment_motion(lon, lat, ts)
+    splittable = (time_diffs >= min_gap_s) & (speeds_kn < TRAJ_MAX_SPEED_KN)
+    return (np.flatnonzero(splittable) + 1).tolist()
+
+
+def split_points_at_gaps(
+    points: list[DuckDBRawPoint],
+    max_pieces: int,
+    min_gap_s: float = SPLIT_MIN_GAP_S,
+) -> list[list[DuckDBRawPoint]]:
+    """Split one MMSI's time-ordered points at long gaps into at most ``max_pieces`` pieces of similar size."""
+    if max_pieces <= 1:
+        return [points]
+
+    target = math.ceil(len(points) / max_pieces)
+    pieces: list[list[DuckDBRawPoint]] = []
+    start = 0
+    for index in find_split_indices(points, min_gap_s):
+        if index - start >= target and len(pieces) < max_pieces - 1:
+            pieces.append(points[start:index])
+            start = index
+    pieces.append(points[start:])
+    return pieces
+
+
+def plan_construct_tasks(
+    points_by_key: dict[Any, list[InputPoint]],
+    model: CostModel,
+    max_workers: int,
+) -> list[ConstructTask]:
+    """Order MMSI tasks by predicted cost (heaviest first) and split stragglers at long gaps.
+
+    ``points_by_key`` maps a task key (an MMSI, or (MMSI, day)) to its time-ordered points.
+
+    An MMSI whose predicted cost exceeds a worker's fair share of the day (total / workers)
+    would keep the pool busy after everything else is done, so it is split into pieces of
+    about one share each; pieces of the same MMSI are stitched back by ``stitch_mmsi_results``.
+    """
+    costs = {
+        key: predict_cost(model, len(points))
+        for key, points in points_by_key.items()
+        if points
+    }
+    share = sum(costs.values()) / max(max_workers, 1)
+
+    tasks: list[ConstructTask] = []
+    for key, cost in costs.items():
+        points = points_by_key[key]
+        pieces: list[list[InputPoint]] = [points]
+        if (
+            max_workers > 1
+            and cost > share
+            and len(points) >= MIN_SPLIT_POINTS
+            and len(points[0]) == 4  # DuckDB raw points carry their timestamp
+        ):
+            max_pieces = min(math.ceil(cost / share), max_workers)
+            pieces = list(split_points_at_gaps(points, max_pieces))  # type: ignore[arg-type]
+        for piece_index, piece in enumerate(pieces):
+            tasks.append(
+                (
+                    key,
+                    piece_index,
+                    len(pieces),
+                    piece,
+                    predict_cost(model, len(piece)),
+                )
+            )
+
+    tasks.sort(key=lambda task: task[4], reverse=True)
+    return tasks
+
+
+def stitch_mmsi_results(
+    parts: list[ProcessResultWithMetrics],
+) -> ProcessResultWithMetrics:
+    """Combine the results of an MMSI's pieces (in time order) into one result."""
+    if len(parts) == 1:
+        return parts[0]
+
+    mmsi = parts[0][0]
+    metrics: MmsiMetrics = {}
+    for _, _, _, part_metrics in parts:
+        for key, value in part_metrics.items():
+            if key == "worker_pid":
+                metrics.setdefault(key, value)
+            elif key in NON_ADDITIVE_DETAILS:
+                metrics[key] = max(metrics.get(key, value), value)
+            else:
+                metrics[key] = metrics.get(key, 0) + value
+    metrics["num_pieces"] = len(parts)
+
+    return (
+        mmsi,
+        [traj for _, trajs, _, _ in parts for traj in trajs],
+        [stop for _, _, stops, _ in parts for stop in stops],
+        metrics,
+    )
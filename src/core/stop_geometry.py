@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+from shapely import MultiPoint, Point, concave_hull, get_coordinates
+from shapely.geometry.base import BaseGeometry
+
+from core.geodesy import haversine_m
+from core.utils import Coord
+
+STOP_HULL_RATIO = 0.2  # concave_hull ratio used for stop polygons
+STOP_POINT_BUFFER_DEG = 1e-5  # ~1 m radius buffer in WGS84 degrees, used when all stop points have same lat,lon (e.g. null-SOG stationary vessel)
+STOP_GRID_DEG = 1e-6  # ~0.1 m, points in the same grid cell are duplicates for the hull
+# Larger stops are thinned to about this many points before the concave hull
+MAX_HULL_POINTS = 2_000
+# m², stops with a smaller MBR (about one z21 cell) get the convex hull instead
+TINY_STOP_MBR_AREA = 400
+
+
+def dedupe_stop_points(
+    coords: list[Coord], grid_deg: float = STOP_GRID_DEG
+) -> np.ndarray:
+    """Unique (lon, lat) positions of a stop on a ``grid_deg`` grid, one original point per grid cell."""
+    xy = np.array([(c[0], c[1]) for c in coords], dtype=np.float64)
+    keys = np.floor(xy / grid_deg).astype(np.int64)
+    _, first_index = np.unique(keys, axis=0, return_index=True)
+    return xy[np.sort(first_index)]
+
+
+def thin_stop_points(xy: np.ndarray, max_points: int = MAX_HULL_POINTS) -> np.ndarray:
+    """Keep one point per cell of a grid sized for ``max_points`` cells, plus the convex hull vertices.
+
+    Keeping the convex hull vertices preserves the stop's extent (and so its MBR).
+    """
+    if len(xy) <= max_points:
+        return xy
+
+    mins = xy.min(axis=0)
+    extent = np.maximum(xy.max(axis=0) - mins, STOP_GRID_DEG)
+    cell = math.sqrt(float(extent[0] * extent[1]) / max_points)
+    keys = np.floor((xy - mins) / cell).astype(np.int64)
+    _, first_index = np.unique(keys, axis=0, return_index=True)
+
+    hull_xy = get_coordinates(MultiPoint(xy).convex_hull)
+    return np.unique(np.vstack([xy[first_index], hull_xy]), axis=0)
+
+
+def mbr_area_of_points_m2(xy: np.ndarray) -> float:
+    minx, miny = xy.min(axis=0)
+    maxx, maxy = xy.max(axis=0)
+    w = haversine_m(minx, miny, maxx, miny)
+    h = haversine_m(minx, miny, minx, maxy)
+    return w * h
+
+
+def build_stop_polygon(coords: list[Coord]) -> BaseGeometry:
+    """Stop geometry from the stop's points; a Polygon unless the points are degenerate (e.g. collinear).
+
+    Points are deduplicated on a ~0.1 m grid first. Stops whose MBR is about one z21 cell or
+    smaller get their convex hull; larger stops are thinned to at most ``MAX_HULL_POINTS``
+    points (keeping the extent) before the concave hull. Stops with a single position get a
+    ~1 m buffer around it. As before, the envelope is used when the hull is not a Polygon.
+    """
+    xy = dedupe_stop_points(coords)
+    if len(xy) == 1:
+        return Point(xy[0]).buffer(STOP_POINT_BUFFER_DEG)
+
+    if mbr_area_of_points_m2(xy) <= TINY_STOP_MBR_AREA:
+        points = MultiPoint(xy)
+        hull = points.convex_hull
+        return hull if hull.geom_type == "Polygon" else points.envelope
+
+    thinned = MultiPoint(thin_stop_points(xy))
+    hull = concave_hull(thinned, ratio=STOP_HULL_RATIO, allow_holes=False)
+    return hull if hull.geom_type == "Polygon" else thinned.envelope
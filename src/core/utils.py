@@ -1,29 +1,16 @@
 from math import inf
 
-import numpy as np
 from shapely import Polygon, from_wkt
 
-KNOT_AS_MPS = 0.514444  # 1 knot = 0.514444 m/s
-MIN_POINTS_IN_SEGMENT = 2  # Minimum number of points in a trajectory or stop segment
+from core.geodesy import KNOT_AS_MPS, coords_segment_motion, haversine_m
 
-EARTH_RADIUS_M = 6_371_000.0  # Mean Earth radius in meters
+MIN_POINTS_IN_SEGMENT = 2  # Minimum number of points in a trajectory or stop segment
 
 # Coordinate (lon, lat, epoch_ts)
 Coord = tuple[float, float, float]
 
-
-def haversine_distance_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
-    """Haversine distance in meters between two (lon, lat) points."""
-    lon1, lat1, lon2, lat2 = (
-        np.radians(lon1),
-        np.radians(lat1),
-        np.radians(lon2),
-        np.radians(lat2),
-    )
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
-    return float(EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(a)))
+# Scalar haversine, kept under its old name; arrays go through core.geodesy.haversine_m_array
+haversine_distance_m = haversine_m
 
 
 def distance_m(c1: Coord, c2: Coord) -> float:
@@ -44,7 +31,7 @@ def extract_start_end_time_s(coords: list[Coord]) -> tuple[float, float]:
 def compute_motion(prev: Coord, curr: Coord) -> tuple[float, float, float]:
     """Compute time difference (s), distance difference (m), and average vessel speed (knots) between two Coords."""
     time_diff = curr[2] - prev[2]
-    dist_diff = haversine_distance_m(prev[0], prev[1], curr[0], curr[1])
+    dist_diff = haversine_m(prev[0], prev[1], curr[0], curr[1])
     avg_vessel_speed = (dist_diff / time_diff / KNOT_AS_MPS) if time_diff > 0 else inf
     return time_diff, dist_diff, avg_vessel_speed
 
@@ -52,8 +39,8 @@ def compute_motion(prev: Coord, curr: Coord) -> tuple[float, float, float]:
 def compute_mbr_area(poly: Polygon) -> float:
     """Compute the area of the Minimum Bounding Rectangle (MBR) of a polygon in square meters."""
     minx, miny, maxx, maxy = poly.bounds
-    w = haversine_distance_m(minx, miny, maxx, miny)
-    h = haversine_distance_m(minx, miny, minx, maxy)
+    w = haversine_m(minx, miny, maxx, miny)
+    h = haversine_m(minx, miny, minx, maxy)
     return w * h
 
 
@@ -86,7 +73,8 @@ def merge_candidate_stops(
         time_diff = current_candidate_stop[0][2] - current_merged_stop[-1][2]
 
         # Distance between centroids of the current merged stop and the candidate stop
-        dist_diff = haversine_distance_m(
+        # (sequential: the merged centroid depends on the previous decision)
+        dist_diff = haversine_m(
             merged_sx / merged_n,
             merged_sy / merged_n,
             cand_sx / cand_n,
@@ -129,70 +117,130 @@ def append_segment_if_nonempty_and_clear_segment(
     current_segment.clear()  # empties in caller
 
 
-def try_merge_invalid_merged_stop_with_trajectories(
+class _SegmentChunk:
+    """One list of Coords in a linked segment."""
+
+    __slots__ = ("coords", "next")
+
+    def __init__(self, coords: list[Coord]):
+        self.coords = coords
+        self.next: _SegmentChunk | None = None
+
+
+class _LinkedSegment:
+    """A trajectory as a linked list of Coord chunks, so prepending/appending/joining is O(1)."""
+
+    __slots__ = ("head", "tail", "start", "end")
+
+    def __init__(self, coords: list[Coord]):
+        self.head = self.tail = _SegmentChunk(coords)
+        self.start = coords[0]
+        self.end = coords[-1]
+
+    def append(self, chunk: _SegmentChunk, end: Coord):
+        self.tail.next = chunk
+        self.tail = chunk
+        self.end = end
+
+    def to_coords(self) -> list[Coord]:
+        if self.head.next is None:
+            return self.head.coords
+        coords: list[Coord] = []
+        chunk: _SegmentChunk | None = self.head
+        while chunk is not None:
+            coords.extend(chunk.coords)
+            chunk = chunk.next
+        return coords
+
+
+def is_valid_trajectory_part(
+    coords: list[Coord], traj_max_speed_kn: float, traj_max_gap_s: float
+) -> bool:
+    """True if no step between consecutive Coords is faster than ``traj_max_speed_kn`` or longer than ``traj_max_gap_s``."""
+    time_diffs, _, speeds_kn = coords_segment_motion(coords)
+    return not (
+        (speeds_kn > traj_max_speed_kn).any() or (time_diffs > traj_max_gap_s).any()
+    )
+
+
+def merge_invalid_stops_with_trajectories(
     trajs: list[list[Coord]],
-    invalid_merged_stop: list[Coord],
+    invalid_merged_stops: list[list[Coord]],
     traj_max_speed_kn: float,
     traj_max_gap_s: float,
     min_ais_points_in_traj: int,
-):
-    """Insert or merge a non-valid stop with existing trajectories."""
-
-    # First, validate the invalid_merged_stop points to ensure no traj with unrealistic speeds/time gaps is created
-    for c1, c2 in zip(invalid_merged_stop, invalid_merged_stop[1:]):
-        time_diff, _, avg_vessel_speed = compute_motion(c1, c2)
-        if avg_vessel_speed > traj_max_speed_kn or time_diff > traj_max_gap_s:
-            return  # Discard the invalid stop
-
-    # Used to compare start/end points between stop and trajectories
-    first_stop_pt = invalid_merged_stop[0]
-    last_stop_pt = invalid_merged_stop[-1]
-
-    traj_before_idx = None
-    traj_after_idx = None
-
-    # Find trajectories to merge with
-    for i, traj in enumerate(trajs):
-        first_traj_pt = traj[0]
-        last_traj_pt = traj[-1]
-
-        # Compare full (lon, lat, epoch_ts) - exact equality
-        if last_traj_pt == first_stop_pt:
-            traj_before_idx = i
-        if first_traj_pt == last_stop_pt:
-            traj_after_idx = i
-
-    # Case 1: Stop connects/bridges two trajectories (stop starts where one trajectory ends and ends where another trajectory starts)
-    if (
-        traj_before_idx is not None
-        and traj_after_idx is not None
-        and traj_before_idx != traj_after_idx
-    ):
-        before_traj = trajs[traj_before_idx]
-        after_traj = trajs[traj_after_idx]
-        merged_traj = before_traj + invalid_merged_stop.copy() + after_traj
-
-        # replace both in list
-        trajs[traj_before_idx] = merged_traj
-        # remove the later one (index may shift if before < after)
-        trajs.pop(
-            traj_after_idx if traj_after_idx > traj_before_idx else traj_before_idx + 1
-        )
-        return
-
-    # Case 2: Stop continues a trajectory (stop starts where a trajectory ends)
-    if traj_before_idx is not None:
-        trajs[traj_before_idx].extend(invalid_merged_stop)
-        return
-
-    # Case 3: Stop precedes a trajectory (stop ends where a trajectory starts)
-    if traj_after_idx is not None:
-        trajs[traj_after_idx] = invalid_merged_stop + trajs[traj_after_idx]
-        return
-
-    # Case 4: No merge possible = treat as new trajectory (if it has enough points)
-    if len(invalid_merged_stop) >= min_ais_points_in_traj:
-        trajs.append(invalid_merged_stop)
+) -> list[list[Coord]]:
+    """Insert or merge non-valid stops (in time order) into the trajectories; returns the new trajectory list.
+
+    Trajectories are indexed by their first and last Coord (exact (lon, lat, epoch_ts) equality)
+    and held as linked chunks, so each stop is merged in O(1) and the whole fallback is linear in
+    the number of trajectories and stops. Trajectory order is kept: merged trajectories stay in
+    the position of the one that absorbed the stop, new ones are appended.
+    """
+    if not invalid_merged_stops:
+        return trajs
+
+    segments: list[_LinkedSegment | None] = [_LinkedSegment(traj) for traj in trajs]
+    by_end: dict[Coord, int] = {}
+    by_start: dict[Coord, int] = {}
+    for i, segment in enumerate(segments):
+        assert segment is not None
+        by_end[segment.end] = i
+        by_start[segment.start] = i
+
+    for stop in invalid_merged_stops:
+        # Validate the stop's points to ensure no traj with unrealistic speeds/time gaps is created
+        if not is_valid_trajectory_part(stop, traj_max_speed_kn, traj_max_gap_s):
+            continue  # Discard the invalid stop
+
+        first_stop_pt = stop[0]
+        last_stop_pt = stop[-1]
+        before_idx = by_end.get(first_stop_pt)
+        after_idx = by_start.get(last_stop_pt)
+
+        # Case 1: Stop bridges two trajectories (starts where one ends, ends where another starts)
+        if before_idx is not None and after_idx is not None and before_idx != after_idx:
+            before = segments[before_idx]
+            after = segments[after_idx]
+            assert before is not None and after is not None
+            del by_end[first_stop_pt]
+            del by_start[last_stop_pt]
+            before.append(_SegmentChunk(stop), last_stop_pt)
+            before.tail.next = after.head
+            before.tail = after.tail
+            before.end = after.end
+            by_end[after.end] = before_idx
+            segments[after_idx] = None
+            continue
+
+        # Case 2: Stop continues a trajectory (stop starts where a trajectory ends)
+        if before_idx is not None:
+            before = segments[before_idx]
+            assert before is not None
+            del by_end[first_stop_pt]
+            before.append(_SegmentChunk(stop), last_stop_pt)
+            by_end[last_stop_pt] = before_idx
+            continue
+
+        # Case 3: Stop precedes a trajectory (stop ends where a trajectory starts)
+        if after_idx is not None:
+            after = segments[after_idx]
+            assert after is not None
+            del by_start[last_stop_pt]
+            chunk = _SegmentChunk(stop)
+            chunk.next = after.head
+            after.head = chunk
+            after.start = first_stop_pt
+            by_start[first_stop_pt] = after_idx
+            continue
+
+        # Case 4: No merge possible = treat as new trajectory (if it has enough points)
+        if len(stop) >= min_ais_points_in_traj:
+            by_end[last_stop_pt] = len(segments)
+            by_start[first_stop_pt] = len(segments)
+            segments.append(_LinkedSegment(stop))
+
+    return [segment.to_coords() for segment in segments if segment is not None]
 
 
 def coords_to_linestringm_as_wkb(coords: list[Coord]) -> bytes:
@@ -0,0 +1,179 @@
+import time
+
+import duckdb
+
+from core.cellstring_utils import DEFAULT_ZOOM
+from db_setup.duckdb.cs_variant import get_cs_schema_zoom
+
+CLUSTER_ZOOM = 13  # Coarse quadkey prefix used as leading sort key (z13 ancestor)
+MAX_SORTED_RUNS = 8  # Rewrite the whole table once this many sorted runs exist
+TEMP_CLUSTER_TABLE = "_cs_cluster_tmp"
+
+# table_name -> (id column, secondary sort columns)
+CS_CLUSTER_TABLES: dict[str, tuple[str, str]] = {
+    "trajectory_cs": ("trajectory_id", "trajectory_id, ts_entry"),
+    "stop_cs": ("stop_id", "stop_id"),
+    "region_cs": ("region_id", "region_id"),
+    "passage_cs": ("passage_id", "passage_id"),
+}
+# Tables holding the schema's variant zoom in cell_z21 (regions and passages are always z21)
+VARIANT_ZOOM_TABLES = ("trajectory_cs", "stop_cs")
+
+
+def _ensure_cluster_state_table(conn: duckdb.DuckDBPyConnection, cs_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {cs_schema}.cs_cluster_state (
+            table_name       TEXT PRIMARY KEY,
+            clustered_max_id INTEGER NOT NULL,
+            sorted_runs      INTEGER NOT NULL,
+            cluster_zoom     INTEGER NOT NULL,
+            clustered_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def _cluster_sort_key(
+    cluster_zoom: int, secondary: str, cells_zoom: int = DEFAULT_ZOOM
+) -> str:
+    if cluster_zoom >= cells_zoom:
+        return f"cell_z21, {secondary}"
+    shift = 2 * (cells_zoom - cluster_zoom)
+    return f"cell_z21 >> {shift}, {secondary}, cell_z21"
+
+
+def _rewrite_sorted(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    table_name: str,
+    where_clause: str,
+    sort_key: str,
+) -> int:
+    """Rewrite the rows matching ``where_clause`` in sorted order at the end of the table."""
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {TEMP_CLUSTER_TABLE} AS
+        SELECT * FROM {cs_schema}.{table_name}
+        WHERE {where_clause}
+        ORDER BY {sort_key};
+    """)
+    conn.execute(f"DELETE FROM {cs_schema}.{table_name} WHERE {where_clause};")
+    conn.execute(
+        f"INSERT INTO {cs_schema}.{table_name} SELECT * FROM {TEMP_CLUSTER_TABLE};"
+    )
+    row = conn.execute(f"SELECT COUNT(*) FROM {TEMP_CLUSTER_TABLE}").fetchone()
+    conn.execute(f"DROP TABLE IF EXISTS {TEMP_CLUSTER_TABLE};")
+    return int(row[0]) if row else 0
+
+
+def cluster_duckdb_cs_table(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    table_name: str,
+    cluster_zoom: int = CLUSTER_ZOOM,
+    full: bool = False,
+    max_sorted_runs: int = MAX_SORTED_RUNS,
+) -> int:
+    """Cluster one CellString table by its coarse cell prefix so DuckDB zone maps prune row groups.
+
+    Incremental runs only sort the rows with an id above the last clustered id and append them
+    as a new sorted run. Each run has narrow min/max ``cell_z21`` per row group, so pruning works
+    without rewriting the table. Once ``max_sorted_runs`` runs exist (or ``full`` is set, or the
+    cluster zoom changed) the whole table is rewritten as a single run.
+
+    In a CellString variant schema, trajectory_cs and stop_cs hold cells of the variant's zoom
+    (``cs_variant``), and the prefix is taken relative to that zoom.
+
+    Returns the number of rows rewritten.
+    """
+    if table_name not in CS_CLUSTER_TABLES:
+        raise ValueError(f"Unsupported CellString table: {table_name}")
+
+    _ensure_cluster_state_table(conn, cs_schema)
+    id_column, secondary = CS_CLUSTER_TABLES[table_name]
+    cells_zoom = (
+        get_cs_schema_zoom(conn, cs_schema)
+        if table_name in VARIANT_ZOOM_TABLES
+        else DEFAULT_ZOOM
+    )
+    sort_key = _cluster_sort_key(cluster_zoom, secondary, cells_zoom)
+
+    max_id_row = conn.execute(
+        f"SELECT MAX({id_column}) FROM {cs_schema}.{table_name}"
+    ).fetchone()
+    max_id = max_id_row[0] if max_id_row else None
+    if max_id is None:
+        return 0
+
+    state = conn.execute(
+        f"""
+        SELECT clustered_max_id, sorted_runs, cluster_zoom
+        FROM {cs_schema}.cs_cluster_state
+        WHERE table_name = ?
+    """,
+        [table_name],
+    ).fetchone()
+
+    rewrite_all = (
+        full or state is None or state[1] >= max_sorted_runs or state[2] != cluster_zoom
+    )
+    if not rewrite_all and state is not None and max_id <= state[0]:
+        return 0
+
+    conn.begin()
+    try:
+        if rewrite_all:
+            rows = _rewrite_sorted(conn, cs_schema, table_name, "TRUE", sort_key)
+            sorted_runs = 1
+        else:
+            assert state is not None
+            rows = _rewrite_sorted(
+                conn, cs_schema, table_name, f"{id_column} > {int(state[0])}", sort_key
+            )
+            sorted_runs = state[1] + 1
+
+        conn.execute(
+            f"""
+            INSERT INTO {cs_schema}.cs_cluster_state
+                (table_name, clustered_max_id, sorted_runs, cluster_zoom, clustered_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (table_name) DO UPDATE SET
+                clustered_max_id = excluded.clustered_max_id,
+                sorted_runs = excluded.sorted_runs,
+                cluster_zoom = excluded.cluster_zoom,
+                clustered_at = excluded.clustered_at;
+        """,
+            [table_name, int(max_id), sorted_runs, cluster_zoom],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return rows
+
+
+def cluster_duckdb_cs_tables(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    cluster_zoom: int = CLUSTER_ZOOM,
+    full: bool = False,
+):
+    """Cluster trajectory_cs, stop_cs, region_cs and passage_cs by coarse cell prefix."""
+    print(
+        f"\n--- Clustering CellString tables in '{cs_schema}' by z{cluster_zoom} cell prefix ---"
+    )
+    start_time = time.perf_counter()
+    for table_name in CS_CLUSTER_TABLES:
+        table_start = time.perf_counter()
+        rows = cluster_duckdb_cs_table(
+            conn, cs_schema, table_name, cluster_zoom=cluster_zoom, full=full
+        )
+        if rows:
+            print(
+                f"Clustered {rows:,} rows of {cs_schema}.{table_name} in {time.perf_counter() - table_start:.2f}s."
+            )
+        else:
+            print(f"{cs_schema}.{table_name} is already clustered.")
+
+    # Reclaim the row groups emptied by the rewrites
+    conn.execute("CHECKPOINT;")
+    print(f"Finished clustering in {time.perf_counter() - start_time:.2f}s.")
@@ -0,0 +1,67 @@
+import duckdb
+import pyarrow as pa
+
+from core.cover_store import CoverStoreKey
+
+
+def ensure_cover_store_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.cover_store (
+            geom_hash  BLOB NOT NULL,
+            zoom       UTINYINT NOT NULL,
+            algorithm  TEXT NOT NULL,
+            cells      BLOB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (geom_hash, zoom, algorithm)
+        );
+    """)
+
+
+def load_covers(
+    conn: duckdb.DuckDBPyConnection, db_schema: str, keys: list[CoverStoreKey]
+) -> dict[CoverStoreKey, bytes]:
+    """Encoded covers (see ``core.cover_store.encode_cells``) stored for any of ``keys``."""
+    ensure_cover_store_table(conn, db_schema)
+    if not keys:
+        return {}
+    keys_arrow_table = pa.table(
+        {
+            "geom_hash": pa.array([key[0] for key in keys], type=pa.binary()),
+            "zoom": pa.array([key[1] for key in keys], type=pa.uint8()),
+            "algorithm": pa.array([key[2] for key in keys], type=pa.string()),
+        }
+    )
+    rows = conn.execute(f"""
+        SELECT c.geom_hash, c.zoom, c.algorithm, c.cells
+        FROM {db_schema}.cover_store c
+        SEMI JOIN keys_arrow_table k USING (geom_hash, zoom, algorithm);
+    """).fetchall()
+    return {
+        (bytes(geom_hash), zoom, algorithm): bytes(cells)
+        for geom_hash, zoom, algorithm, cells in rows
+    }
+
+
+def save_covers(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    covers: dict[CoverStoreKey, bytes],
+):
+    ensure_cover_store_table(conn, db_schema)
+    if not covers:
+        return
+    covers_arrow_table = pa.table(
+        {
+            "geom_hash": pa.array([key[0] for key in covers], type=pa.binary()),
+            "zoom": pa.array([key[1] for key in covers], type=pa.uint8()),
+            "algorithm": pa.array([key[2] for key in covers], type=pa.string()),
+            "cells": pa.array(list(covers.values()), type=pa.binary()),
+        }
+    )
+    conn.execute(f"""
+        INSERT INTO {db_schema}.cover_store (geom_hash, zoom, algorithm, cells, created_at)
+        SELECT geom_hash, zoom, algorithm, cells, CURRENT_TIMESTAMP FROM covers_arrow_table
+        ON CONFLICT (geom_hash, zoom, algorithm) DO UPDATE SET
+            cells = excluded.cells,
+            created_at = excluded.created_at;
+    """)
@@ -1,3 +1,5 @@
+import calendar
+import os
 import re
 import time
 from datetime import date, datetime
@@ -14,6 +16,46 @@ from prompt_utils import prompt_optional_date_range
 
 AIS_FILE_PATTERN = re.compile(r"^aisdk-(\d{4}-\d{2}-\d{2})\.pq$")
 TEMP_AIS_STAGE = "_selected_ais_data_tmp"
+TEMP_NEW_POINTS = "_new_points_tmp"
+TEMP_REWRITE_POINTS = "_rewrite_points_tmp"
+POINTS_COLUMNS = "mmsi, lat, lon, sog, timestamp, epoch_ts"
+# Physical order of points: each day's rows together, sorted by vessel and time
+POINTS_CLUSTER_ORDER = "CAST(timestamp AS DATE), mmsi, epoch_ts"
+
+# Compact points layout (DUCKDB_POINTS_COMPACT): the staged value as the points view returns it,
+# so re-published points are recognised, and the fixed-point column it is stored in
+COMPACT_POINT_COLUMNS = (
+    ("mmsi", "CAST(a.mmsi AS BIGINT)", "CAST(mmsi AS INTEGER)"),
+    (
+        "lat",
+        "round(CAST(a.lat AS DOUBLE) * 1e7) / 1e7",
+        "CAST(round(lat * 1e7) AS INTEGER)",
+    ),
+    (
+        "lon",
+        "round(CAST(a.lon AS DOUBLE) * 1e7) / 1e7",
+        "CAST(round(lon * 1e7) AS INTEGER)",
+    ),
+    (
+        "sog",
+        "round(CAST(a.sog AS DOUBLE) * 10) / 10",
+        "CAST(round(sog * 10) AS SMALLINT)",
+    ),
+    (
+        "timestamp",
+        "date_trunc('second', CAST(a.timestamp AS TIMESTAMP))",
+        "CAST(epoch_ts AS INTEGER)",
+    ),
+)  # (points column, staged value, points_compact value)
+# The points view's columns, computed from points_compact
+COMPACT_POINTS_VIEW_COLUMNS = """
+    CAST(mmsi AS BIGINT) AS mmsi,
+    lat_e7 / 1e7 AS lat,
+    lon_e7 / 1e7 AS lon,
+    sog_dk / 10 AS sog,
+    make_timestamp(epoch_s * 1000000::BIGINT) AS timestamp,
+    CAST(epoch_s AS DOUBLE) AS epoch_ts
+"""
 
 
 def parse_ais_file_date(file_name: str) -> date | None:
@@ -41,15 +83,43 @@ def discover_ais_parquet_files(ais_data_path: str) -> list[tuple[str, str, date]
     return discovered
 
 
+def compute_file_fingerprint(file_path: str) -> str:
+    """Cheap change detector for an AIS file: size and modification time (ns)."""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def find_republished_files(
+    files: list[tuple[str, str, date]],
+    logged_fingerprints: dict[str, str | None],
+) -> set[str]:
+    """Names of already loaded files whose fingerprint changed since they were logged.
+
+    Files logged before fingerprints were recorded (NULL) are not considered changed.
+    """
+    return {
+        file_name
+        for file_path, file_name, _ in files
+        if logged_fingerprints.get(file_name) is not None
+        and logged_fingerprints[file_name] != compute_file_fingerprint(file_path)
+    }
+
+
 def filter_files_by_watermark_and_period(
     files: list[tuple[str, str, date]],
     watermark_date: date | None,
     start_date: date | None,
     end_date: date | None,
+    republished_files: set[str] | None = None,
 ) -> list[tuple[str, str, date]]:
+    """Files newer than the watermark (or re-published since they were loaded) within the period."""
     selected: list[tuple[str, str, date]] = []
     for file_path, file_name, file_date in files:
-        if watermark_date is not None and file_date <= watermark_date:
+        if (
+            watermark_date is not None
+            and file_date <= watermark_date
+            and file_name not in (republished_files or set())
+        ):
             continue
         if start_date is not None and file_date < start_date:
             continue
@@ -72,6 +142,84 @@ def _ensure_points_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
     """)
 
 
+def _ensure_points_compact_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    """Points as fixed-point integers (about 16 instead of 48 bytes per row) behind a
+    ``points`` view with the usual columns. An existing ``points`` table is converted.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.points_compact (
+            mmsi    INTEGER NOT NULL,   -- valid MMSIs have 9 digits
+            lat_e7  INTEGER NOT NULL,   -- 1e-7 degrees
+            lon_e7  INTEGER NOT NULL,   -- 1e-7 degrees
+            sog_dk  SMALLINT,           -- 0.1 knots
+            epoch_s INTEGER NOT NULL    -- whole seconds since 1970 (until 2038)
+        );
+    """)
+    if points_relation_type(conn, db_schema) == "BASE TABLE":
+        print(f"Converting {db_schema}.points to the compact layout...")
+        conn.execute("BEGIN TRANSACTION;")
+        try:
+            conn.execute(f"""
+                INSERT INTO {db_schema}.points_compact
+                SELECT {', '.join(compact for _, _, compact in COMPACT_POINT_COLUMNS)}
+                FROM {db_schema}.points
+                ORDER BY {POINTS_CLUSTER_ORDER};
+            """)
+            conn.execute(f"DROP TABLE {db_schema}.points;")
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+    conn.execute(f"""
+        CREATE OR REPLACE VIEW {db_schema}.points AS
+        SELECT {COMPACT_POINTS_VIEW_COLUMNS}
+        FROM {db_schema}.points_compact;
+    """)
+
+
+def points_relation_type(conn: duckdb.DuckDBPyConnection, db_schema: str) -> str | None:
+    """'BASE TABLE' (standard layout), 'VIEW' (over points_compact) or None if missing."""
+    row = conn.execute(
+        """
+        SELECT table_type FROM information_schema.tables
+        WHERE table_schema = ? AND table_name = 'points';
+    """,
+        [db_schema],
+    ).fetchone()
+    return row[0] if row else None
+
+
+def points_in_time_range(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    start: date | datetime,
+    end: date | datetime,
+) -> tuple[str, list]:
+    """A subquery with the points columns of the points with ``start <= timestamp < end``, and
+    its parameters.
+
+    The points view computes ``timestamp`` from ``points_compact.epoch_s``, and a filter on that
+    expression is not pushed into the scan, so compact points are filtered on ``epoch_s`` to let
+    min/max zone maps skip the row groups of other days.
+    """
+    if points_relation_type(conn, db_schema) == "VIEW":
+        return (
+            f"""(
+            SELECT {COMPACT_POINTS_VIEW_COLUMNS}
+            FROM {db_schema}.points_compact
+            WHERE epoch_s >= ? AND epoch_s < ?
+        )""",
+            [calendar.timegm(start.timetuple()), calendar.timegm(end.timetuple())],
+        )
+    return (
+        f"""(
+            SELECT {POINTS_COLUMNS} FROM {db_schema}.points
+            WHERE timestamp >= ? AND timestamp < ?
+        )""",
+        [start, end],
+    )
+
+
 def _ensure_ingestion_log_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
     conn.execute(f"""
         CREATE TABLE IF NOT EXISTS {db_schema}.points_ingestion_log (
@@ -80,11 +228,52 @@ def _ensure_ingestion_log_table(conn: duckdb.DuckDBPyConnection, db_schema: str)
             file_date DATE NOT NULL,
             min_ts TIMESTAMP,
             max_ts TIMESTAMP,
-            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            fingerprint TEXT
+        );
+    """)
+    # Logs created before fingerprints were recorded
+    conn.execute(f"""
+        ALTER TABLE {db_schema}.points_ingestion_log
+        ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+    """)
+
+
+def _ensure_reprocess_queue_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.points_reprocess_queue (
+            mmsi BIGINT NOT NULL,
+            day DATE NOT NULL,
+            queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (mmsi, day)
         );
     """)
 
 
+def _get_logged_fingerprints(
+    conn: duckdb.DuckDBPyConnection, db_schema: str
+) -> dict[str, str | None]:
+    rows = conn.execute(
+        f"SELECT file_name, fingerprint FROM {db_schema}.points_ingestion_log"
+    ).fetchall()
+    return {file_name: fingerprint for file_name, fingerprint in rows}
+
+
+def _backfill_fingerprints(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    files: list[tuple[str, str, date]],
+    logged_fingerprints: dict[str, str | None],
+):
+    """Record the current fingerprint of logged files that have none (logged by older versions)."""
+    for file_path, file_name, _ in files:
+        if file_name in logged_fingerprints and logged_fingerprints[file_name] is None:
+            conn.execute(
+                f"UPDATE {db_schema}.points_ingestion_log SET fingerprint = ? WHERE file_name = ?",
+                [compute_file_fingerprint(file_path), file_name],
+            )
+
+
 def _get_ingestion_watermark(
     conn: duckdb.DuckDBPyConnection, db_schema: str
 ) -> datetime | None:
@@ -130,14 +319,118 @@ def _create_staging_table(
     print()
 
 
-def _insert_incremental_points(conn: duckdb.DuckDBPyConnection, db_schema: str) -> int:
-    before_count_row = conn.execute(
-        f"SELECT COUNT(*) FROM {db_schema}.points"
-    ).fetchone()
-    before_count = before_count_row[0] if before_count_row else 0
+def _in_days_filter(ts_expr: str) -> str:
+    """Rows whose day is in $days; the $first_day..$last_day range lets min/max zone maps
+    skip the row groups of other days."""
+    return f"""
+        {ts_expr} >= CAST($first_day AS TIMESTAMP)
+        AND {ts_expr} < CAST($last_day AS TIMESTAMP) + INTERVAL 1 DAY
+        AND CAST({ts_expr} AS DATE) IN (SELECT unnest($days::DATE[]))
+    """
+
 
+def _insert_clustered_points(
+    conn: duckdb.DuckDBPyConnection, db_schema: str, compact: bool
+):
+    """Insert the points of TEMP_NEW_POINTS so that points stays clustered by
+    ``POINTS_CLUSTER_ORDER``: new days are appended in order, and days that already have
+    points (late arrivals) are rewritten with their new points in one transaction."""
+    new_days = [day for (day,) in conn.execute(f"""
+            SELECT DISTINCT CAST(timestamp AS DATE) AS day
+            FROM {TEMP_NEW_POINTS}
+            ORDER BY day;
+        """).fetchall()]
+    if not new_days:
+        return
+    # Only the days that get new points and already have stored points are rewritten
+    rewrite_days = [
+        day
+        for (day,) in conn.execute(
+            f"""
+            SELECT DISTINCT CAST(timestamp AS DATE) AS day
+            FROM {db_schema}.points
+            WHERE {_in_days_filter("timestamp")}
+            ORDER BY day;
+        """,
+            {"first_day": new_days[0], "last_day": new_days[-1], "days": new_days},
+        ).fetchall()
+    ]
+    if compact:
+        table, columns = "points_compact", "mmsi, lat_e7, lon_e7, sog_dk, epoch_s"
+        values = ", ".join(
+            compact_value for _, _, compact_value in COMPACT_POINT_COLUMNS
+        )
+        row_ts = "make_timestamp(epoch_s * 1000000::BIGINT)"
+    else:
+        table, columns = "points", POINTS_COLUMNS
+        values = POINTS_COLUMNS
+        row_ts = "timestamp"
+    day_params = {
+        "first_day": rewrite_days[0] if rewrite_days else new_days[0],
+        "last_day": rewrite_days[-1] if rewrite_days else new_days[0],
+        "days": rewrite_days,
+    }
+
+    conn.execute("BEGIN TRANSACTION;")
+    try:
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE {TEMP_REWRITE_POINTS} AS
+            SELECT {POINTS_COLUMNS} FROM {db_schema}.points
+            WHERE {_in_days_filter("timestamp")};
+        """,
+            day_params,
+        )
+        conn.execute(
+            f"DELETE FROM {db_schema}.{table} WHERE {_in_days_filter(row_ts)};",
+            day_params,
+        )
+        conn.execute(f"""
+            INSERT INTO {db_schema}.{table} ({columns})
+            SELECT {values}
+            FROM (
+                SELECT {POINTS_COLUMNS} FROM {TEMP_NEW_POINTS}
+                UNION ALL
+                SELECT {POINTS_COLUMNS} FROM {TEMP_REWRITE_POINTS}
+            )
+            ORDER BY {POINTS_CLUSTER_ORDER};
+        """)
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {TEMP_REWRITE_POINTS};")
+    if rewrite_days:
+        print(
+            f"Rewrote {len(rewrite_days)} day(s) of points that received late points, keeping points clustered by day, MMSI and time."
+        )
+
+
+def _insert_incremental_points(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    watermark_ts: datetime | None,
+    compact: bool = False,
+) -> tuple[int, int]:
+    """Insert unseen staged points; MMSI-days receiving points at or before ``watermark_ts``
+    (late arrivals, e.g. from re-published files) are queued in points_reprocess_queue.
+    With ``compact``, points are rounded to the points_compact precision before deduplication.
+
+    Returns (inserted points, queued MMSI-days).
+    """
+    if compact:
+        staged = {column: staged for column, staged, _ in COMPACT_POINT_COLUMNS}
+    else:
+        staged = {
+            "mmsi": "CAST(a.mmsi AS BIGINT)",
+            "lat": "CAST(a.lat AS DOUBLE)",
+            "lon": "CAST(a.lon AS DOUBLE)",
+            "sog": "CAST(a.sog AS DOUBLE)",
+            "timestamp": "CAST(a.timestamp AS TIMESTAMP)",
+        }
     conn.execute(f"""
-        INSERT INTO {db_schema}.points (mmsi, lat, lon, sog, timestamp, epoch_ts)
+        CREATE OR REPLACE TEMP TABLE {TEMP_NEW_POINTS} AS
         WITH valid_mmsi AS (
             SELECT mmsi
             FROM {TEMP_AIS_STAGE}
@@ -149,38 +442,51 @@ def _insert_incremental_points(conn: duckdb.DuckDBPyConnection, db_schema: str)
             HAVING COUNT(*) >= 10
         ),
         dedup AS (
-            SELECT DISTINCT ON (a.mmsi, a.lat, a.lon, a.timestamp)
-                CAST(a.mmsi AS BIGINT) AS mmsi,
-                CAST(a.lat AS DOUBLE) AS lat,
-                CAST(a.lon AS DOUBLE) AS lon,
-                CAST(a.sog AS DOUBLE) AS sog,
-                CAST(a.timestamp AS TIMESTAMP) AS timestamp,
-                EPOCH(CAST(a.timestamp AS TIMESTAMP)) AS epoch_ts
+            SELECT DISTINCT ON (mmsi, lat, lon, timestamp)
+                {staged["mmsi"]} AS mmsi,
+                {staged["lat"]} AS lat,
+                {staged["lon"]} AS lon,
+                {staged["sog"]} AS sog,
+                {staged["timestamp"]} AS timestamp,
+                EPOCH({staged["timestamp"]}) AS epoch_ts
             FROM {TEMP_AIS_STAGE} a
             JOIN valid_mmsi v ON a.mmsi = v.mmsi
             WHERE a.lat != 91
-            ORDER BY a.mmsi, a.timestamp, a.lat, a.lon
-        ),
-        unseen AS (
-            SELECT d.*
-            FROM dedup d
-            LEFT JOIN {db_schema}.points p
-                ON p.mmsi = d.mmsi
-               AND p.lat = d.lat
-               AND p.lon = d.lon
-               AND p.timestamp = d.timestamp
-            WHERE p.mmsi IS NULL
+            ORDER BY mmsi, timestamp, lat, lon
         )
-        SELECT mmsi, lat, lon, sog, timestamp, epoch_ts
-        FROM unseen
-        ORDER BY mmsi, epoch_ts;
+        SELECT d.*
+        FROM dedup d
+        LEFT JOIN {db_schema}.points p
+            ON p.mmsi = d.mmsi
+           AND p.lat = d.lat
+           AND p.lon = d.lon
+           AND p.timestamp = d.timestamp
+        WHERE p.mmsi IS NULL;
     """)
 
-    after_count_row = conn.execute(
-        f"SELECT COUNT(*) FROM {db_schema}.points"
-    ).fetchone()
-    after_count = after_count_row[0] if after_count_row else 0
-    return int(after_count - before_count)
+    _insert_clustered_points(conn, db_schema, compact)
+    inserted_row = conn.execute(f"SELECT COUNT(*) FROM {TEMP_NEW_POINTS}").fetchone()
+    inserted = int(inserted_row[0]) if inserted_row else 0
+
+    queued = 0
+    if watermark_ts is not None and inserted:
+        late_filter = f"FROM {TEMP_NEW_POINTS} WHERE timestamp <= ?"
+        conn.execute(
+            f"""
+            INSERT INTO {db_schema}.points_reprocess_queue (mmsi, day)
+            SELECT DISTINCT mmsi, CAST(timestamp AS DATE) {late_filter}
+            ON CONFLICT DO NOTHING;
+        """,
+            [watermark_ts],
+        )
+        queued_row = conn.execute(
+            f"SELECT COUNT(DISTINCT (mmsi, CAST(timestamp AS DATE))) {late_filter}",
+            [watermark_ts],
+        ).fetchone()
+        queued = int(queued_row[0]) if queued_row else 0
+
+    conn.execute(f"DROP TABLE IF EXISTS {TEMP_NEW_POINTS};")
+    return inserted, queued
 
 
 def _log_loaded_files(
@@ -203,10 +509,17 @@ def _log_loaded_files(
         conn.execute(
             f"""
             INSERT INTO {db_schema}.points_ingestion_log
-                (file_name, file_path, file_date, min_ts, max_ts, loaded_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                (file_name, file_path, file_date, min_ts, max_ts, loaded_at, fingerprint)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
         """,
-            [file_name, file_path, file_date.isoformat(), min_ts, max_ts],
+            [
+                file_name,
+                file_path,
+                file_date.isoformat(),
+                min_ts,
+                max_ts,
+                compute_file_fingerprint(file_path),
+            ],
         )
 
 
@@ -214,12 +527,26 @@ def create_duckdb_points(
     conn: duckdb.DuckDBPyConnection,
     db_schema: str,
     ais_data_path: str | None = None,
+    interactive: bool = True,
+    compact: bool = False,
 ):
+    """Load new AIS parquet files into points. ``interactive=False`` skips the period prompt
+    and uses AIS_START_DATE/AIS_END_DATE (or all files) instead. ``compact`` stores them in
+    points_compact behind a points view (kept for later runs once created).
+
+    Files loaded before are reloaded when their fingerprint (size, mtime) changed, e.g. a day
+    re-published with additional messages; the MMSI-days that receive late points are queued
+    in points_reprocess_queue for construction to rebuild."""
     print("Loading AIS parquet files into DuckDB points incrementally...")
     start_time = time.perf_counter()
 
-    _ensure_points_table(conn, db_schema)
+    compact = compact or points_relation_type(conn, db_schema) == "VIEW"
+    if compact:
+        _ensure_points_compact_table(conn, db_schema)
+    else:
+        _ensure_points_table(conn, db_schema)
     _ensure_ingestion_log_table(conn, db_schema)
+    _ensure_reprocess_queue_table(conn, db_schema)
 
     resolved_ais_data_path = ais_data_path or get_ais_data_path()
     discovered_files = discover_ais_parquet_files(resolved_ais_data_path)
@@ -232,21 +559,28 @@ def create_duckdb_points(
 
     watermark_ts = _get_ingestion_watermark(conn, db_schema)
     watermark_date = watermark_ts.date() if watermark_ts is not None else None
+    logged_fingerprints = _get_logged_fingerprints(conn, db_schema)
+    _backfill_fingerprints(conn, db_schema, discovered_files, logged_fingerprints)
+    republished_files = find_republished_files(discovered_files, logged_fingerprints)
 
     default_start, default_end = get_ais_default_period()
-    selected_start, selected_end = prompt_optional_date_range(
-        "Select optional AIS ingestion period",
-        default_start=default_start,
-        default_end=default_end,
-        available_start=available_start,
-        available_end=available_end,
-    )
+    if interactive:
+        selected_start, selected_end = prompt_optional_date_range(
+            "Select optional AIS ingestion period",
+            default_start=default_start,
+            default_end=default_end,
+            available_start=available_start,
+            available_end=available_end,
+        )
+    else:
+        selected_start, selected_end = default_start, default_end
 
     selected_files = filter_files_by_watermark_and_period(
         discovered_files,
         watermark_date,
         selected_start,
         selected_end,
+        republished_files,
     )
 
     print(
@@ -257,6 +591,14 @@ def create_duckdb_points(
             f"Applying period filter: {selected_start.isoformat() if selected_start else '*'} to {selected_end.isoformat() if selected_end else '*'}"
         )
 
+    num_republished = sum(
+        1 for _, name, _ in selected_files if name in republished_files
+    )
+    if num_republished:
+        print(
+            f"{num_republished} already loaded file(s) were re-published and will be reloaded."
+        )
+
     if not selected_files:
         print("No new parquet files matched current watermark and date filter.")
         return
@@ -269,7 +611,9 @@ def create_duckdb_points(
     _create_staging_table(conn, selected_files)
 
     print(f"Loaded {len(selected_files)} files. Inserting into points table...")
-    inserted_points = _insert_incremental_points(conn, db_schema)
+    inserted_points, queued_days = _insert_incremental_points(
+        conn, db_schema, watermark_ts, compact
+    )
 
     _log_loaded_files(conn, db_schema, selected_files)
     conn.execute(f"DROP TABLE IF EXISTS {TEMP_AIS_STAGE};")
@@ -277,3 +621,7 @@ def create_duckdb_points(
     print(
         f"{inserted_points:,} new points inserted from {len(selected_files)} files in {time.perf_counter() - start_time:.2f}s."
     )
+    if queued_days:
+        print(
+            f"{queued_days:,} MMSI-day(s) received late points and are queued for reprocessing by the construct step."
+        )
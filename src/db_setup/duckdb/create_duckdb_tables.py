@@ -1,5 +1,21 @@
 import duckdb
 
+# Built once after loading in bulk-load mode (ETL_BULK_LOAD) instead of maintained per insert
+RTREE_INDEXES = (
+    ("trajectory_ls_geom_rtree_idx", "trajectory_ls"),
+    ("stop_poly_geom_rtree_idx", "stop_poly"),
+    ("region_poly_geom_rtree_idx", "region_poly"),
+    ("passage_ls_geom_rtree_idx", "passage_ls"),
+)  # (index name, LineString schema table indexed on geom)
+LS_BULK_LOAD_PRIMARY_KEYS = (
+    ("trajectory_ls", "trajectory_id"),
+    ("stop_poly", "stop_id"),
+)
+CS_BULK_LOAD_PRIMARY_KEYS = (
+    ("trajectory_cs_ancestors", "trajectory_id"),
+    ("stop_cs_ancestors", "stop_id"),
+)
+
 
 def create_duckdb_schema(conn: duckdb.DuckDBPyConnection, db_schema: str):
     conn.execute(f"""CREATE SCHEMA IF NOT EXISTS {db_schema};""")
@@ -7,8 +23,16 @@ def create_duckdb_schema(conn: duckdb.DuckDBPyConnection, db_schema: str):
 
 
 def create_duckdb_tables(
-    conn: duckdb.DuckDBPyConnection, ls_schema: str, cs_schema: str
+    conn: duckdb.DuckDBPyConnection,
+    ls_schema: str,
+    cs_schema: str,
+    bulk_load: bool = False,
 ):
+    """Create the tables if missing. With ``bulk_load``, new trajectory/stop tables get no
+    primary key and the RTREE indexes are dropped; ``build_duckdb_deferred_indexes`` adds them
+    after loading. Otherwise missing primary keys and indexes are (re)built here.
+    """
+    primary_key = "" if bulk_load else " PRIMARY KEY"
 
     conn.execute(f"""
         CREATE TABLE IF NOT EXISTS {ls_schema}.points_ingestion_log (
@@ -17,7 +41,18 @@ def create_duckdb_tables(
             file_date DATE NOT NULL,
             min_ts TIMESTAMP,
             max_ts TIMESTAMP,
-            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            fingerprint TEXT
+        );
+    """)
+
+    # MMSI-days with late-arriving points, rebuilt by the construct step
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ls_schema}.points_reprocess_queue (
+            mmsi BIGINT NOT NULL,
+            day DATE NOT NULL,
+            queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (mmsi, day)
         );
     """)
 
@@ -25,7 +60,7 @@ def create_duckdb_tables(
     conn.execute(f"""
         CREATE SEQUENCE IF NOT EXISTS {ls_schema}.trajectory_ls_seq START 1;
         CREATE TABLE IF NOT EXISTS {ls_schema}.trajectory_ls (
-            trajectory_id INTEGER PRIMARY KEY DEFAULT nextval('{ls_schema}.trajectory_ls_seq'),
+            trajectory_id INTEGER{primary_key} DEFAULT nextval('{ls_schema}.trajectory_ls_seq'),
             mmsi          BIGINT NOT NULL,
             ts_start      TIMESTAMP NOT NULL,
             ts_end        TIMESTAMP NOT NULL,
@@ -37,7 +72,7 @@ def create_duckdb_tables(
     conn.execute(f"""
         CREATE SEQUENCE IF NOT EXISTS {ls_schema}.stop_poly_seq START 1;
         CREATE TABLE IF NOT EXISTS {ls_schema}.stop_poly (
-            stop_id  INTEGER PRIMARY KEY DEFAULT nextval('{ls_schema}.stop_poly_seq'),
+            stop_id  INTEGER{primary_key} DEFAULT nextval('{ls_schema}.stop_poly_seq'),
             mmsi     BIGINT NOT NULL,
             ts_start TIMESTAMP NOT NULL,
             ts_end   TIMESTAMP NOT NULL,
@@ -45,6 +80,16 @@ def create_duckdb_tables(
         );
     """)
 
+    # Per-MMSI construct watermark: latest point constructed into trajectory_ls/stop_poly
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ls_schema}.construct_watermarks (
+            mmsi       BIGINT PRIMARY KEY,
+            last_ts    TIMESTAMP NOT NULL,
+            run_id     TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
     # trajectory_cs
     conn.execute(f"""
         CREATE TABLE IF NOT EXISTS {cs_schema}.trajectory_cs (
@@ -67,6 +112,22 @@ def create_duckdb_tables(
         );
     """)
 
+    # Deduplicated z13/z17 ancestors of each trajectory/stop CellString, for coarse prefiltering
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {cs_schema}.trajectory_cs_ancestors (
+            trajectory_id   INTEGER{primary_key},
+            mmsi            BIGINT NOT NULL,
+            cellstring_z13  UINTEGER[] NOT NULL,
+            cellstring_z17  UBIGINT[] NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS {cs_schema}.stop_cs_ancestors (
+            stop_id         INTEGER{primary_key},
+            mmsi            BIGINT NOT NULL,
+            cellstring_z13  UINTEGER[] NOT NULL,
+            cellstring_z17  UBIGINT[] NOT NULL
+        );
+    """)
+
     # region poly
     conn.execute(f"""
         CREATE SEQUENCE IF NOT EXISTS {ls_schema}.region_poly_seq START 1;
@@ -109,22 +170,85 @@ def create_duckdb_tables(
         );
     """)
 
-    # Spatial indexes on geometry columns
+    # CellString clustering state (see cluster_duckdb_cs_tables)
     conn.execute(f"""
-        CREATE INDEX IF NOT EXISTS trajectory_ls_geom_rtree_idx
-        ON {ls_schema}.trajectory_ls USING RTREE (geom);
-
-        CREATE INDEX IF NOT EXISTS stop_poly_geom_rtree_idx
-        ON {ls_schema}.stop_poly USING RTREE (geom);
-
-        CREATE INDEX IF NOT EXISTS region_poly_geom_rtree_idx
-        ON {ls_schema}.region_poly USING RTREE (geom);
-
-        CREATE INDEX IF NOT EXISTS passage_ls_geom_rtree_idx
-        ON {ls_schema}.passage_ls USING RTREE (geom);
+        CREATE TABLE IF NOT EXISTS {cs_schema}.cs_cluster_state (
+            table_name       TEXT PRIMARY KEY,
+            clustered_max_id INTEGER NOT NULL,
+            sorted_runs      INTEGER NOT NULL,
+            cluster_zoom     INTEGER NOT NULL,
+            clustered_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
     """)
 
+    if bulk_load:
+        drop_duckdb_rtree_indexes(conn, ls_schema)
+    else:
+        build_duckdb_deferred_indexes(conn, ls_schema, cs_schema)
+
     print(f"""Created DuckDB tables: 
     '{ls_schema}': trajectory_ls, stop_poly, region_poly, passage_ls
-    '{cs_schema}': trajectory_cs, stop_cs, region_cs, passage_cs
+    '{cs_schema}': trajectory_cs, stop_cs, trajectory_cs_ancestors, stop_cs_ancestors, region_cs, passage_cs
     """)
+
+
+def _lacks_primary_key(
+    conn: duckdb.DuckDBPyConnection, schema: str, table: str
+) -> bool:
+    """Whether the table exists without a primary key."""
+    (count,) = conn.execute(
+        """
+        SELECT count(*) FROM duckdb_tables() t
+        WHERE t.schema_name = ? AND t.table_name = ?
+          AND NOT EXISTS (
+              SELECT 1 FROM duckdb_constraints() c
+              WHERE c.schema_name = t.schema_name AND c.table_name = t.table_name
+                AND c.constraint_type = 'PRIMARY KEY'
+          );
+    """,
+        [schema, table],
+    ).fetchone()
+    return count > 0
+
+
+def drop_duckdb_rtree_indexes(conn: duckdb.DuckDBPyConnection, ls_schema: str):
+    for index_name, _ in RTREE_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {ls_schema}.{index_name};")
+
+
+def add_deferred_primary_keys(
+    conn: duckdb.DuckDBPyConnection, ls_schema: str, cs_schema: str
+) -> list[str]:
+    """Add the primary keys that bulk-load mode left out; returns the tables altered."""
+    rtree_index_by_table = {table: index_name for index_name, table in RTREE_INDEXES}
+    altered = []
+    for schema, tables in (
+        (ls_schema, LS_BULK_LOAD_PRIMARY_KEYS),
+        (cs_schema, CS_BULK_LOAD_PRIMARY_KEYS),
+    ):
+        for table, column in tables:
+            if not _lacks_primary_key(conn, schema, table):
+                continue
+            # DuckDB cannot alter a table that has an index; it is rebuilt afterwards
+            if table in rtree_index_by_table:
+                conn.execute(
+                    f"DROP INDEX IF EXISTS {schema}.{rtree_index_by_table[table]};"
+                )
+            conn.execute(f"ALTER TABLE {schema}.{table} ADD PRIMARY KEY ({column});")
+            altered.append(f"{schema}.{table}")
+    return altered
+
+
+def build_duckdb_deferred_indexes(
+    conn: duckdb.DuckDBPyConnection, ls_schema: str, cs_schema: str
+):
+    """Add missing primary keys and create the RTREE indexes, each in one pass over its table
+    (DuckDB builds them with all threads)."""
+    altered = add_deferred_primary_keys(conn, ls_schema, cs_schema)
+    for index_name, table in RTREE_INDEXES:
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON {ls_schema}.{table} USING RTREE (geom);
+        """)
+    if altered:
+        print(f"Added deferred primary keys: {', '.join(altered)}")
@@ -0,0 +1,38 @@
+import duckdb
+
+from core.cellstring_utils import DEFAULT_ZOOM
+
+
+def ensure_cs_variant_zoom(conn: duckdb.DuckDBPyConnection, cs_schema: str, zoom: int):
+    """Record the zoom of the cells in ``cs_schema`` (its ``cell_z21`` columns), or check it.
+
+    Raises ValueError if the schema already holds CellStrings at another zoom.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {cs_schema}.cs_variant (
+            zoom       UTINYINT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    row = conn.execute(f"SELECT zoom FROM {cs_schema}.cs_variant LIMIT 1;").fetchone()
+    if row is None:
+        conn.execute(f"INSERT INTO {cs_schema}.cs_variant (zoom) VALUES (?);", [zoom])
+    elif row[0] != zoom:
+        raise ValueError(
+            f"CellString schema '{cs_schema}' holds z{row[0]} cells, not z{zoom}; drop its CellString tables or use another schema."
+        )
+
+
+def get_cs_schema_zoom(conn: duckdb.DuckDBPyConnection, cs_schema: str) -> int:
+    """Zoom of the trajectory/stop cells in ``cs_schema``: its recorded variant zoom, else z21."""
+    has_variant = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = ? AND table_name = 'cs_variant';
+    """,
+        [cs_schema],
+    ).fetchone()
+    if not (has_variant and has_variant[0]):
+        return DEFAULT_ZOOM
+    row = conn.execute(f"SELECT zoom FROM {cs_schema}.cs_variant LIMIT 1;").fetchone()
+    return int(row[0]) if row else DEFAULT_ZOOM
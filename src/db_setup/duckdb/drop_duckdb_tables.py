@@ -1,5 +1,8 @@
 from duckdb import DuckDBPyConnection
 
+from db_setup.duckdb.create_duckdb_points import points_relation_type
+from db_setup.duckdb.etl_checkpoints import clear_checkpoints
+
 
 def drop_duckdb_tables(
     conn: DuckDBPyConnection,
@@ -11,10 +14,16 @@ def drop_duckdb_tables(
     cur = conn.cursor()
 
     if drop_ls_tables:
+        if points_relation_type(cur, ls_schema) == "VIEW":
+            cur.execute(f"DROP VIEW {ls_schema}.points;")
         cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.points;")
+        cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.points_compact;")
+        cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.points_reprocess_queue;")
 
         cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.trajectory_ls;")
         cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.stop_poly;")
+        cur.execute(f"DROP TABLE IF EXISTS {ls_schema}.construct_watermarks;")
+        clear_checkpoints(cur, ls_schema, "construct")
 
         cur.execute(f"DROP SEQUENCE IF EXISTS {ls_schema}.trajectory_ls_seq;")
         cur.execute(f"DROP SEQUENCE IF EXISTS {ls_schema}.stop_poly_seq;")
@@ -32,8 +41,14 @@ def drop_duckdb_tables(
     if drop_cs_tables:
         cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.trajectory_cs;")
         cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.stop_cs;")
+        cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.trajectory_cs_ancestors;")
+        cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.stop_cs_ancestors;")
         cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.region_cs;")
         cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.passage_cs;")
+        cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.cs_cluster_state;")
+        cur.execute(f"DROP TABLE IF EXISTS {cs_schema}.cs_variant;")
+        clear_checkpoints(cur, cs_schema, "transform_trajs")
+        clear_checkpoints(cur, cs_schema, "transform_stops")
         print(f"Dropped CellString tables in DuckDB schema '{cs_schema}'.")
 
     conn.commit()
@@ -0,0 +1,58 @@
+import duckdb
+
+
+def ensure_etl_checkpoints_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.etl_checkpoints (
+            stage        TEXT NOT NULL,
+            unit         TEXT NOT NULL,
+            run_id       TEXT,
+            rows         BIGINT NOT NULL DEFAULT 0,
+            completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (stage, unit)
+        );
+    """)
+
+
+def get_checkpoints(
+    conn: duckdb.DuckDBPyConnection, db_schema: str, stage: str
+) -> list[str]:
+    """Units (days, batch end ids) committed by the unfinished run of ``stage``, oldest first."""
+    ensure_etl_checkpoints_table(conn, db_schema)
+    rows = conn.execute(
+        f"""
+        SELECT unit FROM {db_schema}.etl_checkpoints
+        WHERE stage = ?
+        ORDER BY completed_at, unit;
+    """,
+        [stage],
+    ).fetchall()
+    return [unit for (unit,) in rows]
+
+
+def record_checkpoint(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    stage: str,
+    unit: str,
+    run_id: str,
+    rows: int = 0,
+):
+    """Mark ``unit`` of ``stage`` as done; call inside the transaction that writes the unit."""
+    conn.execute(
+        f"""
+        INSERT INTO {db_schema}.etl_checkpoints (stage, unit, run_id, rows, completed_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (stage, unit) DO UPDATE SET
+            run_id = excluded.run_id,
+            rows = excluded.rows,
+            completed_at = excluded.completed_at;
+    """,
+        [stage, unit, run_id, rows],
+    )
+
+
+def clear_checkpoints(conn: duckdb.DuckDBPyConnection, db_schema: str, stage: str):
+    """Forget the checkpoints of ``stage`` (it finished, or a fresh run starts)."""
+    ensure_etl_checkpoints_table(conn, db_schema)
+    conn.execute(f"DELETE FROM {db_schema}.etl_checkpoints WHERE stage = ?;", [stage])
@@ -10,6 +10,15 @@ TRAJ_CS_SCHEMA = pa.schema(
     ]
 )
 
+TRAJ_CS_ANCESTORS_SCHEMA = pa.schema(
+    [
+        pa.field("trajectory_id", pa.int32()),
+        pa.field("mmsi", pa.int64()),
+        pa.field("cellstring_z13", pa.list_(pa.uint32())),
+        pa.field("cellstring_z17", pa.list_(pa.uint64())),
+    ]
+)
+
 TRAJ_LS_SCHEMA = pa.schema(
     [
         pa.field("mmsi", pa.int64()),
@@ -29,6 +38,15 @@ STOP_CS_SCHEMA = pa.schema(
     ]
 )
 
+STOP_CS_ANCESTORS_SCHEMA = pa.schema(
+    [
+        pa.field("stop_id", pa.int32()),
+        pa.field("mmsi", pa.int64()),
+        pa.field("cellstring_z13", pa.list_(pa.uint32())),
+        pa.field("cellstring_z17", pa.list_(pa.uint64())),
+    ]
+)
+
 STOP_POLY_SCHEMA = pa.schema(
     [
         pa.field("mmsi", pa.int64()),
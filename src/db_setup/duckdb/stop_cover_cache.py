@@ -0,0 +1,60 @@
+import duckdb
+import pyarrow as pa
+
+from core.cover_cache import CachedCover
+
+
+def ensure_stop_cover_cache_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.stop_cover_cache (
+            cache_key  BLOB PRIMARY KEY,
+            geom_wkb   BLOB NOT NULL,
+            cells      UBIGINT[] NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def get_stored_covers(
+    conn: duckdb.DuckDBPyConnection, db_schema: str, keys: list[bytes]
+) -> dict[bytes, CachedCover]:
+    """Stored stop covers for any of ``keys`` (see ``cover_cache_keys``)."""
+    if not keys:
+        return {}
+    keys_arrow_table = pa.table({"cache_key": pa.array(keys, type=pa.binary())})
+    rows = conn.execute(f"""
+        SELECT c.cache_key, c.geom_wkb, c.cells
+        FROM {db_schema}.stop_cover_cache c
+        SEMI JOIN keys_arrow_table k ON c.cache_key = k.cache_key;
+    """).fetchall()
+    return {bytes(key): (bytes(geom_wkb), cells) for key, geom_wkb, cells in rows}
+
+
+def store_covers(
+    conn: duckdb.DuckDBPyConnection,
+    db_schema: str,
+    covers: dict[bytes, CachedCover],
+):
+    """Insert or replace stop covers by cache key, e.g. in the transaction of a transform batch."""
+    if not covers:
+        return
+    covers_arrow_table = pa.table(
+        {
+            "cache_key": pa.array(list(covers), type=pa.binary()),
+            "geom_wkb": pa.array(
+                [geom_wkb for geom_wkb, _ in covers.values()], type=pa.binary()
+            ),
+            "cells": pa.array(
+                [cells for _, cells in covers.values()], type=pa.list_(pa.uint64())
+            ),
+        }
+    )
+    conn.execute(f"""
+        INSERT INTO {db_schema}.stop_cover_cache (cache_key, geom_wkb, cells, updated_at)
+        SELECT cache_key, geom_wkb, cells, CURRENT_TIMESTAMP
+        FROM covers_arrow_table
+        ON CONFLICT (cache_key) DO UPDATE SET
+            geom_wkb = excluded.geom_wkb,
+            cells = excluded.cells,
+            updated_at = excluded.updated_at;
+    """)
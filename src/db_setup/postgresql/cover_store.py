@@ -0,0 +1,64 @@
+from psycopg import Connection, sql
+
+from core.cover_store import CoverStoreKey
+
+
+def ensure_cover_store_table(conn: Connection, ls_schema: str):
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {ls_schema}.cover_store
+                (
+                    geom_hash BYTEA NOT NULL,
+                    zoom SMALLINT NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    cells BYTEA NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    PRIMARY KEY (geom_hash, zoom, algorithm)
+                );
+            """).format(ls_schema=sql.Identifier(ls_schema)))
+    conn.commit()
+
+
+def load_covers(
+    conn: Connection, ls_schema: str, keys: list[CoverStoreKey]
+) -> dict[CoverStoreKey, bytes]:
+    """Encoded covers (see ``core.cover_store.encode_cells``) stored for any of ``keys``."""
+    ensure_cover_store_table(conn, ls_schema)
+    if not keys:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("""
+                SELECT c.geom_hash, c.zoom, c.algorithm, c.cells
+                FROM {ls_schema}.cover_store AS c
+                JOIN unnest(%s::bytea[], %s::smallint[], %s::text[])
+                    AS k(geom_hash, zoom, algorithm)
+                    USING (geom_hash, zoom, algorithm);
+            """).format(ls_schema=sql.Identifier(ls_schema)),
+            (
+                [key[0] for key in keys],
+                [key[1] for key in keys],
+                [key[2] for key in keys],
+            ),
+        )
+        rows = cur.fetchall()
+    return {
+        (bytes(geom_hash), zoom, algorithm): bytes(cells)
+        for geom_hash, zoom, algorithm, cells in rows
+    }
+
+
+def save_covers(conn: Connection, ls_schema: str, covers: dict[CoverStoreKey, bytes]):
+    ensure_cover_store_table(conn, ls_schema)
+    with conn.cursor() as cur:
+        cur.executemany(
+            sql.SQL("""
+                INSERT INTO {ls_schema}.cover_store (geom_hash, zoom, algorithm, cells)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (geom_hash, zoom, algorithm) DO UPDATE SET
+                    cells = EXCLUDED.cells,
+                    created_at = now();
+            """).format(ls_schema=sql.Identifier(ls_schema)),
+            [(*key, cells) for key, cells in covers.items()],
+        )
+    conn.commit()
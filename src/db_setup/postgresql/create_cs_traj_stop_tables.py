@@ -1,15 +1,60 @@
 from psycopg import Connection, sql
 
+from db_setup.postgresql.deferred_indexes import (
+    add_missing_primary_keys,
+    create_indexes,
+    drop_indexes,
+)
 
-def create_cs_traj_stop_tables(conn: Connection, db_schema: str):
+CS_TRAJ_STOP_INDEXES = (
+    ("trajectory_mmsi_idx", "trajectory_cs", "(mmsi)"),
+    ("trajectory_time_idx", "trajectory_cs", "(ts_start, ts_end)"),
+    (
+        "trajectory_cellstring_z13_gin_idx",
+        "trajectory_cs",
+        "USING GIN (cellstring_z13 gin__int_ops)",
+    ),
+    (
+        "trajectory_cellstring_z17_gin_idx",
+        "trajectory_cs",
+        "USING GIN (cellstring_z17)",
+    ),
+    (
+        "trajectory_cellstring_z21_gin_idx",
+        "trajectory_cs",
+        "USING GIN (cellstring_z21)",
+    ),
+    ("stop_mmsi_idx", "stop_cs", "(mmsi)"),
+    ("stop_time_idx", "stop_cs", "(ts_start, ts_end)"),
+    (
+        "stop_cellstring_z13_gin_idx",
+        "stop_cs",
+        "USING GIN (cellstring_z13 gin__int_ops)",
+    ),
+    ("stop_cellstring_z17_gin_idx", "stop_cs", "USING GIN (cellstring_z17)"),
+    ("stop_cellstring_z21_gin_idx", "stop_cs", "USING GIN (cellstring_z21)"),
+)
+CS_TRAJ_STOP_PRIMARY_KEYS = (("trajectory_cs", "trajectory_id"), ("stop_cs", "stop_id"))
+
+
+def create_cs_traj_stop_indexes(conn: Connection, db_schema: str):
+    cur = conn.cursor()
+    add_missing_primary_keys(cur, db_schema, CS_TRAJ_STOP_PRIMARY_KEYS)
+    create_indexes(cur, db_schema, CS_TRAJ_STOP_INDEXES)
+    conn.commit()
+    cur.close()
+
+
+def create_cs_traj_stop_tables(
+    conn: Connection, db_schema: str, bulk_load: bool = False
+):
     cur = conn.cursor()
+    primary_key = sql.SQL("" if bulk_load else " PRIMARY KEY")
 
     # Trajectory table
-    cur.execute(
-        sql.SQL(
-            """
+    cur.execute(sql.SQL("""
             CREATE TABLE IF NOT EXISTS {db_schema}.trajectory_cs (
-                trajectory_id INTEGER PRIMARY KEY,
+                trajectory_id INTEGER{primary_key},
                 mmsi          BIGINT                      NOT NULL,
                 ts_start      TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 ts_end        TIMESTAMP WITHOUT TIME ZONE NOT NULL,
@@ -18,79 +63,14 @@ def create_cs_traj_stop_tables(conn: Connection, db_schema: str):
                 cellstring_z21    bigint ARRAY            NOT NULL,
                 CONSTRAINT trajectory_time_check CHECK (ts_start < ts_end)
             );
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_mmsi_idx 
-            ON {db_schema}.trajectory_cs (mmsi);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_time_idx
-            ON {db_schema}.trajectory_cs (ts_start, ts_end);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_cellstring_z13_gin_idx 
-            ON {db_schema}.trajectory_cs 
-            USING GIN (cellstring_z13 gin__int_ops);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_cellstring_z17_gin_idx 
-            ON {db_schema}.trajectory_cs 
-            USING GIN (cellstring_z17);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_cellstring_z21_gin_idx 
-            ON {db_schema}.trajectory_cs 
-            USING GIN (cellstring_z21);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_cellstring_z17_gin_idx 
-            ON {db_schema}.trajectory_cs 
-            USING GIN (cellstring_z17);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_cellstring_z21_gin_idx 
-            ON {db_schema}.trajectory_cs 
-            USING GIN (cellstring_z21);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
+        """).format(db_schema=sql.Identifier(db_schema), primary_key=primary_key))
     print(f"Created CS trajectory table if not exists in database schema {db_schema}.")
 
     # Stop table
-    cur.execute(
-        sql.SQL(
-            """
+    cur.execute(sql.SQL("""
             CREATE TABLE IF NOT EXISTS {db_schema}.stop_cs
             (
-                stop_id     INTEGER PRIMARY KEY,
+                stop_id     INTEGER{primary_key},
                 mmsi        BIGINT                      NOT NULL,
                 ts_start    TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 ts_end      TIMESTAMP WITHOUT TIME ZONE NOT NULL,
@@ -99,53 +79,14 @@ def create_cs_traj_stop_tables(conn: Connection, db_schema: str):
                 cellstring_z21  bigint ARRAY            NOT NULL,
                 CONSTRAINT stop_time_check CHECK (ts_start < ts_end)
             );
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_mmsi_idx
-            ON {db_schema}.stop_cs (mmsi);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_time_idx
-            ON {db_schema}.stop_cs (ts_start, ts_end);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_cellstring_z13_gin_idx
-            ON {db_schema}.stop_cs
-            USING GIN (cellstring_z13 gin__int_ops);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_cellstring_z17_gin_idx
-            ON {db_schema}.stop_cs
-            USING GIN (cellstring_z17);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_cellstring_z21_gin_idx
-            ON {db_schema}.stop_cs
-            USING GIN (cellstring_z21);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
+        """).format(db_schema=sql.Identifier(db_schema), primary_key=primary_key))
     print(f"Created CS stop table if not exists in database schema {db_schema}.")
 
+    # Indexes are built once after a bulk load (create_cs_traj_stop_indexes)
+    if bulk_load:
+        drop_indexes(cur, db_schema, CS_TRAJ_STOP_INDEXES)
     conn.commit()
     cur.close()
+
+    if not bulk_load:
+        create_cs_traj_stop_indexes(conn, db_schema)
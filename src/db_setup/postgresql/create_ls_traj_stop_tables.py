@@ -1,92 +1,70 @@
 from psycopg import Connection, sql
 
+from db_setup.postgresql.deferred_indexes import (
+    add_missing_primary_keys,
+    create_indexes,
+    drop_indexes,
+)
 
-def create_ls_traj_stop_tables(conn: Connection, db_schema: str):
+LS_TRAJ_STOP_INDEXES = (
+    ("trajectory_mmsi_idx", "trajectory_ls", "(mmsi)"),
+    ("trajectory_time_idx", "trajectory_ls", "(ts_start, ts_end)"),
+    ("trajectory_geom_idx", "trajectory_ls", "USING GIST (geom)"),
+    ("stop_mmsi_idx", "stop_poly", "(mmsi)"),
+    ("stop_time_idx", "stop_poly", "(ts_start, ts_end)"),
+    ("stop_geom_idx", "stop_poly", "USING GIST (geom)"),
+)
+LS_TRAJ_STOP_PRIMARY_KEYS = (
+    ("trajectory_ls", "trajectory_id"),
+    ("stop_poly", "stop_id"),
+)
+
+
+def create_ls_traj_stop_indexes(conn: Connection, db_schema: str):
+    cur = conn.cursor()
+    add_missing_primary_keys(cur, db_schema, LS_TRAJ_STOP_PRIMARY_KEYS)
+    create_indexes(cur, db_schema, LS_TRAJ_STOP_INDEXES)
+    conn.commit()
+    cur.close()
+
+
+def create_ls_traj_stop_tables(
+    conn: Connection, db_schema: str, bulk_load: bool = False
+):
     cur = conn.cursor()
+    primary_key = sql.SQL("" if bulk_load else " PRIMARY KEY")
 
     # Trajectory table
-    cur.execute(
-        sql.SQL(
-            """
+    cur.execute(sql.SQL("""
             CREATE TABLE IF NOT EXISTS {db_schema}.trajectory_ls (
-                trajectory_id SERIAL PRIMARY KEY,
+                trajectory_id SERIAL{primary_key},
                 mmsi          BIGINT                      NOT NULL,
                 ts_start      TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 ts_end        TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 geom          geometry(LINESTRINGM, 4326) NOT NULL,
                 CONSTRAINT trajectory_time_check CHECK (ts_start < ts_end)
             );
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-                CREATE INDEX IF NOT EXISTS trajectory_mmsi_idx
-            ON {db_schema}.trajectory_ls (mmsi);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_time_idx
-            ON {db_schema}.trajectory_ls (ts_start, ts_end);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS trajectory_geom_idx
-            ON {db_schema}.trajectory_ls 
-            USING GIST (geom);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
+        """).format(db_schema=sql.Identifier(db_schema), primary_key=primary_key))
     print(f"Created LS trajectory table if not exists in database schema {db_schema}")
 
     # Stop table
-    cur.execute(
-        sql.SQL(
-            """
+    cur.execute(sql.SQL("""
             CREATE TABLE IF NOT EXISTS {db_schema}.stop_poly (
-                stop_id SERIAL PRIMARY KEY,
+                stop_id SERIAL{primary_key},
                 mmsi BIGINT NOT NULL,
                 ts_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 ts_end   TIMESTAMP WITHOUT TIME ZONE NOT NULL,
                 geom geometry(POLYGON, 4326) NOT NULL,
                 CONSTRAINT stop_time_check CHECK (ts_start < ts_end)
             );
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_mmsi_idx
-            ON {db_schema}.stop_poly (mmsi);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_time_idx
-            ON {db_schema}.stop_poly (ts_start, ts_end);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
-    cur.execute(
-        sql.SQL(
-            """
-            CREATE INDEX IF NOT EXISTS stop_geom_idx
-            ON {db_schema}.stop_poly
-            USING GIST (geom);
-        """
-        ).format(db_schema=sql.Identifier(db_schema))
-    )
+        """).format(db_schema=sql.Identifier(db_schema), primary_key=primary_key))
     print(f"Created LS stop table if not exists in database schema {db_schema}.")
 
+    # Indexes are built once after a bulk load (create_ls_traj_stop_indexes)
+    if bulk_load:
+        drop_indexes(cur, db_schema, LS_TRAJ_STOP_INDEXES)
     conn.commit()
     cur.close()
+
+    if not bulk_load:
+        create_ls_traj_stop_indexes(conn, db_schema)
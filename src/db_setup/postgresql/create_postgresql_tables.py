@@ -1,8 +1,14 @@
 from psycopg import Connection, sql
 from db_setup.postgresql.create_region_tables import create_region_tables
 from db_setup.postgresql.create_passage_tables import create_passage_tables
-from db_setup.postgresql.create_cs_traj_stop_tables import create_cs_traj_stop_tables
-from db_setup.postgresql.create_ls_traj_stop_tables import create_ls_traj_stop_tables
+from db_setup.postgresql.create_cs_traj_stop_tables import (
+    create_cs_traj_stop_indexes,
+    create_cs_traj_stop_tables,
+)
+from db_setup.postgresql.create_ls_traj_stop_tables import (
+    create_ls_traj_stop_indexes,
+    create_ls_traj_stop_tables,
+)
 from db_setup.postgresql.mat_points_view import mat_points_view
 
 
@@ -22,13 +28,15 @@ def create_postgresql_points(conn: Connection, db_schema: str):
     mat_points_view(conn, db_schema)
 
 
-def create_postgresql_tables(conn: Connection, ls_schema: str, cs_schema: str):
+def create_postgresql_tables(
+    conn: Connection, ls_schema: str, cs_schema: str, bulk_load: bool = False
+):
 
-    # Create LineString/Polygon tables Trajectory and Stop
-    create_ls_traj_stop_tables(conn, ls_schema)
+    # Create LineString/Polygon tables Trajectory and Stop (without keys and indexes when bulk loading)
+    create_ls_traj_stop_tables(conn, ls_schema, bulk_load)
 
     # Create CellString tables Trajectory and Stop
-    create_cs_traj_stop_tables(conn, cs_schema)
+    create_cs_traj_stop_tables(conn, cs_schema, bulk_load)
 
     # Create (region and passage) tables
     create_region_tables(conn, ls_schema, cs_schema)
@@ -37,3 +45,23 @@ def create_postgresql_tables(conn: Connection, ls_schema: str, cs_schema: str):
     print(
         f"Created PostgreSQL tables (trajectory_ls, stop_poly, region_poly, passage_ls) in schema '{ls_schema}' and CellString tables (trajectory_cs, stop_cs, region_cs, passage_cs) in schema '{cs_schema}'."
     )
+
+
+def build_postgresql_deferred_indexes(
+    conn: Connection, ls_schema: str, cs_schema: str, parallel_workers: int
+):
+    """Add the primary keys and indexes left out by a bulk load, each built in one pass over
+    its table; B-tree (and, from PostgreSQL 18, GIN) builds use up to ``parallel_workers``.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        sql.SQL("SET max_parallel_maintenance_workers = {workers};").format(
+            workers=sql.Literal(parallel_workers)
+        )
+    )
+    cur.close()
+    create_ls_traj_stop_indexes(conn, ls_schema)
+    create_cs_traj_stop_indexes(conn, cs_schema)
+    print(
+        f"Built deferred primary keys and indexes of trajectory_ls/stop_poly in '{ls_schema}' and trajectory_cs/stop_cs in '{cs_schema}'."
+    )
@@ -0,0 +1,55 @@
+from psycopg import Cursor, sql
+
+IndexDefinition = tuple[str, str, str]  # (index name, table, method and key columns)
+PrimaryKey = tuple[str, str]  # (table, key column)
+
+
+def create_indexes(cur: Cursor, db_schema: str, indexes: tuple[IndexDefinition, ...]):
+    for index_name, table, definition in indexes:
+        cur.execute(
+            sql.SQL(
+                "CREATE INDEX IF NOT EXISTS {index} ON {db_schema}.{table} "
+            ).format(
+                index=sql.Identifier(index_name),
+                db_schema=sql.Identifier(db_schema),
+                table=sql.Identifier(table),
+            )
+            + sql.SQL(definition)
+        )
+
+
+def drop_indexes(cur: Cursor, db_schema: str, indexes: tuple[IndexDefinition, ...]):
+    for index_name, _, _ in indexes:
+        cur.execute(
+            sql.SQL("DROP INDEX IF EXISTS {db_schema}.{index};").format(
+                db_schema=sql.Identifier(db_schema), index=sql.Identifier(index_name)
+            )
+        )
+
+
+def add_missing_primary_keys(
+    cur: Cursor, db_schema: str, primary_keys: tuple[PrimaryKey, ...]
+) -> list[str]:
+    """Add the primary keys left out of tables created in bulk-load mode; returns the tables altered."""
+    altered = []
+    for table, column in primary_keys:
+        cur.execute(
+            """
+            SELECT count(*) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'p';
+        """,
+            (f'"{db_schema}"."{table}"',),
+        )
+        if cur.fetchone()[0] > 0:
+            continue
+        cur.execute(
+            sql.SQL(
+                "ALTER TABLE {db_schema}.{table} ADD PRIMARY KEY ({column});"
+            ).format(
+                db_schema=sql.Identifier(db_schema),
+                table=sql.Identifier(table),
+                column=sql.Identifier(column),
+            )
+        )
+        altered.append(f"{db_schema}.{table}")
+    return altered
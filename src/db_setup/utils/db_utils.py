@@ -2,6 +2,8 @@ import os
 from dotenv import load_dotenv
 from datetime import date
 
+import pyarrow as pa
+
 
 def format_eta(seconds: float) -> str:
     """Format seconds as human-readable time (e.g., 65s -> 1m 5s)."""
@@ -17,6 +19,27 @@ def format_eta(seconds: float) -> str:
         return f"{hours:.0f}h {minutes:.0f}m"
 
 
+def format_table(table: pa.Table, max_rows: int = 20) -> str:
+    """Format the first ``max_rows`` rows of an Arrow table as aligned text columns."""
+    columns = table.slice(0, max_rows).to_pydict()
+    cells = [
+        [name] + ["" if value is None else str(value) for value in values]
+        for name, values in columns.items()
+    ]
+    widths = [max(len(cell) for cell in column) for column in cells]
+    numeric = [
+        pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        for field in table.schema
+    ]
+    return "\n".join(
+        "  ".join(
+            column[row].rjust(width) if is_numeric else column[row].ljust(width)
+            for column, width, is_numeric in zip(cells, widths, numeric)
+        ).rstrip()
+        for row in range(len(cells[0]) if cells else 0)
+    )
+
+
 def _get_required_env(key: str) -> str:
     value = os.getenv(key)
     if not value:
@@ -37,6 +60,22 @@ def _parse_optional_env_date(key: str) -> date | None:
         ) from exc
 
 
+def _parse_optional_env_positive_int(key: str, default: int) -> int:
+    value = os.getenv(key)
+    if not value:
+        return default
+
+    try:
+        parsed = int(value.strip())
+    except ValueError as exc:
+        raise ValueError(
+            f"Invalid integer for {key}: '{value}'. Use a positive whole number."
+        ) from exc
+    if parsed < 1:
+        raise ValueError(f"Invalid value for {key}: '{value}'. Must be at least 1.")
+    return parsed
+
+
 def _get_schema_with_fallback(primary_key: str, fallback_key: str) -> str:
     value = os.getenv(primary_key)
     if value:
@@ -131,3 +170,50 @@ def get_ais_default_period() -> tuple[date | None, date | None]:
     if start and end and start > end:
         raise ValueError("AIS_START_DATE cannot be after AIS_END_DATE.")
     return start, end
+
+
+def get_construct_days_per_cycle() -> int:
+    """Days constructed per fetch/insert cycle (DuckDB), from ``ETL_CONSTRUCT_DAYS_PER_CYCLE`` (default 1)."""
+    load_dotenv()
+    return _parse_optional_env_positive_int("ETL_CONSTRUCT_DAYS_PER_CYCLE", 1)
+
+
+def get_construct_engine() -> str:
+    """Segmentation engine of the DuckDB construct step, from ``ETL_CONSTRUCT_ENGINE``: 'python' (default) or 'sql'."""
+    load_dotenv()
+    engine = (os.getenv("ETL_CONSTRUCT_ENGINE") or "python").strip().lower()
+    if engine not in ("python", "sql"):
+        raise ValueError(
+            f"Unsupported ETL_CONSTRUCT_ENGINE: {engine}. Please set it to 'python' or 'sql'."
+        )
+    return engine
+
+
+def get_cs_variants() -> list[tuple[str, int]]:
+    """CellString variants built in one DuckDB transform pass, from ``ETL_CS_VARIANTS``.
+
+    Format: ``schema:zoom`` pairs separated by commas, e.g. ``cs_z21:21,cs_z17:17``; unset = none.
+    """
+    load_dotenv()
+    value = (os.getenv("ETL_CS_VARIANTS") or "").strip()
+    variants: list[tuple[str, int]] = []
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        schema, _, zoom = entry.partition(":")
+        try:
+            variants.append((schema.strip(), int(zoom)))
+        except ValueError as exc:
+            raise ValueError(
+                f"Invalid ETL_CS_VARIANTS entry: {entry}. Use schema:zoom pairs separated by commas."
+            ) from exc
+    return variants
+
+
+def get_transform_engine() -> str:
+    """CellString engine of the DuckDB transform step, from ``ETL_TRANSFORM_ENGINE``: 'pool' (default) or 'udf'."""
+    load_dotenv()
+    engine = (os.getenv("ETL_TRANSFORM_ENGINE") or "pool").strip().lower()
+    if engine not in ("pool", "udf"):
+        raise ValueError(
+            f"Unsupported ETL_TRANSFORM_ENGINE: {engine}. Please set it to 'pool' or 'udf'."
+        )
+    return engine
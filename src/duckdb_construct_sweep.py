@@ -0,0 +1,259 @@
+"""Sweep construct thresholds over the DuckDB points in one pass.
+
+Each (MMSI, day)'s points are fetched, parsed and turned into motion arrays once, then
+constructed with every parameter set (``sweep_single_mmsi``). Nothing is inserted into
+trajectory_ls/stop_poly: per parameter set and MMSI, the number and duration of trajectories
+and stops are written to ``construct_sweep`` in the LineString schema, keyed by a sweep id.
+Construct watermarks are ignored, so the sweep reads every point in the chosen days.
+
+Usage:
+    python ./src/duckdb_construct_sweep.py --grid stop_sog_threshold=0.5,1,2 \\
+        --grid merge_distance_threshold=50,200 --start 2025-01-01 --end 2025-01-07
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields, replace
+from datetime import date
+
+import duckdb
+import pyarrow as pa
+
+from core.metrics import MetricsRecorder
+from core.points_to_ls_poly import (
+    DEFAULT_CONSTRUCT_PARAMS,
+    ConstructParams,
+    sweep_single_mmsi,
+)
+from db_setup.utils.db_utils import (
+    format_table,
+    get_db_path_or_url,
+    get_db_schema,
+    get_ls_schema,
+)
+from duckdb_construct_trajs_stops import (
+    get_points_for_days_duckdb,
+    get_processing_days_duckdb,
+)
+
+NO_WATERMARKS = "construct_sweep_no_watermarks"
+SWEEP_COLUMNS = (
+    "num_trajs",
+    "num_stops",
+    "traj_s",
+    "stop_s",
+    "traj_points",
+)  # the fields of SweepSummary
+
+
+def build_param_grid(grid: dict[str, list[float]]) -> list[ConstructParams]:
+    """Every combination of the swept values, the other thresholds at their defaults."""
+    types = {field.name: field.type for field in fields(ConstructParams)}
+    unknown = set(grid) - set(types)
+    if unknown:
+        raise ValueError(
+            f"Unknown construct parameter(s) {sorted(unknown)}; use any of {sorted(types)}."
+        )
+    names = list(grid)
+    return [
+        replace(
+            DEFAULT_CONSTRUCT_PARAMS,
+            **{name: types[name](value) for name, value in zip(names, values)},
+        )
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def ensure_construct_sweep_table(conn: duckdb.DuckDBPyConnection, db_schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {db_schema}.construct_sweep (
+            sweep_id     TEXT NOT NULL,
+            params_index INTEGER NOT NULL,
+            params       JSON NOT NULL,
+            mmsi         BIGINT NOT NULL,
+            num_days     INTEGER NOT NULL,
+            num_trajs    INTEGER NOT NULL,
+            num_stops    INTEGER NOT NULL,
+            traj_s       BIGINT NOT NULL,
+            stop_s       BIGINT NOT NULL,
+            traj_points  BIGINT NOT NULL,
+            created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sweep_id, params_index, mmsi)
+        );
+    """)
+
+
+def sweep_construct_params(
+    conn: duckdb.DuckDBPyConnection,
+    points_schema: str,
+    output_schema: str,
+    params_list: list[ConstructParams],
+    days: list[date] | None = None,
+    max_workers: int = 4,
+    metrics: MetricsRecorder | None = None,
+) -> str:
+    """Construct every (MMSI, day) of ``days`` (default: all days with points) with each
+    parameter set, and write the per-MMSI summaries to ``construct_sweep``. Returns the sweep id.
+    """
+    metrics = metrics or MetricsRecorder()
+    sweep_id = uuid.uuid4().hex[:12]
+    ensure_construct_sweep_table(conn, output_schema)
+    conn.execute(
+        f"CREATE OR REPLACE TEMP TABLE {NO_WATERMARKS} (mmsi BIGINT, last_ts TIMESTAMP);"
+    )
+    if days is None:
+        days = get_processing_days_duckdb(conn, points_schema, NO_WATERMARKS)
+    print(
+        f"Sweeping {len(params_list)} construct parameter set(s) over {len(days)} day(s) (sweep {sweep_id})..."
+    )
+
+    # (params_index, mmsi) -> summed SweepSummary fields, and the days each MMSI had points
+    totals: dict[tuple[int, int], list[int]] = {}
+    days_by_mmsi: dict[int, int] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for day in days:
+            day_start = time.perf_counter()
+            points = get_points_for_days_duckdb(
+                conn, points_schema, NO_WATERMARKS, [day]
+            )
+            futures = {
+                executor.submit(sweep_single_mmsi, mmsi, key_points, params_list): mmsi
+                for (mmsi, _), key_points in points.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    mmsi, summaries = future.result()
+                except Exception as e:
+                    print(f"Worker error for MMSI {futures[future]}: {e}")
+                    continue
+                days_by_mmsi[mmsi] = days_by_mmsi.get(mmsi, 0) + 1
+                for params_index, summary in enumerate(summaries):
+                    total = totals.setdefault((params_index, mmsi), [0] * len(summary))
+                    for index, value in enumerate(summary):
+                        total[index] += value
+            metrics.record(
+                "construct_sweep",
+                "day",
+                time.perf_counter() - day_start,
+                rows=sum(len(key_points) for key_points in points.values()),
+                unit=day.isoformat(),
+                num_mmsis=len(points),
+                num_params=len(params_list),
+            )
+            print(f"Swept {day} ({len(points)} MMSIs).")
+
+    _insert_sweep_rows(conn, output_schema, sweep_id, params_list, totals, days_by_mmsi)
+    metrics.flush()
+    return sweep_id
+
+
+def _insert_sweep_rows(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    sweep_id: str,
+    params_list: list[ConstructParams],
+    totals: dict[tuple[int, int], list[int]],
+    days_by_mmsi: dict[int, int],
+):
+    keys = sorted(totals)
+    params_json = [json.dumps(asdict(params)) for params in params_list]
+    sweep_arrow_table = pa.table(
+        {
+            "sweep_id": pa.array([sweep_id] * len(keys), type=pa.string()),
+            "params_index": pa.array([index for index, _ in keys], type=pa.int32()),
+            "params": pa.array([params_json[index] for index, _ in keys]),
+            "mmsi": pa.array([mmsi for _, mmsi in keys], type=pa.int64()),
+            "num_days": pa.array(
+                [days_by_mmsi[mmsi] for _, mmsi in keys], type=pa.int32()
+            ),
+            **{
+                column: pa.array([totals[key][index] for key in keys], type=pa.int64())
+                for index, column in enumerate(SWEEP_COLUMNS)
+            },
+        }
+    )
+    conn.execute(f"""
+        INSERT INTO {output_schema}.construct_sweep
+            (sweep_id, params_index, params, mmsi, num_days, {', '.join(SWEEP_COLUMNS)})
+        SELECT sweep_id, params_index, params, mmsi, num_days, {', '.join(SWEEP_COLUMNS)}
+        FROM sweep_arrow_table;
+    """)
+
+
+def summarize_sweep(
+    conn: duckdb.DuckDBPyConnection, output_schema: str, sweep_id: str
+) -> pa.Table:
+    """Totals per parameter set of a sweep."""
+    return conn.execute(
+        f"""
+        SELECT
+            params_index,
+            ANY_VALUE(params) AS params,
+            count(*) AS num_mmsis,
+            sum(num_trajs) AS num_trajs,
+            sum(num_stops) AS num_stops,
+            round(sum(traj_s) / 3600, 1) AS traj_h,
+            round(sum(stop_s) / 3600, 1) AS stop_h,
+            sum(traj_points) AS traj_points
+        FROM {output_schema}.construct_sweep
+        WHERE sweep_id = ?
+        GROUP BY params_index
+        ORDER BY params_index;
+    """,
+        [sweep_id],
+    ).fetch_arrow_table()
+
+
+def _parse_grid(values: list[str]) -> dict[str, list[float]]:
+    grid: dict[str, list[float]] = {}
+    for value in values:
+        name, _, numbers = value.partition("=")
+        grid[name.strip()] = [float(number) for number in numbers.split(",") if number]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        help="name=value1,value2,... for a ConstructParams field; repeat to sweep combinations",
+    )
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    params_list = build_param_grid(_parse_grid(args.grid))
+    points_schema = get_db_schema("duckdb")
+    ls_schema = get_ls_schema("duckdb")
+    conn = duckdb.connect(get_db_path_or_url("duckdb"))
+    try:
+        conn.execute("SET TimeZone = 'UTC';")
+        conn.execute(
+            f"CREATE OR REPLACE TEMP TABLE {NO_WATERMARKS} (mmsi BIGINT, last_ts TIMESTAMP);"
+        )
+        days = [
+            day
+            for day in get_processing_days_duckdb(
+                conn, points_schema, NO_WATERMARKS, args.start
+            )
+            if args.end is None or day <= args.end
+        ]
+        sweep_id = sweep_construct_params(
+            conn, points_schema, ls_schema, params_list, days, args.workers
+        )
+        summary = summarize_sweep(conn, ls_schema, sweep_id)
+        print(format_table(summary, max_rows=summary.num_rows))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,58 @@
 import time
 from collections import defaultdict
 from concurrent.futures import Future, ProcessPoolExecutor, as_completed
-from datetime import date
+from datetime import date, timedelta
 
 import duckdb
+import numpy as np
 import pyarrow as pa
 
+from core.metrics import MetricsRecorder, worker_utilisation
 from core.points_to_ls_poly import (
-    DictInputPoint,
-    ProcessResult,
+    CandidateSegments,
+    InputPoint,
+    ProcessResultWithMetrics,
     Stop,
     Traj,
-    process_single_mmsi,
+    process_candidate_segments_with_metrics,
+    process_single_mmsi_with_metrics,
+)
+from core.profiling import get_profile_settings, profiled_task
+from core.scheduling import (
+    MAX_COST_SAMPLES,
+    CostSample,
+    fit_cost_model,
+    plan_construct_tasks,
+    stitch_mmsi_results,
+)
+from db_setup.duckdb.create_duckdb_points import points_in_time_range
+from db_setup.duckdb.etl_checkpoints import (
+    clear_checkpoints,
+    get_checkpoints,
+    record_checkpoint,
 )
 from db_setup.duckdb.pyarrow_schemas import STOP_POLY_SCHEMA, TRAJ_LS_SCHEMA
 from db_setup.utils.db_utils import format_eta
-
-FutureResult = Future[ProcessResult]  # Future returning ProcessResult
+from duckdb_segment_points import segment_points_duckdb
+
+FutureResult = Future[
+    ProcessResultWithMetrics
+]  # Future returning ProcessResultWithMetrics
+TaskKey = tuple[int, date]  # (mmsi, day)
+DayPoints = dict[TaskKey, list[InputPoint]]
+TaskRef = tuple[TaskKey, int, int]  # (task key, piece, num_pieces)
+Frontiers = dict[int, float]  # mmsi -> epoch_ts of its latest fetched point
+SubmittedCycle = tuple[
+    int,
+    str,
+    dict[FutureResult, TaskRef],
+    int,
+    int,
+    float,
+    float,
+    list[TaskKey] | None,
+    Frontiers,
+]  # (cycle num, label, futures, num MMSI-days, num points, fetch_s, start time, reprocessed MMSI-days, frontiers)
 
 
 def ensure_points_table_exists(
@@ -42,108 +78,473 @@ def ensure_points_table_exists(
         )
 
 
-def get_latest_constructed_ts_duckdb(
+def ensure_construct_watermarks_duckdb(
     conn: duckdb.DuckDBPyConnection, output_schema: str
 ):
-    """Fetch latest constructed ts_end across stop_poly and trajectory_ls."""
-    row = conn.execute(f"""
-        SELECT GREATEST(
-            COALESCE((SELECT MAX(ts_end) FROM {output_schema}.stop_poly), TIMESTAMP '1970-01-01'),
-            COALESCE((SELECT MAX(ts_end) FROM {output_schema}.trajectory_ls), TIMESTAMP '1970-01-01')
-        ) AS latest_ts;
-    """).fetchone()
-    return row[0] if row else None
+    """Create the per-MMSI construct watermark table; an empty one is seeded with each MMSI's
+    latest constructed ts_end (databases constructed before watermarks existed)."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {output_schema}.construct_watermarks (
+            mmsi       BIGINT PRIMARY KEY,
+            last_ts    TIMESTAMP NOT NULL,
+            run_id     TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM {output_schema}.construct_watermarks"
+    ).fetchone()
+    if row and row[0]:
+        return
+
+    conn.execute(f"""
+        INSERT INTO {output_schema}.construct_watermarks (mmsi, last_ts, run_id)
+        SELECT mmsi, MAX(ts_end), 'seed'
+        FROM (
+            SELECT mmsi, ts_end FROM {output_schema}.trajectory_ls
+            UNION ALL
+            SELECT mmsi, ts_end FROM {output_schema}.stop_poly
+        )
+        GROUP BY mmsi;
+    """)
+
+
+def snapshot_construct_watermarks_duckdb(
+    conn: duckdb.DuckDBPyConnection, output_schema: str
+) -> str:
+    """Copy the watermarks into a temp table read by all cycles of a run, so watermarks advanced
+    by one cycle do not hide points of days that a later cycle still has to fetch."""
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE construct_watermarks_snapshot AS
+        SELECT mmsi, last_ts FROM {output_schema}.construct_watermarks;
+    """)
+    return "construct_watermarks_snapshot"
 
 
 def get_processing_days_duckdb(
     conn: duckdb.DuckDBPyConnection,
     points_schema: str,
-    latest_ts,
+    watermarks_table: str,
+    from_day: date | None = None,
 ) -> list[date]:
-    """Fetch days that contain points newer than global latest constructed timestamp."""
+    """Fetch days (from ``from_day`` on) that contain points newer than their MMSI's construct watermark."""
     rows = conn.execute(
         f"""
         SELECT DISTINCT DATE(p.timestamp) AS point_day
         FROM {points_schema}.points p
-        WHERE p.timestamp > ?
+        LEFT JOIN {watermarks_table} w ON p.mmsi = w.mmsi
+        WHERE (w.last_ts IS NULL OR p.timestamp > w.last_ts)
+          {"AND p.timestamp >= ?" if from_day is not None else ""}
         ORDER BY point_day;
     """,
-        [latest_ts],
+        [from_day] if from_day is not None else [],
     ).fetchall()
     return [point_day for (point_day,) in rows]
 
 
-def get_mmsis_duckdb(
+def _watermark_epochs(
+    conn: duckdb.DuckDBPyConnection, watermarks_table: str, mmsis: np.ndarray
+) -> np.ndarray:
+    """Each row's construct watermark as epoch seconds (-inf for MMSIs without one)."""
+    watermarks = conn.execute(
+        f"SELECT mmsi, epoch(last_ts) AS last_epoch FROM {watermarks_table} ORDER BY mmsi;"
+    ).fetchnumpy()
+    watermark_mmsis = watermarks["mmsi"].astype(np.int64)
+    thresholds = np.full(len(mmsis), -np.inf)
+    if len(watermark_mmsis) == 0:
+        return thresholds
+    index = np.minimum(
+        np.searchsorted(watermark_mmsis, mmsis), len(watermark_mmsis) - 1
+    )
+    found = watermark_mmsis[index] == mmsis
+    thresholds[found] = np.asarray(watermarks["last_epoch"], dtype=np.float64)[
+        index[found]
+    ]
+    return thresholds
+
+
+def get_points_for_days_duckdb(
     conn: duckdb.DuckDBPyConnection,
     points_schema: str,
-    point_day: date,
-    latest_ts,
-) -> list[int]:
-    """Fetch MMSIs with unprocessed points for one day, ordered by number of points (descending)."""
-    rows = conn.execute(
+    watermarks_table: str,
+    days: list[date],
+) -> DayPoints:
+    """Fetch the points newer than their MMSI's construct watermark for a window of days,
+    grouped by (MMSI, day), ordered by time.
+
+    Points are stored clustered by (day, MMSI, time) (see ``create_duckdb_points``), so the
+    days are read in storage order, without a join or sort in DuckDB, and split into
+    contiguous (MMSI, day) runs; rows stored out of order (e.g. points loaded before the
+    clustering) are sorted here instead.
+    """
+    if not days:
+        return {}
+
+    day_points, params = points_in_time_range(
+        conn, points_schema, days[0], days[-1] + timedelta(days=1)
+    )
+    points = conn.execute(
         f"""
-        SELECT p.mmsi, COUNT(*) AS num_points
-        FROM {points_schema}.points p
-        WHERE DATE(p.timestamp) = ?
-          AND p.timestamp > ?
-        GROUP BY p.mmsi
-        ORDER BY num_points DESC;
+        SELECT mmsi, DATE(timestamp) AS point_day, lon, lat, sog, epoch_ts
+        FROM {day_points};
     """,
-        [point_day, latest_ts],
-    ).fetchall()
-    return [int(mmsi) for mmsi, _ in rows]
+        params,
+    ).fetch_arrow_table()
+    mmsis = points["mmsi"].to_numpy().astype(np.int64)
+    epoch_ts = points["epoch_ts"].to_numpy()
+    rows = np.flatnonzero(epoch_ts > _watermark_epochs(conn, watermarks_table, mmsis))
+    if len(rows) == 0:
+        return {}
+    point_days = points["point_day"].to_numpy()[rows]
+    mmsis, epoch_ts = mmsis[rows], epoch_ts[rows]
+
+    new_run = (point_days[1:] != point_days[:-1]) | (mmsis[1:] != mmsis[:-1])
+    run_starts = np.concatenate(([0], np.flatnonzero(new_run) + 1))
+    clustered = bool(np.all(new_run | (epoch_ts[1:] >= epoch_ts[:-1]))) and len(
+        set(zip(point_days[run_starts].tolist(), mmsis[run_starts].tolist()))
+    ) == len(run_starts)
+    if not clustered:
+        order = np.lexsort((epoch_ts, mmsis, point_days))
+        rows, point_days, mmsis = rows[order], point_days[order], mmsis[order]
+        new_run = (point_days[1:] != point_days[:-1]) | (mmsis[1:] != mmsis[:-1])
+        run_starts = np.concatenate(([0], np.flatnonzero(new_run) + 1))
+
+    selected = points.take(pa.array(rows))
+    lons = selected["lon"].to_pylist()
+    lats = selected["lat"].to_pylist()
+    sogs = selected["sog"].to_pylist()
+    epochs = selected["epoch_ts"].to_pylist()
+    run_days = selected["point_day"].take(pa.array(run_starts)).to_pylist()
+    run_ends = [*run_starts[1:], len(rows)]
+    return {
+        (int(mmsis[start]), run_day): list(
+            zip(lons[start:end], lats[start:end], sogs[start:end], epochs[start:end])
+        )
+        for start, end, run_day in zip(run_starts, run_ends, run_days)
+    }
 
 
-def get_points_for_mmsis_in_batch_duckdb(
+def advance_construct_watermarks_duckdb(
     conn: duckdb.DuckDBPyConnection,
-    points_schema: str,
-    point_day: date,
-    mmsis: list[int],
-    latest_ts,
-) -> DictInputPoint:
-    """Fetch one-day incremental points for MMSIs grouped by MMSI, ordered by time."""
-    if not mmsis:
-        return defaultdict(list)
-
-    placeholders = ",".join(["?"] * len(mmsis))
+    output_schema: str,
+    frontiers: Frontiers,
+    run_id: str,
+):
+    """Move each MMSI's watermark to its latest constructed point (epoch seconds), never backwards."""
+    if not frontiers:
+        return
+
+    frontier_arrow_table = pa.table(
+        {
+            "mmsi": pa.array(list(frontiers), type=pa.int64()),
+            "last_us": pa.array(
+                [round(ts * 1_000_000) for ts in frontiers.values()], type=pa.int64()
+            ),
+        }
+    )
+    conn.execute(
+        f"""
+        INSERT INTO {output_schema}.construct_watermarks (mmsi, last_ts, run_id, updated_at)
+        SELECT mmsi, make_timestamp(last_us), ?, CURRENT_TIMESTAMP
+        FROM frontier_arrow_table
+        ON CONFLICT (mmsi) DO UPDATE SET
+            last_ts = GREATEST(last_ts, excluded.last_ts),
+            run_id = excluded.run_id,
+            updated_at = excluded.updated_at;
+    """,
+        [run_id],
+    )
+
+
+def get_reprocess_keys_duckdb(
+    conn: duckdb.DuckDBPyConnection, points_schema: str
+) -> list[TaskKey]:
+    """MMSI-days queued by ingestion because late points arrived for them."""
+    try:
+        rows = conn.execute(f"""
+            SELECT mmsi, day
+            FROM {points_schema}.points_reprocess_queue
+            ORDER BY day, mmsi;
+        """).fetchall()
+    except duckdb.CatalogException:
+        return []
+    return [(int(mmsi), day) for mmsi, day in rows]
+
+
+def _task_keys_arrow_table(keys: list[TaskKey]) -> pa.Table:
+    return pa.table(
+        {
+            "mmsi": pa.array([mmsi for mmsi, _ in keys], type=pa.int64()),
+            "day": pa.array([day for _, day in keys], type=pa.date32()),
+        }
+    )
+
+
+def get_points_for_keys_duckdb(
+    conn: duckdb.DuckDBPyConnection, points_schema: str, keys: list[TaskKey]
+) -> DayPoints:
+    """Fetch all points of the given (MMSI, day)s, grouped by (MMSI, day), ordered by time."""
+    if not keys:
+        return {}
+
+    keys_arrow_table = _task_keys_arrow_table(keys)
+    days = [day for _, day in keys]
+    day_points, params = points_in_time_range(
+        conn, points_schema, min(days), max(days) + timedelta(days=1)
+    )
     rows = conn.execute(
         f"""
-        SELECT mmsi, lon, lat, sog, epoch_ts
-        FROM {points_schema}.points
-        WHERE mmsi IN ({placeholders})
-          AND DATE(timestamp) = ?
-          AND timestamp > ?
-        ORDER BY mmsi, epoch_ts;
+        SELECT p.mmsi, DATE(p.timestamp) AS point_day, p.lon, p.lat, p.sog, p.epoch_ts
+        FROM {day_points} p
+        JOIN keys_arrow_table k
+          ON p.mmsi = k.mmsi AND DATE(p.timestamp) = k.day
+        ORDER BY p.mmsi, p.epoch_ts;
     """,
-        [*mmsis, point_day, latest_ts],
+        params,
     ).fetchall()
 
-    grouped: DictInputPoint = defaultdict(list)
-    for mmsi, lon, lat, sog, epoch_ts in rows:
+    grouped: DayPoints = defaultdict(list)
+    for mmsi, point_day, lon, lat, sog, epoch_ts in rows:
         if mmsi is None or lon is None or lat is None or epoch_ts is None:
             continue
-        grouped[int(mmsi)].append((lon, lat, sog, epoch_ts))
+        grouped[(int(mmsi), point_day)].append((lon, lat, sog, epoch_ts))
     return grouped
 
 
+def _table_exists(conn: duckdb.DuckDBPyConnection, schema: str, table: str) -> bool:
+    row = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = ? AND table_name = ?;
+    """,
+        [schema, table],
+    ).fetchone()
+    return bool(row and row[0])
+
+
+def invalidate_constructed_days_duckdb(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    cs_schemas: list[str],
+    keys: list[TaskKey],
+) -> tuple[int, int]:
+    """Delete the trajectories and stops of the given (MMSI, day)s and their CellString rows
+    in every schema of ``cs_schemas`` (the CellString schema and any variant schemas).
+
+    Construction works per MMSI-day, so every trajectory/stop starts on the day it was built
+    for. Returns (deleted trajectories, deleted stops).
+    """
+    if not keys:
+        return 0, 0
+
+    keys_arrow_table = _task_keys_arrow_table(keys)
+    deleted: list[int] = []
+    for ls_table, cs_table, id_column in (
+        ("trajectory_ls", "trajectory_cs", "trajectory_id"),
+        ("stop_poly", "stop_cs", "stop_id"),
+    ):
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _invalidated_ids AS
+            SELECT t.{id_column} AS id
+            FROM {output_schema}.{ls_table} t
+            JOIN keys_arrow_table k
+              ON t.mmsi = k.mmsi AND CAST(t.ts_start AS DATE) = k.day;
+        """)
+        for cs_schema in cs_schemas:
+            for table in (cs_table, f"{cs_table}_ancestors"):
+                if _table_exists(conn, cs_schema, table):
+                    conn.execute(f"""
+                        DELETE FROM {cs_schema}.{table}
+                        WHERE {id_column} IN (SELECT id FROM _invalidated_ids);
+                    """)
+        conn.execute(f"""
+            DELETE FROM {output_schema}.{ls_table}
+            WHERE {id_column} IN (SELECT id FROM _invalidated_ids);
+        """)
+        count_row = conn.execute("SELECT COUNT(*) FROM _invalidated_ids").fetchone()
+        deleted.append(int(count_row[0]) if count_row else 0)
+    conn.execute("DROP TABLE IF EXISTS _invalidated_ids;")
+    return deleted[0], deleted[1]
+
+
+def replace_constructed_days_duckdb(
+    conn: duckdb.DuckDBPyConnection,
+    points_schema: str,
+    output_schema: str,
+    cs_schemas: list[str],
+    keys: list[TaskKey],
+    trajs_to_insert: list[Traj],
+    stops_to_insert: list[Stop],
+) -> tuple[int, int]:
+    """Invalidate the (MMSI, day)s, insert their rebuilt trajectories and stops and remove them
+    from the reprocess queue; the caller owns the transaction. Returns (deleted trajectories,
+    deleted stops).
+    """
+    deleted = invalidate_constructed_days_duckdb(conn, output_schema, cs_schemas, keys)
+    insert_trajs_and_stops_duckdb(conn, output_schema, trajs_to_insert, stops_to_insert)
+    keys_arrow_table = _task_keys_arrow_table(keys)
+    conn.execute(f"""
+        DELETE FROM {points_schema}.points_reprocess_queue q
+        USING keys_arrow_table k
+        WHERE q.mmsi = k.mmsi AND q.day = k.day;
+    """)
+    return deleted
+
+
+def get_construct_cost_samples_duckdb(
+    conn: duckdb.DuckDBPyConnection, metrics_schema: str
+) -> list[CostSample]:
+    """(num_points, seconds) of MMSIs constructed in earlier runs, from the etl_metrics table."""
+    try:
+        rows = conn.execute(f"""
+            SELECT rows, duration_s
+            FROM {metrics_schema}.etl_metrics
+            WHERE stage = 'construct' AND kind = 'mmsi' AND rows > 0
+            ORDER BY recorded_at DESC
+            LIMIT {MAX_COST_SAMPLES};
+        """).fetchall()
+    except duckdb.CatalogException:
+        return []
+    return [(int(num_points), float(seconds)) for num_points, seconds in reversed(rows)]
+
+
+def insert_trajs_and_stops_duckdb(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    trajs_to_insert: list[Traj],
+    stops_to_insert: list[Stop],
+):
+    if trajs_to_insert:
+        traj_mmsis: list[int] = [mmsi for mmsi, _, _, _ in trajs_to_insert]
+        traj_ts_starts: list[int] = [ts_start for _, ts_start, _, _ in trajs_to_insert]
+        traj_ts_ends: list[int] = [ts_end for _, _, ts_end, _ in trajs_to_insert]
+        traj_geoms: list[bytes] = [geom_wkb for _, _, _, geom_wkb in trajs_to_insert]
+
+        traj_arrow_table = pa.table(
+            {
+                "mmsi": pa.array(traj_mmsis, type=pa.int64()),
+                "ts_start": pa.array(traj_ts_starts, type=pa.timestamp("s", tz="UTC")),
+                "ts_end": pa.array(traj_ts_ends, type=pa.timestamp("s", tz="UTC")),
+                "geom_wkb": pa.array(traj_geoms, type=pa.binary()),
+            },
+            schema=TRAJ_LS_SCHEMA,
+        )
+        conn.execute(f"""
+            INSERT INTO {output_schema}.trajectory_ls (mmsi, ts_start, ts_end, geom)
+            SELECT mmsi, ts_start, ts_end, ST_GeomFromWKB(geom_wkb)
+            FROM traj_arrow_table
+        """)
+
+    if stops_to_insert:
+        stop_mmsis: list[int] = [mmsi for mmsi, _, _, _ in stops_to_insert]
+        stop_ts_starts: list[int] = [ts_start for _, ts_start, _, _ in stops_to_insert]
+        stop_ts_ends: list[int] = [ts_end for _, _, ts_end, _ in stops_to_insert]
+        stop_geoms: list[bytes] = [geom_wkb for _, _, _, geom_wkb in stops_to_insert]
+
+        stop_arrow_table = pa.table(
+            {
+                "mmsi": pa.array(stop_mmsis, type=pa.int64()),
+                "ts_start": pa.array(stop_ts_starts, type=pa.timestamp("s", tz="UTC")),
+                "ts_end": pa.array(stop_ts_ends, type=pa.timestamp("s", tz="UTC")),
+                "geom_wkb": pa.array(stop_geoms, type=pa.binary()),
+            },
+            schema=STOP_POLY_SCHEMA,
+        )
+        conn.execute(f"""
+            INSERT INTO {output_schema}.stop_poly (mmsi, ts_start, ts_end, geom)
+            SELECT mmsi, ts_start, ts_end, ST_GeomFromWKB(geom_wkb)
+            FROM stop_arrow_table
+        """)
+
+
 def construct_trajectories_and_stops(
     conn: duckdb.DuckDBPyConnection,
     points_schema: str,
     output_schema: str,
     max_workers: int = 4,
+    metrics: MetricsRecorder | None = None,
+    days_per_cycle: int = 1,
+    cs_schema: str | None = None,
+    resume: bool = False,
+    engine: str = "python",
+    cs_variant_schemas: list[str] | None = None,
 ):
-    """Construct trajectories and stops per day using global latest constructed timestamp."""
+    """Construct trajectories and stops per day from the points newer than each MMSI's watermark.
+
+    Days are processed in cycles of ``days_per_cycle`` days: one point scan and one insert per
+    cycle, with tasks per (MMSI, day) so results do not depend on the cycle size. A single
+    worker pool is kept for the whole run and the next cycle is fetched and submitted before
+    the current one is collected and inserted, so workers stay busy across cycle boundaries.
+
+    MMSI-days queued by ingestion because late points arrived for them (points_reprocess_queue)
+    are rebuilt first, from all their points: their old trajectories, stops and CellString rows
+    (in ``cs_schema``, default ``output_schema``, and in ``cs_variant_schemas``) are replaced in
+    one transaction.
+
+    Each MMSI's watermark (construct_watermarks) moves to its latest constructed point in the same
+    transaction as the cycle's insert, so one vessel with clock-skewed timestamps does not hide
+    the newer points of the others. MMSIs with a failed day keep their watermark and have their
+    results dropped for the rest of the run, so the failed day and the ones after it are
+    constructed once, by the next run.
+
+    Each cycle also records a checkpoint (its last day) in that transaction. With ``resume``, the
+    days up to the last checkpoint of an interrupted run are not scanned again; a finished run
+    clears its checkpoints.
+
+    With ``engine="sql"`` the points of the regular cycles are segmented into candidate
+    trajectories and stops in DuckDB (duckdb_segment_points) and the workers only merge and
+    validate them; MMSI-days the SQL segmentation cannot reproduce exactly fall back to the
+    Python engine. The late-arrivals cycle always uses the Python engine.
+    """
+    metrics = metrics or MetricsRecorder()
+    days_per_cycle = max(days_per_cycle, 1)
+    profile_settings = get_profile_settings("construct", metrics.run_id)
+    process_mmsi = profiled_task(process_single_mmsi_with_metrics, profile_settings)
+    process_segments = profiled_task(
+        process_candidate_segments_with_metrics, profile_settings
+    )
     ensure_points_table_exists(conn, points_schema)
-    latest_ts = get_latest_constructed_ts_duckdb(conn, output_schema)
-    processing_days = get_processing_days_duckdb(conn, points_schema, latest_ts)
+    ensure_construct_watermarks_duckdb(conn, output_schema)
+    watermarks_table = snapshot_construct_watermarks_duckdb(conn, output_schema)
+    resume_from_day = None
+    if resume:
+        completed_days = get_checkpoints(conn, output_schema, "construct")
+        if completed_days:
+            resume_from_day = date.fromisoformat(max(completed_days)) + timedelta(
+                days=1
+            )
+            print(f"Resuming construct after checkpointed day {max(completed_days)}.")
+    else:
+        clear_checkpoints(conn, output_schema, "construct")
+    processing_days = get_processing_days_duckdb(
+        conn, points_schema, watermarks_table, resume_from_day
+    )
+    reprocess_keys = get_reprocess_keys_duckdb(conn, points_schema)
+    cost_samples = get_construct_cost_samples_duckdb(
+        conn, metrics.duckdb_schema or output_schema
+    )
 
-    if not processing_days:
+    if not processing_days and not reprocess_keys:
         print("No days with unprocessed points.")
+        clear_checkpoints(conn, output_schema, "construct")
         return
 
+    cycles = [
+        processing_days[i : i + days_per_cycle]
+        for i in range(0, len(processing_days), days_per_cycle)
+    ]
+    num_cycles = len(cycles) + (1 if reprocess_keys else 0)
+    reprocess_key_set = set(reprocess_keys)
+    failed_mmsis: set[int] = set()
     start_time = time.perf_counter()
+    if reprocess_keys:
+        print(
+            f"Rebuilding {len(reprocess_keys)} already constructed MMSI-day(s) with late-arriving points."
+        )
     print(
-        f"Processing {len(processing_days)} day(s) newer than global latest ts ({latest_ts}) using {max_workers} workers."
+        f"Processing {len(processing_days)} day(s) with points newer than each MMSI's construct watermark "
+        f"in {len(cycles)} cycle(s) of up to {days_per_cycle} day(s) using {max_workers} workers "
+        f"({engine} segmentation engine)."
     )
     print(
         """
@@ -158,127 +559,295 @@ def construct_trajectories_and_stops(
 -------------------------------------------------------------------------------------------------------------"""
     )
 
-    total_mmsis_processed = 0
-    for day_num, point_day in enumerate(processing_days, start=1):
-        day_start_time = time.perf_counter()
-        day_mmsis = get_mmsis_duckdb(conn, points_schema, point_day, latest_ts)
-        if not day_mmsis:
-            continue
-
+    total_tasks_processed = 0
+    total_points = 0
+    total_busy_time = 0.0
+
+    def submit_cycle(
+        executor: ProcessPoolExecutor,
+        cycle_num: int,
+        cycle_days: list[date],
+        keys: list[TaskKey] | None = None,
+    ) -> SubmittedCycle:
+        if keys is not None:
+            cycle_label = "late arrivals"
+        else:
+            cycle_label = cycle_days[0].isoformat() + (
+                f"..{cycle_days[-1].isoformat()}" if len(cycle_days) > 1 else ""
+            )
+        print(f"\n=== Fetching cycle {cycle_num}/{num_cycles}: {cycle_label} ===")
+        cycle_start_time = time.perf_counter()
+        segments: dict[TaskKey, CandidateSegments] = {}
+        last_ts_by_key: dict[TaskKey, float] = {}
+        if keys is not None:
+            points = get_points_for_keys_duckdb(conn, points_schema, keys)
+        elif engine == "sql":
+            segments, points, last_ts_by_key = segment_points_duckdb(
+                conn, points_schema, watermarks_table, cycle_days
+            )
+        else:
+            points = get_points_for_days_duckdb(
+                conn, points_schema, watermarks_table, cycle_days
+            )
+        if keys is None:
+            # Rebuilt from all their points in the late-arrivals cycle
+            for key in reprocess_key_set.intersection(points):
+                del points[key]
+            for key in reprocess_key_set.intersection(segments):
+                del segments[key]
+                del last_ts_by_key[key]
+        point_count = sum(len(pts) for pts in points.values()) + sum(
+            key_segments[3] for key_segments in segments.values()
+        )
+        frontiers: Frontiers = {}
+        for (mmsi, _), key_points in points.items():
+            frontiers[mmsi] = max(frontiers.get(mmsi, 0.0), key_points[-1][3])
+        for (mmsi, _), last_ts in last_ts_by_key.items():
+            frontiers[mmsi] = max(frontiers.get(mmsi, 0.0), last_ts)
+        fetch_time = time.perf_counter() - cycle_start_time
+
+        # Heaviest predicted tasks first; straggler MMSI-days are split at long gaps
+        tasks = plan_construct_tasks(points, fit_cost_model(cost_samples), max_workers)
+        num_split = len({key for key, _, num_pieces, _, _ in tasks if num_pieces > 1})
+        futures: dict[FutureResult, TaskRef] = {
+            executor.submit(process_mmsi, key[0], task_points): (key, piece, num_pieces)
+            for key, piece, num_pieces, task_points, _ in tasks
+        }
+        for key, key_segments in sorted(
+            segments.items(), key=lambda item: item[1][3], reverse=True
+        ):
+            futures[executor.submit(process_segments, key[0], key_segments)] = (
+                key,
+                0,
+                1,
+            )
         print(
-            f"\n=== Procesing batch {day_num}/{len(processing_days)}: {point_day.isoformat()} ({len(day_mmsis)} MMSIs: {day_mmsis[0]} to {day_mmsis[-1]}) ==="
+            f"{point_count:,} points of {len(points) + len(segments)} MMSI-days fetched in {fetch_time:.2f}s"
+            + (
+                f" ({len(segments)} segmented in DuckDB)"
+                if engine == "sql" and keys is None
+                else ""
+            )
+            + f", {len(futures)} tasks submitted"
+            + (
+                f" ({num_split} heavy MMSI-days split at long time gaps)."
+                if num_split
+                else "."
+            )
         )
-
-        batch_start_time = time.perf_counter()
-        print(f"Fetching points for day {point_day.isoformat()}...")
-
-        points = get_points_for_mmsis_in_batch_duckdb(
-            conn,
-            points_schema,
-            point_day,
-            day_mmsis,
-            latest_ts,
+        return (
+            cycle_num,
+            cycle_label,
+            futures,
+            len(points) + len(segments),
+            point_count,
+            fetch_time,
+            cycle_start_time,
+            keys,
+            frontiers,
         )
 
-        point_count = sum(len(pts) for pts in points.values())
-        print(
-            f"{point_count:,} points fetched in {time.perf_counter() - batch_start_time:.2f}s. Processing MMSIs in parallel..."
-        )
+    def finish_cycle(cycle: SubmittedCycle):
+        nonlocal total_tasks_processed, total_points, total_busy_time
+        (
+            cycle_num,
+            cycle_label,
+            futures,
+            num_tasks,
+            point_count,
+            fetch_time,
+            cycle_start_time,
+            keys,
+            frontiers,
+        ) = cycle
 
         trajs_to_insert: list[Traj] = []
         stops_to_insert: list[Stop] = []
-
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            futures: dict[FutureResult, int] = {
-                executor.submit(process_single_mmsi, mmsi, points.get(mmsi, [])): mmsi
-                for mmsi in day_mmsis
-                if points.get(mmsi)
-            }
-
-            for future in as_completed(futures):
-                mmsi = futures[future]
-                try:
-                    mmsi, trajs, stops = future.result()
-                    trajs_to_insert.extend(trajs)
-                    stops_to_insert.extend(stops)
-                except Exception as e:
-                    print(f"Error processing MMSI {mmsi}: {e}")
-                    continue
-
-        print(
-            f"Processed batch {day_num}/{len(processing_days)}: {point_day.isoformat()} ({len(trajs_to_insert)} trajectories, {len(stops_to_insert)} stops). Inserting into database..."
+        busy_time = 0.0
+        wait_start_time = time.perf_counter()
+        pieces_by_key: dict[TaskKey, dict[int, ProcessResultWithMetrics]] = defaultdict(
+            dict
         )
+        failed_keys: set[TaskKey] = set()
+
+        for future in as_completed(futures):
+            key, piece, num_pieces = futures[future]
+            mmsi, point_day = key
+            try:
+                piece_result = future.result()
+            except Exception as e:
+                print(f"Error processing MMSI {mmsi} on {point_day}: {e}")
+                failed_keys.add(key)
+                pieces_by_key.pop(key, None)
+                continue
+
+            piece_metrics = piece_result[3]
+            # The cost model predicts the Python engine's tasks, which also segment their points
+            if not piece_metrics.get("sql_segmented"):
+                cost_samples.append(
+                    (
+                        int(piece_metrics["num_points"]),
+                        float(piece_metrics["time_total"]),
+                    )
+                )
+            busy_time += float(piece_metrics["time_total"])
+            if key in failed_keys:
+                continue
+            pieces = pieces_by_key[key]
+            pieces[piece] = piece_result
+            if len(pieces) < num_pieces:
+                continue
+
+            _, trajs, stops, mmsi_metrics = stitch_mmsi_results(
+                [pieces[i] for i in range(num_pieces)]
+            )
+            del pieces_by_key[key]
+            trajs_to_insert.extend(trajs)
+            stops_to_insert.extend(stops)
+            metrics.record(
+                "construct",
+                "mmsi_segments" if mmsi_metrics.get("sql_segmented") else "mmsi",
+                float(mmsi_metrics["time_total"]),
+                rows=int(mmsi_metrics["num_points"]),
+                unit=mmsi,
+                day=point_day.isoformat(),
+                **mmsi_metrics,
+            )
 
-        if trajs_to_insert:
-            traj_mmsis: list[int] = [mmsi for mmsi, _, _, _ in trajs_to_insert]
-            traj_ts_starts: list[int] = [
-                ts_start for _, ts_start, _, _ in trajs_to_insert
+        wait_time = time.perf_counter() - wait_start_time
+        if keys is None:
+            # A failed day must not be skipped by the next run. Its MMSI's watermark stays
+            # before it, so the MMSI's later days are dropped too; the next run rebuilds them
+            failed_mmsis.update(mmsi for mmsi, _ in failed_keys)
+            trajs_to_insert = [
+                traj for traj in trajs_to_insert if traj[0] not in failed_mmsis
             ]
-            traj_ts_ends: list[int] = [ts_end for _, _, ts_end, _ in trajs_to_insert]
-            traj_geoms: list[bytes] = [
-                geom_wkb for _, _, _, geom_wkb in trajs_to_insert
+            stops_to_insert = [
+                stop for stop in stops_to_insert if stop[0] not in failed_mmsis
             ]
+        print(
+            f"Processed cycle {cycle_num}/{num_cycles}: {cycle_label} ({len(trajs_to_insert)} trajectories, {len(stops_to_insert)} stops). Inserting into database..."
+        )
 
-            traj_arrow_table = pa.table(
-                {
-                    "mmsi": pa.array(traj_mmsis, type=pa.int64()),
-                    "ts_start": pa.array(
-                        traj_ts_starts, type=pa.timestamp("s", tz="UTC")
-                    ),
-                    "ts_end": pa.array(traj_ts_ends, type=pa.timestamp("s", tz="UTC")),
-                    "geom_wkb": pa.array(traj_geoms, type=pa.binary()),
-                },
-                schema=TRAJ_LS_SCHEMA,
+        insert_start_time = time.perf_counter()
+        deleted = (0, 0)
+        conn.execute("BEGIN TRANSACTION;")
+        try:
+            if keys is not None:
+                # Failed MMSI-days keep their old rows and stay queued
+                rebuilt_keys = [key for key in keys if key not in failed_keys]
+                deleted = replace_constructed_days_duckdb(
+                    conn,
+                    points_schema,
+                    output_schema,
+                    [cs_schema or output_schema, *(cs_variant_schemas or [])],
+                    rebuilt_keys,
+                    trajs_to_insert,
+                    stops_to_insert,
+                )
+                rebuilt_mmsis = {mmsi for mmsi, _ in rebuilt_keys}
+                frontiers = {
+                    mmsi: ts for mmsi, ts in frontiers.items() if mmsi in rebuilt_mmsis
+                }
+            else:
+                insert_trajs_and_stops_duckdb(
+                    conn, output_schema, trajs_to_insert, stops_to_insert
+                )
+                frontiers = {
+                    mmsi: ts
+                    for mmsi, ts in frontiers.items()
+                    if mmsi not in failed_mmsis
+                }
+            advance_construct_watermarks_duckdb(
+                conn, output_schema, frontiers, metrics.run_id
             )
-            conn.execute(f"""
-                INSERT INTO {output_schema}.trajectory_ls (mmsi, ts_start, ts_end, geom)
-                SELECT mmsi, ts_start, ts_end, ST_GeomFromWKB(geom_wkb)
-                FROM traj_arrow_table
-            """)
-
-        if stops_to_insert:
-            stop_mmsis: list[int] = [mmsi for mmsi, _, _, _ in stops_to_insert]
-            stop_ts_starts: list[int] = [
-                ts_start for _, ts_start, _, _ in stops_to_insert
-            ]
-            stop_ts_ends: list[int] = [ts_end for _, _, ts_end, _ in stops_to_insert]
-            stop_geoms: list[bytes] = [
-                geom_wkb for _, _, _, geom_wkb in stops_to_insert
-            ]
-
-            stop_arrow_table = pa.table(
-                {
-                    "mmsi": pa.array(stop_mmsis, type=pa.int64()),
-                    "ts_start": pa.array(
-                        stop_ts_starts, type=pa.timestamp("s", tz="UTC")
-                    ),
-                    "ts_end": pa.array(stop_ts_ends, type=pa.timestamp("s", tz="UTC")),
-                    "geom_wkb": pa.array(stop_geoms, type=pa.binary()),
-                },
-                schema=STOP_POLY_SCHEMA,
+            if keys is None:
+                record_checkpoint(
+                    conn,
+                    output_schema,
+                    "construct",
+                    cycle_label.split("..")[-1],
+                    metrics.run_id,
+                    rows=point_count,
+                )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        if keys is not None:
+            print(
+                f"Replaced {deleted[0]} trajectories and {deleted[1]} stops of {len(rebuilt_keys)} MMSI-day(s)."
             )
-            conn.execute(f"""
-                INSERT INTO {output_schema}.stop_poly (mmsi, ts_start, ts_end, geom)
-                SELECT mmsi, ts_start, ts_end, ST_GeomFromWKB(geom_wkb)
-                FROM stop_arrow_table
-            """)
+        insert_time = time.perf_counter() - insert_start_time
 
-        total_mmsis_processed += len(day_mmsis)
+        total_tasks_processed += num_tasks
+        total_points += point_count
+        total_busy_time += busy_time
         elapsed_time = time.perf_counter() - start_time
-        batch_time = time.perf_counter() - batch_start_time
-        avg_time_per_day = elapsed_time / day_num
-        eta = (len(processing_days) - day_num) * avg_time_per_day
-        print(
-            f"Inserted batch results for day {point_day.isoformat()} | Elapsed: {elapsed_time:.2f}s | Batch time: {batch_time:.2f}s"
+        cycle_time = time.perf_counter() - cycle_start_time
+        if keys is not None:
+            cycle_kind = "reprocess"
+        else:
+            cycle_kind = "day" if ".." not in cycle_label else "cycle"
+        metrics.record(
+            "construct",
+            cycle_kind,
+            cycle_time,
+            rows=point_count,
+            unit=cycle_label,
+            num_mmsis=num_tasks,
+            num_trajs=len(trajs_to_insert),
+            num_stops=len(stops_to_insert),
+            fetch_s=fetch_time,
+            compute_s=wait_time,
+            insert_s=insert_time,
+            busy_s=busy_time,
+            deleted_trajs=deleted[0],
+            deleted_stops=deleted[1],
         )
-
-        day_elapsed = time.perf_counter() - day_start_time
+        metrics.flush()
+        eta = (num_cycles - cycle_num) * elapsed_time / cycle_num
         print(
-            f"Completed day {point_day.isoformat()} in {day_elapsed:.2f}s ({len(day_mmsis)} MMSIs) - Progress: {day_num/len(processing_days):.2%} - ETA: {format_eta(eta)}"
+            f"Inserted cycle {cycle_label} | Elapsed: {elapsed_time:.2f}s | Cycle time: {cycle_time:.2f}s "
+            f"(fetch {fetch_time:.2f}s, waiting for workers {wait_time:.2f}s, insert {insert_time:.2f}s) | "
+            f"{total_points / elapsed_time if elapsed_time > 0 else 0:,.0f} points/s so far | "
+            f"Progress: {cycle_num/num_cycles:.2%} - ETA: {format_eta(eta)}"
         )
 
+    # One pool for the whole run; cycle N+1 is queued while cycle N is collected and inserted
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending: SubmittedCycle | None = None
+        if reprocess_keys:
+            pending = submit_cycle(executor, 1, [], reprocess_keys)
+        for cycle_num, cycle_days in enumerate(
+            cycles, start=2 if reprocess_keys else 1
+        ):
+            submitted = submit_cycle(executor, cycle_num, cycle_days)
+            if pending is not None:
+                finish_cycle(pending)
+            pending = submitted
+        if pending is not None:
+            finish_cycle(pending)
+
+    clear_checkpoints(conn, output_schema, "construct")
     total_time = time.perf_counter() - start_time
+    metrics.record(
+        "construct",
+        "run",
+        total_time,
+        rows=total_points,
+        num_days=len(processing_days),
+        num_reprocessed=len(reprocess_keys),
+        days_per_cycle=days_per_cycle,
+        engine=engine,
+        busy_s=total_busy_time,
+        capacity_s=total_time * max_workers,
+    )
+    metrics.flush()
     print("\nAll MMSIs processed.")
     print(
-        f"Total time: {total_time/60:.2f} min | Avg per MMSI: {total_time/max(total_mmsis_processed, 1):.2f}s"
+        f"Total time: {total_time/60:.2f} min | {total_points:,} points in {len(processing_days)} day(s) | "
+        f"{total_points / total_time if total_time > 0 else 0:,.0f} points/s | "
+        f"Avg per MMSI-day: {total_time/max(total_tasks_processed, 1):.2f}s | "
+        f"Worker utilisation: {worker_utilisation(total_busy_time, total_time, max_workers):.0%}"
     )
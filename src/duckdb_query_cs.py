@@ -0,0 +1,528 @@
+"""Region and passage queries over DuckDB CellString tables.
+
+Functions return Arrow tables. Run as a script for a small CLI:
+
+    python ./src/duckdb_query_cs.py dwell --region "small_region_high_traffic"
+    python ./src/duckdb_query_cs.py crossings --passage "Storebælt Nord" --start 2025-12-01 --end 2025-12-31
+    python ./src/duckdb_query_cs.py transits --from-region A --to-region B --max-transit-h 48 --out transits.parquet
+"""
+
+import argparse
+from datetime import datetime
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from core.cellstring_utils import DEFAULT_ZOOM, quadkey_int_to_xy_array
+from db_setup.duckdb.cs_variant import get_cs_schema_zoom
+from db_setup.utils.db_utils import format_table, get_cs_schema, get_db_path_or_url
+
+# Passage hits further apart than this (seconds) are separate crossings
+CROSSING_GAP_S = 600
+Z13_SHIFT = 2 * (DEFAULT_ZOOM - 13)
+Z17_SHIFT = 2 * (DEFAULT_ZOOM - 17)
+
+# area table -> id column
+AREA_TABLES = {"region_cs": "region_id", "passage_cs": "passage_id"}
+# CellString table -> id column
+CS_ID_COLUMNS = {"trajectory_cs": "trajectory_id", "stop_cs": "stop_id"}
+
+
+def _table_exists(conn: duckdb.DuckDBPyConnection, schema: str, table: str) -> bool:
+    row = conn.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = ? AND table_name = ?;
+    """,
+        [schema, table],
+    ).fetchone()
+    return bool(row and row[0])
+
+
+def _check_z21_schema(conn: duckdb.DuckDBPyConnection, cs_schema: str):
+    """The queries compare trajectory/stop cells with z21 area cells; refuse variant schemas
+    holding coarser cells."""
+    zoom = get_cs_schema_zoom(conn, cs_schema)
+    if zoom != DEFAULT_ZOOM:
+        raise ValueError(
+            f"CellString schema '{cs_schema}' holds z{zoom} cells; region and passage queries need z{DEFAULT_ZOOM} CellStrings."
+        )
+
+
+def _resolve_area_id(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    table: str,
+    area: int | str,
+) -> int:
+    """Resolve a region/passage given by id or name to its id."""
+    id_column = AREA_TABLES[table]
+    if isinstance(area, int):
+        return area
+
+    rows = conn.execute(
+        f"SELECT DISTINCT {id_column} FROM {cs_schema}.{table} WHERE name = ?",
+        [area],
+    ).fetchall()
+    if not rows:
+        raise ValueError(f"No {table} entry named '{area}' in schema '{cs_schema}'.")
+    if len(rows) > 1:
+        ids = ", ".join(str(row[0]) for row in rows)
+        raise ValueError(f"Name '{area}' is ambiguous in {table} (ids: {ids}).")
+    return int(rows[0][0])
+
+
+def _area_cte(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    table: str,
+    area_id: int,
+    prefix: str,
+) -> tuple[str, tuple[int, int] | None]:
+    """Build CTEs holding the area's z21 cells and the lists of their z13/z17 ancestors.
+
+    Also returns the (min, max) z21 cell of the area, inlined as constants by callers so
+    DuckDB can prune trajectory_cs row groups on their cell_z21 zone maps.
+    """
+    id_column = AREA_TABLES[table]
+    bounds = conn.execute(
+        f"SELECT MIN(cell_z21), MAX(cell_z21) FROM {cs_schema}.{table} WHERE {id_column} = ?",
+        [area_id],
+    ).fetchone()
+    cell_bounds = (
+        (int(bounds[0]), int(bounds[1])) if bounds and bounds[0] is not None else None
+    )
+
+    cte = f"""
+        {prefix}_z21 AS (
+            SELECT DISTINCT cell_z21 FROM {cs_schema}.{table} WHERE {id_column} = {int(area_id)}
+        ),
+        {prefix}_z13 AS (
+            SELECT list(DISTINCT (cell_z21 >> {Z13_SHIFT})::UINTEGER) AS cells FROM {prefix}_z21
+        ),
+        {prefix}_z17 AS (
+            SELECT list(DISTINCT (cell_z21 >> {Z17_SHIFT})::UBIGINT) AS cells FROM {prefix}_z21
+        )"""
+    return cte, cell_bounds
+
+
+def _cell_filter(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    cs_table: str,
+    alias: str,
+    prefix: str,
+    cell_bounds: tuple[int, int],
+) -> str:
+    """Coarse-to-fine cell predicate for ``cs_table`` rows inside an area.
+
+    Candidate trajectories/stops are those whose z13 and z17 ancestors (``{cs_table}_ancestors``,
+    one row each) overlap the area's; only their rows are matched against the area's z21 cells.
+    The z21 range lets DuckDB skip row groups on the cell_z21 zone maps. Without an ancestor
+    table, every row in the range is matched at z21.
+    """
+    lo, hi = cell_bounds
+    predicate = f"""
+            {alias}.cell_z21 BETWEEN {lo} AND {hi}
+            AND {alias}.cell_z21 IN (SELECT cell_z21 FROM {prefix}_z21)"""
+    if not _table_exists(conn, cs_schema, f"{cs_table}_ancestors"):
+        return predicate
+    id_column = CS_ID_COLUMNS[cs_table]
+    return f"""
+            {alias}.{id_column} IN (
+                SELECT {id_column} FROM {cs_schema}.{cs_table}_ancestors
+                WHERE list_has_any(cellstring_z13, (SELECT cells FROM {prefix}_z13))
+                  AND list_has_any(cellstring_z17, (SELECT cells FROM {prefix}_z17))
+            )
+            AND{predicate}"""
+
+
+def _time_filter(
+    entry_col: str, exit_col: str, start: datetime | None, end: datetime | None
+) -> tuple[str, list]:
+    """Time-window predicate on a cell's [entry, exit] interval (overlap semantics)."""
+    clauses: list[str] = []
+    params: list = []
+    if start is not None:
+        clauses.append(f"{exit_col} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{entry_col} <= ?")
+        params.append(end)
+    return "".join(f"\n            AND {clause}" for clause in clauses), params
+
+
+def _empty_table(schema: pa.Schema) -> pa.Table:
+    return schema.empty_table()
+
+
+REGION_DWELL_SCHEMA = pa.schema(
+    [
+        pa.field("kind", pa.string()),
+        pa.field("id", pa.int32()),
+        pa.field("mmsi", pa.int64()),
+        pa.field("ts_entry", pa.timestamp("us")),
+        pa.field("ts_exit", pa.timestamp("us")),
+        pa.field("dwell_s", pa.float64()),
+        pa.field("num_cells", pa.int64()),
+    ]
+)
+
+
+def region_dwell(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    region: int | str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    include_stops: bool = True,
+) -> pa.Table:
+    """Per trajectory (and stop) time spent inside a region.
+
+    Trajectory dwell is the sum of the cell durations inside the region; stop dwell is the stop
+    duration. Returns columns kind, id, mmsi, ts_entry, ts_exit, dwell_s, num_cells.
+    """
+    _check_z21_schema(conn, cs_schema)
+    region_id = _resolve_area_id(conn, cs_schema, "region_cs", region)
+    cte, cell_bounds = _area_cte(conn, cs_schema, "region_cs", region_id, "region")
+    if cell_bounds is None:
+        return _empty_table(REGION_DWELL_SCHEMA)
+
+    traj_cells = _cell_filter(
+        conn, cs_schema, "trajectory_cs", "t", "region", cell_bounds
+    )
+    traj_time, traj_params = _time_filter("t.ts_entry", "t.ts_exit", start, end)
+    query = f"""
+        WITH {cte}
+        SELECT
+            'trajectory' AS kind,
+            t.trajectory_id AS id,
+            ANY_VALUE(t.mmsi) AS mmsi,
+            MIN(t.ts_entry) AS ts_entry,
+            MAX(t.ts_exit) AS ts_exit,
+            SUM(EPOCH(t.ts_exit) - EPOCH(t.ts_entry))::DOUBLE AS dwell_s,
+            COUNT(*) AS num_cells
+        FROM {cs_schema}.trajectory_cs t
+        WHERE {traj_cells}{traj_time}
+        GROUP BY t.trajectory_id"""
+    params = list(traj_params)
+
+    if include_stops:
+        stop_cells = _cell_filter(
+            conn, cs_schema, "stop_cs", "s", "region", cell_bounds
+        )
+        stop_time, stop_params = _time_filter("s.ts_start", "s.ts_end", start, end)
+        query += f"""
+        UNION ALL
+        SELECT
+            'stop' AS kind,
+            s.stop_id AS id,
+            ANY_VALUE(s.mmsi) AS mmsi,
+            ANY_VALUE(s.ts_start) AS ts_entry,
+            ANY_VALUE(s.ts_end) AS ts_exit,
+            (EPOCH(ANY_VALUE(s.ts_end)) - EPOCH(ANY_VALUE(s.ts_start)))::DOUBLE AS dwell_s,
+            COUNT(*) AS num_cells
+        FROM {cs_schema}.stop_cs s
+        WHERE {stop_cells}{stop_time}
+        GROUP BY s.stop_id"""
+        params += stop_params
+
+    query += "\n        ORDER BY ts_entry, kind, id;"
+    return conn.execute(query, params).fetch_arrow_table().cast(REGION_DWELL_SCHEMA)
+
+
+PASSAGE_CROSSING_SCHEMA = pa.schema(
+    [
+        pa.field("trajectory_id", pa.int32()),
+        pa.field("mmsi", pa.int64()),
+        pa.field("crossing_no", pa.int64()),
+        pa.field("ts_entry", pa.timestamp("us")),
+        pa.field("ts_exit", pa.timestamp("us")),
+        pa.field("cell_before", pa.uint64()),
+        pa.field("cell_after", pa.uint64()),
+        pa.field("direction", pa.string()),
+    ]
+)
+
+
+def _crossing_directions(
+    cells_before: np.ndarray,
+    cells_after: np.ndarray,
+    valid: np.ndarray,
+    passage_cells: np.ndarray,
+) -> list[str | None]:
+    """Label crossings northbound/southbound (east-west passage) or eastbound/westbound."""
+    px, py = quadkey_int_to_xy_array(passage_cells, DEFAULT_ZOOM)
+    east_west_passage = (px.max() - px.min()) >= (py.max() - py.min())
+
+    bx, by = quadkey_int_to_xy_array(cells_before, DEFAULT_ZOOM)
+    ax, ay = quadkey_int_to_xy_array(cells_after, DEFAULT_ZOOM)
+    dx = ax.astype(np.int64) - bx.astype(np.int64)
+    dy = ay.astype(np.int64) - by.astype(np.int64)  # tile y grows southwards
+
+    directions: list[str | None] = []
+    for is_valid, step_x, step_y in zip(valid, dx, dy):
+        if not is_valid:
+            directions.append(None)
+        elif east_west_passage:
+            directions.append("northbound" if step_y < 0 else "southbound")
+        else:
+            directions.append("eastbound" if step_x > 0 else "westbound")
+    return directions
+
+
+def passage_crossings(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    passage: int | str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    crossing_gap_s: int = CROSSING_GAP_S,
+) -> pa.Table:
+    """Trajectory crossings of a passage with entry/exit time and direction.
+
+    Passage cell hits of one trajectory more than ``crossing_gap_s`` apart are separate
+    crossings. The direction compares the trajectory cell entered just before the crossing with
+    the one entered just after it; it is null when the trajectory starts or ends on the passage.
+    """
+    _check_z21_schema(conn, cs_schema)
+    passage_id = _resolve_area_id(conn, cs_schema, "passage_cs", passage)
+    cte, cell_bounds = _area_cte(conn, cs_schema, "passage_cs", passage_id, "passage")
+    if cell_bounds is None:
+        return _empty_table(PASSAGE_CROSSING_SCHEMA)
+
+    hit_cells = _cell_filter(
+        conn, cs_schema, "trajectory_cs", "t", "passage", cell_bounds
+    )
+    time_clause, params = _time_filter("t.ts_entry", "t.ts_exit", start, end)
+    query = f"""
+        WITH {cte},
+        hits AS (
+            SELECT t.trajectory_id, t.mmsi, t.ts_entry, t.ts_exit
+            FROM {cs_schema}.trajectory_cs t
+            WHERE {hit_cells}{time_clause}
+        ),
+        numbered AS (
+            SELECT *,
+                SUM(CASE
+                    WHEN EPOCH(ts_entry) - EPOCH(prev_exit) <= {int(crossing_gap_s)} THEN 0
+                    ELSE 1
+                END) OVER (PARTITION BY trajectory_id ORDER BY ts_entry) AS crossing_no
+            FROM (
+                SELECT *, LAG(ts_exit) OVER (PARTITION BY trajectory_id ORDER BY ts_entry) AS prev_exit
+                FROM hits
+            )
+        ),
+        crossings AS (
+            SELECT
+                trajectory_id,
+                ANY_VALUE(mmsi) AS mmsi,
+                crossing_no,
+                MIN(ts_entry) AS ts_entry,
+                MAX(ts_exit) AS ts_exit,
+                MAX(ts_entry) AS last_hit_entry
+            FROM numbered
+            GROUP BY trajectory_id, crossing_no
+        ),
+        context AS (
+            SELECT t.trajectory_id, t.ts_entry, t.cell_z21
+            FROM {cs_schema}.trajectory_cs t
+            WHERE t.trajectory_id IN (SELECT trajectory_id FROM crossings)
+        )
+        SELECT
+            c.trajectory_id,
+            c.mmsi,
+            c.crossing_no,
+            c.ts_entry,
+            c.ts_exit,
+            b.cell_z21 AS cell_before,
+            a.cell_z21 AS cell_after
+        FROM crossings c
+        ASOF LEFT JOIN context b
+            ON c.trajectory_id = b.trajectory_id AND c.ts_entry > b.ts_entry
+        ASOF LEFT JOIN context a
+            ON c.trajectory_id = a.trajectory_id AND a.ts_entry > c.last_hit_entry
+        ORDER BY c.ts_entry, c.trajectory_id;
+    """
+    table = conn.execute(query, params).fetch_arrow_table()
+
+    passage_cells = np.array(
+        [
+            row[0]
+            for row in conn.execute(
+                f"SELECT cell_z21 FROM {cs_schema}.passage_cs WHERE passage_id = ?",
+                [passage_id],
+            ).fetchall()
+        ],
+        dtype=np.uint64,
+    )
+    before = table.column("cell_before")
+    after = table.column("cell_after")
+    valid = np.logical_and(
+        before.is_valid().to_numpy(zero_copy_only=False),
+        after.is_valid().to_numpy(zero_copy_only=False),
+    )
+    directions = _crossing_directions(
+        before.fill_null(0).to_numpy().astype(np.uint64),
+        after.fill_null(0).to_numpy().astype(np.uint64),
+        valid,
+        passage_cells,
+    )
+    table = table.append_column("direction", pa.array(directions, type=pa.string()))
+    return table.cast(PASSAGE_CROSSING_SCHEMA)
+
+
+REGION_TRANSIT_SCHEMA = pa.schema(
+    [
+        pa.field("mmsi", pa.int64()),
+        pa.field("from_trajectory_id", pa.int32()),
+        pa.field("to_trajectory_id", pa.int32()),
+        pa.field("departed", pa.timestamp("us")),
+        pa.field("arrived", pa.timestamp("us")),
+        pa.field("transit_s", pa.float64()),
+    ]
+)
+
+
+def region_transits(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    from_region: int | str,
+    to_region: int | str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    max_transit_s: float | None = None,
+) -> pa.Table:
+    """Vessel transits from one region to another.
+
+    Each trajectory visit of ``from_region`` is paired with the same vessel's first visit of
+    ``to_region`` entered at or after leaving ``from_region``.
+    """
+    _check_z21_schema(conn, cs_schema)
+    from_id = _resolve_area_id(conn, cs_schema, "region_cs", from_region)
+    to_id = _resolve_area_id(conn, cs_schema, "region_cs", to_region)
+    from_cte, from_bounds = _area_cte(conn, cs_schema, "region_cs", from_id, "src")
+    to_cte, to_bounds = _area_cte(conn, cs_schema, "region_cs", to_id, "dst")
+    if from_bounds is None or to_bounds is None:
+        return _empty_table(REGION_TRANSIT_SCHEMA)
+
+    src_cells = _cell_filter(conn, cs_schema, "trajectory_cs", "t", "src", from_bounds)
+    dst_cells = _cell_filter(conn, cs_schema, "trajectory_cs", "t", "dst", to_bounds)
+    time_clause, time_params = _time_filter("t.ts_entry", "t.ts_exit", start, end)
+    max_clause = ""
+    if max_transit_s is not None:
+        max_clause = f"\n        WHERE EPOCH(b.ts_entry) - EPOCH(a.ts_exit) <= {float(max_transit_s)}"
+
+    query = f"""
+        WITH {from_cte}, {to_cte},
+        src_visits AS (
+            SELECT t.trajectory_id, ANY_VALUE(t.mmsi) AS mmsi, MAX(t.ts_exit) AS ts_exit
+            FROM {cs_schema}.trajectory_cs t
+            WHERE {src_cells}{time_clause}
+            GROUP BY t.trajectory_id
+        ),
+        dst_visits AS (
+            SELECT t.trajectory_id, ANY_VALUE(t.mmsi) AS mmsi, MIN(t.ts_entry) AS ts_entry
+            FROM {cs_schema}.trajectory_cs t
+            WHERE {dst_cells}{time_clause}
+            GROUP BY t.trajectory_id
+        )
+        SELECT
+            a.mmsi,
+            a.trajectory_id AS from_trajectory_id,
+            b.trajectory_id AS to_trajectory_id,
+            a.ts_exit AS departed,
+            b.ts_entry AS arrived,
+            (EPOCH(b.ts_entry) - EPOCH(a.ts_exit))::DOUBLE AS transit_s
+        FROM src_visits a
+        ASOF JOIN dst_visits b
+            ON a.mmsi = b.mmsi AND b.ts_entry >= a.ts_exit{max_clause}
+        ORDER BY departed, a.mmsi;
+    """
+    params = time_params + time_params
+    return conn.execute(query, params).fetch_arrow_table().cast(REGION_TRANSIT_SCHEMA)
+
+
+# --- CLI ---
+
+
+def _parse_area(value: str) -> int | str:
+    return int(value) if value.isdigit() else value
+
+
+def _write_or_print(table: pa.Table, out: str | None):
+    if out is None:
+        print(format_table(table))
+        print(f"{table.num_rows:,} rows.")
+        return
+
+    if out.endswith(".csv"):
+        import pyarrow.csv as pacsv
+
+        pacsv.write_csv(table, out)
+    else:
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, out)
+    print(f"Wrote {table.num_rows:,} rows to '{out}'.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Query region dwell, passage crossings and region transits over DuckDB CellStrings."
+    )
+    parser.add_argument(
+        "--cs-schema", default=None, help="Defaults to DUCKDB_CS_SCHEMA"
+    )
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--out", default=None, help="Write result to .parquet or .csv")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dwell = subparsers.add_parser("dwell", help="Time spent inside a region")
+    dwell.add_argument("--region", type=_parse_area, required=True)
+    dwell.add_argument("--no-stops", action="store_true")
+
+    crossings = subparsers.add_parser("crossings", help="Passage crossings")
+    crossings.add_argument("--passage", type=_parse_area, required=True)
+    crossings.add_argument("--crossing-gap-s", type=int, default=CROSSING_GAP_S)
+
+    transits = subparsers.add_parser("transits", help="Region-to-region transits")
+    transits.add_argument("--from-region", type=_parse_area, required=True)
+    transits.add_argument("--to-region", type=_parse_area, required=True)
+    transits.add_argument("--max-transit-h", type=float, default=None)
+
+    args = parser.parse_args()
+    cs_schema = args.cs_schema or get_cs_schema("duckdb")
+
+    conn = duckdb.connect(get_db_path_or_url("duckdb"), read_only=True)
+    try:
+        if args.command == "dwell":
+            table = region_dwell(
+                conn, cs_schema, args.region, args.start, args.end, not args.no_stops
+            )
+        elif args.command == "crossings":
+            table = passage_crossings(
+                conn, cs_schema, args.passage, args.start, args.end, args.crossing_gap_s
+            )
+        else:
+            max_transit_s = (
+                args.max_transit_h * 3600 if args.max_transit_h is not None else None
+            )
+            table = region_transits(
+                conn,
+                cs_schema,
+                args.from_region,
+                args.to_region,
+                args.start,
+                args.end,
+                max_transit_s,
+            )
+        _write_or_print(table, args.out)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import duckdb
+import numpy as np
+
+from core.geodesy import EARTH_RADIUS_M, KNOT_AS_MPS
+from core.points_to_ls_poly import (
+    STOP_DISTANCE_THRESHOLD,
+    STOP_SOG_THRESHOLD,
+    STOP_TIME_THRESHOLD,
+    TRAJ_MAX_GAP_S,
+    TRAJ_MAX_SPEED_KN,
+    CandidateSegments,
+    InputPoint,
+)
+from db_setup.duckdb.create_duckdb_points import points_in_time_range
+
+SegmentKey = tuple[int, date]  # (mmsi, day)
+SegmentedPoints = tuple[
+    dict[SegmentKey, CandidateSegments],
+    dict[SegmentKey, list[InputPoint]],
+    dict[SegmentKey, float],
+]  # (candidate segments of SQL-segmented MMSI-days, raw points of the other MMSI-days, epoch_ts of each SQL-segmented MMSI-day's last point)
+
+TEMP_SEGMENT_STEPS = "construct_segment_steps"
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def create_segmentation_macros(conn: duckdb.DuckDBPyConnection):
+    """Phase 2 of ``process_single_mmsi_with_metrics`` as SQL macros over (sog, time diff, distance)."""
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP MACRO seg_haversine_m(lon1, lat1, lon2, lat2) AS
+            {EARTH_RADIUS_M} * 2 * asin(sqrt(least(
+                pow(sin((radians(lat2) - radians(lat1)) / 2), 2)
+                + cos(radians(lat1)) * cos(radians(lat2))
+                  * pow(sin(radians(lon2 - lon1) / 2), 2),
+                1.0
+            )));
+        CREATE OR REPLACE TEMP MACRO seg_speed_kn(time_diff, dist_diff) AS
+            CASE WHEN time_diff > 0
+                THEN dist_diff / time_diff / {KNOT_AS_MPS}
+                ELSE 'inf'::DOUBLE
+            END;
+        CREATE OR REPLACE TEMP MACRO seg_is_stop(sog, time_diff, dist_diff) AS
+            COALESCE(sog, seg_speed_kn(time_diff, dist_diff)) < {STOP_SOG_THRESHOLD}
+            AND time_diff < {STOP_TIME_THRESHOLD}
+            AND dist_diff < {STOP_DISTANCE_THRESHOLD};
+        CREATE OR REPLACE TEMP MACRO seg_is_skipped(sog, time_diff, dist_diff) AS
+            time_diff = 0
+            OR (
+                NOT seg_is_stop(sog, time_diff, dist_diff)
+                AND seg_speed_kn(time_diff, dist_diff) >= {TRAJ_MAX_SPEED_KN}
+            );
+    """)
+
+
+def segment_points_duckdb(
+    conn: duckdb.DuckDBPyConnection,
+    points_schema: str,
+    watermarks_table: str,
+    days: list[date],
+) -> SegmentedPoints:
+    """Segment the points newer than their MMSI's construct watermark into candidate trajectories
+    and stops in DuckDB, for a window of days, per (MMSI, day).
+
+    The Python loop skips a point that moves faster than ``TRAJ_MAX_SPEED_KN`` from the last kept
+    point, which makes it order dependent. Here a point is dropped when the step from the point
+    before it is such a jump, unless that point was itself a spike the current point returns
+    from. The dropped points are then checked against the rule: every kept point must be a
+    valid step from the previous kept point, and every dropped point an invalid step from it.
+    MMSI-days that fail the check (or have consecutive dropped points or duplicate timestamps)
+    are returned as raw points for the Python engine; the others get exactly the Python engine's
+    candidate segments, as arrays for ``process_candidate_segments_with_metrics``.
+    """
+    if not days:
+        return {}, {}, {}
+
+    create_segmentation_macros(conn)
+    day_points, params = points_in_time_range(
+        conn, points_schema, days[0], days[-1] + timedelta(days=1)
+    )
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE {TEMP_SEGMENT_STEPS} AS
+        WITH day_points AS (
+            SELECT p.mmsi, DATE(p.timestamp) AS point_day, p.lon, p.lat, p.sog, p.epoch_ts
+            FROM {day_points} p
+            LEFT JOIN {watermarks_table} w ON p.mmsi = w.mmsi
+            WHERE (w.last_ts IS NULL OR p.timestamp > w.last_ts)
+              AND p.mmsi IS NOT NULL AND p.lon IS NOT NULL
+              AND p.lat IS NOT NULL AND p.epoch_ts IS NOT NULL
+        ),
+        lagged AS (
+            SELECT
+                *,
+                epoch_ts - LAG(epoch_ts) OVER w AS time_diff,
+                seg_haversine_m(LAG(lon) OVER w, LAG(lat) OVER w, lon, lat) AS dist_diff,
+                epoch_ts - LAG(epoch_ts, 2) OVER w AS time_diff_2,
+                seg_haversine_m(LAG(lon, 2) OVER w, LAG(lat, 2) OVER w, lon, lat) AS dist_diff_2
+            FROM day_points
+            WINDOW w AS (PARTITION BY mmsi, point_day ORDER BY epoch_ts)
+        ),
+        jumps AS (
+            SELECT
+                mmsi, point_day, lon, lat, sog, epoch_ts,
+                COALESCE(time_diff = 0, false) AS duplicate,
+                time_diff IS NOT NULL
+                AND seg_is_skipped(sog, time_diff, dist_diff) AS jump,
+                time_diff_2 IS NOT NULL
+                AND seg_is_skipped(sog, time_diff_2, dist_diff_2) AS jump_2
+            FROM lagged
+        )
+        SELECT
+            * EXCLUDE (jump_2),
+            -- A jump away from the previous point, unless it was a spike we return from
+            jump AND NOT (
+                COALESCE(LAG(jump) OVER w, false) AND NOT jump_2
+            ) AS dropped
+        FROM jumps
+        WINDOW w AS (PARTITION BY mmsi, point_day ORDER BY epoch_ts);
+    """,
+        params,
+    )
+
+    # Steps between consecutive kept points, as in Phase 2: X = skipped (the check failed),
+    # S = stop, G = gap ending a trajectory, T = trajectory
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {TEMP_SEGMENT_STEPS}_kept AS
+        WITH kept AS (
+            SELECT
+                mmsi, point_day, lon, lat, sog, epoch_ts,
+                LAG(lon) OVER w AS prev_lon,
+                LAG(lat) OVER w AS prev_lat,
+                LAG(epoch_ts) OVER w AS prev_ts
+            FROM {TEMP_SEGMENT_STEPS}
+            WHERE NOT dropped
+            WINDOW w AS (PARTITION BY mmsi, point_day ORDER BY epoch_ts)
+        ),
+        motion AS (
+            SELECT
+                *,
+                epoch_ts - prev_ts AS time_diff,
+                seg_haversine_m(prev_lon, prev_lat, lon, lat) AS dist_diff
+            FROM kept
+        )
+        SELECT
+            * EXCLUDE (sog, time_diff, dist_diff),
+            CASE
+                WHEN prev_ts IS NULL THEN NULL
+                WHEN seg_is_skipped(sog, time_diff, dist_diff) THEN 'X'
+                WHEN seg_is_stop(sog, time_diff, dist_diff) THEN 'S'
+                WHEN time_diff >= {TRAJ_MAX_GAP_S} THEN 'G'
+                ELSE 'T'
+            END AS step
+        FROM motion;
+    """)
+
+    # A dropped point's last kept point is the point before it, unless that was dropped too
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {TEMP_SEGMENT_STEPS}_python AS
+        SELECT mmsi, point_day
+        FROM (
+            SELECT
+                mmsi,
+                point_day,
+                duplicate,
+                dropped AND COALESCE(LAG(dropped) OVER w, true) AS unchecked_drop
+            FROM {TEMP_SEGMENT_STEPS}
+            WINDOW w AS (PARTITION BY mmsi, point_day ORDER BY epoch_ts)
+        )
+        GROUP BY mmsi, point_day
+        HAVING bool_or(duplicate) OR bool_or(unchecked_drop)
+        UNION
+        SELECT DISTINCT mmsi, point_day
+        FROM {TEMP_SEGMENT_STEPS}_kept
+        WHERE step = 'X';
+    """)
+
+    raw_points: dict[SegmentKey, list[InputPoint]] = defaultdict(list)
+    for mmsi, point_day, lon, lat, sog, epoch_ts in conn.execute(f"""
+        SELECT s.mmsi, s.point_day, s.lon, s.lat, s.sog, s.epoch_ts
+        FROM {TEMP_SEGMENT_STEPS} s
+        SEMI JOIN {TEMP_SEGMENT_STEPS}_python f
+          ON s.mmsi = f.mmsi AND s.point_day = f.point_day
+        ORDER BY s.mmsi, s.epoch_ts;
+    """).fetchall():
+        raw_points[(int(mmsi), point_day)].append((lon, lat, sog, epoch_ts))
+
+    segments: dict[SegmentKey, CandidateSegments] = {}
+    num_points_by_key: dict[SegmentKey, int] = {}
+    last_ts_by_key: dict[SegmentKey, float] = {}
+    for mmsi, point_day, num_points, last_ts in conn.execute(f"""
+            SELECT mmsi, point_day, COUNT(*), MAX(epoch_ts)
+            FROM {TEMP_SEGMENT_STEPS}
+            ANTI JOIN {TEMP_SEGMENT_STEPS}_python USING (mmsi, point_day)
+            GROUP BY mmsi, point_day;
+        """).fetchall():
+        num_points_by_key[(int(mmsi), point_day)] = int(num_points)
+        last_ts_by_key[(int(mmsi), point_day)] = float(last_ts)
+
+    # Runs of stop (S) or trajectory (T) steps; a gap (G) ends a run without starting one.
+    # Each run starts with the kept point before its first step, like the Python connecting point.
+    columns = conn.execute(f"""
+        WITH run_starts AS (
+            SELECT
+                *,
+                step IN ('S', 'T')
+                AND step IS DISTINCT FROM LAG(step) OVER w AS run_start
+            FROM {TEMP_SEGMENT_STEPS}_kept
+            ANTI JOIN {TEMP_SEGMENT_STEPS}_python USING (mmsi, point_day)
+            WINDOW w AS (PARTITION BY mmsi, point_day ORDER BY epoch_ts)
+        ),
+        runs AS (
+            SELECT
+                *,
+                SUM(run_start::INTEGER) OVER (
+                    PARTITION BY mmsi, point_day ORDER BY epoch_ts
+                    ROWS UNBOUNDED PRECEDING
+                ) AS run_no
+            FROM run_starts
+            WHERE step IS NOT NULL
+        ),
+        run_points AS (
+            SELECT mmsi, point_day, run_no, step, lon, lat, epoch_ts, 1 AS point_order
+            FROM runs
+            WHERE step IN ('S', 'T')
+            UNION ALL
+            SELECT mmsi, point_day, run_no, step, prev_lon, prev_lat, prev_ts, 0
+            FROM runs
+            WHERE run_start
+        )
+        SELECT
+            mmsi,
+            datediff('day', DATE '1970-01-01', point_day) AS day_num,
+            run_no,
+            step = 'S' AS is_stop,
+            lon,
+            lat,
+            epoch_ts
+        FROM run_points
+        ORDER BY mmsi, point_day, run_no, point_order, epoch_ts;
+    """).fetchnumpy()
+
+    mmsis = np.asarray(columns["mmsi"], dtype=np.int64)
+    day_nums = np.asarray(columns["day_num"], dtype=np.int64)
+    run_nos = np.asarray(columns["run_no"], dtype=np.int64)
+    is_stop = np.asarray(columns["is_stop"], dtype=bool)
+    coords = np.column_stack(
+        [
+            np.asarray(columns[name], dtype=np.float64)
+            for name in ("lon", "lat", "epoch_ts")
+        ]
+    )
+    key_change = (
+        np.flatnonzero((mmsis[1:] != mmsis[:-1]) | (day_nums[1:] != day_nums[:-1])) + 1
+    )
+    run_change = np.flatnonzero(run_nos[1:] != run_nos[:-1]) + 1
+    key_bounds = np.concatenate(([0], key_change, [len(mmsis)]))
+    run_bounds = np.union1d(np.concatenate(([0], key_change, run_change)), [len(mmsis)])
+
+    for start, end in zip(key_bounds[:-1], key_bounds[1:]):
+        if start == end:
+            continue
+        key = (
+            int(mmsis[start]),
+            date.fromordinal(EPOCH_ORDINAL + int(day_nums[start])),
+        )
+        run_starts = run_bounds[(run_bounds >= start) & (run_bounds <= end)]
+        segments[key] = (
+            is_stop[run_starts[:-1]],
+            run_starts - start,
+            coords[start:end],
+            num_points_by_key.pop(key),
+        )
+
+    # MMSI-days without any segment still count their points
+    empty_runs = np.zeros(0, dtype=bool)
+    for key, num_points in num_points_by_key.items():
+        segments[key] = (
+            empty_runs,
+            np.zeros(1, dtype=np.int64),
+            coords[:0],
+            num_points,
+        )
+
+    for suffix in ("", "_kept", "_python"):
+        conn.execute(f"DROP TABLE IF EXISTS {TEMP_SEGMENT_STEPS}{suffix};")
+    return segments, raw_points, last_ts_by_key
@@ -1,23 +1,50 @@
 from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 import time
+from typing import cast
 import duckdb
+import numpy as np
 import pyarrow as pa
+from shapely import LineString, Polygon, from_wkb
+from core.cellstring_utils import DEFAULT_ZOOM, grouped_cellstring_ancestors
+from core.cover_cache import CachedCover, CoverCacheSettings, cover_cache_keys
+from core.metrics import MetricsRecorder, TimedResult, call_timed, worker_utilisation
+from core.profiling import get_profile_settings, profiled_task
 from core.ls_poly_to_cs import (
     ProcessResultStop,
     ProcessResultTraj,
     StopRow,
     TrajRow,
-    process_stop_row,
+    convert_linestring_to_cellstring,
+    convert_polygon_to_cellstrings,
+    process_stop_row_cached,
     process_trajectory_row,
 )
-from db_setup.duckdb.pyarrow_schemas import STOP_CS_SCHEMA, TRAJ_CS_SCHEMA
+from db_setup.duckdb.cs_variant import ensure_cs_variant_zoom
+from db_setup.duckdb.etl_checkpoints import (
+    clear_checkpoints,
+    get_checkpoints,
+    record_checkpoint,
+)
+from db_setup.duckdb.stop_cover_cache import (
+    ensure_stop_cover_cache_table,
+    get_stored_covers,
+    store_covers,
+)
+from db_setup.duckdb.pyarrow_schemas import (
+    STOP_CS_ANCESTORS_SCHEMA,
+    STOP_CS_SCHEMA,
+    TRAJ_CS_ANCESTORS_SCHEMA,
+    TRAJ_CS_SCHEMA,
+)
 from db_setup.utils.db_utils import format_eta
 
-FutureResultTraj = Future[ProcessResultTraj]
-FutureResultStop = Future[ProcessResultStop]
+FutureTimedResult = Future[TimedResult]  # (ProcessResultTraj | ProcessResultStop, duration_s, pid)
 
 BATCH_SIZE = 5000
 MAX_WORKERS = 4
+LINECOVER_UDF = "cs_linecover"
+POLYGON_COVER_UDF = "cs_polygon_cover"
+TEMP_TRANSFORM_IDS = "transform_ids"
 
 
 def calculate_exit_timestamps(
@@ -39,29 +66,448 @@ def calculate_exit_timestamps(
     return exit_timestamps
 
 
+def build_ancestors_arrow_table(
+    id_column: str,
+    ids: list[int],
+    cells: list[int],
+    mmsi_by_id: dict[int, int],
+    schema: pa.Schema,
+    zoom: int = DEFAULT_ZOOM,
+) -> pa.Table:
+    """One row per id with its sorted distinct z13 and z17 ancestor cells (from bit shifts of
+    cells at ``zoom``; a z13 CellString is its own z17 "ancestor")."""
+    ids_array = np.asarray(ids, dtype=np.int64)
+    cells_array = np.asarray(cells, dtype=np.uint64)
+    unique_ids, offsets_z13, cells_z13 = grouped_cellstring_ancestors(
+        ids_array, cells_array, 13, zoom
+    )
+    _, offsets_z17, cells_z17 = grouped_cellstring_ancestors(
+        ids_array, cells_array, min(17, zoom), zoom
+    )
+
+    return pa.table(
+        {
+            id_column: pa.array(unique_ids, type=pa.int32()),
+            "mmsi": pa.array(
+                [mmsi_by_id[int(id_)] for id_ in unique_ids], type=pa.int64()
+            ),
+            "cellstring_z13": pa.ListArray.from_arrays(
+                pa.array(offsets_z13, type=pa.int32()),
+                pa.array(cells_z13.astype(np.uint32), type=pa.uint32()),
+            ),
+            "cellstring_z17": pa.ListArray.from_arrays(
+                pa.array(offsets_z17, type=pa.int32()),
+                pa.array(cells_z17, type=pa.uint64()),
+            ),
+        },
+        schema=schema,
+    )
+
+
+def insert_traj_cs_rows(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    results: list[ProcessResultTraj],
+    trajectory_end_by_id: dict[int, int],
+    zoom: int = DEFAULT_ZOOM,
+) -> int:
+    """Insert one row per cell visit, and the ancestor rows, of a batch of trajectory results.
+
+    Runs inside the caller's transaction; returns the number of cell rows.
+    """
+    # Flatten: one row per cell
+    trajectory_ids: list[int] = []
+    mmsis: list[int] = []
+    ts_entries: list[int] = []
+    ts_exits: list[int] = []
+    cells: list[int] = []
+
+    for trajectory_id, mmsi, cells_with_ts in results:
+        ts_end = trajectory_end_by_id.get(
+            trajectory_id,
+            cells_with_ts[-1][1] if cells_with_ts else 0,
+        )
+        cell_exit_timestamps = calculate_exit_timestamps(cells_with_ts, ts_end)
+
+        for (cell, ts_entry), ts_exit in zip(cells_with_ts, cell_exit_timestamps):
+            trajectory_ids.append(trajectory_id)
+            mmsis.append(mmsi)
+            ts_entries.append(int(ts_entry))  # seconds
+            ts_exits.append(int(ts_exit))  # seconds
+            cells.append(cell)
+
+    if not cells:
+        return 0
+    traj_arrow_table = pa.table(
+        {
+            "trajectory_id": pa.array(trajectory_ids, type=pa.int32()),
+            "mmsi": pa.array(mmsis, type=pa.int64()),
+            "ts_entry": pa.array(ts_entries, type=pa.timestamp("s", tz="UTC")),
+            "ts_exit": pa.array(ts_exits, type=pa.timestamp("s", tz="UTC")),
+            "cell_z21": pa.array(cells, type=pa.uint64()),
+        },
+        schema=TRAJ_CS_SCHEMA,
+    )
+    conn.execute(
+        f"INSERT INTO {output_schema}.trajectory_cs SELECT * FROM traj_arrow_table"
+    )
+    traj_ancestors_arrow_table = build_ancestors_arrow_table(
+        "trajectory_id",
+        trajectory_ids,
+        cells,
+        {trajectory_id: mmsi for trajectory_id, mmsi, _ in results},
+        TRAJ_CS_ANCESTORS_SCHEMA,
+        zoom,
+    )
+    conn.execute(
+        f"INSERT INTO {output_schema}.trajectory_cs_ancestors SELECT * FROM traj_ancestors_arrow_table"
+    )
+    return len(cells)
+
+
+def insert_stop_cs_rows(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    results: list[ProcessResultStop],
+    zoom: int = DEFAULT_ZOOM,
+) -> int:
+    """Insert one row per cell, and the ancestor rows, of a batch of stop results.
+
+    Runs inside the caller's transaction; returns the number of cell rows.
+    """
+    # Flatten: one row per cell
+    stop_ids: list[int] = []
+    mmsis: list[int] = []
+    ts_starts: list[int] = []
+    ts_ends: list[int] = []
+    cells: list[int] = []
+
+    for stop_id, mmsi, ts_start, ts_end, cell_list in results:
+        for cell in cell_list:
+            stop_ids.append(stop_id)
+            mmsis.append(mmsi)
+            ts_starts.append(ts_start)
+            ts_ends.append(ts_end)
+            cells.append(cell)
+
+    if not cells:
+        return 0
+    stop_arrow_table = pa.table(
+        {
+            "stop_id": pa.array(stop_ids, type=pa.int32()),
+            "mmsi": pa.array(mmsis, type=pa.int64()),
+            "ts_start": pa.array(ts_starts, type=pa.timestamp("s", tz="UTC")),
+            "ts_end": pa.array(ts_ends, type=pa.timestamp("s", tz="UTC")),
+            "cell_z21": pa.array(cells, type=pa.uint64()),
+        },
+        schema=STOP_CS_SCHEMA,
+    )
+    conn.execute(f"INSERT INTO {output_schema}.stop_cs SELECT * FROM stop_arrow_table")
+    stop_ancestors_arrow_table = build_ancestors_arrow_table(
+        "stop_id",
+        stop_ids,
+        cells,
+        {stop_id: mmsi for stop_id, mmsi, _, _, _ in results},
+        STOP_CS_ANCESTORS_SCHEMA,
+        zoom,
+    )
+    conn.execute(
+        f"INSERT INTO {output_schema}.stop_cs_ancestors SELECT * FROM stop_ancestors_arrow_table"
+    )
+    return len(cells)
+
+
+def insert_cs_ancestors(
+    conn: duckdb.DuckDBPyConnection,
+    cs_schema: str,
+    cs_table: str,
+    id_column: str,
+    ids_query: str,
+    params: list | None = None,
+):
+    """Insert the ancestor rows of the ids selected by ``ids_query``, from their CellString rows."""
+    z13_shift = 2 * (DEFAULT_ZOOM - 13)
+    z17_shift = 2 * (DEFAULT_ZOOM - 17)
+    conn.execute(
+        f"""
+        INSERT INTO {cs_schema}.{cs_table}_ancestors
+        SELECT
+            {id_column},
+            ANY_VALUE(mmsi),
+            list_sort(list_distinct(list((cell_z21 >> {z13_shift})::UINTEGER))),
+            list_sort(list_distinct(list((cell_z21 >> {z17_shift})::UBIGINT)))
+        FROM {cs_schema}.{cs_table}
+        WHERE {id_column} IN ({ids_query})
+        GROUP BY {id_column};
+    """,
+        params or [],
+    )
+
+
+def backfill_cs_ancestors(conn: duckdb.DuckDBPyConnection, cs_schema: str):
+    """Fill the ancestor tables for CellStrings transformed before they existed.
+
+    Transforms write ancestors in the same transaction as the cells, so only an empty ancestor
+    table next to a non-empty CellString table needs filling; other runs skip the full scan.
+    """
+    for cs_table, id_column in (("trajectory_cs", "trajectory_id"), ("stop_cs", "stop_id")):
+        needs_backfill = conn.execute(f"""
+            SELECT EXISTS (SELECT 1 FROM {cs_schema}.{cs_table})
+               AND NOT EXISTS (SELECT 1 FROM {cs_schema}.{cs_table}_ancestors);
+        """).fetchone()
+        if not (needs_backfill and needs_backfill[0]):
+            continue
+        print(f"Backfilling {cs_schema}.{cs_table}_ancestors...")
+        insert_cs_ancestors(
+            conn,
+            cs_schema,
+            cs_table,
+            id_column,
+            f"""
+            SELECT {id_column} FROM {cs_schema}.{cs_table}
+            EXCEPT
+            SELECT {id_column} FROM {cs_schema}.{cs_table}_ancestors""",
+        )
+
+
+def linecover_udf(geom_wkb: pa.Array, ts_end: pa.Array) -> pa.Array:
+    """Arrow UDF: the z21 CellString of each trajectory as a list of (cell_z21, ts_entry, ts_exit)."""
+    offsets: list[int] = [0]
+    cells: list[int] = []
+    ts_entries: list[int] = []
+    ts_exits: list[int] = []
+    for wkb, end in zip(geom_wkb.to_pylist(), ts_end.to_pylist()):
+        linestring = cast(LineString, from_wkb(wkb))
+        cells_with_ts = convert_linestring_to_cellstring(linestring, DEFAULT_ZOOM)
+        for (cell, ts_entry), ts_exit in zip(
+            cells_with_ts, calculate_exit_timestamps(cells_with_ts, end)
+        ):
+            cells.append(cell)
+            ts_entries.append(int(ts_entry))
+            ts_exits.append(ts_exit)
+        offsets.append(len(cells))
+
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.StructArray.from_arrays(
+            [
+                pa.array(cells, type=pa.uint64()),
+                pa.array(ts_entries, type=pa.int64()),
+                pa.array(ts_exits, type=pa.int64()),
+            ],
+            names=["cell_z21", "ts_entry", "ts_exit"],
+        ),
+    )
+
+
+def polygon_cover_udf(geom_wkb: pa.Array) -> pa.Array:
+    """Arrow UDF: the z21 cells covering each stop polygon."""
+    offsets: list[int] = [0]
+    cells: list[int] = []
+    for wkb in geom_wkb.to_pylist():
+        _, _, cellstring_z21 = convert_polygon_to_cellstrings(cast(Polygon, from_wkb(wkb)))
+        cells.extend(cellstring_z21)
+        offsets.append(len(cells))
+
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()), pa.array(cells, type=pa.uint64())
+    )
+
+
+def register_cover_udfs(conn: duckdb.DuckDBPyConnection):
+    """Register ``cs_linecover(geom_wkb, ts_end_epoch)`` and ``cs_polygon_cover(geom_wkb)`` on ``conn``."""
+    for name, function, parameters, return_type in (
+        (
+            LINECOVER_UDF,
+            linecover_udf,
+            ["BLOB", "DOUBLE"],
+            "STRUCT(cell_z21 UBIGINT, ts_entry BIGINT, ts_exit BIGINT)[]",
+        ),
+        (POLYGON_COVER_UDF, polygon_cover_udf, ["BLOB"], "UBIGINT[]"),
+    ):
+        try:
+            conn.remove_function(name)
+        except duckdb.InvalidInputException:
+            pass
+        conn.create_function(
+            name,
+            function,
+            [conn.type(parameter) for parameter in parameters],
+            conn.type(return_type),
+            type="arrow",
+        )
+
+
+def transform_with_cover_udf(
+    conn: duckdb.DuckDBPyConnection,
+    output_schema: str,
+    ids: list[int],
+    cs_table: str,
+    id_column: str,
+    stage: str,
+    cover_query: str,
+    batch_size: int,
+    metrics: MetricsRecorder,
+) -> int:
+    """Insert the CellStrings of ``ids`` with ``cover_query`` (a SELECT of the CellString rows
+    of the ids in TEMP_TRANSFORM_IDS between its two parameters) running the cover UDFs inside
+    DuckDB. Ids are committed in chunks of ``batch_size`` with their ancestors and checkpoint,
+    so an interrupted run can resume. Returns the number of cells inserted."""
+    register_cover_udfs(conn)
+    ids_arrow_table = pa.table({"id": pa.array(ids, type=pa.int64())})
+    conn.execute(
+        f"CREATE OR REPLACE TEMP TABLE {TEMP_TRANSFORM_IDS} AS SELECT id FROM ids_arrow_table;"
+    )
+    chunk_ids_query = f"SELECT id FROM {TEMP_TRANSFORM_IDS} WHERE id BETWEEN ? AND ?"
+    total_cells = 0
+    total_batches = (len(ids) + batch_size - 1) // batch_size
+    start_time = time.perf_counter()
+    for batch_index, next_index in enumerate(range(0, len(ids), batch_size), start=1):
+        batch_ids = ids[next_index : next_index + batch_size]
+        bounds = [batch_ids[0], batch_ids[-1]]
+        batch_start_time = time.perf_counter()
+        conn.execute("BEGIN TRANSACTION;")
+        try:
+            row = conn.execute(
+                f"INSERT INTO {output_schema}.{cs_table} {cover_query}", bounds
+            ).fetchone()
+            num_cells = int(row[0]) if row else 0
+            insert_cs_ancestors(
+                conn, output_schema, cs_table, id_column, chunk_ids_query, bounds
+            )
+            record_checkpoint(
+                conn, output_schema, stage, str(batch_ids[-1]), metrics.run_id, rows=num_cells
+            )
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+        batch_time = time.perf_counter() - batch_start_time
+        total_cells += num_cells
+        metrics.record(
+            stage,
+            "batch",
+            batch_time,
+            rows=num_cells,
+            unit=batch_index,
+            num_ids=len(batch_ids),
+            engine="udf",
+        )
+        metrics.flush()
+        elapsed = time.perf_counter() - start_time
+        eta = (total_batches - batch_index) * elapsed / batch_index
+        print(
+            f"Inserted batch {batch_index}/{total_batches} of {len(batch_ids)} {cs_table} ids ({num_cells:,} cells) "
+            f"in {batch_time:.2f}s - ETA: {format_eta(eta)}"
+        )
+
+    conn.execute(f"DROP TABLE IF EXISTS {TEMP_TRANSFORM_IDS};")
+    return total_cells
+
+
+def get_ids_to_transform(
+    conn: duckdb.DuckDBPyConnection,
+    input_schema: str,
+    output_schema: str,
+    ls_table: str,
+    cs_table: str,
+    id_column: str,
+    stage: str,
+    resume: bool = False,
+) -> list[int]:
+    """Ids of LS rows without CellString rows, ascending.
+
+    Batches commit in id order with a checkpoint (their last id), so when resuming an
+    interrupted run only the ids after the last checkpoint are listed, without the anti-join
+    against the CellString table.
+    """
+    if resume:
+        completed = get_checkpoints(conn, output_schema, stage)
+        if completed:
+            last_id = max(int(unit) for unit in completed)
+            print(f"Resuming {stage} after checkpointed {id_column} {last_id}.")
+            return [row[0] for row in conn.execute(f"""
+                SELECT {id_column} FROM {input_schema}.{ls_table}
+                WHERE {id_column} > {last_id}
+                ORDER BY {id_column};""").fetchall()]
+    else:
+        clear_checkpoints(conn, output_schema, stage)
+
+    return [row[0] for row in conn.execute(f"""
+                SELECT {id_column} FROM {input_schema}.{ls_table}
+                EXCEPT
+                SELECT {id_column} FROM {output_schema}.{cs_table}
+                ORDER BY {id_column};""").fetchall()]
+
+
 def transform_ls_trajectories_to_cs(
     conn: duckdb.DuckDBPyConnection,
     input_schema: str,
     output_schema: str,
     max_workers: int = MAX_WORKERS,
     batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
+    resume: bool = False,
+    engine: str = "pool",
 ):
     print(f"\n--- Processing trajectories (using {max_workers} workers) ---")
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_trajectory_row,
+        get_profile_settings("transform_trajs", metrics.run_id),
+    )
     total_processed = 0
     total_cells_inserted = 0
 
     conn.execute("LOAD spatial")
+    ensure_cs_variant_zoom(conn, output_schema, DEFAULT_ZOOM)
+    backfill_cs_ancestors(conn, output_schema)
     print(f"Processing trajectories in batches of {batch_size}...")
 
-    traj_ids_to_process: list[int] = [row[0] for row in conn.execute(f"""
-                SELECT trajectory_id FROM {input_schema}.trajectory_ls
-                EXCEPT
-                SELECT trajectory_id FROM {output_schema}.trajectory_cs
-                ORDER BY trajectory_id;""").fetchall()]
+    traj_ids_to_process = get_ids_to_transform(
+        conn,
+        input_schema,
+        output_schema,
+        "trajectory_ls",
+        "trajectory_cs",
+        "trajectory_id",
+        "transform_trajs",
+        resume,
+    )
 
     print(
         f"Found {len(traj_ids_to_process)} LineString trajectories to convert to CellString. Starting processing..."
     )
+    if engine == "udf":
+        # linecover runs inside DuckDB's insert pipeline: no WKB round trip, pickling or IN-lists
+        total_cells_inserted = transform_with_cover_udf(
+            conn,
+            output_schema,
+            traj_ids_to_process,
+            "trajectory_cs",
+            "trajectory_id",
+            "transform_trajs",
+            f"""
+            SELECT
+                trajectory_id,
+                mmsi,
+                make_timestamp(cell.ts_entry * 1000000),
+                make_timestamp(cell.ts_exit * 1000000),
+                cell.cell_z21
+            FROM (
+                SELECT trajectory_id, mmsi, unnest({LINECOVER_UDF}(ST_AsWKB(geom), epoch(ts_end))) AS cell
+                FROM {input_schema}.trajectory_ls
+                WHERE trajectory_id IN (SELECT id FROM {TEMP_TRANSFORM_IDS} WHERE id BETWEEN ? AND ?)
+            )""",
+            batch_size,
+            metrics,
+        )
+        clear_checkpoints(conn, output_schema, "transform_trajs")
+        print(
+            f"Finished processing all trajectories ({len(traj_ids_to_process):,} trajectories, {total_cells_inserted:,} cells)"
+        )
+        return
+
     next_index = 0
     start_time = time.perf_counter()
     total_batches = (len(traj_ids_to_process) + batch_size - 1) // batch_size
@@ -76,6 +522,7 @@ def transform_ls_trajectories_to_cs(
                 break
 
             print(f"Fetching batch {batch_index}/{total_batches} of {len(batch_ids)} LineString trajectories...")
+            batch_start_time = time.perf_counter()
             batch: list[TrajRow] = [
                 (int(tid), int(mmsi), ts_start, ts_end, bytes(geom_wkb))
                 for tid, mmsi, ts_start, ts_end, geom_wkb in conn.execute(f"""
@@ -92,67 +539,84 @@ def transform_ls_trajectories_to_cs(
                 trajectory_id: ts_end for trajectory_id, _, _, ts_end, _ in batch
             }
 
+            fetch_time = time.perf_counter() - batch_start_time
             print(
                 f"Processing batch {batch_index}/{total_batches} of {len(batch)} trajectories..."
             )
 
-            futures: list[FutureResultTraj] = [
-                executor.submit(process_trajectory_row, row) for row in batch
+            compute_start_time = time.perf_counter()
+            busy_time = 0.0
+            futures: list[FutureTimedResult] = [
+                executor.submit(call_timed, process_row, row)
+                for row in batch
             ]
             results: list[ProcessResultTraj] = []
             for future in as_completed(futures):
                 try:
-                    results.append(future.result())
+                    result, duration, worker_pid = future.result()
+                    results.append(result)
+                    busy_time += duration
+                    metrics.record(
+                        "transform_trajs",
+                        "trajectory",
+                        duration,
+                        rows=len(result[2]),
+                        unit=result[0],
+                        worker_pid=worker_pid,
+                        mmsi=result[1],
+                    )
                 except Exception as e:
                     print(f"Worker error: {e}")
+            compute_time = time.perf_counter() - compute_start_time
+            insert_start_time = time.perf_counter()
 
             print(
                 f"Processed batch {batch_index}/{total_batches} of {len(results)} trajectories, inserting into the database..."
             )
 
-            # Flatten: one row per cell
-            trajectory_ids: list[int] = []
-            mmsis: list[int] = []
-            ts_entries: list[int] = []
-            ts_exits: list[int] = []
-            cells: list[int] = []
-
-            for trajectory_id, mmsi, cells_with_ts in results:
-                ts_end = trajectory_end_by_id.get(
-                    trajectory_id,
-                    cells_with_ts[-1][1] if cells_with_ts else 0,
-                )
-                cell_exit_timestamps = calculate_exit_timestamps(cells_with_ts, ts_end)
-
-                for (cell, ts_entry), ts_exit in zip(
-                    cells_with_ts, cell_exit_timestamps
-                ):
-                    trajectory_ids.append(trajectory_id)
-                    mmsis.append(mmsi)
-                    ts_entries.append(int(ts_entry))  # seconds
-                    ts_exits.append(int(ts_exit))  # seconds
-                    cells.append(cell)
-
-            if cells:
-                traj_arrow_table = pa.table(
-                    {
-                        "trajectory_id": pa.array(trajectory_ids, type=pa.int32()),
-                        "mmsi": pa.array(mmsis, type=pa.int64()),
-                        "ts_entry": pa.array(
-                            ts_entries, type=pa.timestamp("s", tz="UTC")
-                        ),
-                        "ts_exit": pa.array(ts_exits, type=pa.timestamp("s", tz="UTC")),
-                        "cell_z21": pa.array(cells, type=pa.uint64()),
-                    },
-                    schema=TRAJ_CS_SCHEMA,
-                )
-                conn.execute(
-                    f"INSERT INTO {output_schema}.trajectory_cs SELECT * FROM traj_arrow_table"
+            # The batch's CellStrings, ancestors and checkpoint commit together
+            conn.execute("BEGIN TRANSACTION;")
+            try:
+                num_cells = insert_traj_cs_rows(
+                    conn, output_schema, results, trajectory_end_by_id
                 )
-                print(
-                    f"Inserted batch {batch_index}/{total_batches} of {len(results)} trajectories ({len(cells):,} cells)."
+                if num_cells:
+                    print(
+                        f"Inserted batch {batch_index}/{total_batches} of {len(results)} trajectories ({num_cells:,} cells)."
+                    )
+                    total_cells_inserted += num_cells
+                record_checkpoint(
+                    conn,
+                    output_schema,
+                    "transform_trajs",
+                    str(batch_ids[-1]),
+                    metrics.run_id,
+                    rows=num_cells,
                 )
-                total_cells_inserted += len(cells)
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+
+            insert_time = time.perf_counter() - insert_start_time
+            metrics.record(
+                "transform_trajs",
+                "batch",
+                time.perf_counter() - batch_start_time,
+                rows=num_cells,
+                unit=batch_index,
+                num_trajs=len(results),
+                fetch_s=fetch_time,
+                compute_s=compute_time,
+                insert_s=insert_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
+            print(
+                f"Batch {batch_index}/{total_batches} timings: fetch {fetch_time:.2f}s, compute {compute_time:.2f}s, insert {insert_time:.2f}s | "
+                f"Worker utilisation: {worker_utilisation(busy_time, compute_time, max_workers):.0%}"
+            )
 
             total_processed += len(results)
             elapsed = time.perf_counter() - start_time
@@ -163,6 +627,7 @@ def transform_ls_trajectories_to_cs(
             )
             batch_index += 1
 
+    clear_checkpoints(conn, output_schema, "transform_trajs")
     print(
         f"Finished processing all trajectories ({total_processed:,} trajectories, {total_cells_inserted:,} cells)"
     )
@@ -174,23 +639,66 @@ def transform_poly_stops_to_cs(
     output_schema: str,
     max_workers: int = MAX_WORKERS,
     batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
+    resume: bool = False,
+    engine: str = "pool",
+    cover_cache: CoverCacheSettings | None = None,
+    persist_cover_cache: bool = False,
 ):
+    """Cover stop polygons with z21 cells. With ``cover_cache`` (pool engine), each worker reuses
+    the covers of recurring polygons; with ``persist_cover_cache`` too, covers are also looked up
+    in and added to ``{output_schema}.stop_cover_cache`` so hits carry across runs."""
     print(f"\n--- Processing stops (using {max_workers} workers) ---")
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_stop_row_cached,
+        get_profile_settings("transform_stops", metrics.run_id),
+    )
+    persist_cover_cache = persist_cover_cache and cover_cache is not None
     total_processed = 0
     total_cells_inserted = 0
 
     conn.execute("LOAD spatial")
+    ensure_cs_variant_zoom(conn, output_schema, DEFAULT_ZOOM)
     print(f"Processing stops in batches of {batch_size}...")
 
-    stop_ids_to_process: list[int] = [row[0] for row in conn.execute(f"""
-                SELECT stop_id FROM {input_schema}.stop_poly
-                EXCEPT
-                SELECT stop_id FROM {output_schema}.stop_cs
-                ORDER BY stop_id;""").fetchall()]
+    stop_ids_to_process = get_ids_to_transform(
+        conn,
+        input_schema,
+        output_schema,
+        "stop_poly",
+        "stop_cs",
+        "stop_id",
+        "transform_stops",
+        resume,
+    )
 
     print(
         f"Found {len(stop_ids_to_process)} Polygon stops to convert to CellString. Starting processing..."
     )
+    if engine == "udf":
+        total_cells_inserted = transform_with_cover_udf(
+            conn,
+            output_schema,
+            stop_ids_to_process,
+            "stop_cs",
+            "stop_id",
+            "transform_stops",
+            f"""
+            SELECT stop_id, mmsi, ts_start, ts_end, unnest({POLYGON_COVER_UDF}(ST_AsWKB(geom)))
+            FROM {input_schema}.stop_poly
+            WHERE stop_id IN (SELECT id FROM {TEMP_TRANSFORM_IDS} WHERE id BETWEEN ? AND ?)""",
+            batch_size,
+            metrics,
+        )
+        clear_checkpoints(conn, output_schema, "transform_stops")
+        print(
+            f"Finished processing all stops ({len(stop_ids_to_process):,} stops, {total_cells_inserted:,} cells)"
+        )
+        return
+
+    if persist_cover_cache:
+        ensure_stop_cover_cache_table(conn, output_schema)
     next_index = 0
     start_time = time.perf_counter()
     total_batches = (len(stop_ids_to_process) + batch_size - 1) // batch_size
@@ -205,6 +713,7 @@ def transform_poly_stops_to_cs(
                 break
 
             print(f"Fetching batch {batch_index}/{total_batches} of {len(batch_ids)} Polygon stops...")
+            batch_start_time = time.perf_counter()
             batch: list[StopRow] = [
                 (int(sid), int(mmsi), ts_start, ts_end, bytes(geom_wkb))
                 for sid, mmsi, ts_start, ts_end, geom_wkb in conn.execute(f"""
@@ -217,49 +726,102 @@ def transform_poly_stops_to_cs(
             if not batch:
                 break
 
-            futures: list[FutureResultStop] = [
-                executor.submit(process_stop_row, row) for row in batch
+            # Candidates from the shared cover cache, looked up once per batch
+            keys_by_stop: dict[int, list[bytes]] = {}
+            stored: dict[bytes, CachedCover] = {}
+            if persist_cover_cache:
+                keys_by_stop = {
+                    row[0]: cover_cache_keys(row[4], from_wkb(row[4]), cover_cache[1])
+                    for row in batch
+                }
+                stored = get_stored_covers(
+                    conn,
+                    output_schema,
+                    [key for keys in keys_by_stop.values() for key in keys],
+                )
+
+            fetch_time = time.perf_counter() - batch_start_time
+            compute_start_time = time.perf_counter()
+            busy_time = 0.0
+            futures: list[FutureTimedResult] = [
+                executor.submit(
+                    call_timed,
+                    process_row,
+                    row,
+                    cover_cache,
+                    [stored[key] for key in keys_by_stop.get(row[0], []) if key in stored],
+                )
+                for row in batch
             ]
             results: list[ProcessResultStop] = []
+            cache_outcomes = {"hit": 0, "near": 0, "miss": 0}
+            new_covers: dict[bytes, CachedCover] = {}
+            geom_by_stop = {row[0]: row[4] for row in batch}
             for future in as_completed(futures):
                 try:
-                    results.append(future.result())
+                    (result, cache_outcome), duration, worker_pid = future.result()
+                    results.append(result)
+                    busy_time += duration
+                    if cache_outcome in cache_outcomes:
+                        cache_outcomes[cache_outcome] += 1
+                    if persist_cover_cache and cache_outcome != "hit":
+                        for key in keys_by_stop[result[0]]:
+                            new_covers[key] = (geom_by_stop[result[0]], result[4])
+                    metrics.record(
+                        "transform_stops",
+                        "stop",
+                        duration,
+                        rows=len(result[4]),
+                        unit=result[0],
+                        worker_pid=worker_pid,
+                        mmsi=result[1],
+                        cover_cache=cache_outcome,
+                    )
                 except Exception as e:
                     print(f"Worker error: {e}")
-
-            # Flatten: one row per cell
-            stop_ids: list[int] = []
-            mmsis: list[int] = []
-            ts_starts: list[int] = []
-            ts_ends: list[int] = []
-            cells: list[int] = []
-
-            for stop_id, mmsi, ts_start, ts_end, cell_list in results:
-                for cell in cell_list:
-                    stop_ids.append(stop_id)
-                    mmsis.append(mmsi)
-                    ts_starts.append(ts_start)
-                    ts_ends.append(ts_end)
-                    cells.append(cell)
-
-            if cells:
-                stop_arrow_table = pa.table(
-                    {
-                        "stop_id": pa.array(stop_ids, type=pa.int32()),
-                        "mmsi": pa.array(mmsis, type=pa.int64()),
-                        "ts_start": pa.array(
-                            ts_starts, type=pa.timestamp("s", tz="UTC")
-                        ),
-                        "ts_end": pa.array(ts_ends, type=pa.timestamp("s", tz="UTC")),
-                        "cell_z21": pa.array(cells, type=pa.uint64()),
-                    },
-                    schema=STOP_CS_SCHEMA,
+            compute_time = time.perf_counter() - compute_start_time
+            insert_start_time = time.perf_counter()
+
+            # The batch's CellStrings, ancestors and checkpoint commit together
+            conn.execute("BEGIN TRANSACTION;")
+            try:
+                num_cells = insert_stop_cs_rows(conn, output_schema, results)
+                if num_cells:
+                    print(f"Inserted batch {batch_index}/{total_batches} of {len(results)} stops ({num_cells:,} cells).")
+                    total_cells_inserted += num_cells
+                if persist_cover_cache:
+                    store_covers(conn, output_schema, new_covers)
+                record_checkpoint(
+                    conn,
+                    output_schema,
+                    "transform_stops",
+                    str(batch_ids[-1]),
+                    metrics.run_id,
+                    rows=num_cells,
                 )
-                conn.execute(
-                    f"INSERT INTO {output_schema}.stop_cs SELECT * FROM stop_arrow_table"
-                )
-                print(f"Inserted batch {batch_index}/{total_batches} of {len(results)} stops ({len(cells):,} cells).")
-                total_cells_inserted += len(cells)
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+
+            insert_time = time.perf_counter() - insert_start_time
+            metrics.record(
+                "transform_stops",
+                "batch",
+                time.perf_counter() - batch_start_time,
+                rows=num_cells,
+                unit=batch_index,
+                num_stops=len(results),
+                cover_hits=cache_outcomes["hit"],
+                cover_near=cache_outcomes["near"],
+                cover_misses=cache_outcomes["miss"],
+                fetch_s=fetch_time,
+                compute_s=compute_time,
+                insert_s=insert_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
 
             total_processed += len(results)
             elapsed = time.perf_counter() - start_time
@@ -270,6 +832,7 @@ def transform_poly_stops_to_cs(
             )
             batch_index += 1
 
+    clear_checkpoints(conn, output_schema, "transform_stops")
     print(
         f"Finished processing all stops ({total_processed:,} stops, {total_cells_inserted:,} cells)"
     )
@@ -0,0 +1,296 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable
+
+import duckdb
+
+from core.cellstring_utils import DEFAULT_ZOOM
+from core.ls_poly_to_cs import (
+    ProcessResultStop,
+    ProcessResultTraj,
+    StopRow,
+    TrajRow,
+    process_stop_row_variants,
+    process_trajectory_row_variants,
+)
+from core.metrics import MetricsRecorder, call_timed, worker_utilisation
+from core.profiling import get_profile_settings, profiled_task
+from db_setup.duckdb.cs_variant import ensure_cs_variant_zoom
+from db_setup.duckdb.etl_checkpoints import clear_checkpoints, record_checkpoint
+from db_setup.utils.db_utils import format_eta
+from duckdb_transform_ls_to_cs import (
+    BATCH_SIZE,
+    MAX_WORKERS,
+    FutureTimedResult,
+    get_ids_to_transform,
+    insert_stop_cs_rows,
+    insert_traj_cs_rows,
+)
+
+CsVariant = tuple[str, int]  # (output_schema, zoom of its cells)
+
+# The zooms of the hierarchical polygon cover, so stops can be covered at any of them
+VARIANT_ZOOMS = (13, 17, DEFAULT_ZOOM)
+
+
+def validate_cs_variants(variants: list[CsVariant]):
+    schemas = [schema for schema, _ in variants]
+    if len(set(schemas)) != len(schemas):
+        raise ValueError(f"CellString variants must use distinct schemas: {schemas}")
+    for schema, zoom in variants:
+        if zoom not in VARIANT_ZOOMS:
+            raise ValueError(
+                f"Unsupported zoom {zoom} for CellString variant '{schema}'; use one of {VARIANT_ZOOMS}."
+            )
+
+
+def _transform_to_variants(
+    conn: duckdb.DuckDBPyConnection,
+    input_schema: str,
+    variants: list[CsVariant],
+    ls_table: str,
+    cs_table: str,
+    id_column: str,
+    stage: str,
+    select_rows: Callable[[list[int]], list],
+    process_row: Callable,
+    insert_rows: Callable[[str, int, list, list], int],
+    max_workers: int,
+    batch_size: int,
+    metrics: MetricsRecorder,
+    resume: bool,
+) -> int:
+    """Read each LS row once, cover it at every variant zoom, and insert into every variant
+    that lacks it; all variants' rows and checkpoints of a batch commit together."""
+    validate_cs_variants(variants)
+    for schema, zoom in variants:
+        ensure_cs_variant_zoom(conn, schema, zoom)
+
+    pending = {
+        schema: set(
+            get_ids_to_transform(
+                conn, input_schema, schema, ls_table, cs_table, id_column, stage, resume
+            )
+        )
+        for schema, _ in variants
+    }
+    ids_to_process = sorted(set().union(*pending.values()))
+    zooms = tuple(sorted({zoom for _, zoom in variants}))
+    print(
+        f"Found {len(ids_to_process)} rows of {ls_table} missing from {len(variants)} CellString variant(s) {[schema for schema, _ in variants]}."
+    )
+
+    total_processed = 0
+    total_cells_inserted = 0
+    start_time = time.perf_counter()
+    total_batches = (len(ids_to_process) + batch_size - 1) // batch_size
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for batch_index, next_index in enumerate(
+            range(0, len(ids_to_process), batch_size), start=1
+        ):
+            batch_ids = ids_to_process[next_index : next_index + batch_size]
+            batch_start_time = time.perf_counter()
+            batch = select_rows(batch_ids)
+            fetch_time = time.perf_counter() - batch_start_time
+
+            compute_start_time = time.perf_counter()
+            busy_time = 0.0
+            futures: list[FutureTimedResult] = [
+                executor.submit(call_timed, process_row, row, zooms) for row in batch
+            ]
+            results = []
+            for future in as_completed(futures):
+                try:
+                    result, duration, worker_pid = future.result()
+                    results.append(result)
+                    busy_time += duration
+                    metrics.record(
+                        stage,
+                        "row",
+                        duration,
+                        rows=sum(len(cells) for cells in result[-1].values()),
+                        unit=result[0],
+                        worker_pid=worker_pid,
+                        mmsi=result[1],
+                    )
+                except Exception as e:
+                    print(f"Worker error: {e}")
+            results.sort(key=lambda result: result[0])
+            compute_time = time.perf_counter() - compute_start_time
+
+            insert_start_time = time.perf_counter()
+            num_cells = 0
+            conn.execute("BEGIN TRANSACTION;")
+            try:
+                for schema, zoom in variants:
+                    variant_results = [
+                        (*result[:-1], result[-1][zoom])
+                        for result in results
+                        if result[0] in pending[schema]
+                    ]
+                    variant_cells = insert_rows(schema, zoom, batch, variant_results)
+                    record_checkpoint(
+                        conn,
+                        schema,
+                        stage,
+                        str(batch_ids[-1]),
+                        metrics.run_id,
+                        rows=variant_cells,
+                    )
+                    num_cells += variant_cells
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+            insert_time = time.perf_counter() - insert_start_time
+            total_cells_inserted += num_cells
+
+            metrics.record(
+                stage,
+                "batch",
+                time.perf_counter() - batch_start_time,
+                rows=num_cells,
+                unit=batch_index,
+                num_rows=len(results),
+                num_variants=len(variants),
+                fetch_s=fetch_time,
+                compute_s=compute_time,
+                insert_s=insert_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
+
+            total_processed += len(results)
+            elapsed = time.perf_counter() - start_time
+            eta = (len(ids_to_process) - total_processed) * (
+                elapsed / total_processed if total_processed else 0
+            )
+            print(
+                f"Batch {batch_index}/{total_batches}: {len(results)} rows, {num_cells:,} cells over {len(variants)} variant(s) | "
+                f"fetch {fetch_time:.2f}s, compute {compute_time:.2f}s, insert {insert_time:.2f}s | "
+                f"Worker utilisation: {worker_utilisation(busy_time, compute_time, max_workers):.0%} - ETA: {format_eta(eta)}"
+            )
+
+    for schema, _ in variants:
+        clear_checkpoints(conn, schema, stage)
+    return total_cells_inserted
+
+
+def transform_ls_trajectories_to_cs_variants(
+    conn: duckdb.DuckDBPyConnection,
+    input_schema: str,
+    variants: list[CsVariant],
+    max_workers: int = MAX_WORKERS,
+    batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
+    resume: bool = False,
+):
+    """``transform_ls_trajectories_to_cs`` into several CellString schemas from one pass:
+    each WKB is decoded and walked once (``linecover_multizoom``) for all variant zooms.
+    """
+    print(
+        f"\n--- Processing trajectories into {len(variants)} CellString variant(s) (using {max_workers} workers) ---"
+    )
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_trajectory_row_variants,
+        get_profile_settings("transform_trajs", metrics.run_id),
+    )
+    conn.execute("LOAD spatial")
+
+    def select_rows(batch_ids: list[int]) -> list[TrajRow]:
+        return [
+            (int(tid), int(mmsi), ts_start, ts_end, bytes(geom_wkb))
+            for tid, mmsi, ts_start, ts_end, geom_wkb in conn.execute(f"""
+                SELECT trajectory_id, mmsi, EXTRACT(EPOCH FROM ts_start) AS ts_start, EXTRACT(EPOCH FROM ts_end) AS ts_end, ST_AsWKB(geom)
+                FROM {input_schema}.trajectory_ls
+                WHERE trajectory_id IN ({','.join(map(str, batch_ids))})
+                ORDER BY trajectory_id;
+            """).fetchall()
+        ]
+
+    def insert_rows(
+        schema: str, zoom: int, batch: list[TrajRow], results: list[ProcessResultTraj]
+    ) -> int:
+        trajectory_end_by_id = {row[0]: row[3] for row in batch}
+        return insert_traj_cs_rows(conn, schema, results, trajectory_end_by_id, zoom)
+
+    total_cells_inserted = _transform_to_variants(
+        conn,
+        input_schema,
+        variants,
+        "trajectory_ls",
+        "trajectory_cs",
+        "trajectory_id",
+        "transform_trajs",
+        select_rows,
+        process_row,
+        insert_rows,
+        max_workers,
+        batch_size,
+        metrics,
+        resume,
+    )
+    print(
+        f"Finished processing trajectories into {len(variants)} CellString variant(s) ({total_cells_inserted:,} cells)"
+    )
+
+
+def transform_poly_stops_to_cs_variants(
+    conn: duckdb.DuckDBPyConnection,
+    input_schema: str,
+    variants: list[CsVariant],
+    max_workers: int = MAX_WORKERS,
+    batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
+    resume: bool = False,
+):
+    """``transform_poly_stops_to_cs`` into several CellString schemas from one pass: each
+    polygon is decoded and covered once (the z13/z17/z21 hierarchy) for all variant zooms.
+    """
+    print(
+        f"\n--- Processing stops into {len(variants)} CellString variant(s) (using {max_workers} workers) ---"
+    )
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_stop_row_variants,
+        get_profile_settings("transform_stops", metrics.run_id),
+    )
+    conn.execute("LOAD spatial")
+
+    def select_rows(batch_ids: list[int]) -> list[StopRow]:
+        return [
+            (int(sid), int(mmsi), ts_start, ts_end, bytes(geom_wkb))
+            for sid, mmsi, ts_start, ts_end, geom_wkb in conn.execute(f"""
+                SELECT stop_id, mmsi, EXTRACT(EPOCH FROM ts_start) AS ts_start, EXTRACT(EPOCH FROM ts_end) AS ts_end, ST_AsWKB(geom)
+                FROM {input_schema}.stop_poly
+                WHERE stop_id IN ({','.join(map(str, batch_ids))})
+                ORDER BY stop_id;
+            """).fetchall()
+        ]
+
+    def insert_rows(
+        schema: str, zoom: int, _batch: list[StopRow], results: list[ProcessResultStop]
+    ) -> int:
+        return insert_stop_cs_rows(conn, schema, results, zoom)
+
+    total_cells_inserted = _transform_to_variants(
+        conn,
+        input_schema,
+        variants,
+        "stop_poly",
+        "stop_cs",
+        "stop_id",
+        "transform_stops",
+        select_rows,
+        process_row,
+        insert_rows,
+        max_workers,
+        batch_size,
+        metrics,
+        resume,
+    )
+    print(
+        f"Finished processing stops into {len(variants)} CellString variant(s) ({total_cells_inserted:,} cells)"
+    )
@@ -4,12 +4,20 @@ import sys
 
 from db_setup.utils.db_utils import (
     get_ais_data_path,
+    get_construct_days_per_cycle,
+    get_construct_engine,
     get_cs_schema,
+    get_cs_variants,
     get_db_backend,
     get_db_path_or_url,
     get_ls_schema,
+    get_transform_engine,
+)
+from prompt_utils import (
+    parse_env_bool,
+    should_run_step,
+    should_run_step_with_fallback,
 )
-from prompt_utils import should_run_step, should_run_step_with_fallback
 
 
 def _get_num_workers() -> int:
@@ -44,6 +52,84 @@ def _ensure_schema_names(connection, backend: str, ls_schema: str, cs_schema: st
     raise ValueError(f"Unsupported database backend: {backend}")
 
 
+def _warn_ignored_by_cs_variants(cs_schema: str, cs_variants: list[tuple[str, int]]):
+    """Settings of the single-schema DuckDB transform that the variant pass does not use."""
+    ignored = [
+        name
+        for name, is_set in (
+            ("ETL_TRANSFORM_ENGINE", get_transform_engine() != "pool"),
+            ("ETL_STOP_COVER_CACHE_SIZE", bool(os.getenv("ETL_STOP_COVER_CACHE_SIZE"))),
+            ("ETL_STOP_COVER_SNAP_DEG", bool(os.getenv("ETL_STOP_COVER_SNAP_DEG"))),
+            (
+                "ETL_STOP_COVER_CACHE_DB",
+                bool(parse_env_bool("ETL_STOP_COVER_CACHE_DB")),
+            ),
+        )
+        if is_set
+    ]
+    if ignored:
+        print(
+            f"Warning: ETL_CS_VARIANTS is set, so {', '.join(ignored)} are ignored: the variant transform uses the worker pool without the stop cover cache."
+        )
+    if cs_schema not in {variant_schema for variant_schema, _ in cs_variants}:
+        print(
+            f"Warning: ETL_CS_VARIANTS is set, so CellStrings are not written to '{cs_schema}' (DUCKDB_CS_SCHEMA); list it as a variant to keep filling it."
+        )
+
+
+def _create_metrics_recorder(duckdb_connection=None, duckdb_schema: str | None = None):
+    """Metrics sinks from env: ETL_METRICS_PATH (JSON lines), ETL_METRICS_DB (DuckDB etl_metrics table)."""
+    from core.metrics import MetricsRecorder, get_metrics_jsonl_path
+
+    write_to_db = duckdb_connection is not None and bool(
+        parse_env_bool("ETL_METRICS_DB")
+    )
+    metrics = MetricsRecorder(
+        jsonl_path=get_metrics_jsonl_path(),
+        duckdb_conn=duckdb_connection if write_to_db else None,
+        duckdb_schema=duckdb_schema if write_to_db else None,
+    )
+    sinks = [
+        sink
+        for sink, enabled in (
+            (f"'{metrics.jsonl_path}'", metrics.jsonl_path),
+            (f"{duckdb_schema}.etl_metrics", write_to_db),
+        )
+        if enabled
+    ]
+    print(
+        f"Recording ETL metrics (run {metrics.run_id}) to {', '.join(sinks) if sinks else 'summary only'}."
+    )
+    return metrics
+
+
+def _write_profile_report(connection, ls_schema: str, metrics):
+    """With ETL_PROFILE set, write the slowest MMSIs/trajectories/stops next to the profiles."""
+    from core.profiling import get_profile_dir, write_slowest_report
+
+    profile_dir = get_profile_dir(metrics.run_id)
+    if profile_dir is None:
+        return
+
+    # Trajectory metrics count cells; add the AIS point count of the slowest ones
+    num_points_by_unit: dict[tuple[str, str], dict[str, int]] = {}
+    trajectory_ids = [
+        int(unit) for _, unit, _ in metrics.slowest("transform_trajs", "trajectory")
+    ]
+    if trajectory_ids:
+        rows = connection.execute(f"""
+            SELECT trajectory_id, ST_NPoints(geom)
+            FROM {ls_schema}.trajectory_ls
+            WHERE trajectory_id IN ({','.join(map(str, trajectory_ids))});
+        """).fetchall()
+        num_points_by_unit[("transform_trajs", "trajectory")] = {
+            str(trajectory_id): int(num_points) for trajectory_id, num_points in rows
+        }
+
+    out_path = write_slowest_report(metrics, profile_dir, num_points_by_unit)
+    print(f"Profiles and slowest units written to '{profile_dir}' ({out_path}).")
+
+
 def main():
     backend = get_db_backend()
     ls_schema = get_ls_schema(backend)
@@ -68,14 +154,25 @@ def main():
 def main_duckdb():
     import duckdb
 
+    from db_setup.duckdb.cluster_duckdb_cs_tables import cluster_duckdb_cs_tables
     from db_setup.duckdb.create_duckdb_points import create_duckdb_points
-    from db_setup.duckdb.create_duckdb_tables import create_duckdb_tables
+    from db_setup.duckdb.create_duckdb_tables import (
+        build_duckdb_deferred_indexes,
+        create_duckdb_schema,
+        create_duckdb_tables,
+    )
+    from core.cover_cache import get_cover_cache_settings
+    from core.profiling import get_profile_settings, profile_stage
     from db_setup.duckdb.drop_duckdb_tables import drop_duckdb_tables
     from duckdb_construct_trajs_stops import construct_trajectories_and_stops
     from duckdb_transform_ls_to_cs import (
         transform_ls_trajectories_to_cs,
         transform_poly_stops_to_cs,
     )
+    from duckdb_transform_variants import (
+        transform_ls_trajectories_to_cs_variants,
+        transform_poly_stops_to_cs_variants,
+    )
 
     print("Connecting to DuckDB...")
     db_path = get_db_path_or_url("duckdb")
@@ -96,6 +193,13 @@ def main_duckdb():
         connection.execute("LOAD spatial;")
         print("Spatial extension installed and loaded.")
         print(f"{num_workers} workers available for parallel processing.")
+        metrics = _create_metrics_recorder(connection, ls_schema)
+        resume = bool(parse_env_bool("ETL_RESUME"))
+        if resume:
+            print("Resuming construct and transform from their last checkpoints.")
+        bulk_load = bool(parse_env_bool("ETL_BULK_LOAD"))
+        if bulk_load:
+            print("Bulk load: primary keys and RTREE indexes are built after loading.")
 
         should_drop_ls_tables = should_run_step_with_fallback(
             env_var="ETL_DROP_LS",
@@ -124,34 +228,131 @@ def main_duckdb():
             _ensure_schema_names(connection, "duckdb", ls_schema, cs_schema)
 
         if should_run_step("ETL_CREATE_TABLES", "Do you want to create all tables?"):
-            create_duckdb_tables(connection, ls_schema, cs_schema)
+            create_duckdb_tables(connection, ls_schema, cs_schema, bulk_load)
 
         if should_run_step(
             "ETL_CREATE_POINTS",
             "Do you want to create or incrementally update points table from parquet files?",
             default_yes=True,
         ):
-            create_duckdb_points(
-                connection, ls_schema, ais_data_path=get_ais_data_path()
-            )
+            with profile_stage(get_profile_settings("ingest", metrics.run_id)):
+                create_duckdb_points(
+                    connection,
+                    ls_schema,
+                    ais_data_path=get_ais_data_path(),
+                    compact=bool(parse_env_bool("DUCKDB_POINTS_COMPACT")),
+                )
 
         if should_run_step(
             "ETL_CONSTRUCT", "Do you want to construct trajectories and stops?"
         ):
-            construct_trajectories_and_stops(
-                connection, ls_schema, ls_schema, num_workers
-            )
+            with profile_stage(get_profile_settings("construct", metrics.run_id)):
+                construct_trajectories_and_stops(
+                    connection,
+                    ls_schema,
+                    ls_schema,
+                    num_workers,
+                    metrics=metrics,
+                    days_per_cycle=get_construct_days_per_cycle(),
+                    cs_schema=cs_schema,
+                    resume=resume,
+                    engine=get_construct_engine(),
+                    cs_variant_schemas=[
+                        variant_schema for variant_schema, _ in get_cs_variants()
+                    ],
+                )
 
         if should_run_step(
             "ETL_TRANSFORM",
             "Do you want to transform trajectories/stops to CellStrings?",
         ):
-            transform_ls_trajectories_to_cs(
-                connection, ls_schema, cs_schema, num_workers, batch_size=3000
-            )
-            transform_poly_stops_to_cs(
-                connection, ls_schema, cs_schema, num_workers, batch_size=3000
-            )
+            cs_variants = get_cs_variants()
+            if cs_variants:
+                _warn_ignored_by_cs_variants(cs_schema, cs_variants)
+                # One pass over trajectory_ls/stop_poly writes every variant schema
+                for variant_schema, _ in cs_variants:
+                    create_duckdb_schema(connection, variant_schema)
+                    create_duckdb_tables(
+                        connection, ls_schema, variant_schema, bulk_load
+                    )
+                with profile_stage(
+                    get_profile_settings("transform_trajs", metrics.run_id)
+                ):
+                    transform_ls_trajectories_to_cs_variants(
+                        connection,
+                        ls_schema,
+                        cs_variants,
+                        num_workers,
+                        batch_size=3000,
+                        metrics=metrics,
+                        resume=resume,
+                    )
+                with profile_stage(
+                    get_profile_settings("transform_stops", metrics.run_id)
+                ):
+                    transform_poly_stops_to_cs_variants(
+                        connection,
+                        ls_schema,
+                        cs_variants,
+                        num_workers,
+                        batch_size=3000,
+                        metrics=metrics,
+                        resume=resume,
+                    )
+            else:
+                with profile_stage(
+                    get_profile_settings("transform_trajs", metrics.run_id)
+                ):
+                    transform_ls_trajectories_to_cs(
+                        connection,
+                        ls_schema,
+                        cs_schema,
+                        num_workers,
+                        batch_size=3000,
+                        metrics=metrics,
+                        resume=resume,
+                        engine=get_transform_engine(),
+                    )
+                with profile_stage(
+                    get_profile_settings("transform_stops", metrics.run_id)
+                ):
+                    transform_poly_stops_to_cs(
+                        connection,
+                        ls_schema,
+                        cs_schema,
+                        num_workers,
+                        batch_size=3000,
+                        metrics=metrics,
+                        resume=resume,
+                        engine=get_transform_engine(),
+                        cover_cache=get_cover_cache_settings(),
+                        persist_cover_cache=bool(
+                            parse_env_bool("ETL_STOP_COVER_CACHE_DB")
+                        ),
+                    )
+
+        if bulk_load:
+            with metrics.timer("build_indexes", "stage"):
+                for index_cs_schema in [cs_schema] + [
+                    variant_schema for variant_schema, _ in get_cs_variants()
+                ]:
+                    build_duckdb_deferred_indexes(
+                        connection, ls_schema, index_cs_schema
+                    )
+
+        if should_run_step(
+            "ETL_CLUSTER_CS",
+            "Do you want to re-cluster CellString tables by cell for faster cell lookups?",
+        ):
+            with metrics.timer("cluster_cs", "stage"):
+                for cluster_cs_schema in [cs_schema] + [
+                    variant_schema for variant_schema, _ in get_cs_variants()
+                ]:
+                    cluster_duckdb_cs_tables(connection, cluster_cs_schema)
+
+        metrics.flush()
+        print(metrics.summary())
+        _write_profile_report(connection, ls_schema, metrics)
     except KeyboardInterrupt:
         print("\nETL interrupted. Shutting down DuckDB connection...")
         raise SystemExit(130)
@@ -169,9 +370,11 @@ def main_duckdb():
 
 def main_postgres():
     from db_setup.postgresql.create_postgresql_tables import (
+        build_postgresql_deferred_indexes,
         create_postgresql_points,
         create_postgresql_tables,
     )
+    from core.profiling import get_profile_settings, profile_stage
     from db_setup.postgresql.drop_postgresql_tables import drop_postgresql_tables
     from db_setup.utils.connect import connect_to_postgres_db
     from pg_construct_trajs_stops import construct_trajectories_and_stops
@@ -184,6 +387,8 @@ def main_postgres():
     cs_schema = get_cs_schema("postgresql")
     num_workers = min(os.cpu_count() or 4, 16)
     connection = connect_to_postgres_db()
+    metrics = _create_metrics_recorder()
+    bulk_load = bool(parse_env_bool("ETL_BULK_LOAD"))
 
     should_drop_ls_tables = should_run_step_with_fallback(
         env_var="ETL_DROP_LS",
@@ -212,7 +417,7 @@ def main_postgres():
         _ensure_schema_names(connection, "postgresql", ls_schema, cs_schema)
 
     if should_run_step("ETL_CREATE_TABLES", "Do you want to create all tables?"):
-        create_postgresql_tables(connection, ls_schema, cs_schema)
+        create_postgresql_tables(connection, ls_schema, cs_schema, bulk_load)
 
     if should_run_step(
         "ETL_CREATE_POINTS",
@@ -224,18 +429,42 @@ def main_postgres():
     if should_run_step(
         "ETL_CONSTRUCT", "Do you want to construct trajectories and stops?"
     ):
-        construct_trajectories_and_stops(connection, ls_schema, ls_schema, num_workers)
+        with profile_stage(get_profile_settings("construct", metrics.run_id)):
+            construct_trajectories_and_stops(
+                connection, ls_schema, ls_schema, num_workers, metrics=metrics
+            )
 
     if should_run_step(
         "ETL_TRANSFORM", "Do you want to transform trajectories/stops to CellStrings?"
     ):
-        transform_ls_trajectories_to_cs(
-            connection, ls_schema, cs_schema, num_workers, batch_size=2000
-        )
-        transform_poly_stops_to_cs(
-            connection, ls_schema, cs_schema, num_workers, batch_size=2000
-        )
+        with profile_stage(get_profile_settings("transform_trajs", metrics.run_id)):
+            transform_ls_trajectories_to_cs(
+                connection,
+                ls_schema,
+                cs_schema,
+                num_workers,
+                batch_size=2000,
+                metrics=metrics,
+            )
+        with profile_stage(get_profile_settings("transform_stops", metrics.run_id)):
+            transform_poly_stops_to_cs(
+                connection,
+                ls_schema,
+                cs_schema,
+                num_workers,
+                batch_size=2000,
+                metrics=metrics,
+            )
+
+    if bulk_load:
+        with metrics.timer("build_indexes", "stage"):
+            build_postgresql_deferred_indexes(
+                connection, ls_schema, cs_schema, num_workers
+            )
 
+    metrics.flush()
+    print(metrics.summary())
+    _write_profile_report(connection, ls_schema, metrics)
     connection.close()
 
 
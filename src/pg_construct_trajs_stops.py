@@ -3,17 +3,21 @@ import time
 from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 from psycopg import Connection, Cursor
 from psycopg import sql
+from core.metrics import MetricsRecorder, worker_utilisation
 from core.points_to_ls_poly import (
     AISPointRow,
     DictInputPoint,
-    ProcessResult,
+    ProcessResultWithMetrics,
     Stop,
     Traj,
-    process_single_mmsi,
+    process_single_mmsi_with_metrics,
 )
+from core.profiling import get_profile_settings, profiled_task
 
 BATCH_SIZE = 50  # Number of MMSIs to process in parallel
-FutureResult = Future[ProcessResult]  # Future returning ProcessResult
+FutureResult = Future[
+    ProcessResultWithMetrics
+]  # Future returning ProcessResultWithMetrics
 
 
 def construct_trajectories_and_stops(
@@ -22,8 +26,14 @@ def construct_trajectories_and_stops(
     output_schema: str,
     max_workers: int = 4,
     batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
 ):
     """Construct trajectories and stops for all MMSIs in the database. Processes MMSIs in batches."""
+    metrics = metrics or MetricsRecorder()
+    process_mmsi = profiled_task(
+        process_single_mmsi_with_metrics,
+        get_profile_settings("construct", metrics.run_id),
+    )
     cur = conn.cursor()
     all_mmsis = get_mmsis(cur, points_schema, output_schema)
     cur.close()
@@ -68,28 +78,44 @@ def construct_trajectories_and_stops(
             points: DictInputPoint = get_points_for_mmsis_in_batch(
                 read_cur, points_schema, mmsis_in_batch
             )
-            print(f"{sum(len(pts) for pts in points.values()):,} points fetched.")
+            point_count = sum(len(pts) for pts in points.values())
+            fetch_time = time.perf_counter() - batch_start_time
+            print(f"{point_count:,} points fetched.")
 
             trajs_to_insert: list[Traj] = []
             stops_to_insert: list[Stop] = []
+            busy_time = 0.0
+            compute_start_time = time.perf_counter()
 
             # Parallel processing of the batch of MMSIs
             with ProcessPoolExecutor(max_workers=max_workers) as executor:
                 futures: dict[FutureResult, int] = {
-                    executor.submit(process_single_mmsi, mmsi, points[mmsi]): mmsi
+                    executor.submit(process_mmsi, mmsi, points[mmsi]): mmsi
                     for mmsi in mmsis_in_batch
                 }
 
                 for future in as_completed(futures):
                     mmsi = futures[future]
                     try:
-                        (mmsi, trajs, stops) = future.result()
+                        (mmsi, trajs, stops, mmsi_metrics) = future.result()
                         trajs_to_insert.extend(trajs)
                         stops_to_insert.extend(stops)
+                        busy_time += float(mmsi_metrics["time_total"])
+                        metrics.record(
+                            "construct",
+                            "mmsi",
+                            float(mmsi_metrics["time_total"]),
+                            rows=int(mmsi_metrics["num_points"]),
+                            unit=mmsi,
+                            **mmsi_metrics,
+                        )
                     except Exception as e:
                         print(f"Error processing MMSI {mmsi}: {e}")
                         continue
 
+            compute_time = time.perf_counter() - compute_start_time
+            insert_start_time = time.perf_counter()
+
             print(
                 f"Batch {batch_num} processed: {len(trajs_to_insert)} trajectories, {len(stops_to_insert)} stops. Inserting into database..."
             )
@@ -115,12 +141,33 @@ def construct_trajectories_and_stops(
                     )
 
             conn.commit()
+            insert_time = time.perf_counter() - insert_start_time
 
             print(
                 f"Batch {batch_num} inserted: {len(trajs_to_insert)} trajectories, {len(stops_to_insert)} stops."
             )
             elapsed_time = time.perf_counter() - start_time
             batch_time = time.perf_counter() - batch_start_time
+            metrics.record(
+                "construct",
+                "batch",
+                batch_time,
+                rows=point_count,
+                unit=batch_num,
+                num_mmsis=len(mmsis_in_batch),
+                num_trajs=len(trajs_to_insert),
+                num_stops=len(stops_to_insert),
+                fetch_s=fetch_time,
+                compute_s=compute_time,
+                insert_s=insert_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
+            print(
+                f"Fetch {fetch_time:.2f}s | Compute {compute_time:.2f}s | Insert {insert_time:.2f}s | "
+                f"Worker utilisation: {worker_utilisation(busy_time, compute_time, max_workers):.0%}"
+            )
             print(
                 f"Progress: {batch_num/num_batches*100:.2f}% | Elapsed time: {elapsed_time:.2f}s | Batch time: {batch_time:.2f}s | Avg per MMSI: {batch_time/batch_size:.2f}s"
             )
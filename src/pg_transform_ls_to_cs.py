@@ -1,7 +1,11 @@
+import time
 from concurrent.futures import Future, ProcessPoolExecutor, as_completed
 from psycopg import Connection, Cursor
 from psycopg import sql
 from psycopg.abc import Query
+from core.cellstring_utils import cellstring_ancestors
+from core.metrics import MetricsRecorder, TimedResult, call_timed
+from core.profiling import get_profile_settings, profiled_task
 from core.ls_poly_to_cs import (
     ProcessResultStop,
     ProcessResultTraj,
@@ -9,8 +13,7 @@ from core.ls_poly_to_cs import (
     process_trajectory_row,
 )
 
-FutureResultTraj = Future[ProcessResultTraj]
-FutureResultStop = Future[ProcessResultStop]
+FutureTimedResult = Future[TimedResult]  # (ProcessResultTraj | ProcessResultStop, duration_s, pid)
 
 BATCH_SIZE = 5000
 MAX_WORKERS = 4
@@ -39,8 +42,14 @@ def transform_ls_trajectories_to_cs(
     output_schema: str,
     max_workers: int = MAX_WORKERS,
     batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
 ):
     print(f"--- Processing trajectories (using {max_workers} workers) ---")
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_trajectory_row,
+        get_profile_settings("transform_trajs", metrics.run_id),
+    )
     total_processed = 0
     insert_traj_query = sql.SQL(
         """
@@ -65,16 +74,30 @@ def transform_ls_trajectories_to_cs(
         )
 
         for batch in get_batches(cur, get_trajs_query, batch_size):
+            batch_start_time = time.perf_counter()
             with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                futures: list[FutureResultTraj] = [
-                    executor.submit(process_trajectory_row, row) for row in batch
+                futures: list[FutureTimedResult] = [
+                    executor.submit(call_timed, process_row, row) for row in batch
                 ]
                 results: list[ProcessResultTraj] = []
+                busy_time = 0.0
                 for future in as_completed(futures):
                     try:
-                        results.append(future.result())
+                        result, duration, worker_pid = future.result()
+                        results.append(result)
+                        busy_time += duration
+                        metrics.record(
+                            "transform_trajs",
+                            "trajectory",
+                            duration,
+                            rows=len(result[2]),
+                            unit=result[0],
+                            worker_pid=worker_pid,
+                            mmsi=result[1],
+                        )
                     except Exception as e:
                         print(f"Worker error: {e}")
+            compute_time = time.perf_counter() - batch_start_time
 
             with connection.cursor() as insert_cur:
                 insert_cur.executemany(
@@ -85,14 +108,27 @@ def transform_ls_trajectories_to_cs(
                             mmsi,
                             cellstring_z21[0][1],
                             cellstring_z21[-1][1],
-                            [],
-                            [],
-                            [cells for cells, _ in cellstring_z21],
+                            cellstring_ancestors(cells, 13),
+                            cellstring_ancestors(cells, 17),
+                            cells,
                         )
                         for (trajectory_id, mmsi, cellstring_z21) in results
+                        for cells in ([cell for cell, _ in cellstring_z21],)
                     ],
                 )
             connection.commit()
+            metrics.record(
+                "transform_trajs",
+                "batch",
+                time.perf_counter() - batch_start_time,
+                rows=len(results),
+                num_trajs=len(results),
+                compute_s=compute_time,
+                insert_s=time.perf_counter() - batch_start_time - compute_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
 
             total_processed += len(results)
             print(f"Processed total: {total_processed:,} trajectories")
@@ -106,8 +142,13 @@ def transform_poly_stops_to_cs(
     output_schema: str,
     max_workers: int = MAX_WORKERS,
     batch_size: int = BATCH_SIZE,
+    metrics: MetricsRecorder | None = None,
 ):
     print(f"--- Processing stops (using {max_workers} workers) ---")
+    metrics = metrics or MetricsRecorder()
+    process_row = profiled_task(
+        process_stop_row, get_profile_settings("transform_stops", metrics.run_id)
+    )
     total_processed = 0
     insert_stop_query = sql.SQL(
         """
@@ -132,22 +173,44 @@ def transform_poly_stops_to_cs(
         )
 
         for batch in get_batches(cur, get_stops_query, batch_size):
+            batch_start_time = time.perf_counter()
             with ProcessPoolExecutor(max_workers=max_workers) as executor:
-                futures: list[FutureResultStop] = [
-                    executor.submit(process_stop_row, row) for row in batch
+                futures: list[FutureTimedResult] = [
+                    executor.submit(call_timed, process_row, row) for row in batch
                 ]
                 results: list[ProcessResultStop] = []
+                busy_time = 0.0
                 for future in as_completed(futures):
                     try:
-                        results.append(future.result())
+                        result, duration, worker_pid = future.result()
+                        results.append(result)
+                        busy_time += duration
+                        metrics.record(
+                            "transform_stops",
+                            "stop",
+                            duration,
+                            rows=len(result[4]),
+                            unit=result[0],
+                            worker_pid=worker_pid,
+                            mmsi=result[1],
+                        )
                     except Exception as e:
                         print(f"Worker error: {e}")
+            compute_time = time.perf_counter() - batch_start_time
 
             with connection.cursor() as insert_cur:
                 insert_cur.executemany(
                     insert_stop_query,
                     [
-                        (stop_id, mmsi, start_time, end_time, [], [], cellstring_z21)
+                        (
+                            stop_id,
+                            mmsi,
+                            start_time,
+                            end_time,
+                            cellstring_ancestors(cellstring_z21, 13),
+                            cellstring_ancestors(cellstring_z21, 17),
+                            cellstring_z21,
+                        )
                         for (
                             stop_id,
                             mmsi,
@@ -158,6 +221,18 @@ def transform_poly_stops_to_cs(
                     ],
                 )
             connection.commit()
+            metrics.record(
+                "transform_stops",
+                "batch",
+                time.perf_counter() - batch_start_time,
+                rows=len(results),
+                num_stops=len(results),
+                compute_s=compute_time,
+                insert_s=time.perf_counter() - batch_start_time - compute_time,
+                busy_s=busy_time,
+                capacity_s=compute_time * max_workers,
+            )
+            metrics.flush()
 
             total_processed += len(results)
             print(f"Processed total: {total_processed:,} stops")
@@ -0,0 +1,93 @@
+"""Synthetic AIS points shared by the construct tests.
+
+``create_points`` fills ``ls.points`` with one report per minute per vessel on each day, shaped
+by a named track; ``insert_point_rows`` adds hand-made rows for tests that need anomalies.
+"""
+
+from datetime import date
+
+import duckdb
+
+# Tracks: vessel shape over one day
+UNDERWAY = "underway"  # reports 06-18 h only, sailing east at 12 kn
+DAY_TRIP = "day_trip"  # reports all day, sailing 06-18 h, at the origin otherwise
+MOORED = "moored"  # reports all day at a berth, sog 0.1
+TRACKS = (UNDERWAY, DAY_TRIP, MOORED)
+
+_TRACK_SQL = {
+    # (first minute of the day, number of minutes, lat, lon, sog)
+    UNDERWAY: (
+        6 * 60,
+        12 * 60,
+        "56.0 + (mmsi % 10) * 0.1",
+        "10.0 + (minute - 360) * 0.002",
+        "12.0",
+    ),
+    DAY_TRIP: (
+        0,
+        24 * 60,
+        "56.5",
+        "CASE WHEN minute BETWEEN 360 AND 1079 THEN 10.0 + (minute - 360) * 0.002 ELSE 10.0 END",
+        "CASE WHEN minute BETWEEN 360 AND 1079 THEN 12.0 ELSE 0.0 END",
+    ),
+    MOORED: (0, 24 * 60, "56.15", "10.2 + (mmsi % 10) * 1e-3", "0.1"),
+}
+
+
+def create_ls_tables(conn: duckdb.DuckDBPyConnection):
+    """Create the ``ls`` schema with empty points, trajectory_ls and stop_poly tables."""
+    conn.execute("SET TimeZone = 'UTC';")
+    conn.execute("CREATE SCHEMA IF NOT EXISTS ls;")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ls.trajectory_ls (mmsi BIGINT, ts_start TIMESTAMP, ts_end TIMESTAMP);
+        CREATE TABLE IF NOT EXISTS ls.stop_poly (mmsi BIGINT, ts_start TIMESTAMP, ts_end TIMESTAMP);
+        CREATE TABLE IF NOT EXISTS ls.points (
+            mmsi BIGINT, lat DOUBLE, lon DOUBLE, sog DOUBLE, timestamp TIMESTAMP, epoch_ts DOUBLE
+        );
+    """)
+
+
+def create_points(
+    conn: duckdb.DuckDBPyConnection,
+    days: list[date],
+    mmsis: tuple[int, ...],
+    track: str = UNDERWAY,
+):
+    """Append one report per minute for each of ``mmsis`` on each of ``days``, following ``track``.
+
+    Rows are appended minute-major (as reports arrive), so repeated calls can add days or
+    vessels to the same tables.
+    """
+    if track not in _TRACK_SQL:
+        raise ValueError(f"Unknown track {track!r}, expected one of {TRACKS}")
+    create_ls_tables(conn)
+    if not days or not mmsis:
+        return
+    first_minute, num_minutes, lat, lon, sog = _TRACK_SQL[track]
+    day_list = ", ".join(f"DATE '{day.isoformat()}'" for day in days)
+    conn.execute(f"""
+        INSERT INTO ls.points
+        SELECT mmsi, {lat} AS lat, {lon} AS lon, {sog} AS sog, ts AS timestamp, epoch(ts) AS epoch_ts
+        FROM (
+            SELECT day + minute * INTERVAL 1 MINUTE AS ts, minute
+            FROM (SELECT unnest([{day_list}]) AS day),
+                (SELECT range AS minute FROM range({first_minute}, {first_minute + num_minutes}))
+        ),
+            (SELECT unnest({list(mmsis)}) AS mmsi)
+        ORDER BY ts, mmsi;
+    """)
+
+
+def insert_point_rows(
+    conn: duckdb.DuckDBPyConnection,
+    rows: list[tuple[int, float, float, float | None, float]],
+):
+    """Append (mmsi, lat, lon, sog, epoch_ts) rows as given."""
+    create_ls_tables(conn)
+    conn.executemany(
+        "INSERT INTO ls.points VALUES (?, ?, ?, ?, make_timestamp((? * 1e6)::BIGINT), ?)",
+        [
+            (mmsi, lat, lon, sog, epoch_ts, epoch_ts)
+            for mmsi, lat, lon, sog, epoch_ts in rows
+        ],
+    )
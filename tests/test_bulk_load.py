@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from db_setup.duckdb.create_duckdb_tables import (  # noqa: E402
+    add_deferred_primary_keys,
+)
+
+
+class TestDeferredPrimaryKeys(unittest.TestCase):
+
+    def setUp(self):
+        # As created in bulk-load mode (geometry as BLOB: no spatial extension in tests)
+        self.conn = duckdb.connect()
+        self.conn.execute("""
+            CREATE SCHEMA ls;
+            CREATE SCHEMA cs;
+            CREATE TABLE ls.trajectory_ls (trajectory_id INTEGER, mmsi BIGINT, geom BLOB);
+            CREATE TABLE ls.stop_poly (stop_id INTEGER PRIMARY KEY, mmsi BIGINT, geom BLOB);
+            CREATE TABLE cs.trajectory_cs_ancestors (trajectory_id INTEGER, mmsi BIGINT);
+            INSERT INTO ls.trajectory_ls VALUES (1, 100, ''), (2, 100, '');
+            INSERT INTO cs.trajectory_cs_ancestors VALUES (1, 100), (2, 100);
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_missing_primary_keys_are_added_once(self):
+        altered = add_deferred_primary_keys(self.conn, "ls", "cs")
+
+        # stop_poly already has its key and cs.stop_cs_ancestors does not exist
+        self.assertEqual(altered, ["ls.trajectory_ls", "cs.trajectory_cs_ancestors"])
+        with self.assertRaises(duckdb.ConstraintException):
+            self.conn.execute("INSERT INTO ls.trajectory_ls VALUES (2, 101, '')")
+        self.assertEqual(add_deferred_primary_keys(self.conn, "ls", "cs"), [])
+
+    def test_duplicate_keys_loaded_in_bulk_are_reported(self):
+        self.conn.execute("INSERT INTO cs.trajectory_cs_ancestors VALUES (2, 100)")
+
+        with self.assertRaises(duckdb.Error):
+            add_deferred_primary_keys(self.conn, "ls", "cs")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import mercantile  # noqa: E402
+import numpy as np  # noqa: E402
+
+from core.cellstring_utils import (  # noqa: E402
+    cellstring_ancestors,
+    grouped_cellstring_ancestors,
+    quadkey_int_ancestor,
+    quadkey_int_to_xy_array,
+    xy_to_quadkey_int_array,
+    xyz_to_quadkey_int,
+)
+
+
+class TestQuadkeyIntArithmetic(unittest.TestCase):
+
+    def test_vectorized_quadkey_matches_scalar(self):
+        tiles = [
+            mercantile.tile(10.383365, 57.056374, 21),
+            mercantile.tile(-123.120231, 49.290563, 21),
+            mercantile.tile(144.944281, -37.815050, 21),
+            mercantile.tile(-57.853151, -34.469250, 21),
+        ]
+        x = np.array([t.x for t in tiles])
+        y = np.array([t.y for t in tiles])
+
+        cells = xy_to_quadkey_int_array(x, y, 21)
+
+        self.assertEqual(
+            [int(c) for c in cells], [xyz_to_quadkey_int(21, t.x, t.y) for t in tiles]
+        )
+
+    def test_ancestor_matches_parent_tile(self):
+        tile = mercantile.tile(10.383365, 57.056374, 21)
+        cell_z21 = xyz_to_quadkey_int(21, tile.x, tile.y)
+
+        for zoom in (13, 17, 20):
+            parent = mercantile.parent(tile, zoom=zoom)
+            self.assertEqual(
+                quadkey_int_ancestor(cell_z21, 21, zoom),
+                xyz_to_quadkey_int(zoom, parent.x, parent.y),
+            )
+
+    def test_ancestor_rejects_finer_zoom(self):
+        with self.assertRaises(ValueError):
+            quadkey_int_ancestor(123, 13, 17)
+
+    def test_quadkey_to_xy_round_trip(self):
+        x = np.array([0, 1, 1_140_000, 2**21 - 1])
+        y = np.array([0, 2, 655_000, 2**21 - 1])
+
+        rx, ry = quadkey_int_to_xy_array(xy_to_quadkey_int_array(x, y, 21), 21)
+
+        self.assertEqual(rx.tolist(), x.tolist())
+        self.assertEqual(ry.tolist(), y.tolist())
+
+    def test_cellstring_ancestors_are_distinct_parent_tiles(self):
+        tiles = [
+            mercantile.tile(10.383365 + 0.0001 * i, 57.056374, 21) for i in range(200)
+        ]
+        cells = [xyz_to_quadkey_int(21, t.x, t.y) for t in tiles]
+
+        expected = sorted(
+            {
+                xyz_to_quadkey_int(17, p.x, p.y)
+                for p in (mercantile.parent(t, zoom=17) for t in tiles)
+            }
+        )
+
+        self.assertEqual(cellstring_ancestors(cells, 17), expected)
+        self.assertEqual(cellstring_ancestors([], 13), [])
+
+    def test_grouped_ancestors_match_per_id_ancestors(self):
+        rng = np.random.default_rng(1)
+        ids = rng.integers(1, 20, 1000)
+        cells = xy_to_quadkey_int_array(
+            rng.integers(1_100_000, 1_100_600, 1000),
+            rng.integers(650_000, 650_600, 1000),
+            21,
+        )
+
+        unique_ids, offsets, ancestors = grouped_cellstring_ancestors(ids, cells, 13)
+
+        self.assertEqual(unique_ids.tolist(), sorted(set(ids.tolist())))
+        for i, id_ in enumerate(unique_ids):
+            self.assertEqual(
+                ancestors[offsets[i] : offsets[i + 1]].tolist(),
+                cellstring_ancestors(cells[ids == id_].tolist(), 13),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from db_setup.duckdb.cluster_duckdb_cs_tables import (  # noqa: E402
+    cluster_duckdb_cs_table,
+)
+from db_setup.duckdb.cs_variant import ensure_cs_variant_zoom  # noqa: E402
+
+CS_SCHEMA = "cs"
+
+
+class TestClusterDuckdbCsTables(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute(f"CREATE SCHEMA {CS_SCHEMA};")
+        self.conn.execute(f"""
+            CREATE TABLE {CS_SCHEMA}.region_cs (
+                region_id INTEGER NOT NULL, name TEXT NOT NULL, cell_z21 UINT64 NOT NULL
+            );
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _insert(self, region_id: int, cells: list[int]):
+        for cell in cells:
+            self.conn.execute(
+                f"INSERT INTO {CS_SCHEMA}.region_cs VALUES (?, 'r', ?)",
+                [region_id, cell],
+            )
+
+    def _cells(self) -> list[int]:
+        return [
+            row[0]
+            for row in self.conn.execute(
+                f"SELECT cell_z21 FROM {CS_SCHEMA}.region_cs"
+            ).fetchall()
+        ]
+
+    def _state(self):
+        return self.conn.execute(
+            f"SELECT clustered_max_id, sorted_runs FROM {CS_SCHEMA}.cs_cluster_state"
+        ).fetchone()
+
+    def test_full_cluster_sorts_rows(self):
+        self._insert(1, [30, 10, 20])
+        self._insert(2, [25, 5])
+
+        rows = cluster_duckdb_cs_table(
+            self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21
+        )
+
+        self.assertEqual(rows, 5)
+        self.assertEqual(self._cells(), [5, 10, 20, 25, 30])
+        self.assertEqual(self._state(), (2, 1))
+
+    def test_variant_schema_prefix_uses_its_zoom(self):
+        self.conn.execute(f"""
+            CREATE TABLE {CS_SCHEMA}.stop_cs (stop_id INTEGER NOT NULL, cell_z21 UINT64 NOT NULL);
+        """)
+        ensure_cs_variant_zoom(self.conn, CS_SCHEMA, 17)
+        # z17 cells: the z13 prefix is cell >> 8, so stop 1 (prefix 1) sorts before stop 2
+        self.conn.execute(
+            f"INSERT INTO {CS_SCHEMA}.stop_cs VALUES (2, 0), (1, 256), (2, 512)"
+        )
+
+        cluster_duckdb_cs_table(self.conn, CS_SCHEMA, "stop_cs", cluster_zoom=13)
+
+        self.assertEqual(
+            self.conn.execute(
+                f"SELECT stop_id, cell_z21 FROM {CS_SCHEMA}.stop_cs"
+            ).fetchall(),
+            [(2, 0), (1, 256), (2, 512)],
+        )
+
+    def test_incremental_cluster_only_sorts_new_rows(self):
+        self._insert(1, [30, 10])
+        cluster_duckdb_cs_table(self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21)
+
+        self._insert(2, [20, 5])
+        rows = cluster_duckdb_cs_table(
+            self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21
+        )
+
+        # First run untouched, new rows appended as a second sorted run
+        self.assertEqual(rows, 2)
+        self.assertEqual(self._cells(), [10, 30, 5, 20])
+        self.assertEqual(self._state(), (2, 2))
+
+    def test_no_new_rows_is_noop(self):
+        self._insert(1, [30, 10])
+        cluster_duckdb_cs_table(self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21)
+
+        rows = cluster_duckdb_cs_table(
+            self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21
+        )
+
+        self.assertEqual(rows, 0)
+
+    def test_max_sorted_runs_triggers_full_rewrite(self):
+        self._insert(1, [30, 10])
+        cluster_duckdb_cs_table(self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21)
+        self._insert(2, [20, 5])
+
+        rows = cluster_duckdb_cs_table(
+            self.conn, CS_SCHEMA, "region_cs", cluster_zoom=21, max_sorted_runs=1
+        )
+
+        self.assertEqual(rows, 4)
+        self.assertEqual(self._cells(), [5, 10, 20, 30])
+        self.assertEqual(self._state(), (2, 1))
+
+    def test_coarse_prefix_keeps_region_rows_together(self):
+        # Same z13 prefix (cell >> 16) for both regions' first cells
+        self._insert(1, [(1 << 16) + 7, (2 << 16) + 1])
+        self._insert(2, [(1 << 16) + 3])
+
+        cluster_duckdb_cs_table(self.conn, CS_SCHEMA, "region_cs", cluster_zoom=13)
+
+        self.assertEqual(self._cells(), [(1 << 16) + 7, (1 << 16) + 3, (2 << 16) + 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+import unittest
+from dataclasses import replace
+from datetime import datetime, timezone
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from core.points_to_ls_poly import (  # noqa: E402
+    DEFAULT_CONSTRUCT_PARAMS,
+    process_single_mmsi_with_metrics,
+    sweep_single_mmsi,
+)
+from db_setup.utils.db_utils import format_table  # noqa: E402
+from duckdb_construct_sweep import (  # noqa: E402
+    build_param_grid,
+    summarize_sweep,
+    sweep_construct_params,
+)
+
+MMSI = 219000002
+
+
+def _track() -> list[tuple[float, float, float, float]]:
+    """(lon, lat, sog, epoch_ts) of a vessel reporting every minute from 06:00, with a
+    one-hour stop, a 10-minute slow-down, and a second one-hour stop 350 m further on.
+    """
+    start = datetime(2025, 1, 1, 6, tzinfo=timezone.utc).timestamp()
+    points = []
+    lon = 10.0
+    for minute in range(8 * 60):
+        stopped = 120 <= minute < 180 or 190 <= minute < 250
+        if not stopped:
+            lon += 0.0005 if 180 <= minute < 190 else 0.002
+        points.append((lon, 56.0, 0.2 if stopped else 12.0, start + minute * 60))
+    return points
+
+
+class TestConstructSweep(unittest.TestCase):
+
+    def test_default_params_match_the_construct(self):
+        points = _track()
+        _, trajs, stops, _ = process_single_mmsi_with_metrics(MMSI, points)
+        mmsi, (summary,) = sweep_single_mmsi(MMSI, points, [DEFAULT_CONSTRUCT_PARAMS])
+
+        self.assertEqual(mmsi, MMSI)
+        self.assertEqual(summary[:2], (len(trajs), len(stops)))
+        self.assertEqual(
+            summary[2], sum(ts_end - ts_start for _, ts_start, ts_end, _ in trajs)
+        )
+        self.assertEqual(summary[3], sum(stop[2] - stop[1] for stop in stops))
+
+    def test_each_params_set_is_constructed_independently(self):
+        points = _track()
+        params_list = [
+            replace(DEFAULT_CONSTRUCT_PARAMS, merge_distance_threshold=1.0),
+            DEFAULT_CONSTRUCT_PARAMS,
+            replace(DEFAULT_CONSTRUCT_PARAMS, merge_distance_threshold=1.0),
+            replace(DEFAULT_CONSTRUCT_PARAMS, stop_sog_threshold=0.1),
+        ]
+        _, summaries = sweep_single_mmsi(MMSI, points, params_list)
+
+        for params, summary in zip(params_list, summaries):
+            _, trajs, stops, _ = process_single_mmsi_with_metrics(MMSI, points, params)
+            self.assertEqual(summary[:2], (len(trajs), len(stops)))
+        # Shared segmentation results are not mutated by merging
+        self.assertEqual(summaries[0], summaries[2])
+        self.assertEqual(summaries[3][1], 0)
+
+    def test_param_grid(self):
+        grid = build_param_grid(
+            {"stop_sog_threshold": [0.5, 1.0], "min_stop_points": [3.0, 5.0, 7.0]}
+        )
+
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[1].min_stop_points, 5)
+        self.assertIsInstance(grid[1].min_stop_points, int)
+        self.assertEqual(
+            grid[1].merge_time_threshold, DEFAULT_CONSTRUCT_PARAMS.merge_time_threshold
+        )
+        self.assertEqual(build_param_grid({}), [DEFAULT_CONSTRUCT_PARAMS])
+        with self.assertRaises(ValueError):
+            build_param_grid({"stop_speed": [1.0]})
+
+    def test_sweep_writes_summary_rows(self):
+        conn = duckdb.connect()
+        conn.execute("SET TimeZone = 'UTC';")
+        conn.execute("""
+            CREATE SCHEMA ls;
+            CREATE TABLE ls.points (
+                mmsi BIGINT, lat DOUBLE, lon DOUBLE, sog DOUBLE, timestamp TIMESTAMP, epoch_ts DOUBLE
+            );
+        """)
+        conn.executemany(
+            "INSERT INTO ls.points VALUES (?, ?, ?, ?, make_timestamp((? * 1e6)::BIGINT), ?)",
+            [(MMSI, lat, lon, sog, ts, ts) for lon, lat, sog, ts in _track()],
+        )
+        params_list = build_param_grid({"merge_distance_threshold": [1.0, 1000.0]})
+
+        sweep_id = sweep_construct_params(conn, "ls", "ls", params_list, max_workers=1)
+
+        rows = conn.execute(
+            "SELECT params_index, params, mmsi, num_days, num_trajs, num_stops FROM ls.construct_sweep WHERE sweep_id = ? ORDER BY params_index",
+            [sweep_id],
+        ).fetchall()
+        _, summaries = sweep_single_mmsi(MMSI, _track(), params_list)
+        self.assertEqual(
+            [
+                (index, mmsi, days, trajs, stops)
+                for index, _, mmsi, days, trajs, stops in rows
+            ],
+            [(index, MMSI, 1, *summary[:2]) for index, summary in enumerate(summaries)],
+        )
+        self.assertEqual((rows[0][5], rows[1][5]), (2, 1))
+        self.assertEqual(json.loads(rows[1][1])["merge_distance_threshold"], 1000.0)
+        summary = summarize_sweep(conn, "ls", sweep_id)
+        self.assertEqual(summary.num_rows, 2)
+        # The CLI prints the summary without pandas
+        self.assertEqual(len(format_table(summary).splitlines()), 3)
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+from shapely import affinity, box  # noqa: E402
+
+import core.ls_poly_to_cs as ls_poly_to_cs  # noqa: E402
+from core.cover_cache import (  # noqa: E402
+    CoverCache,
+    cover_cache_keys,
+    reuse_cached_cover,
+)
+from core.ls_poly_to_cs import process_stop_row, process_stop_row_cached  # noqa: E402
+from db_setup.duckdb.stop_cover_cache import (  # noqa: E402
+    ensure_stop_cover_cache_table,
+    get_stored_covers,
+    store_covers,
+)
+
+BERTH = box(10.2, 56.15, 10.2006, 56.1503)
+SETTINGS = (16, 0.0001)
+
+
+def _cover(polygon) -> list[int]:
+    return process_stop_row((1, 0, 0, 0, polygon.wkb))[4]
+
+
+class TestCoverCache(unittest.TestCase):
+
+    def setUp(self):
+        ls_poly_to_cs._stop_cover_cache = None
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = CoverCache(2)
+        cache.put([b"a"], (b"a", [1]))
+        cache.put([b"b"], (b"b", [2]))
+        cache.get(b"a")
+        cache.put([b"c"], (b"c", [3]))
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(b"b"))
+        self.assertEqual(cache.get(b"a"), (b"a", [1]))
+
+    def test_identical_polygon_is_a_hit(self):
+        first, outcome = process_stop_row_cached((1, 7, 0, 10, BERTH.wkb), SETTINGS)
+        self.assertEqual(outcome, "miss")
+        with mock.patch.object(
+            ls_poly_to_cs, "convert_polygon_to_cellstrings"
+        ) as convert:
+            second, outcome = process_stop_row_cached(
+                (2, 8, 20, 30, BERTH.wkb), SETTINGS
+            )
+        convert.assert_not_called()
+        self.assertEqual(outcome, "hit")
+        self.assertEqual(second, (2, 8, 20, 30, first[4]))
+
+    def test_near_duplicate_is_reused_only_when_identical(self):
+        process_stop_row_cached((1, 7, 0, 10, BERTH.wkb), SETTINGS)
+        # Well within the same z21 cells as the berth
+        jittered = affinity.translate(BERTH, 1e-9, -1e-9)
+        result, outcome = process_stop_row_cached(
+            (2, 7, 20, 30, jittered.wkb), SETTINGS
+        )
+        self.assertEqual(outcome, "near")
+        self.assertEqual(result[4], _cover(jittered))
+
+        # Snaps to the same bounds but reaches into another column of cells
+        wider = box(10.2, 56.15, 10.200649, 56.1503)
+        self.assertEqual(
+            cover_cache_keys(wider.wkb, wider, SETTINGS[1])[1],
+            cover_cache_keys(BERTH.wkb, BERTH, SETTINGS[1])[1],
+        )
+        self.assertIsNone(reuse_cached_cover(wider, BERTH, _cover(BERTH)))
+        result, outcome = process_stop_row_cached((3, 7, 40, 50, wider.wkb), SETTINGS)
+        self.assertEqual(outcome, "miss")
+        self.assertEqual(result[4], _cover(wider))
+
+    def test_cache_off_computes_every_cover(self):
+        result, outcome = process_stop_row_cached((1, 7, 0, 10, BERTH.wkb), None)
+        self.assertEqual(outcome, "off")
+        self.assertEqual(result, process_stop_row((1, 7, 0, 10, BERTH.wkb)))
+
+    def test_stored_covers_round_trip(self):
+        conn = duckdb.connect()
+        conn.execute("CREATE SCHEMA cs;")
+        ensure_stop_cover_cache_table(conn, "cs")
+        keys = cover_cache_keys(BERTH.wkb, BERTH, SETTINGS[1])
+        store_covers(conn, "cs", {key: (b"stale", [1]) for key in keys})
+        store_covers(conn, "cs", {key: (BERTH.wkb, _cover(BERTH)) for key in keys})
+
+        stored = get_stored_covers(conn, "cs", keys + [b"missing"])
+        self.assertEqual(set(stored), set(keys))
+        with mock.patch.object(
+            ls_poly_to_cs, "convert_polygon_to_cellstrings"
+        ) as convert:
+            result, outcome = process_stop_row_cached(
+                (1, 7, 0, 10, BERTH.wkb), SETTINGS, list(stored.values())
+            )
+        convert.assert_not_called()
+        self.assertEqual(outcome, "hit")
+        self.assertEqual(result[4], _cover(BERTH))
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
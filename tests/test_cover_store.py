@@ -0,0 +1,121 @@
+import os
+import sys
+import unittest
+from functools import partial
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+from shapely import LineString, box  # noqa: E402
+
+from core.cover_store import (  # noqa: E402
+    LINECOVER,
+    POLYGON_COVER,
+    cover_store_keys,
+    decode_cells,
+    encode_cells,
+    get_or_compute_covers,
+)
+from core.ls_poly_to_cs import (  # noqa: E402
+    convert_linestring_to_cellstrings,
+    convert_polygon_to_cellstrings,
+)
+from db_setup.duckdb.cover_store import load_covers, save_covers  # noqa: E402
+
+REGION = box(11.30, 57.540, 11.32, 57.549)
+# Heads west then north, so its traversal order is not the sorted order
+PASSAGE = LineString([(11.32, 57.540), (11.30, 57.541), (11.30, 57.549)])
+
+
+class TestCoverStore(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute("CREATE SCHEMA ls;")
+        self.computed = 0
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _covers(self, geom_wkb: bytes, algorithm: str = POLYGON_COVER):
+        def compute():
+            self.computed += 1
+            return dict(zip((13, 17, 21), convert_polygon_to_cellstrings(REGION)))
+
+        return get_or_compute_covers(
+            geom_wkb,
+            algorithm,
+            (17, 21),
+            partial(load_covers, self.conn, "ls"),
+            partial(save_covers, self.conn, "ls"),
+            compute,
+        )
+
+    def test_encoding_round_trips_sorted_unique_cells(self):
+        cells = [2**63 + 5, 7, 3, 7, 2**40]
+        blob = encode_cells(cells)
+
+        self.assertEqual(decode_cells(blob), sorted(set(cells)))
+        self.assertEqual(decode_cells(encode_cells([])), [])
+        contiguous = list(range(10**12, 10**12 + 100_000))
+        self.assertLess(len(encode_cells(contiguous)), len(contiguous))
+
+    def test_ordered_encoding_keeps_order_and_repeats(self):
+        cells = [2**41 + 5, 7, 3, 7, 2**40, 2**41 + 5]
+
+        self.assertEqual(decode_cells(encode_cells(cells, True), True), cells)
+        self.assertEqual(decode_cells(encode_cells([], True), True), [])
+
+    def test_linecover_round_trips_in_traversal_order(self):
+        expected = dict(zip((13, 17, 21), convert_linestring_to_cellstrings(PASSAGE)))
+        self.assertNotEqual(expected[21], sorted(expected[21]))
+
+        def compute():
+            self.computed += 1
+            return expected
+
+        covers = [
+            get_or_compute_covers(
+                PASSAGE.wkb,
+                LINECOVER,
+                (13, 17, 21),
+                partial(load_covers, self.conn, "ls"),
+                partial(save_covers, self.conn, "ls"),
+                compute,
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual(self.computed, 1)
+        self.assertEqual([from_store for _, from_store in covers], [False, True])
+        for cover, _ in covers:
+            self.assertEqual(cover, expected)
+
+    def test_stored_cover_is_reused(self):
+        first, from_store = self._covers(REGION.wkb)
+        self.assertFalse(from_store)
+        second, from_store = self._covers(REGION.wkb)
+
+        self.assertTrue(from_store)
+        self.assertEqual(self.computed, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(second[21], sorted(convert_polygon_to_cellstrings(REGION)[2]))
+
+    def test_key_separates_geometries_and_algorithms(self):
+        self._covers(REGION.wkb)
+        self._covers(REGION.wkb, LINECOVER)
+        self._covers(box(11.30, 57.540, 11.32, 57.5491).wkb)
+
+        self.assertEqual(self.computed, 3)
+        stored = load_covers(
+            self.conn,
+            "ls",
+            list(cover_store_keys(REGION.wkb, POLYGON_COVER, (21, 13)).values()),
+        )
+        self.assertEqual({key[1] for key in stored}, {21})
+
+
+if __name__ == "__main__":
+    unittest.main()
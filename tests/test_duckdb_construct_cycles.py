@@ -0,0 +1,129 @@
+import os
+import sys
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+import duckdb_construct_trajs_stops  # noqa: E402
+from core.metrics import MetricsRecorder  # noqa: E402
+from duckdb_construct_trajs_stops import (  # noqa: E402
+    construct_trajectories_and_stops,
+    get_points_for_days_duckdb,
+)
+from points_fixtures import DAY_TRIP, MOORED, create_points  # noqa: E402
+
+FIRST_DAY = date(2025, 1, 1)
+
+
+def _create_points(conn: duckdb.DuckDBPyConnection, num_days: int = 3):
+    """Two moored vessels and two vessels on day trips, for ``num_days`` days."""
+    days = [FIRST_DAY + timedelta(days=i) for i in range(num_days)]
+    create_points(conn, days, (219000001, 219000002), track=MOORED)
+    create_points(conn, days, (219000003, 219000004), track=DAY_TRIP)
+
+
+class TestConstructCycles(unittest.TestCase):
+
+    def _construct(self, days_per_cycle: int):
+        conn = duckdb.connect()
+        _create_points(conn)
+        inserted: dict[str, list] = {"trajs": [], "stops": []}
+
+        def capture(_conn, _schema, trajs, stops):
+            inserted["trajs"].extend(trajs)
+            inserted["stops"].extend(stops)
+
+        metrics = MetricsRecorder()
+        with mock.patch.object(
+            duckdb_construct_trajs_stops, "insert_trajs_and_stops_duckdb", capture
+        ):
+            construct_trajectories_and_stops(
+                conn, "ls", "ls", 2, metrics=metrics, days_per_cycle=days_per_cycle
+            )
+        conn.close()
+        return sorted(inserted["trajs"]), sorted(inserted["stops"]), metrics
+
+    def test_points_are_grouped_by_mmsi_and_day(self):
+        conn = duckdb.connect()
+        _create_points(conn)
+        conn.execute(
+            "CREATE TABLE ls.construct_watermarks (mmsi BIGINT, last_ts TIMESTAMP);"
+        )
+        points = get_points_for_days_duckdb(
+            conn,
+            "ls",
+            "ls.construct_watermarks",
+            [FIRST_DAY, FIRST_DAY + timedelta(days=1)],
+        )
+        conn.close()
+
+        self.assertEqual(len(points), 8)
+        self.assertEqual(len(points[(219000001, FIRST_DAY)]), 24 * 60)
+        timestamps = [p[3] for p in points[(219000003, FIRST_DAY)]]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_storage_order_read_matches_sorted_query(self):
+        conn = duckdb.connect()
+        _create_points(conn)
+        conn.execute("""
+            CREATE TABLE ls.construct_watermarks AS
+            SELECT 219000003 AS mmsi, TIMESTAMP '2025-01-02 12:00' AS last_ts;
+        """)
+        days = [FIRST_DAY, FIRST_DAY + timedelta(days=1)]
+        expected: dict = {}
+        for mmsi, day, lon, lat, sog, ts in conn.execute("""
+            SELECT p.mmsi, DATE(p.timestamp), p.lon, p.lat, p.sog, p.epoch_ts
+            FROM ls.points p
+            LEFT JOIN ls.construct_watermarks w ON w.mmsi = p.mmsi
+            WHERE p.timestamp < TIMESTAMP '2025-01-03'
+              AND (w.last_ts IS NULL OR p.timestamp > w.last_ts)
+            ORDER BY p.mmsi, p.epoch_ts;
+        """).fetchall():
+            expected.setdefault((mmsi, day), []).append((lon, lat, sog, ts))
+
+        # Minute-major rows need the sort fallback, clustered rows are read as stored
+        conn.execute("""
+            CREATE OR REPLACE TABLE ls.points AS
+            SELECT * FROM ls.points ORDER BY epoch_ts, mmsi;
+        """)
+        unclustered = get_points_for_days_duckdb(
+            conn, "ls", "ls.construct_watermarks", days
+        )
+        conn.execute("""
+            CREATE OR REPLACE TABLE ls.points AS
+            SELECT * FROM ls.points ORDER BY CAST(timestamp AS DATE), mmsi, epoch_ts;
+        """)
+        clustered = get_points_for_days_duckdb(
+            conn, "ls", "ls.construct_watermarks", days
+        )
+        conn.close()
+
+        self.assertEqual(len(expected[(219000003, FIRST_DAY + timedelta(days=1))]), 719)
+        self.assertNotIn((219000003, FIRST_DAY), expected)
+        self.assertEqual(unclustered, expected)
+        self.assertEqual(clustered, expected)
+
+    def test_output_does_not_depend_on_cycle_size(self):
+        daily_trajs, daily_stops, daily_metrics = self._construct(1)
+        cycle_trajs, cycle_stops, cycle_metrics = self._construct(2)
+
+        self.assertTrue(daily_trajs and daily_stops)
+        self.assertEqual(cycle_trajs, daily_trajs)
+        self.assertEqual(cycle_stops, daily_stops)
+        self.assertEqual(daily_metrics.totals("construct", "day")["count"], 3)
+        self.assertEqual(cycle_metrics.totals("construct", "cycle")["count"], 1)
+        self.assertEqual(cycle_metrics.totals("construct", "day")["count"], 1)
+        self.assertEqual(
+            cycle_metrics.totals("construct", "run")["rows"], 3 * 24 * 60 * 4
+        )
+        self.assertEqual(cycle_metrics.totals("construct", "mmsi")["count"], 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+import duckdb_construct_trajs_stops  # noqa: E402
+from duckdb_construct_trajs_stops import (  # noqa: E402
+    construct_trajectories_and_stops,
+    ensure_construct_watermarks_duckdb,
+)
+from points_fixtures import create_points  # noqa: E402
+
+SKEWED = 219000001
+UNDERWAY = 219000002
+VESSELS = (SKEWED, UNDERWAY)
+
+
+def _watermarks(conn: duckdb.DuckDBPyConnection) -> dict[int, datetime]:
+    return dict(
+        conn.execute("SELECT mmsi, last_ts FROM ls.construct_watermarks").fetchall()
+    )
+
+
+class TestConstructWatermarks(unittest.TestCase):
+
+    def _construct(
+        self, conn: duckdb.DuckDBPyConnection, days_per_cycle: int = 1
+    ) -> list:
+        inserted: list = []
+
+        def capture(_conn, _schema, trajs, _stops):
+            inserted.extend(trajs)
+
+        with mock.patch.object(
+            duckdb_construct_trajs_stops, "insert_trajs_and_stops_duckdb", capture
+        ):
+            construct_trajectories_and_stops(
+                conn, "ls", "ls", 2, days_per_cycle=days_per_cycle
+            )
+        return inserted
+
+    def _traj_days(self, trajs: list) -> set[tuple[int, date]]:
+        return {
+            (mmsi, datetime.fromtimestamp(ts_start, timezone.utc).date())
+            for mmsi, ts_start, _, _ in trajs
+        }
+
+    def test_skewed_vessel_does_not_hide_other_vessels_points(self):
+        conn = duckdb.connect()
+        create_points(conn, [date(2025, 1, 1), date(2025, 1, 2)], VESSELS)
+        # One vessel reported a far-future timestamp in an earlier run
+        conn.execute(
+            "INSERT INTO ls.trajectory_ls VALUES (?, ?, ?), (?, ?, ?)",
+            [
+                SKEWED,
+                datetime(2030, 1, 1),
+                datetime(2030, 1, 1, 1),
+                UNDERWAY,
+                datetime(2025, 1, 1, 6),
+                datetime(2025, 1, 1, 17, 59),
+            ],
+        )
+
+        trajs = self._construct(conn)
+
+        self.assertEqual(self._traj_days(trajs), {(UNDERWAY, date(2025, 1, 2))})
+        self.assertEqual(
+            _watermarks(conn),
+            {SKEWED: datetime(2030, 1, 1, 1), UNDERWAY: datetime(2025, 1, 2, 17, 59)},
+        )
+        conn.close()
+
+    def test_runs_resume_from_each_vessels_watermark(self):
+        conn = duckdb.connect()
+        create_points(conn, [date(2025, 1, 1)], VESSELS)
+        first_run = self._construct(conn)
+        self.assertEqual(
+            self._traj_days(first_run),
+            {(SKEWED, date(2025, 1, 1)), (UNDERWAY, date(2025, 1, 1))},
+        )
+        self.assertEqual(self._construct(conn), [])
+
+        # New points of one vessel only: the next run fetches just those
+        create_points(conn, [date(2025, 1, 2)], (UNDERWAY,))
+        third_run = self._construct(conn)
+
+        self.assertEqual(self._traj_days(third_run), {(UNDERWAY, date(2025, 1, 2))})
+        self.assertEqual(_watermarks(conn)[SKEWED], datetime(2025, 1, 1, 17, 59))
+        conn.close()
+
+    def test_failed_day_is_constructed_once_by_the_next_run(self):
+        process_mmsi = duckdb_construct_trajs_stops.process_single_mmsi_with_metrics
+        failed_day = datetime(2025, 1, 2, tzinfo=timezone.utc).timestamp()
+
+        def fail_second_day(mmsi, points, *args):
+            if mmsi == SKEWED and 0 <= points[0][3] - failed_day < 24 * 3600:
+                raise RuntimeError("worker crashed")
+            return process_mmsi(mmsi, points, *args)
+
+        for days_per_cycle in (1, 3):
+            with self.subTest(days_per_cycle=days_per_cycle):
+                conn = duckdb.connect()
+                create_points(
+                    conn,
+                    [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)],
+                    VESSELS,
+                )
+                with mock.patch.multiple(
+                    duckdb_construct_trajs_stops,
+                    ProcessPoolExecutor=ThreadPoolExecutor,
+                    process_single_mmsi_with_metrics=fail_second_day,
+                ):
+                    first_run = self._construct(conn, days_per_cycle)
+                second_run = self._construct(conn, days_per_cycle)
+
+                self.assertNotIn((SKEWED, date(2025, 1, 3)), self._traj_days(first_run))
+                trajs = first_run + second_run
+                self.assertEqual(len(trajs), len(set(trajs)))
+                self.assertEqual(len(self._traj_days(trajs)), 6)
+                conn.close()
+
+    def test_watermarks_are_seeded_from_constructed_rows(self):
+        conn = duckdb.connect()
+        create_points(conn, [], VESSELS)
+        conn.execute(
+            "INSERT INTO ls.trajectory_ls VALUES (?, ?, ?)",
+            [UNDERWAY, datetime(2025, 1, 1, 6), datetime(2025, 1, 1, 12)],
+        )
+        conn.execute(
+            "INSERT INTO ls.stop_poly VALUES (?, ?, ?)",
+            [UNDERWAY, datetime(2025, 1, 1, 12), datetime(2025, 1, 1, 14)],
+        )
+
+        ensure_construct_watermarks_duckdb(conn, "ls")
+        ensure_construct_watermarks_duckdb(conn, "ls")
+
+        self.assertEqual(_watermarks(conn), {UNDERWAY: datetime(2025, 1, 1, 14)})
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
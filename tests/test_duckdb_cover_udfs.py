@@ -0,0 +1,174 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+from shapely import box, from_wkt  # noqa: E402
+
+from core.cellstring_utils import cellstring_ancestors  # noqa: E402
+from core.ls_poly_to_cs import process_stop_row, process_trajectory_row  # noqa: E402
+from core.metrics import MetricsRecorder  # noqa: E402
+from db_setup.duckdb.etl_checkpoints import (  # noqa: E402
+    ensure_etl_checkpoints_table,
+    get_checkpoints,
+)
+from duckdb_transform_ls_to_cs import (  # noqa: E402
+    LINECOVER_UDF,
+    TEMP_TRANSFORM_IDS,
+    calculate_exit_timestamps,
+    register_cover_udfs,
+    transform_with_cover_udf,
+)
+
+START_TS = 1_735_725_600  # 2025-01-01 10:00 UTC
+TRAJECTORIES = {
+    1: f"LINESTRING M (10.0 56.0 {START_TS}, 10.003 56.001 {START_TS + 120})",
+    2: f"LINESTRING M (10.2 56.1 {START_TS}, 10.2 56.102 {START_TS + 300})",
+    3: f"LINESTRING M (11.0 55.5 {START_TS}, 11.001 55.5 {START_TS + 60}, 11.001 55.501 {START_TS + 90})",
+}
+STOP = box(10.2, 56.15, 10.2006, 56.1503)
+
+
+def _expected_traj_cells(trajectory_id: int) -> list[tuple[int, int, int]]:
+    wkb = from_wkt(TRAJECTORIES[trajectory_id]).wkb
+    _, _, cells_with_ts = process_trajectory_row((trajectory_id, 0, 0, 0, wkb))
+    ts_end = from_wkt(TRAJECTORIES[trajectory_id]).coords[-1][2]
+    return [
+        (cell, int(ts_entry), ts_exit)
+        for (cell, ts_entry), ts_exit in zip(
+            cells_with_ts, calculate_exit_timestamps(cells_with_ts, ts_end)
+        )
+    ]
+
+
+class TestCoverUdfs(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute("SET TimeZone = 'UTC';")
+        self.conn.execute("""
+            CREATE SCHEMA ls;
+            CREATE TABLE ls.trajectory_ls (
+                trajectory_id INTEGER, mmsi BIGINT, ts_end DOUBLE, geom_wkb BLOB
+            );
+            CREATE TABLE ls.trajectory_cs (
+                trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                ts_entry TIMESTAMP NOT NULL, ts_exit TIMESTAMP NOT NULL,
+                cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE ls.trajectory_cs_ancestors (
+                trajectory_id INTEGER PRIMARY KEY, mmsi BIGINT NOT NULL,
+                cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+            );
+        """)
+        for trajectory_id, wkt in TRAJECTORIES.items():
+            linestring = from_wkt(wkt)
+            self.conn.execute(
+                "INSERT INTO ls.trajectory_ls VALUES (?, ?, ?, ?)",
+                [
+                    trajectory_id,
+                    100 + trajectory_id,
+                    linestring.coords[-1][2],
+                    linestring.wkb,
+                ],
+            )
+        ensure_etl_checkpoints_table(self.conn, "ls")
+        register_cover_udfs(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_linecover_udf_matches_worker_function(self):
+        rows = self.conn.execute(f"""
+            SELECT trajectory_id, {LINECOVER_UDF}(geom_wkb, ts_end)
+            FROM ls.trajectory_ls ORDER BY trajectory_id
+        """).fetchall()
+
+        for trajectory_id, cells in rows:
+            expected = _expected_traj_cells(trajectory_id)
+            self.assertTrue(expected)
+            self.assertEqual(
+                [
+                    (cell["cell_z21"], cell["ts_entry"], cell["ts_exit"])
+                    for cell in cells
+                ],
+                expected,
+            )
+
+    def test_polygon_cover_udf_matches_worker_function(self):
+        register_cover_udfs(self.conn)  # re-registering replaces the functions
+        (cells,) = self.conn.execute(
+            "SELECT cs_polygon_cover(?)", [STOP.wkb]
+        ).fetchone()
+
+        self.assertEqual(cells, process_stop_row((1, 0, 0, 0, STOP.wkb))[4])
+        self.assertGreater(len(cells), 1)
+
+    def test_transform_commits_chunks_with_ancestors_and_checkpoints(self):
+        metrics = MetricsRecorder()
+        num_cells = transform_with_cover_udf(
+            self.conn,
+            "ls",
+            [1, 3],
+            "trajectory_cs",
+            "trajectory_id",
+            "transform_trajs",
+            f"""
+            SELECT
+                trajectory_id,
+                mmsi,
+                make_timestamp(cell.ts_entry * 1000000),
+                make_timestamp(cell.ts_exit * 1000000),
+                cell.cell_z21
+            FROM (
+                SELECT trajectory_id, mmsi, unnest({LINECOVER_UDF}(geom_wkb, ts_end)) AS cell
+                FROM ls.trajectory_ls
+                WHERE trajectory_id IN (SELECT id FROM {TEMP_TRANSFORM_IDS} WHERE id BETWEEN ? AND ?)
+            )""",
+            1,
+            metrics,
+        )
+
+        rows = self.conn.execute("""
+            SELECT trajectory_id, mmsi, cell_z21, epoch(ts_entry)::BIGINT, epoch(ts_exit)::BIGINT
+            FROM ls.trajectory_cs ORDER BY trajectory_id, ts_entry, rowid
+        """).fetchall()
+        expected = [
+            (trajectory_id, 100 + trajectory_id, cell, ts_entry, ts_exit)
+            for trajectory_id in (1, 3)
+            for cell, ts_entry, ts_exit in _expected_traj_cells(trajectory_id)
+        ]
+        self.assertEqual(rows, expected)
+        self.assertEqual(num_cells, len(expected))
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT trajectory_id, cellstring_z13 FROM ls.trajectory_cs_ancestors ORDER BY 1"
+            ).fetchall(),
+            [
+                (
+                    trajectory_id,
+                    cellstring_ancestors(
+                        [row[2] for row in expected if row[0] == trajectory_id], 13
+                    ),
+                )
+                for trajectory_id in (1, 3)
+            ],
+        )
+        self.assertEqual(
+            get_checkpoints(self.conn, "ls", "transform_trajs"), ["1", "3"]
+        )
+        self.assertEqual(
+            sorted(
+                (unit, rows)
+                for _, unit, rows in metrics.slowest("transform_trajs", "batch")
+            ),
+            [("1", len(_expected_traj_cells(1))), ("2", len(_expected_traj_cells(3)))],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from core.cellstring_utils import cellstring_ancestors  # noqa: E402
+from db_setup.duckdb.pyarrow_schemas import TRAJ_CS_ANCESTORS_SCHEMA  # noqa: E402
+from duckdb_transform_ls_to_cs import (  # noqa: E402
+    backfill_cs_ancestors,
+    build_ancestors_arrow_table,
+)
+
+CS_SCHEMA = "cs"
+CELLS = {
+    1: [4_000_000_000_001, 4_000_000_000_002, 4_000_000_070_000, 4_000_000_000_001],
+    2: [5_000_000_000_000, 5_000_000_000_100],
+}
+
+
+class TestDuckdbCsAncestors(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute(f"CREATE SCHEMA {CS_SCHEMA};")
+        self.conn.execute(f"""
+            CREATE TABLE {CS_SCHEMA}.trajectory_cs (
+                trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                ts_entry TIMESTAMP NOT NULL, ts_exit TIMESTAMP NOT NULL,
+                cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.stop_cs (
+                stop_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                ts_start TIMESTAMP NOT NULL, ts_end TIMESTAMP NOT NULL,
+                cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.trajectory_cs_ancestors (
+                trajectory_id INTEGER PRIMARY KEY, mmsi BIGINT NOT NULL,
+                cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.stop_cs_ancestors (
+                stop_id INTEGER PRIMARY KEY, mmsi BIGINT NOT NULL,
+                cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+            );
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _expected(self) -> list[tuple]:
+        return [
+            (
+                id_,
+                100 + id_,
+                cellstring_ancestors(cells, 13),
+                cellstring_ancestors(cells, 17),
+            )
+            for id_, cells in CELLS.items()
+        ]
+
+    def _ancestor_rows(self) -> list[tuple]:
+        return self.conn.execute(
+            f"SELECT * FROM {CS_SCHEMA}.trajectory_cs_ancestors ORDER BY trajectory_id"
+        ).fetchall()
+
+    def test_build_ancestors_arrow_table(self):
+        ids = [id_ for id_, cells in CELLS.items() for _ in cells]
+        cells = [cell for cells in CELLS.values() for cell in cells]
+
+        arrow_table = build_ancestors_arrow_table(
+            "trajectory_id", ids, cells, {1: 101, 2: 102}, TRAJ_CS_ANCESTORS_SCHEMA
+        )
+        self.conn.execute(
+            f"INSERT INTO {CS_SCHEMA}.trajectory_cs_ancestors SELECT * FROM arrow_table"
+        )
+
+        self.assertEqual(self._ancestor_rows(), self._expected())
+
+    def test_backfill_matches_python_ancestors(self):
+        for id_, cells in CELLS.items():
+            for cell in cells:
+                self.conn.execute(
+                    f"INSERT INTO {CS_SCHEMA}.trajectory_cs VALUES (?, ?, '2025-01-01', '2025-01-01', ?)",
+                    [id_, 100 + id_, cell],
+                )
+
+        backfill_cs_ancestors(self.conn, CS_SCHEMA)
+        backfill_cs_ancestors(self.conn, CS_SCHEMA)  # idempotent
+
+        self.assertEqual(self._ancestor_rows(), self._expected())
+
+    def test_backfill_skips_filled_ancestor_tables(self):
+        self.test_backfill_matches_python_ancestors()
+        # A CellString row without ancestors next to a filled table is not a migration
+        self.conn.execute(
+            f"INSERT INTO {CS_SCHEMA}.trajectory_cs VALUES (3, 103, '2025-01-01', '2025-01-01', 1)"
+        )
+
+        backfill_cs_ancestors(self.conn, CS_SCHEMA)
+
+        self.assertEqual(self._ancestor_rows(), self._expected())
+
+
+if __name__ == "__main__":
+    unittest.main()
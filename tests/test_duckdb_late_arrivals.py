@@ -0,0 +1,390 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+import duckdb_construct_trajs_stops  # noqa: E402
+from db_setup.duckdb.create_duckdb_points import (  # noqa: E402
+    create_duckdb_points,
+    filter_files_by_watermark_and_period,
+    points_in_time_range,
+)
+from duckdb_construct_trajs_stops import (  # noqa: E402
+    construct_trajectories_and_stops,
+    get_points_for_days_duckdb,
+    get_reprocess_keys_duckdb,
+)
+
+FIRST_DAY = date(2025, 1, 1)
+MOORED = 219000001
+UNDERWAY = 219000003
+
+
+def _write_day_file(folder: str, day: date, minutes: range, mmsis: list[int]):
+    """One AIS report per minute and MMSI, in the DMA parquet layout."""
+    start = datetime(day.year, day.month, day.day)
+    rows = [(mmsi, minute) for mmsi in mmsis for minute in minutes]
+    pq.write_table(
+        pa.table(
+            {
+                "mmsi": pa.array([mmsi for mmsi, _ in rows], type=pa.int64()),
+                "lat": [56.15 + minute * 1e-6 for _, minute in rows],
+                "lon": [10.2 for _ in rows],
+                "sog": [0.1 for _ in rows],
+                "timestamp": pa.array(
+                    [start + timedelta(minutes=minute) for _, minute in rows],
+                    type=pa.timestamp("us"),
+                ),
+                "transponder_type": ["class a" for _ in rows],
+            }
+        ),
+        os.path.join(folder, f"aisdk-{day.isoformat()}.pq"),
+    )
+
+
+class TestRepublishedFiles(unittest.TestCase):
+    compact = False
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = duckdb.connect()
+        self.conn.execute("SET TimeZone = 'UTC';")
+        self.conn.execute("CREATE SCHEMA ls;")
+        env = {"AIS_START_DATE": "", "AIS_END_DATE": ""}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def _ingest(self):
+        create_duckdb_points(
+            self.conn, "ls", self.tmp.name, interactive=False, compact=self.compact
+        )
+
+    def _count(self, sql: str) -> int:
+        row = self.conn.execute(sql).fetchone()
+        return int(row[0]) if row else 0
+
+    def test_republished_day_is_reloaded_and_queued(self):
+        _write_day_file(self.tmp.name, FIRST_DAY, range(0, 600), [MOORED])
+        _write_day_file(
+            self.tmp.name, FIRST_DAY + timedelta(days=1), range(0, 600), [MOORED]
+        )
+        self._ingest()
+        self.assertEqual(self._count("SELECT COUNT(*) FROM ls.points"), 1200)
+
+        # Unchanged files are not reloaded
+        self._ingest()
+        self.assertEqual(self._count("SELECT COUNT(*) FROM ls.points"), 1200)
+
+        # Day 1 re-published with the reports of a second vessel and more minutes
+        _write_day_file(self.tmp.name, FIRST_DAY, range(0, 700), [MOORED, UNDERWAY])
+        self._ingest()
+
+        self.assertEqual(
+            self._count("SELECT COUNT(*) FROM ls.points"), 1200 + 100 + 700
+        )
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT mmsi, day FROM ls.points_reprocess_queue ORDER BY mmsi"
+            ).fetchall(),
+            [(MOORED, FIRST_DAY), (UNDERWAY, FIRST_DAY)],
+        )
+        self.assertEqual(
+            self._count(
+                "SELECT COUNT(*) FROM ls.points_ingestion_log WHERE fingerprint IS NULL"
+            ),
+            0,
+        )
+
+    def test_points_stay_clustered_by_day_mmsi_and_time(self):
+        _write_day_file(self.tmp.name, FIRST_DAY, range(0, 600), [UNDERWAY, MOORED])
+        _write_day_file(
+            self.tmp.name, FIRST_DAY + timedelta(days=1), range(0, 600), [MOORED]
+        )
+        self._ingest()
+        # Late arrivals for the first day are merged into its cluster
+        _write_day_file(self.tmp.name, FIRST_DAY, range(0, 700), [UNDERWAY, MOORED])
+        self._ingest()
+
+        self.conn.execute("SET threads = 1;")
+        rows = self.conn.execute(
+            "SELECT CAST(timestamp AS DATE), mmsi, epoch_ts FROM ls.points"
+        ).fetchall()
+        self.assertEqual(len(rows), 2 * 700 + 600)
+        day_blocks = [
+            day for i, (day, _, _) in enumerate(rows) if i == 0 or day != rows[i - 1][0]
+        ]
+        self.assertEqual(sorted(day_blocks), [FIRST_DAY, FIRST_DAY + timedelta(days=1)])
+        for day in day_blocks:
+            block = [row for row in rows if row[0] == day]
+            self.assertEqual(block, sorted(block))
+
+    def test_only_days_with_new_points_are_rewritten(self):
+        days = [FIRST_DAY + timedelta(days=offset) for offset in range(3)]
+        for day in days:
+            _write_day_file(self.tmp.name, day, range(0, 600), [MOORED])
+        self._ingest()
+        table, ts_column = (
+            ("points_compact", "epoch_s") if self.compact else ("points", "epoch_ts")
+        )
+        untouched_day_rows = f"""
+            SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM ls.{table}
+            WHERE CAST(to_timestamp({ts_column}) AS DATE) = '{days[1]}'
+        """
+        stored = self.conn.execute(untouched_day_rows).fetchone()
+
+        # The first and last day are re-published; the day in between is left in place
+        for day in (days[0], days[2]):
+            _write_day_file(self.tmp.name, day, range(0, 700), [MOORED])
+        self._ingest()
+
+        self.assertEqual(self.conn.execute(untouched_day_rows).fetchone(), stored)
+        self.assertEqual(self._count("SELECT COUNT(*) FROM ls.points"), 3 * 600 + 200)
+
+    def test_day_fetch_filters_time_in_the_scan(self):
+        for day in (FIRST_DAY, FIRST_DAY + timedelta(days=1)):
+            _write_day_file(self.tmp.name, day, range(0, 600), [MOORED, UNDERWAY])
+        self._ingest()
+        day_points, params = points_in_time_range(
+            self.conn, "ls", FIRST_DAY, FIRST_DAY + timedelta(days=1)
+        )
+
+        plan = self.conn.execute(
+            f"EXPLAIN SELECT * FROM {day_points}", params
+        ).fetchall()[0][1]
+        scan = plan[plan.index("SEQ_SCAN") :]
+        time_column = "epoch_s" if self.compact else "timestamp"
+        self.assertIn("Filters:", scan)
+        self.assertIn(f"{time_column}>=", scan.replace(" ", ""))
+        self.assertNotIn("FILTER", plan)
+
+        self.conn.execute(
+            "CREATE TABLE ls.no_watermarks (mmsi BIGINT, last_ts TIMESTAMP);"
+        )
+        points = get_points_for_days_duckdb(
+            self.conn, "ls", "ls.no_watermarks", [FIRST_DAY]
+        )
+        self.assertEqual(sorted(points), [(MOORED, FIRST_DAY), (UNDERWAY, FIRST_DAY)])
+        self.assertEqual(len(points[(MOORED, FIRST_DAY)]), 600)
+
+    def test_filter_keeps_republished_files_below_watermark(self):
+        files = [
+            ("a", "aisdk-2025-12-01.pq", date(2025, 12, 1)),
+            ("b", "aisdk-2025-12-02.pq", date(2025, 12, 2)),
+        ]
+        filtered = filter_files_by_watermark_and_period(
+            files, date(2025, 12, 2), None, None, {"aisdk-2025-12-01.pq"}
+        )
+        self.assertEqual([name for _, name, _ in filtered], ["aisdk-2025-12-01.pq"])
+
+
+class TestRepublishedFilesCompact(TestRepublishedFiles):
+    compact = True
+
+    def test_points_view_keeps_the_column_interface(self):
+        _write_day_file(self.tmp.name, FIRST_DAY, range(0, 600), [MOORED])
+        create_duckdb_points(self.conn, "ls", self.tmp.name, interactive=False)
+        standard = self.conn.execute(
+            "SELECT * FROM ls.points ORDER BY epoch_ts"
+        ).fetchall()
+        columns = self.conn.execute("DESCRIBE ls.points").fetchall()
+        columns = [(name, column_type) for name, column_type, *_ in columns]
+
+        # An existing points table is converted in place
+        self._ingest()
+        compact = self.conn.execute(
+            "SELECT * FROM ls.points ORDER BY epoch_ts"
+        ).fetchall()
+
+        self.assertEqual(
+            [
+                (name, column_type)
+                for name, column_type, *_ in self.conn.execute(
+                    "DESCRIBE ls.points"
+                ).fetchall()
+            ],
+            columns,
+        )
+        self.assertEqual(len(compact), len(standard))
+        for (mmsi, lat, lon, sog, ts, epoch_ts), expected in zip(compact, standard):
+            self.assertEqual(
+                (mmsi, lon, sog, ts, epoch_ts), (expected[0], *expected[2:])
+            )
+            self.assertAlmostEqual(lat, expected[1], delta=5e-8)
+        # Later runs keep the compact layout without the flag
+        create_duckdb_points(self.conn, "ls", self.tmp.name, interactive=False)
+        self.assertEqual(self._count("SELECT COUNT(*) FROM ls.points_compact"), 600)
+
+
+def _create_constructed_db(conn: duckdb.DuckDBPyConnection):
+    """Three days of points for a moored and an underway vessel, constructed up to day 2 at 23:00,
+    with CellStrings in ``cs`` and a variant schema ``cs_z17``."""
+    conn.execute("SET TimeZone = 'UTC';")
+    conn.execute("CREATE SCHEMA ls;")
+    conn.execute("CREATE SCHEMA cs;")
+    conn.execute(f"""
+        CREATE TABLE ls.points AS
+        WITH minutes AS (
+            SELECT range AS minute, TIMESTAMP '2025-01-01' + range * INTERVAL 1 MINUTE AS ts
+            FROM range({3 * 24 * 60})
+        ),
+        vessels AS (SELECT unnest([{MOORED}, {UNDERWAY}]) AS mmsi)
+        SELECT
+            mmsi,
+            56.15 AS lat,
+            CASE
+                WHEN mmsi = {UNDERWAY} AND hour(ts) BETWEEN 6 AND 17
+                THEN 10.0 + (minute % 720) * 0.002
+                ELSE 10.0
+            END AS lon,
+            CASE WHEN mmsi = {UNDERWAY} AND hour(ts) BETWEEN 6 AND 17 THEN 12.0 ELSE 0.1 END AS sog,
+            ts AS timestamp,
+            epoch(ts) AS epoch_ts
+        FROM minutes, vessels;
+    """)
+    for table, id_column in (("trajectory", "trajectory_id"), ("stop", "stop_id")):
+        ls_table = "trajectory_ls" if table == "trajectory" else "stop_poly"
+        conn.execute(f"""
+            CREATE TABLE ls.{ls_table} (
+                {id_column} INTEGER, mmsi BIGINT, ts_start TIMESTAMP, ts_end TIMESTAMP
+            );
+            CREATE TABLE cs.{table}_cs ({id_column} INTEGER, mmsi BIGINT, cell_z21 UBIGINT);
+            CREATE TABLE cs.{table}_cs_ancestors ({id_column} INTEGER, mmsi BIGINT);
+        """)
+    # Previously constructed rows: one trajectory and stop per MMSI-day, each with two cells
+    row_id = 0
+    for day_offset in range(2):
+        day = datetime(2025, 1, 1) + timedelta(days=day_offset)
+        for mmsi in (MOORED, UNDERWAY):
+            row_id += 1
+            for ls_table, table, id_column in (
+                ("trajectory_ls", "trajectory", "trajectory_id"),
+                ("stop_poly", "stop", "stop_id"),
+            ):
+                conn.execute(
+                    f"INSERT INTO ls.{ls_table} VALUES (?, ?, ?, ?)",
+                    [row_id, mmsi, day + timedelta(hours=1), day + timedelta(hours=23)],
+                )
+                conn.execute(
+                    f"INSERT INTO cs.{table}_cs VALUES (?, ?, 1), (?, ?, 2)",
+                    [row_id, mmsi, row_id, mmsi],
+                )
+                conn.execute(
+                    f"INSERT INTO cs.{table}_cs_ancestors VALUES (?, ?)", [row_id, mmsi]
+                )
+    conn.execute("CREATE SCHEMA cs_z17;")
+    for table in (
+        "trajectory_cs",
+        "trajectory_cs_ancestors",
+        "stop_cs",
+        "stop_cs_ancestors",
+    ):
+        conn.execute(f"CREATE TABLE cs_z17.{table} AS SELECT * FROM cs.{table};")
+    conn.execute("""
+        CREATE TABLE ls.points_reprocess_queue (
+            mmsi BIGINT NOT NULL, day DATE NOT NULL,
+            queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (mmsi, day)
+        );
+    """)
+
+
+class TestReprocessQueuedDays(unittest.TestCase):
+
+    def _construct(self, conn: duckdb.DuckDBPyConnection):
+        inserted: dict[str, list] = {"trajs": [], "stops": []}
+
+        def capture(_conn, _schema, trajs, stops):
+            inserted["trajs"].extend(trajs)
+            inserted["stops"].extend(stops)
+
+        with mock.patch.object(
+            duckdb_construct_trajs_stops, "insert_trajs_and_stops_duckdb", capture
+        ):
+            construct_trajectories_and_stops(
+                conn, "ls", "ls", 2, cs_schema="cs", cs_variant_schemas=["cs_z17"]
+            )
+        return inserted
+
+    def test_queued_days_are_rebuilt_and_old_rows_invalidated(self):
+        conn = duckdb.connect()
+        _create_constructed_db(conn)
+        day2 = FIRST_DAY + timedelta(days=1)
+        day3 = FIRST_DAY + timedelta(days=2)
+        conn.execute(
+            "INSERT INTO ls.points_reprocess_queue (mmsi, day) VALUES (?, ?), (?, ?), (?, ?)",
+            [UNDERWAY, FIRST_DAY, UNDERWAY, day2, MOORED, day3],
+        )
+
+        inserted = self._construct(conn)
+
+        # Old rows of the rebuilt MMSI-days are gone from LS, CS (and variant) and ancestor tables
+        remaining = {
+            table: conn.execute(
+                f"SELECT DISTINCT {id_column} FROM {table} ORDER BY 1"
+            ).fetchall()
+            for table, id_column in (
+                ("ls.trajectory_ls", "trajectory_id"),
+                ("ls.stop_poly", "stop_id"),
+                *(
+                    (f"{schema}.{table}", id_column)
+                    for schema in ("cs", "cs_z17")
+                    for table, id_column in (
+                        ("trajectory_cs", "trajectory_id"),
+                        ("trajectory_cs_ancestors", "trajectory_id"),
+                        ("stop_cs", "stop_id"),
+                        ("stop_cs_ancestors", "stop_id"),
+                    )
+                ),
+            )
+        }
+        for table, ids in remaining.items():
+            self.assertEqual(ids, [(1,), (3,)], table)
+        self.assertEqual(
+            conn.execute("SELECT COUNT(*) FROM ls.points_reprocess_queue").fetchone(),
+            (0,),
+        )
+
+        # The rebuilt days come from all their points, and the boundary day is not built twice
+        underway_starts = sorted(
+            datetime.fromtimestamp(ts_start, timezone.utc)
+            for mmsi, ts_start, _, _ in inserted["trajs"]
+            if mmsi == UNDERWAY
+        )
+        self.assertEqual([ts.date() for ts in underway_starts], [FIRST_DAY, day2, day3])
+        self.assertTrue(all(ts.hour < 7 for ts in underway_starts))
+        conn.close()
+
+    def test_queued_days_stay_queued_until_rebuilt(self):
+        conn = duckdb.connect()
+        _create_constructed_db(conn)
+        day3 = FIRST_DAY + timedelta(days=2)
+        conn.execute(
+            "INSERT INTO ls.points_reprocess_queue (mmsi, day) VALUES (?, ?), (?, ?)",
+            [MOORED, day3, MOORED, FIRST_DAY],
+        )
+
+        # Days after the MMSI's construct watermark are rebuilt from all their points too
+        self.assertEqual(
+            get_reprocess_keys_duckdb(conn, "ls"),
+            [(MOORED, FIRST_DAY), (MOORED, day3)],
+        )
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
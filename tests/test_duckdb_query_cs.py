@@ -0,0 +1,257 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+import numpy as np  # noqa: E402
+
+import duckdb_query_cs  # noqa: E402
+from core.cellstring_utils import xy_to_quadkey_int_array  # noqa: E402
+from db_setup.duckdb.cs_variant import ensure_cs_variant_zoom  # noqa: E402
+from duckdb_transform_ls_to_cs import insert_cs_ancestors  # noqa: E402
+from duckdb_query_cs import (  # noqa: E402
+    passage_crossings,
+    region_dwell,
+    region_transits,
+)
+
+CS_SCHEMA = "cs"
+T0 = datetime(2025, 1, 1)
+CS_ID_COLUMNS = {"trajectory_cs": "trajectory_id", "stop_cs": "stop_id"}
+
+
+def _cell(x: int, y: int) -> int:
+    return int(xy_to_quadkey_int_array(np.array([x]), np.array([y]), 21)[0])
+
+
+class TestDuckdbQueryCs(unittest.TestCase):
+    """Queries on a schema without ancestor tables (z21 matching only)."""
+
+    with_ancestors = False
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute(f"CREATE SCHEMA {CS_SCHEMA};")
+        self.conn.execute(f"""
+            CREATE TABLE {CS_SCHEMA}.trajectory_cs (
+                trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                ts_entry TIMESTAMP NOT NULL, ts_exit TIMESTAMP NOT NULL,
+                cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.stop_cs (
+                stop_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                ts_start TIMESTAMP NOT NULL, ts_end TIMESTAMP NOT NULL,
+                cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.region_cs (
+                region_id INTEGER NOT NULL, name TEXT NOT NULL, cell_z21 UINT64 NOT NULL
+            );
+            CREATE TABLE {CS_SCHEMA}.passage_cs (
+                passage_id INTEGER NOT NULL, name TEXT NOT NULL, cell_z21 UINT64 NOT NULL
+            );
+        """)
+        if self.with_ancestors:
+            self.conn.execute(f"""
+                CREATE TABLE {CS_SCHEMA}.trajectory_cs_ancestors (
+                    trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                    cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+                );
+                CREATE TABLE {CS_SCHEMA}.stop_cs_ancestors (
+                    stop_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+                    cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+                );
+            """)
+        # Region 1 "harbour": 3x3 block, region 2 "anchorage": 3x3 block further east
+        for region_id, name, x0 in ((1, "harbour", 1000), (2, "anchorage", 1100)):
+            for x in range(x0, x0 + 3):
+                for y in range(2000, 2003):
+                    self._insert("region_cs", (region_id, name, _cell(x, y)))
+        # Passage 1: east-west line at y=3000
+        for x in range(1000, 1011):
+            self._insert("passage_cs", (1, "strait", _cell(x, 3000)))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _insert(self, table: str, values: tuple):
+        placeholders = ", ".join("?" for _ in values)
+        self.conn.execute(
+            f"INSERT INTO {CS_SCHEMA}.{table} VALUES ({placeholders})", list(values)
+        )
+        if self.with_ancestors and table in CS_ID_COLUMNS:
+            # Rebuild the ancestor row of the id, as a transform would
+            id_column = CS_ID_COLUMNS[table]
+            self.conn.execute(
+                f"DELETE FROM {CS_SCHEMA}.{table}_ancestors WHERE {id_column} = ?",
+                [values[0]],
+            )
+            insert_cs_ancestors(
+                self.conn, CS_SCHEMA, table, id_column, "SELECT ?", [values[0]]
+            )
+
+    def _traj(
+        self, trajectory_id: int, mmsi: int, start_s: int, xy: list[tuple[int, int]]
+    ):
+        """Insert one trajectory spending 60 s in each cell."""
+        for i, (x, y) in enumerate(xy):
+            entry = T0 + timedelta(seconds=start_s + 60 * i)
+            self._insert(
+                "trajectory_cs",
+                (
+                    trajectory_id,
+                    mmsi,
+                    entry,
+                    entry + timedelta(seconds=60),
+                    _cell(x, y),
+                ),
+            )
+
+    def test_region_dwell_sums_cells_inside_region(self):
+        # 2 of 4 cells inside the harbour
+        self._traj(1, 111, 0, [(998, 2001), (999, 2001), (1000, 2001), (1001, 2001)])
+        self._traj(2, 222, 0, [(500, 500), (501, 500)])
+        self._insert(
+            "stop_cs", (7, 111, T0, T0 + timedelta(hours=2), _cell(1001, 2002))
+        )
+
+        result = region_dwell(self.conn, CS_SCHEMA, "harbour").to_pylist()
+
+        self.assertEqual(
+            [(r["kind"], r["id"], r["dwell_s"], r["num_cells"]) for r in result],
+            [("stop", 7, 7200.0, 1), ("trajectory", 1, 120.0, 2)],
+        )
+
+    def test_region_dwell_time_window_and_id_lookup(self):
+        self._traj(1, 111, 0, [(1000, 2000)])
+        self._traj(2, 111, 86400, [(1000, 2000)])
+
+        result = region_dwell(
+            self.conn,
+            CS_SCHEMA,
+            1,
+            start=T0 + timedelta(hours=12),
+            include_stops=False,
+        )
+
+        self.assertEqual(result.column("id").to_pylist(), [2])
+
+    def test_unknown_region_name_raises(self):
+        with self.assertRaises(ValueError):
+            region_dwell(self.conn, CS_SCHEMA, "nowhere")
+
+    def test_passage_crossings_direction_and_split(self):
+        # Northbound crossing, then back southbound two hours later on the same trajectory
+        north = [(1005, 3002), (1005, 3001), (1005, 3000), (1005, 2999)]
+        south = [(1006, 2999), (1006, 3000), (1006, 3001)]
+        self._traj(1, 111, 0, north)
+        self._traj(1, 111, 7200, south)
+
+        result = passage_crossings(self.conn, CS_SCHEMA, "strait").to_pylist()
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual([r["direction"] for r in result], ["northbound", "southbound"])
+        self.assertEqual([r["crossing_no"] for r in result], [1, 2])
+        self.assertEqual(result[0]["cell_before"], _cell(1005, 3001))
+        self.assertEqual(result[0]["cell_after"], _cell(1005, 2999))
+
+    def test_passage_crossing_at_trajectory_end_has_no_direction(self):
+        self._traj(1, 111, 0, [(1005, 3001), (1005, 3000)])
+
+        result = passage_crossings(self.conn, CS_SCHEMA, "strait").to_pylist()
+
+        self.assertEqual(len(result), 1)
+        self.assertIsNone(result[0]["direction"])
+        self.assertIsNone(result[0]["cell_after"])
+
+    def test_region_transits_pairs_next_arrival(self):
+        self._traj(1, 111, 0, [(1000, 2000)])  # leaves harbour at 60 s
+        self._traj(2, 111, 3600, [(1100, 2000)])  # arrives at anchorage at 3600 s
+        self._traj(3, 111, 90000, [(1101, 2000)])  # later visit, not the first arrival
+        self._traj(4, 222, 3600, [(1100, 2000)])  # different vessel
+
+        result = region_transits(
+            self.conn, CS_SCHEMA, "harbour", "anchorage"
+        ).to_pylist()
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["mmsi"], 111)
+        self.assertEqual(result[0]["to_trajectory_id"], 2)
+        self.assertEqual(result[0]["transit_s"], 3540.0)
+
+        limited = region_transits(
+            self.conn, CS_SCHEMA, "harbour", "anchorage", max_transit_s=600
+        )
+        self.assertEqual(limited.num_rows, 0)
+
+    def test_coarse_variant_schema_is_refused(self):
+        ensure_cs_variant_zoom(self.conn, CS_SCHEMA, 17)
+
+        with self.assertRaises(ValueError):
+            region_dwell(self.conn, CS_SCHEMA, "harbour")
+        with self.assertRaises(ValueError):
+            passage_crossings(self.conn, CS_SCHEMA, "strait")
+
+    def test_cli_prints_result_without_out(self):
+        self._traj(1, 111, 0, [(1000, 2001), (1001, 2001)])
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "ais.duckdb")
+            self.conn.execute(f"ATTACH '{db_path}' AS cli_db;")
+            self.conn.execute("COPY FROM DATABASE memory TO cli_db;")
+            self.conn.execute("DETACH cli_db;")
+            argv = ["duckdb_query_cs.py", "--cs-schema", CS_SCHEMA, "dwell"]
+            output = io.StringIO()
+            with mock.patch.object(
+                duckdb_query_cs, "get_db_path_or_url", return_value=db_path
+            ), mock.patch.object(
+                sys, "argv", argv + ["--region", "harbour"]
+            ), contextlib.redirect_stdout(
+                output
+            ):
+                duckdb_query_cs.main()
+
+        lines = output.getvalue().splitlines()
+        header = lines[0].split()
+        self.assertIn("mmsi", header)
+        self.assertEqual(lines[1].split()[header.index("mmsi")], "111")
+        self.assertEqual(lines[-1], "1 rows.")
+
+
+class TestDuckdbQueryCsAncestors(TestDuckdbQueryCs):
+    """The same queries with candidate ids preselected from the ancestor tables."""
+
+    with_ancestors = True
+
+    def test_candidates_come_from_ancestor_rows(self):
+        self._traj(1, 111, 0, [(1000, 2001), (1001, 2001)])
+        self._traj(2, 222, 0, [(1000, 2002)])
+        # Stale ancestor row for trajectory 2: its cells are no longer candidates
+        self.conn.execute(f"""
+            UPDATE {CS_SCHEMA}.trajectory_cs_ancestors
+            SET cellstring_z13 = [0], cellstring_z17 = [0]
+            WHERE trajectory_id = 2;
+        """)
+
+        result = region_dwell(self.conn, CS_SCHEMA, "harbour", include_stops=False)
+
+        self.assertEqual(result.column("id").to_pylist(), [1])
+
+    def test_plan_has_no_per_row_ancestor_probes(self):
+        sql = duckdb_query_cs._cell_filter(
+            self.conn, CS_SCHEMA, "trajectory_cs", "t", "region", (0, 1)
+        )
+
+        self.assertIn("trajectory_cs_ancestors", sql)
+        self.assertNotIn("t.cell_z21 >>", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
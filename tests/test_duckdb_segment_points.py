@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+import duckdb_construct_trajs_stops  # noqa: E402
+from core.points_to_ls_poly import (  # noqa: E402
+    process_candidate_segments_with_metrics,
+    process_single_mmsi_with_metrics,
+)
+from duckdb_construct_trajs_stops import (  # noqa: E402
+    construct_trajectories_and_stops,
+    get_points_for_days_duckdb,
+)
+from duckdb_segment_points import segment_points_duckdb  # noqa: E402
+from points_fixtures import insert_point_rows  # noqa: E402
+
+DAY = date(2025, 1, 1)
+MOORED = 219000001
+UNDERWAY = 219000002
+DUPLICATES = 219000003
+DOUBLE_SPIKE = 219000004
+
+
+def _track(mmsi: int) -> list[tuple[int, float, float, float | None, float]]:
+    """(mmsi, lat, lon, sog, epoch_ts) rows of one vessel, one report per minute from 06:00."""
+    start = datetime(2025, 1, 1, 6, tzinfo=timezone.utc).timestamp()
+    rows = []
+    for minute in range(8 * 60):
+        # A one-hour stop in the middle of the day
+        stopped = 180 <= minute < 240
+        minutes_underway = minute - min(max(minute - 180, 0), 60)
+        lat, lon, sog = 56.0, 10.0 + minutes_underway * 0.002, 0.2 if stopped else 12.0
+        if mmsi == MOORED:
+            lat, lon, sog = 56.15 + (minute % 7) * 1e-6, 10.2, None
+        rows.append((mmsi, lat, lon, sog, start + minute * 60))
+
+    if mmsi == UNDERWAY:
+        # A position spike, and a 2 h reporting gap ending the first trajectory
+        rows[100] = (mmsi, 57.0, 11.0, 12.0, rows[100][4])
+        rows = rows[:300] + [
+            (mmsi, lat, lon, sog, ts + 2 * 3600)
+            for mmsi, lat, lon, sog, ts in rows[300:]
+        ]
+    elif mmsi == DUPLICATES:
+        rows.insert(50, (mmsi, 56.0, 10.1005, 12.0, rows[50][4]))
+    elif mmsi == DOUBLE_SPIKE:
+        rows[100] = (mmsi, 57.0, 11.0, 12.0, rows[100][4])
+        rows[101] = (mmsi, 57.5, 11.5, 12.0, rows[101][4])
+    return rows
+
+
+def _create_points(conn: duckdb.DuckDBPyConnection):
+    insert_point_rows(
+        conn,
+        [
+            row
+            for vessel in (MOORED, UNDERWAY, DUPLICATES, DOUBLE_SPIKE)
+            for row in _track(vessel)
+        ],
+    )
+    conn.execute("CREATE TEMP TABLE no_watermarks (mmsi BIGINT, last_ts TIMESTAMP);")
+
+
+class TestSegmentPointsDuckDB(unittest.TestCase):
+
+    def test_segments_match_python_engine(self):
+        conn = duckdb.connect()
+        _create_points(conn)
+
+        segments, raw_points, last_ts = segment_points_duckdb(
+            conn, "ls", "no_watermarks", [DAY]
+        )
+        points = get_points_for_days_duckdb(conn, "ls", "no_watermarks", [DAY])
+
+        self.assertEqual(set(segments), {(MOORED, DAY), (UNDERWAY, DAY)})
+        # Duplicate timestamps and consecutive spikes are left to the Python engine
+        self.assertEqual(set(raw_points), {(DUPLICATES, DAY), (DOUBLE_SPIKE, DAY)})
+        self.assertEqual(raw_points[(DUPLICATES, DAY)], points[(DUPLICATES, DAY)])
+        for key, key_segments in segments.items():
+            expected = process_single_mmsi_with_metrics(key[0], points[key])
+            result = process_candidate_segments_with_metrics(key[0], key_segments)
+            self.assertEqual(result[1:3], expected[1:3])
+            self.assertEqual(result[3]["num_points"], len(points[key]))
+            self.assertEqual(last_ts[key], points[key][-1][3])
+        self.assertGreater(len(segments[(UNDERWAY, DAY)][0]), 2)
+        conn.close()
+
+    def test_construct_engines_insert_the_same_rows(self):
+        inserted: dict[str, tuple[list, list]] = {}
+        for engine in ("python", "sql"):
+            conn = duckdb.connect()
+            _create_points(conn)
+            trajs: list = []
+            stops: list = []
+
+            def capture(_conn, _schema, new_trajs, new_stops):
+                trajs.extend(new_trajs)
+                stops.extend(new_stops)
+
+            with mock.patch.object(
+                duckdb_construct_trajs_stops, "insert_trajs_and_stops_duckdb", capture
+            ):
+                construct_trajectories_and_stops(conn, "ls", "ls", 2, engine=engine)
+            inserted[engine] = (sorted(trajs), sorted(stops))
+            inserted[f"{engine} watermarks"] = conn.execute(
+                "SELECT mmsi, last_ts FROM ls.construct_watermarks ORDER BY mmsi"
+            ).fetchall()
+            conn.close()
+
+        self.assertTrue(inserted["python"][0])
+        self.assertTrue(inserted["python"][1])
+        self.assertEqual(inserted["sql"], inserted["python"])
+        self.assertEqual(inserted["sql watermarks"], inserted["python watermarks"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+from shapely import box, from_wkt  # noqa: E402
+
+from core.cellstring_utils import (
+    cellstring_ancestors,
+    linecover_multizoom,
+)  # noqa: E402
+from core.ls_poly_to_cs import (  # noqa: E402
+    convert_polygon_to_cellstrings,
+    process_stop_row_variants,
+    process_trajectory_row_variants,
+)
+from core.metrics import MetricsRecorder  # noqa: E402
+from db_setup.duckdb.cs_variant import ensure_cs_variant_zoom  # noqa: E402
+from db_setup.duckdb.etl_checkpoints import get_checkpoints  # noqa: E402
+from duckdb_transform_ls_to_cs import (  # noqa: E402
+    calculate_exit_timestamps,
+    insert_stop_cs_rows,
+    insert_traj_cs_rows,
+)
+from duckdb_transform_variants import (  # noqa: E402
+    _transform_to_variants,
+    validate_cs_variants,
+)
+
+START_TS = 1_735_725_600  # 2025-01-01 10:00 UTC
+TRAJECTORIES = {
+    1: f"LINESTRING M (10.0 56.0 {START_TS}, 10.01 56.004 {START_TS + 600})",
+    2: f"LINESTRING M (10.2 56.1 {START_TS}, 10.2 56.102 {START_TS + 300})",
+}
+STOP = box(10.2, 56.15, 10.2006, 56.1503)
+VARIANTS = [("cs_a", 21), ("cs_b", 17)]
+
+
+def _create_cs_tables(conn: duckdb.DuckDBPyConnection, schema: str):
+    conn.execute(f"""
+        CREATE SCHEMA {schema};
+        CREATE TABLE {schema}.trajectory_cs (
+            trajectory_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+            ts_entry TIMESTAMP NOT NULL, ts_exit TIMESTAMP NOT NULL,
+            cell_z21 UINT64 NOT NULL
+        );
+        CREATE TABLE {schema}.trajectory_cs_ancestors (
+            trajectory_id INTEGER PRIMARY KEY, mmsi BIGINT NOT NULL,
+            cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+        );
+        CREATE TABLE {schema}.stop_cs (
+            stop_id INTEGER NOT NULL, mmsi BIGINT NOT NULL,
+            ts_start TIMESTAMP NOT NULL, ts_end TIMESTAMP NOT NULL,
+            cell_z21 UINT64 NOT NULL
+        );
+        CREATE TABLE {schema}.stop_cs_ancestors (
+            stop_id INTEGER PRIMARY KEY, mmsi BIGINT NOT NULL,
+            cellstring_z13 UINTEGER[] NOT NULL, cellstring_z17 UBIGINT[] NOT NULL
+        );
+    """)
+
+
+class TestTransformVariants(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = duckdb.connect()
+        self.conn.execute("SET TimeZone = 'UTC';")
+        self.conn.execute("""
+            CREATE SCHEMA ls;
+            CREATE TABLE ls.trajectory_ls (
+                trajectory_id INTEGER, mmsi BIGINT, ts_start DOUBLE, ts_end DOUBLE, geom BLOB
+            );
+            CREATE TABLE ls.stop_poly (
+                stop_id INTEGER, mmsi BIGINT, ts_start DOUBLE, ts_end DOUBLE, geom BLOB
+            );
+        """)
+        for trajectory_id, wkt in TRAJECTORIES.items():
+            linestring = from_wkt(wkt)
+            self.conn.execute(
+                "INSERT INTO ls.trajectory_ls VALUES (?, ?, ?, ?, ?)",
+                [
+                    trajectory_id,
+                    100 + trajectory_id,
+                    linestring.coords[0][2],
+                    linestring.coords[-1][2],
+                    linestring.wkb,
+                ],
+            )
+        self.conn.execute(
+            "INSERT INTO ls.stop_poly VALUES (1, 101, ?, ?, ?)",
+            [START_TS, START_TS + 3600, STOP.wkb],
+        )
+        for schema, _ in VARIANTS:
+            _create_cs_tables(self.conn, schema)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _select(self, table: str, id_column: str):
+        def select_rows(batch_ids: list[int]) -> list:
+            return [
+                (int(id_), int(mmsi), ts_start, ts_end, bytes(geom))
+                for id_, mmsi, ts_start, ts_end, geom in self.conn.execute(
+                    f"SELECT * FROM ls.{table} WHERE {id_column} IN ({','.join(map(str, batch_ids))}) ORDER BY 1"
+                ).fetchall()
+            ]
+
+        return select_rows
+
+    def _transform_trajectories(self) -> int:
+        return _transform_to_variants(
+            self.conn,
+            "ls",
+            VARIANTS,
+            "trajectory_ls",
+            "trajectory_cs",
+            "trajectory_id",
+            "transform_trajs",
+            self._select("trajectory_ls", "trajectory_id"),
+            process_trajectory_row_variants,
+            lambda schema, zoom, batch, results: insert_traj_cs_rows(
+                self.conn, schema, results, {row[0]: row[3] for row in batch}, zoom
+            ),
+            1,
+            1,
+            MetricsRecorder(),
+            False,
+        )
+
+    def test_one_pass_fills_each_variant_at_its_zoom(self):
+        # cs_a already has trajectory 1: only cs_b gets it
+        self.conn.execute(
+            "INSERT INTO cs_a.trajectory_cs VALUES (1, 101, TIMESTAMP '2025-01-01', TIMESTAMP '2025-01-01', 1)"
+        )
+        num_cells = self._transform_trajectories()
+
+        for schema, zoom in VARIANTS:
+            rows = self.conn.execute(f"""
+                SELECT trajectory_id, cell_z21, epoch(ts_entry)::BIGINT, epoch(ts_exit)::BIGINT
+                FROM {schema}.trajectory_cs
+                WHERE trajectory_id = 2 ORDER BY ts_entry, rowid
+            """).fetchall()
+            linestring = from_wkt(TRAJECTORIES[2])
+            # Coarser cells keep the entry time of their first z21 cell
+            cells_with_ts = linecover_multizoom(linestring, (zoom, 21))[0]
+            exits = calculate_exit_timestamps(cells_with_ts, linestring.coords[-1][2])
+            self.assertEqual(
+                rows,
+                [
+                    (2, cell, int(ts), ts_exit)
+                    for (cell, ts), ts_exit in zip(cells_with_ts, exits)
+                ],
+            )
+            self.assertEqual(
+                self.conn.execute(
+                    f"SELECT cellstring_z13 FROM {schema}.trajectory_cs_ancestors WHERE trajectory_id = 2"
+                ).fetchone()[0],
+                cellstring_ancestors([row[1] for row in rows], 13, zoom),
+            )
+            self.assertEqual(get_checkpoints(self.conn, schema, "transform_trajs"), [])
+
+        counts = self.conn.execute(
+            "SELECT (SELECT count(*) FROM cs_a.trajectory_cs WHERE trajectory_id = 1), (SELECT count(*) FROM cs_b.trajectory_cs WHERE trajectory_id = 1)"
+        ).fetchone()
+        self.assertEqual(counts[0], 1)
+        self.assertGreater(counts[1], 1)
+        self.assertEqual(
+            num_cells,
+            self.conn.execute(
+                "SELECT (SELECT count(*) FROM cs_a.trajectory_cs) + (SELECT count(*) FROM cs_b.trajectory_cs) - 1"
+            ).fetchone()[0],
+        )
+
+    def test_stop_variants_share_one_polygon_cover(self):
+        _transform_to_variants(
+            self.conn,
+            "ls",
+            VARIANTS,
+            "stop_poly",
+            "stop_cs",
+            "stop_id",
+            "transform_stops",
+            self._select("stop_poly", "stop_id"),
+            process_stop_row_variants,
+            lambda schema, zoom, _batch, results: insert_stop_cs_rows(
+                self.conn, schema, results, zoom
+            ),
+            1,
+            10,
+            MetricsRecorder(),
+            False,
+        )
+
+        _, cells_z17, cells_z21 = convert_polygon_to_cellstrings(STOP)
+        for schema, expected in (("cs_a", cells_z21), ("cs_b", cells_z17)):
+            cells = self.conn.execute(
+                f"SELECT cell_z21 FROM {schema}.stop_cs ORDER BY cell_z21"
+            ).fetchall()
+            self.assertEqual([cell for (cell,) in cells], sorted(expected))
+        self.assertEqual(
+            process_stop_row_variants((1, 101, 0, 0, STOP.wkb), (17,))[4],
+            {17: cells_z17},
+        )
+
+    def test_variant_zoom_is_recorded_and_checked(self):
+        self._transform_trajectories()
+
+        ensure_cs_variant_zoom(self.conn, "cs_b", 17)
+        with self.assertRaises(ValueError):
+            ensure_cs_variant_zoom(self.conn, "cs_b", 21)
+        with self.assertRaises(ValueError):
+            validate_cs_variants([("cs_a", 21), ("cs_a", 17)])
+        with self.assertRaises(ValueError):
+            validate_cs_variants([("cs_c", 15)])
+
+
+if __name__ == "__main__":
+    unittest.main()
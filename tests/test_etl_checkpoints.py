@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+from datetime import date, datetime, timezone
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+import duckdb_construct_trajs_stops  # noqa: E402
+from db_setup.duckdb.etl_checkpoints import (  # noqa: E402
+    clear_checkpoints,
+    get_checkpoints,
+    record_checkpoint,
+)
+from duckdb_construct_trajs_stops import construct_trajectories_and_stops  # noqa: E402
+from points_fixtures import create_points  # noqa: E402
+
+MMSI = 219000001
+DAYS = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+
+
+class TestCheckpoints(unittest.TestCase):
+
+    def test_record_get_and_clear(self):
+        conn = duckdb.connect()
+        conn.execute("CREATE SCHEMA ls;")
+        self.assertEqual(get_checkpoints(conn, "ls", "construct"), [])
+
+        record_checkpoint(conn, "ls", "construct", "2025-01-01", "run-1", rows=10)
+        record_checkpoint(conn, "ls", "construct", "2025-01-01", "run-2", rows=12)
+        record_checkpoint(conn, "ls", "transform_trajs", "3000", "run-2")
+
+        self.assertEqual(get_checkpoints(conn, "ls", "construct"), ["2025-01-01"])
+        self.assertEqual(
+            conn.execute(
+                "SELECT run_id, rows FROM ls.etl_checkpoints ORDER BY unit"
+            ).fetchall(),
+            [("run-2", 12), ("run-2", 0)],
+        )
+        clear_checkpoints(conn, "ls", "construct")
+        self.assertEqual(get_checkpoints(conn, "ls", "construct"), [])
+        self.assertEqual(get_checkpoints(conn, "ls", "transform_trajs"), ["3000"])
+        conn.close()
+
+
+class TestConstructResume(unittest.TestCase):
+
+    def _construct(self, conn, inserted: list, resume: bool = False, fail_on=None):
+        def capture(_conn, _schema, trajs, _stops):
+            for traj in trajs:
+                if fail_on is not None and traj[1] >= fail_on:
+                    raise RuntimeError("machine preempted")
+            inserted.extend(trajs)
+
+        with mock.patch.object(
+            duckdb_construct_trajs_stops, "insert_trajs_and_stops_duckdb", capture
+        ):
+            construct_trajectories_and_stops(conn, "ls", "ls", 2, resume=resume)
+
+    def test_interrupted_run_resumes_after_last_checkpoint(self):
+        conn = duckdb.connect()
+        create_points(conn, DAYS, (MMSI,))
+        inserted: list = []
+        crash_ts = datetime(2025, 1, 2, tzinfo=timezone.utc).timestamp()
+
+        with self.assertRaises(RuntimeError):
+            self._construct(conn, inserted, fail_on=crash_ts)
+        # The first day committed with its checkpoint; the crashed day rolled back
+        self.assertEqual(get_checkpoints(conn, "ls", "construct"), ["2025-01-01"])
+        self.assertEqual(len(inserted), 1)
+        self.assertEqual(
+            conn.execute("SELECT last_ts FROM ls.construct_watermarks").fetchall(),
+            [(datetime(2025, 1, 1, 17, 59),)],
+        )
+
+        with mock.patch.object(
+            duckdb_construct_trajs_stops,
+            "get_processing_days_duckdb",
+            wraps=duckdb_construct_trajs_stops.get_processing_days_duckdb,
+        ) as get_days:
+            self._construct(conn, inserted, resume=True)
+
+        self.assertEqual(get_days.call_args.args[3], DAYS[1])
+        self.assertEqual(len(inserted), 3)
+        self.assertEqual(len({traj[1] for traj in inserted}), 3)
+        # A finished run leaves no checkpoints behind
+        self.assertEqual(get_checkpoints(conn, "ls", "construct"), [])
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
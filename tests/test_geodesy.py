@@ -0,0 +1,115 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import numpy as np  # noqa: E402
+
+from core.geodesy import (  # noqa: E402
+    EARTH_RADIUS_M,
+    coords_segment_motion,
+    cumulative_distance_m,
+    haversine_m,
+    haversine_m_array,
+    segment_motion,
+)
+from core.utils import compute_motion  # noqa: E402
+
+
+def _reference_haversine_m(lon1, lat1, lon2, lat2) -> float:
+    """Previous core.utils.haversine_distance_m (numpy scalars)."""
+    lon1, lat1, lon2, lat2 = (
+        np.radians(lon1),
+        np.radians(lat1),
+        np.radians(lon2),
+        np.radians(lat2),
+    )
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return float(EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(a)))
+
+
+def _pairs(num: int = 5_000) -> np.ndarray:
+    """(lon1, lat1, lon2, lat2) rows: AIS-scale hops, long distances and antimeridian crossings."""
+    rng = np.random.default_rng(11)
+    lon1 = rng.uniform(-180, 180, num)
+    lat1 = rng.uniform(-85, 85, num)
+    hop = rng.choice([1e-6, 1e-4, 1e-2, 1.0, 50.0], num)
+    lon2 = lon1 + rng.normal(0, 1, num) * hop
+    lat2 = np.clip(lat1 + rng.normal(0, 1, num) * hop, -89.9, 89.9)
+    return np.column_stack([lon1, lat1, lon2, lat2])
+
+
+class TestHaversine(unittest.TestCase):
+
+    def test_scalar_and_array_match_previous_function(self):
+        pairs = _pairs()
+        reference = np.array([_reference_haversine_m(*row) for row in pairs])
+        scalar = np.array([haversine_m(*row) for row in pairs.tolist()])
+        batch = haversine_m_array(*pairs.T)
+
+        # Relative 1e-9 or 1 µm, whichever is larger
+        np.testing.assert_allclose(scalar, reference, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(batch, reference, rtol=1e-9, atol=1e-6)
+        self.assertIsInstance(haversine_m(10.0, 56.0, 10.1, 56.0), float)
+
+    def test_known_distances(self):
+        # One degree of latitude on the mean-radius sphere
+        self.assertAlmostEqual(
+            haversine_m(10.0, 56.0, 10.0, 57.0), EARTH_RADIUS_M * np.pi / 180, places=6
+        )
+        self.assertEqual(haversine_m(10.0, 56.0, 10.0, 56.0), 0.0)
+        # Antipodal points stay finite (half the circumference)
+        self.assertAlmostEqual(
+            haversine_m(0.0, 0.0, 180.0, 0.0), EARTH_RADIUS_M * np.pi, places=3
+        )
+
+
+class TestTrackMotion(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.lon = 10.0 + np.cumsum(rng.normal(0, 1e-4, 500))
+        self.lat = 56.0 + np.cumsum(rng.normal(0, 1e-4, 500))
+        self.ts = 1_735_689_600 + np.cumsum(rng.integers(0, 30, 500)).astype(float)
+
+    def test_segment_motion_matches_compute_motion(self):
+        coords = list(zip(self.lon.tolist(), self.lat.tolist(), self.ts.tolist()))
+        time_diffs, distances, speeds = segment_motion(self.lon, self.lat, self.ts)
+        expected = np.array(
+            [compute_motion(c1, c2) for c1, c2 in zip(coords, coords[1:])]
+        )
+
+        np.testing.assert_array_equal(time_diffs, expected[:, 0])
+        np.testing.assert_allclose(distances, expected[:, 1], rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(speeds, expected[:, 2], rtol=1e-9)
+        # Repeated timestamps give an infinite speed, as in compute_motion
+        self.assertTrue(np.isinf(speeds[time_diffs == 0]).all())
+        self.assertTrue((time_diffs == 0).any())
+
+        for batch, single in zip(
+            coords_segment_motion(coords), (time_diffs, distances, speeds)
+        ):
+            np.testing.assert_array_equal(batch, single)
+
+    def test_cumulative_distance(self):
+        cumulative = cumulative_distance_m(self.lon, self.lat)
+        _, distances, _ = segment_motion(self.lon, self.lat, self.ts)
+
+        self.assertEqual(len(cumulative), len(self.lon))
+        self.assertEqual(cumulative[0], 0.0)
+        self.assertAlmostEqual(cumulative[-1], distances.sum(), places=6)
+        self.assertTrue((np.diff(cumulative) >= 0).all())
+
+    def test_short_tracks(self):
+        for motion in coords_segment_motion([(10.0, 56.0, 0.0)]):
+            self.assertEqual(len(motion), 0)
+        self.assertEqual(cumulative_distance_m([10.0], [56.0]).tolist(), [0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from core.points_to_ls_poly import (  # noqa: E402
+    MIN_AIS_POINTS_IN_TRAJ,
+    TRAJ_MAX_GAP_S,
+    TRAJ_MAX_SPEED_KN,
+)
+from core.utils import Coord, merge_invalid_stops_with_trajectories  # noqa: E402
+
+
+def _track(start_ts: float, num: int, lon: float = 10.0) -> list[Coord]:
+    """``num`` points 10 s apart moving east at ~7 kn."""
+    return [(lon + i * 1e-3, 56.0, start_ts + i * 10) for i in range(num)]
+
+
+def _merge(trajs: list[list[Coord]], stops: list[list[Coord]]) -> list[list[Coord]]:
+    return merge_invalid_stops_with_trajectories(
+        trajs, stops, TRAJ_MAX_SPEED_KN, TRAJ_MAX_GAP_S, MIN_AIS_POINTS_IN_TRAJ
+    )
+
+
+class TestMergeInvalidStopsWithTrajectories(unittest.TestCase):
+
+    def setUp(self):
+        # traj_a -> stop_ab -> traj_b -> stop_b -> (nothing); stop_c precedes traj_c
+        self.traj_a = _track(0, 5)
+        self.stop_ab = [self.traj_a[-1], (10.0041, 56.0, 50), (10.0042, 56.0, 60)]
+        self.traj_b = [self.stop_ab[-1]] + _track(70, 4, lon=10.005)
+        self.stop_b = [self.traj_b[-1], (10.0081, 56.0, 110), (10.0082, 56.0, 120)]
+        self.stop_c = [(10.1, 56.0, 1000), (10.1001, 56.0, 1010)]
+        self.traj_c = [self.stop_c[-1]] + _track(1020, 4, lon=10.101)
+
+    def test_bridge_continue_and_precede(self):
+        trajs = _merge(
+            [self.traj_a, self.traj_b, self.traj_c],
+            [self.stop_ab, self.stop_b, self.stop_c],
+        )
+        self.assertEqual(
+            trajs,
+            [
+                self.traj_a + self.stop_ab + self.traj_b + self.stop_b,
+                self.stop_c + self.traj_c,
+            ],
+        )
+
+    def test_bridge_where_later_trajectory_comes_first_in_list(self):
+        # The trajectory after the stop is listed before the one it continues
+        trajs = _merge([self.traj_b, self.traj_c, self.traj_a], [self.stop_ab])
+        self.assertEqual(trajs, [self.traj_c, self.traj_a + self.stop_ab + self.traj_b])
+
+    def test_unconnected_stop_becomes_trajectory_and_can_be_extended(self):
+        lone = _track(5_000, MIN_AIS_POINTS_IN_TRAJ)
+        follow = [lone[-1], (lone[-1][0] + 1e-4, 56.0, lone[-1][2] + 10)]
+        too_short = _track(9_000, MIN_AIS_POINTS_IN_TRAJ - 1)
+
+        trajs = _merge([self.traj_a], [lone, follow, too_short])
+        self.assertEqual(trajs, [self.traj_a, lone + follow])
+
+    def test_stop_with_unrealistic_step_is_discarded(self):
+        jump = [self.traj_a[-1], (11.0, 56.0, 50)]  # ~60 km in 10 s
+        gap = [self.traj_a[-1], (10.0041, 56.0, 40 + TRAJ_MAX_GAP_S + 1)]
+
+        self.assertEqual(_merge([self.traj_a], [jump, gap]), [self.traj_a])
+
+    def test_many_short_segments_chain_into_one_trajectory(self):
+        trajs: list[list[Coord]] = []
+        stops: list[list[Coord]] = []
+        ts = 0.0
+        lon = 10.0
+        for _ in range(5_000):
+            traj = [(lon, 56.0, ts), (lon + 1e-4, 56.0, ts + 10)]
+            stop = [traj[-1], (lon + 1.5e-4, 56.0, ts + 20)]
+            trajs.append(traj)
+            stops.append(stop)
+            lon += 1.5e-4
+            ts += 20
+
+        merged = _merge(trajs, stops)
+        self.assertEqual(len(merged), 1)
+        # Joining points are kept on both sides, as in the per-stop merge
+        self.assertEqual(len(merged[0]), 4 * len(trajs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import duckdb  # noqa: E402
+
+from core.metrics import (  # noqa: E402
+    MetricsRecorder,
+    call_timed,
+    worker_utilisation,
+)
+from core.points_to_ls_poly import (  # noqa: E402
+    InputPoint,
+    process_single_mmsi,
+    process_single_mmsi_with_metrics,
+)
+
+
+class TestMetricsRecorder(unittest.TestCase):
+
+    def test_totals_and_slowest_units(self):
+        metrics = MetricsRecorder()
+        for mmsi, duration in ((1, 0.5), (2, 2.0), (3, 1.0)):
+            metrics.record(
+                "construct",
+                "mmsi",
+                duration,
+                rows=10 * mmsi,
+                unit=mmsi,
+                time_phase2=duration / 2,
+            )
+
+        totals = metrics.totals("construct", "mmsi")
+        self.assertEqual(totals["count"], 3)
+        self.assertAlmostEqual(totals["duration_s"], 3.5)
+        self.assertEqual(totals["rows"], 60)
+        self.assertAlmostEqual(totals["time_phase2"], 1.75)
+        self.assertEqual(
+            [unit for _, unit, _ in metrics.slowest("construct", "mmsi")],
+            ["2", "3", "1"],
+        )
+        self.assertIn("construct/mmsi: 3 x", metrics.summary())
+
+    def test_timer_records_rows_set_inside_block(self):
+        metrics = MetricsRecorder()
+        with metrics.timer("transform_trajs", "batch", unit=1) as fields:
+            fields["rows"] = 42
+            fields["fetch_s"] = 0.1
+
+        totals = metrics.totals("transform_trajs", "batch")
+        self.assertEqual(totals["rows"], 42)
+        self.assertAlmostEqual(totals["fetch_s"], 0.1)
+
+    def test_flush_writes_jsonl_and_duckdb(self):
+        conn = duckdb.connect()
+        conn.execute("CREATE SCHEMA ls;")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.jsonl")
+            metrics = MetricsRecorder(
+                jsonl_path=path, duckdb_conn=conn, duckdb_schema="ls"
+            )
+            metrics.record(
+                "construct", "mmsi", 1.5, rows=100, unit=219000001, worker_pid=7
+            )
+            metrics.record("construct", "day", 3.0, rows=100, unit="2025-01-01")
+            metrics.flush()
+            metrics.flush()  # empty buffer is a no-op
+
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["unit"], "219000001")
+        self.assertEqual(lines[0]["details"], {"worker_pid": 7})
+        rows = conn.execute(
+            "SELECT stage, kind, unit, duration_s, rows FROM ls.etl_metrics ORDER BY duration_s"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                ("construct", "mmsi", "219000001", 1.5, 100),
+                ("construct", "day", "2025-01-01", 3.0, 100),
+            ],
+        )
+        conn.close()
+
+    def test_call_timed_and_utilisation(self):
+        result, duration, pid = call_timed(sum, [1, 2, 3])
+
+        self.assertEqual(result, 6)
+        self.assertGreaterEqual(duration, 0.0)
+        self.assertEqual(pid, os.getpid())
+        self.assertAlmostEqual(worker_utilisation(6.0, 2.0, 4), 0.75)
+        self.assertEqual(worker_utilisation(1.0, 0.0, 4), 0.0)
+
+
+class TestProcessSingleMmsiWithMetrics(unittest.TestCase):
+
+    def test_metrics_match_result(self):
+        points: list[InputPoint] = [
+            (10.0 + i * 0.001, 57.0, 10.0, 1_700_000_000 + i * 10) for i in range(20)
+        ] + [(10.03, 57.0, 0.0, 1_700_000_300 + i * 60) for i in range(20)]
+
+        mmsi, trajs, stops, metrics = process_single_mmsi_with_metrics(1, points)
+
+        self.assertEqual((mmsi, trajs, stops), process_single_mmsi(1, points))
+        self.assertEqual(metrics["num_points"], 40)
+        self.assertEqual(metrics["num_trajs"], len(trajs))
+        self.assertEqual(metrics["num_stops"], len(stops))
+        self.assertGreaterEqual(
+            metrics["time_total"],
+            metrics["time_phase1"] + metrics["time_phase2"] + metrics["time_phase3"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
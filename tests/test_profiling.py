@@ -0,0 +1,122 @@
+import json
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from core.metrics import MetricsRecorder  # noqa: E402
+from core.profiling import (  # noqa: E402
+    get_profile_mode,
+    get_profile_settings,
+    profile_stage,
+    profiled_task,
+    write_slowest_report,
+)
+
+
+def _busy_sum(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_profile_mode_from_env(self):
+        for value, expected in (
+            ("", None),
+            ("false", None),
+            ("true", "cprofile"),
+            ("cprofile", "cprofile"),
+            ("sample", "sample"),
+        ):
+            with mock.patch.dict(os.environ, {"ETL_PROFILE": value}):
+                self.assertEqual(get_profile_mode(), expected)
+        with mock.patch.dict(os.environ, {"ETL_PROFILE": "perf"}):
+            with self.assertRaises(ValueError):
+                get_profile_mode()
+
+    def test_task_is_unwrapped_when_profiling_is_off(self):
+        with mock.patch.dict(os.environ, {"ETL_PROFILE": "false"}):
+            settings = get_profile_settings("construct", "run")
+        self.assertIsNone(settings)
+        self.assertIs(profiled_task(_busy_sum, settings), _busy_sum)
+
+    def _run_stage(self, mode: str, tmp: str) -> str:
+        env = {"ETL_PROFILE": mode, "ETL_PROFILE_DIR": tmp}
+        with mock.patch.dict(os.environ, env):
+            settings = get_profile_settings("construct", "run")
+        assert settings is not None
+        task = profiled_task(_busy_sum, settings)
+        with profile_stage(settings):
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(task, [500_000] * 8))
+        self.assertEqual(results, [_busy_sum(500_000)] * 8)
+        return os.path.join(tmp, "run")
+
+    def test_cprofile_merges_parent_and_worker_profiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = self._run_stage("cprofile", tmp)
+            parts = os.listdir(os.path.join(out_dir, "parts"))
+            stats = pstats.Stats(os.path.join(out_dir, "construct.pstats"))
+            with open(os.path.join(out_dir, "construct.txt"), encoding="utf-8") as f:
+                report = f.read()
+
+        self.assertIn("construct.main.pstats", parts)
+        self.assertGreaterEqual(
+            len([p for p in parts if p.startswith("construct.worker-")]), 1
+        )
+        busy_calls = [
+            calls
+            for (_, _, name), (_, calls, _, _, _) in stats.stats.items()  # type: ignore[attr-defined]
+            if name == "_busy_sum"
+        ]
+        self.assertEqual(busy_calls, [8])
+        self.assertIn("_busy_sum", report)
+
+    def test_sampler_writes_folded_stacks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = self._run_stage("sample", tmp)
+            with open(os.path.join(out_dir, "construct.folded"), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        self.assertTrue(lines)
+        self.assertTrue(any("_busy_sum" in line for line in lines))
+        for line in lines:
+            stack, _, count = line.rpartition(" ")
+            self.assertTrue(stack)
+            self.assertGreater(int(count), 0)
+
+    def test_slowest_report_includes_details_and_point_counts(self):
+        metrics = MetricsRecorder(run_id="run")
+        metrics.record(
+            "construct", "mmsi", 2.0, rows=80_000, unit=219000001, day="2025-01-01"
+        )
+        metrics.record("construct", "mmsi", 0.5, rows=100, unit=219000002)
+        metrics.record("transform_trajs", "trajectory", 1.0, rows=500, unit=7, mmsi=1)
+        metrics.record("construct", "day", 3.0, rows=80_100)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_slowest_report(
+                metrics, tmp, {("transform_trajs", "trajectory"): {"7": 1234}}
+            )
+            with open(path, encoding="utf-8") as f:
+                report = json.load(f)["slowest"]
+
+        self.assertEqual(
+            [entry["unit"] for entry in report["construct/mmsi"]],
+            ["219000001", "219000002"],
+        )
+        self.assertEqual(report["construct/mmsi"][0]["day"], "2025-01-01")
+        self.assertEqual(report["construct/mmsi"][0]["rows"], 80_000)
+        self.assertEqual(report["transform_trajs/trajectory"][0]["num_points"], 1234)
+        self.assertNotIn("construct/day", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
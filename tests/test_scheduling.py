@@ -0,0 +1,124 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import numpy as np  # noqa: E402
+
+from core.points_to_ls_poly import (  # noqa: E402
+    DuckDBRawPoint,
+    process_single_mmsi,
+    process_single_mmsi_with_metrics,
+)
+from core.scheduling import (  # noqa: E402
+    DEFAULT_COST_MODEL,
+    SPLIT_MIN_GAP_S,
+    fit_cost_model,
+    plan_construct_tasks,
+    predict_cost,
+    split_points_at_gaps,
+    stitch_mmsi_results,
+)
+
+
+def _vessel_with_gaps(num_legs: int = 6) -> list[DuckDBRawPoint]:
+    """Alternating moored and underway legs, each followed by a reporting gap of ~2 h."""
+    rng = np.random.default_rng(3)
+    points: list[DuckDBRawPoint] = []
+    ts = 1_735_689_600.0
+    lon, lat = 10.2, 56.15
+    for leg in range(num_legs):
+        moored = leg % 2 == 0
+        for _ in range(300):
+            if moored:
+                points.append(
+                    (
+                        lon + rng.normal(0, 2e-5),
+                        lat + rng.normal(0, 2e-5),
+                        float(rng.uniform(0, 0.5)),
+                        ts,
+                    )
+                )
+                ts += 30
+            else:
+                lon += 0.0008
+                points.append((lon, lat, 10.0, ts))
+                ts += 10
+        ts += SPLIT_MIN_GAP_S + 600
+    return points
+
+
+class TestCostModel(unittest.TestCase):
+
+    def test_fit_recovers_power_law(self):
+        samples = [(n, 3e-6 * n**1.2) for n in range(100, 100_000, 997)]
+        coef, exponent = fit_cost_model(samples)
+        self.assertAlmostEqual(exponent, 1.2, places=3)
+        self.assertAlmostEqual(coef, 3e-6, delta=1e-7)
+
+    def test_too_few_samples_keep_default(self):
+        self.assertEqual(fit_cost_model([(100, 0.1)] * 5), DEFAULT_COST_MODEL)
+        self.assertEqual(predict_cost(DEFAULT_COST_MODEL, 0), 0.0)
+
+
+class TestSplitAtGaps(unittest.TestCase):
+
+    def test_pieces_cover_points_and_split_only_at_long_gaps(self):
+        points = _vessel_with_gaps()
+        pieces = split_points_at_gaps(points, max_pieces=3)
+
+        self.assertEqual(len(pieces), 3)
+        self.assertEqual([p for piece in pieces for p in piece], points)
+        for before, after in zip(pieces, pieces[1:]):
+            self.assertGreaterEqual(after[0][3] - before[-1][3], SPLIT_MIN_GAP_S)
+
+    def test_stitched_pieces_match_unsplit_result(self):
+        points = _vessel_with_gaps()
+        mmsi, trajs, stops = process_single_mmsi(219000001, points)
+
+        parts = [
+            process_single_mmsi_with_metrics(219000001, piece)
+            for piece in split_points_at_gaps(points, max_pieces=6)
+        ]
+        stitched_mmsi, stitched_trajs, stitched_stops, metrics = stitch_mmsi_results(
+            parts
+        )
+
+        self.assertTrue(trajs and stops)
+        self.assertEqual(stitched_mmsi, mmsi)
+        self.assertEqual(sorted(stitched_trajs), sorted(trajs))
+        self.assertEqual(sorted(stitched_stops), sorted(stops))
+        self.assertEqual(metrics["num_points"], len(points))
+        self.assertEqual(metrics["num_pieces"], 6)
+        self.assertEqual(
+            metrics["max_points_in_stop"],
+            max(part[3]["max_points_in_stop"] for part in parts),
+        )
+
+
+class TestPlanConstructTasks(unittest.TestCase):
+
+    def test_heavy_mmsi_is_split_and_tasks_are_ordered_by_cost(self):
+        heavy = _vessel_with_gaps(num_legs=80)  # 24,000 points
+        light = {mmsi: heavy[:500] for mmsi in range(1, 9)}
+        tasks = plan_construct_tasks({99: heavy, **light}, DEFAULT_COST_MODEL, 4)
+
+        heavy_tasks = [task for task in tasks if task[0] == 99]
+        self.assertGreater(len(heavy_tasks), 1)
+        self.assertTrue(all(task[2] == len(heavy_tasks) for task in heavy_tasks))
+        self.assertEqual(sum(len(task[3]) for task in heavy_tasks), len(heavy))
+        costs = [task[4] for task in tasks]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+        self.assertEqual(len(tasks), len(heavy_tasks) + len(light))
+
+    def test_single_worker_never_splits(self):
+        heavy = _vessel_with_gaps(num_legs=80)
+        tasks = plan_construct_tasks({99: heavy}, DEFAULT_COST_MODEL, 1)
+        self.assertEqual([(task[0], task[2]) for task in tasks], [(99, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
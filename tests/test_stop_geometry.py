@@ -0,0 +1,137 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+import numpy as np  # noqa: E402
+from shapely import MultiPoint, concave_hull  # noqa: E402
+
+from core.points_to_ls_poly import MAX_MBR_AREA  # noqa: E402
+from core.stop_geometry import (  # noqa: E402
+    MAX_HULL_POINTS,
+    STOP_POINT_BUFFER_DEG,
+    build_stop_polygon,
+    dedupe_stop_points,
+    thin_stop_points,
+)
+from core.utils import Coord, compute_mbr_area  # noqa: E402
+
+# Largest allowed symmetric difference between the new and the reference hull, relative to
+# the reference area (stops above the tiny-MBR threshold)
+HULL_AREA_TOLERANCE = 0.02
+
+
+def _reference_stop_geometry(coords: list[Coord]):
+    """Phase 4.1 before the stop geometry builder: concave hull of all points."""
+    geom_points = MultiPoint([(c[0], c[1]) for c in coords])
+    hull = concave_hull(geom_points, ratio=0.2, allow_holes=False)
+    stop_geom = hull if hull.geom_type == "Polygon" else geom_points.envelope
+    if stop_geom.geom_type == "Point":
+        stop_geom = geom_points.centroid.buffer(STOP_POINT_BUFFER_DEG)
+    return stop_geom
+
+
+def _coords(lon, lat) -> list[Coord]:
+    return [(float(x), float(y), float(i)) for i, (x, y) in enumerate(zip(lon, lat))]
+
+
+def _stop_cases() -> dict[str, list[Coord]]:
+    rng = np.random.default_rng(1)
+    angle = rng.uniform(0, 2 * np.pi, 5_000)
+    radius = rng.uniform(0.8, 1.0, 5_000)
+    return {
+        # Moored vessel reporting for days: tens of thousands of jittered positions
+        "moored_dense": _coords(
+            10.2 + rng.normal(0, 5e-5, 20_000), 56.15 + rng.normal(0, 3e-5, 20_000)
+        ),
+        # Same, with positions quantised to 1e-5 degrees (many exact duplicates)
+        "moored_quantised": _coords(
+            np.round(10.2 + rng.normal(0, 5e-5, 20_000), 5),
+            np.round(56.15 + rng.normal(0, 3e-5, 20_000), 5),
+        ),
+        # Vessel swinging at anchor: a ring of ~100 m radius
+        "anchor_swing": _coords(
+            10.5 + 0.0016 * np.cos(angle) * radius,
+            56.3 + 0.0009 * np.sin(angle) * radius,
+        ),
+        "small": _coords(
+            10.2 + rng.normal(0, 2e-4, 300), 56.15 + rng.normal(0, 1e-4, 300)
+        ),
+    }
+
+
+class TestBuildStopPolygonAgainstReference(unittest.TestCase):
+
+    def test_hulls_match_reference_within_tolerance(self):
+        for name, coords in _stop_cases().items():
+            with self.subTest(name):
+                reference = _reference_stop_geometry(coords)
+                polygon = build_stop_polygon(coords)
+
+                self.assertEqual(polygon.geom_type, "Polygon")
+                self.assertLessEqual(
+                    reference.symmetric_difference(polygon).area / reference.area,
+                    HULL_AREA_TOLERANCE,
+                )
+                self.assertAlmostEqual(
+                    compute_mbr_area(polygon), compute_mbr_area(reference), delta=1.0
+                )
+                self.assertEqual(
+                    compute_mbr_area(polygon) <= MAX_MBR_AREA,
+                    compute_mbr_area(reference) <= MAX_MBR_AREA,
+                )
+
+    def test_tiny_stop_uses_convex_hull_containing_reference(self):
+        rng = np.random.default_rng(2)
+        coords = _coords(
+            10.2 + rng.normal(0, 2e-5, 300), 56.15 + rng.normal(0, 1e-5, 300)
+        )
+        reference = _reference_stop_geometry(coords)
+        polygon = build_stop_polygon(coords)
+
+        self.assertTrue(polygon.equals(MultiPoint(polygon.exterior.coords).convex_hull))
+        self.assertLess(reference.difference(polygon).area, 1e-15)
+        self.assertAlmostEqual(
+            compute_mbr_area(polygon), compute_mbr_area(reference), delta=1.0
+        )
+
+    def test_coincident_points_get_buffer(self):
+        coords = [(10.383365, 57.056374, float(i)) for i in range(100)]
+        polygon = build_stop_polygon(coords)
+
+        self.assertEqual(polygon.geom_type, "Polygon")
+        self.assertAlmostEqual(polygon.centroid.x, 10.383365, places=6)
+        self.assertAlmostEqual(polygon.centroid.y, 57.056374, places=6)
+
+    def test_collinear_points_match_reference_geometry(self):
+        coords = [(10.0 + i * 1e-4, 56.0, float(i)) for i in range(50)]
+        polygon = build_stop_polygon(coords)
+        reference = _reference_stop_geometry(coords)
+
+        self.assertEqual(polygon.geom_type, reference.geom_type)
+        self.assertTrue(polygon.equals(reference))
+
+
+class TestStopPointReduction(unittest.TestCase):
+
+    def test_dedupe_keeps_one_point_per_grid_cell(self):
+        coords = [(10.0, 56.0, 0.0), (10.0, 56.0, 1.0), (10.00001, 56.0, 2.0)]
+        self.assertEqual(
+            dedupe_stop_points(coords).tolist(), [[10.0, 56.0], [10.00001, 56.0]]
+        )
+
+    def test_thinning_caps_points_and_keeps_extent(self):
+        xy = dedupe_stop_points(_stop_cases()["moored_dense"])
+        thinned = thin_stop_points(xy)
+
+        self.assertGreater(len(xy), MAX_HULL_POINTS)
+        self.assertLess(len(thinned), 2 * MAX_HULL_POINTS)
+        np.testing.assert_array_equal(thinned.min(axis=0), xy.min(axis=0))
+        np.testing.assert_array_equal(thinned.max(axis=0), xy.max(axis=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
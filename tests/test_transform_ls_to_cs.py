@@ -14,10 +14,12 @@ from core.cellstring_utils import (
     Classification,
     classify_tile_containment,
     deprecated_encode_lonlat_to_cellid,
+    linecover_multizoom,
 )
 from core.ls_poly_to_cs import (
     convert_linestring_to_cellids,
     convert_linestring_to_cellstring,
+    convert_linestring_to_cellstrings,
     convert_polygon_to_cellstrings,
     deprecated_convert_polygon_to_cellstring,
 )
@@ -174,6 +176,54 @@ class TestLineStringToCellStringTransformation(unittest.TestCase):
         self.assertGreater(len(cell_ids), 0)
         self.assertIsInstance(cell_ids[0], int)
 
+    def test_multizoom_linecover_matches_walk_per_zoom(self):
+        """Test: z13/z17 cells derived from the z21 walk equal walking at z13/z17."""
+        linestring = LineString(
+            [
+                (10.0, 55.0, 1000),
+                (10.013, 55.004, 1060),
+                (10.021, 54.998, 1120),
+                (10.017, 55.011, 1200),
+            ]
+        )
+
+        covers = linecover_multizoom(linestring, (13, 17, 21))
+
+        self.assertEqual(covers[2], convert_linestring_to_cellstring(linestring, 21))
+        for cover, zoom in zip(covers, (13, 17)):
+            self.assertEqual(
+                [cell_id for cell_id, _ in cover],
+                [
+                    cell_id
+                    for cell_id, _ in convert_linestring_to_cellstring(linestring, zoom)
+                ],
+            )
+            # Each coarse cell starts at the timestamp of its first z21 cell
+            self.assertEqual(cover[0][1], 1000)
+            self.assertTrue(all(a[1] <= b[1] for a, b in zip(cover, cover[1:])))
+
+    def test_linestring_to_cellstrings_at_all_zooms(self):
+        """Test: one-pass z13/z17/z21 CellStrings equal the per-zoom conversions."""
+        linestring = LineString(
+            [
+                (10.0, 55.0),
+                (10.1, 55.1),
+                (10.2, 55.0),
+                (10.1, 54.9),
+                (10.0, 55.0),
+            ]
+        )
+
+        cellstrings = convert_linestring_to_cellstrings(linestring)
+
+        self.assertEqual(
+            cellstrings,
+            tuple(
+                convert_linestring_to_cellids(linestring, zoom) for zoom in (13, 17, 21)
+            ),
+        )
+        self.assertEqual(convert_linestring_to_cellstrings(LineString()), ([], [], []))
+
 
 class TestPolygonToCellStrings(unittest.TestCase):
 